@@ -1,17 +1,32 @@
+import argparse
 import importlib
 import traceback
 
 import imswitch
-from imswitch.imcommon import prepareApp, launchApp
+from imswitch.imcommon import prepareApp, launchApp, prepareHeadlessApp, launchHeadlessApp
 from imswitch.imcommon.controller import ModuleCommunicationChannel, MultiModuleWindowController
+from imswitch.imcommon.framework import StartupReport
 from imswitch.imcommon.model import modulesconfigtools, pythontools, initLogger
 from imswitch.imcommon.view import MultiModuleWindow, ModuleLoadErrorView
 
 
 def main():
+    parser = argparse.ArgumentParser(prog='imswitch')
+    parser.add_argument('--headless', action='store_true',
+                        help='run the hardware control module without a GUI, to be controlled'
+                             ' through its API only')
+    args = parser.parse_args()
+
     logger = initLogger('main')
     logger.info(f'Starting ImSwitch {imswitch.__version__}')
 
+    if args.headless:
+        mainHeadless(logger)
+    else:
+        mainGUI(logger)
+
+
+def mainGUI(logger):
     app = prepareApp()
 
     enabledModuleIds = modulesconfigtools.getEnabledModuleIds()
@@ -20,17 +35,22 @@ def main():
         
         enabledModuleIds.append(enabledModuleIds.pop(enabledModuleIds.index('imscripting')))
 
-    modulePkgs = [importlib.import_module(pythontools.joinModulePath('imswitch', moduleId))
-                  for moduleId in modulesconfigtools.getEnabledModuleIds()]
+    modulePkgs = []
+    for moduleId in modulesconfigtools.getEnabledModuleIds():
+        with StartupReport.measure(f'import {moduleId}'):
+            modulePkgs.append(
+                importlib.import_module(pythontools.joinModulePath('imswitch', moduleId))
+            )
 
     moduleCommChannel = ModuleCommunicationChannel()
 
-    multiModuleWindow = MultiModuleWindow('ImSwitch')
-    multiModuleWindowController = MultiModuleWindowController.create(
-        multiModuleWindow, moduleCommChannel
-    )
-    multiModuleWindow.show(showLoadingScreen=True)
-    app.processEvents()  # Draw window before continuing
+    with StartupReport.measure('main window'):
+        multiModuleWindow = MultiModuleWindow('ImSwitch')
+        multiModuleWindowController = MultiModuleWindowController.create(
+            multiModuleWindow, moduleCommChannel
+        )
+        multiModuleWindow.show(showLoadingScreen=True)
+        app.processEvents()  # Draw window before continuing
 
     # Register modules
     for modulePkg in modulePkgs:
@@ -48,11 +68,12 @@ def main():
         moduleName = modulePkg.__title__ if hasattr(modulePkg, '__title__') else moduleId
 
         try:
-            view, controller = modulePkg.getMainViewAndController(
-                moduleCommChannel=moduleCommChannel,
-                multiModuleWindowController=multiModuleWindowController,
-                moduleMainControllers=moduleMainControllers
-            )
+            with StartupReport.measure(moduleId):
+                view, controller = modulePkg.getMainViewAndController(
+                    moduleCommChannel=moduleCommChannel,
+                    multiModuleWindowController=multiModuleWindowController,
+                    moduleMainControllers=moduleMainControllers
+                )
         except Exception as e:
             logger.error(f'Failed to initialize module {moduleId}')
             logger.error(traceback.format_exc())
@@ -67,9 +88,26 @@ def main():
             multiModuleWindow.updateLoadingProgress(i / len(modulePkgs))
             app.processEvents()  # Draw window before continuing
 
+    logger.info(f'Startup timing:\n{StartupReport.formatReport()}')
     launchApp(app, multiModuleWindow, moduleMainControllers.values())
 
 
+def mainHeadless(logger):
+    app = prepareHeadlessApp()
+
+    with StartupReport.measure('import imcontrol'):
+        modulePkg = importlib.import_module('imswitch.imcontrol')
+
+    moduleCommChannel = ModuleCommunicationChannel()
+    moduleCommChannel.register(modulePkg)
+
+    with StartupReport.measure('imcontrol'):
+        controller = modulePkg.getHeadlessController(moduleCommChannel=moduleCommChannel)
+
+    logger.info(f'Startup timing:\n{StartupReport.formatReport()}')
+    launchHeadlessApp(app, [controller])
+
+
 if __name__ == '__main__':
     main()
 
@@ -1 +1 @@
-from .applaunch import prepareApp, launchApp
+from .applaunch import prepareApp, launchApp, prepareHeadlessApp, launchHeadlessApp
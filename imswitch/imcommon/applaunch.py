@@ -1,28 +1,24 @@
 import logging
 import os
+import signal
 import sys
 import traceback
 
-from qtpy import QtCore, QtGui, QtWidgets
+from qtpy import QtCore
 
 from .model import dirtools, pythontools, initLogger
-from .view.guitools import getBaseStyleSheet
 
 
 def prepareApp():
     """ This function must be called before any views are created. """
 
-    # Initialize exception handling
-    pythontools.installExceptHook()
+    # Imported here, so that running headless doesn't load the GUI modules
+    from qtpy import QtGui, QtWidgets
+    from .view.guitools import getBaseStyleSheet
 
-    # Set logging levels
-    logging.getLogger('pyvisa').setLevel(logging.WARNING)
-    logging.getLogger('lantz').setLevel(logging.WARNING)
+    _prepareEnvironment()
 
     # Create app
-    os.environ['IMSWITCH_FULL_APP'] = '1'  # Indicator that non-plugin version of ImSwitch is used
-    os.environ['PYQTGRAPH_QT_LIB'] = 'PyQt5'  # Force Qt to use PyQt5
-    os.environ['HDF5_USE_FILE_LOCKING'] = 'FALSE'  # Force HDF5 to not lock files
     os.environ["QT_AUTO_SCREEN_SCALE_FACTOR"] = "1"
     QtWidgets.QApplication.setAttribute(QtCore.Qt.AA_ShareOpenGLContexts)  # Fixes Napari issues
     QtWidgets.QApplication.setAttribute(QtCore.Qt.AA_DisableHighDpiScaling, True) # proper scaling on Mac?
@@ -55,6 +51,66 @@ def launchApp(app, mainView, moduleMainControllers):
     sys.exit(exitCode)
 
 
+def prepareHeadlessApp():
+    """ Prepares an app without a GUI, for running ImSwitch headless. This
+    function must be called before any controllers are created. """
+
+    _prepareEnvironment()
+    return QtCore.QCoreApplication([])
+
+
+def launchHeadlessApp(app, moduleMainControllers):
+    """ Runs the event loop of an app prepared by prepareHeadlessApp until it
+    is quit, e.g. by Ctrl+C or a termination signal. The program will then
+    exit. """
+
+    logger = initLogger('launchHeadlessApp')
+
+    def quitOnSignal(signum, _frame):
+        logger.info(f'Received signal {signum}, shutting down')
+        app.quit()
+
+    signal.signal(signal.SIGINT, quitOnSignal)
+    signal.signal(signal.SIGTERM, quitOnSignal)
+
+    # Python signal handlers only run when the interpreter is running, so regularly return to it
+    # from the Qt event loop
+    signalTimer = QtCore.QTimer()
+    signalTimer.timeout.connect(lambda: None)
+    signalTimer.start(_signalCheckInterval)
+
+    logger.info('Running headless, press Ctrl+C to exit')
+    exitCode = app.exec_()
+    signalTimer.stop()
+
+    # Clean up
+    for controller in moduleMainControllers:
+        try:
+            controller.closeEvent()
+        except Exception:
+            logger.error(f'Error closing {type(controller).__name__}')
+            logger.error(traceback.format_exc())
+
+    # Exit
+    sys.exit(exitCode)
+
+
+def _prepareEnvironment():
+    # Initialize exception handling
+    pythontools.installExceptHook()
+
+    # Set logging levels
+    logging.getLogger('pyvisa').setLevel(logging.WARNING)
+    logging.getLogger('lantz').setLevel(logging.WARNING)
+
+    os.environ['IMSWITCH_FULL_APP'] = '1'  # Indicator that non-plugin version of ImSwitch is used
+    os.environ['PYQTGRAPH_QT_LIB'] = 'PyQt5'  # Force Qt to use PyQt5
+    os.environ['HDF5_USE_FILE_LOCKING'] = 'FALSE'  # Force HDF5 to not lock files
+
+
+_signalCheckInterval = 200  # ms
+
+
 # Copyright (C) 2020-2021 ImSwitch developers
 # This file is part of ImSwitch.
 #
@@ -1 +1,3 @@
 from .qt import *
+from .instrumentation import Instrumentation
+from .startup import StartupGraph, StartupReport
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Callable
+from typing import Any, Callable
 
 
 class Mutex(ABC):
@@ -102,3 +102,12 @@ class FrameworkUtils(ABC):
     @abstractmethod
     def processPendingEventsCurrThread() -> None:
         pass
+
+    @staticmethod
+    @abstractmethod
+    def moveToMainThread(obj: Any) -> None:
+        """ Changes the thread affinity of obj, and of the objects that it
+        contains or refers to through its attributes, to the main thread.
+        Must be called from the thread that the objects currently belong
+        to. """
+        pass
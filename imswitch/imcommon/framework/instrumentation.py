@@ -0,0 +1,309 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+
+class Instrumentation:
+    """ Opt-in registry of performance metrics. Code on hot paths reports how
+    long things take through measure, timed and record, how often they happen
+    through count, and current values such as queue depths through
+    setGauge. While instrumentation is disabled (the default), all of these
+    return right away, so they can be left in place permanently.
+
+    Metrics are identified by a name and optional labels (e.g. the detector
+    name). Durations are kept in histograms with logarithmically spaced
+    buckets, from which percentiles can be estimated. """
+
+    _enabled = False
+    _metrics: Dict[Tuple[str, Tuple[Tuple[str, str], ...]],
+                   Union['_Histogram', '_Counter', '_Gauge']] = {}
+    _registryLock = threading.Lock()
+
+    @classmethod
+    def isEnabled(cls) -> bool:
+        return cls._enabled
+
+    @classmethod
+    def enable(cls) -> None:
+        cls._enabled = True
+
+    @classmethod
+    def disable(cls) -> None:
+        cls._enabled = False
+
+    @classmethod
+    def reset(cls) -> None:
+        """ Discards all recorded metrics. """
+        with cls._registryLock:
+            cls._metrics = {}
+
+    @classmethod
+    def measure(cls, name: str, **labels):
+        """ Returns a context manager that records the time spent inside it.
+        """
+        if not cls._enabled:
+            return _nullMeasurement
+        return _Measurement(name, labels)
+
+    @classmethod
+    def timed(cls, name: Optional[str] = None) -> Callable:
+        """ Decorator that records the time spent in each call to the
+        decorated function, under the given name or the qualified name of the
+        function. """
+        def decorator(func):
+            metricName = name if name is not None else func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not cls._enabled:
+                    return func(*args, **kwargs)
+
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    cls.record(metricName, time.perf_counter() - start)
+
+            return wrapper
+
+        return decorator
+
+    @classmethod
+    def record(cls, name: str, seconds: float, **labels) -> None:
+        """ Records a duration in seconds. """
+        if cls._enabled:
+            cls._getMetric(name, labels, _Histogram).add(seconds)
+
+    @classmethod
+    def count(cls, name: str, increment: int = 1, **labels) -> None:
+        """ Increments a counter. """
+        if cls._enabled:
+            cls._getMetric(name, labels, _Counter).add(increment)
+
+    @classmethod
+    def setGauge(cls, name: str, value: float, **labels) -> None:
+        """ Sets the current value of a quantity, such as a queue depth. The
+        largest value set is kept as well. """
+        if cls._enabled:
+            cls._getMetric(name, labels, _Gauge).set(value)
+
+    @classmethod
+    def getStats(cls) -> Dict[str, Dict[str, Any]]:
+        """ Returns a snapshot of all metrics, keyed by name with the labels
+        in braces, e.g. ``'getChunk{detector=Camera}'``. """
+        with cls._registryLock:
+            metrics = list(cls._metrics.items())
+        return {_formatKey(name, labels): metric.getStats()
+                for (name, labels), metric in sorted(metrics)}
+
+    @classmethod
+    def formatSummary(cls) -> str:
+        """ Returns a human-readable summary of all metrics, one per line. """
+        lines = []
+        for key, stats in cls.getStats().items():
+            if stats['type'] == 'histogram':
+                lines.append(
+                    f'{key}: n={stats["count"]}, mean={stats["mean"] * 1000:.3f} ms,'
+                    f' p50={stats["p50"] * 1000:.3f} ms, p99={stats["p99"] * 1000:.3f} ms,'
+                    f' max={stats["max"] * 1000:.3f} ms'
+                )
+            elif stats['type'] == 'counter':
+                lines.append(f'{key}: {stats["count"]}')
+            else:
+                lines.append(f'{key}: {stats["value"]} (max {stats["max"]})')
+        return '\n'.join(lines)
+
+    @classmethod
+    def formatPrometheus(cls, prefix: str = 'imswitch_') -> str:
+        """ Returns all metrics in the Prometheus text exposition format.
+        Durations are exported as histograms in seconds. """
+        with cls._registryLock:
+            metrics = sorted(cls._metrics.items())
+
+        lines = []
+        describedNames = set()
+        for (name, labels), metric in metrics:
+            metricName = prefix + _sanitizeName(name)
+            if metricName not in describedNames:
+                describedNames.add(metricName)
+                lines.append(f'# TYPE {metricName} {metric.prometheusType}')
+            lines.extend(metric.formatPrometheus(metricName, labels))
+        return '\n'.join(lines) + '\n'
+
+    @classmethod
+    def _getMetric(cls, name, labels, metricType):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        metric = cls._metrics.get(key)
+        if metric is None:
+            with cls._registryLock:
+                metric = cls._metrics.setdefault(key, metricType())
+        return metric
+
+
+class _Measurement:
+    __slots__ = ('_name', '_labels', '_start')
+
+    def __init__(self, name, labels):
+        self._name = name
+        self._labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        Instrumentation.record(self._name, time.perf_counter() - self._start, **self._labels)
+
+
+class _NullMeasurement:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+
+class _Histogram:
+    prometheusType = 'histogram'
+
+    def __init__(self):
+        self._bucketCounts = [0] * (len(_bucketBounds) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        i = bisect_left(_bucketBounds, seconds)
+        with self._lock:
+            self._bucketCounts[i] += 1
+            self._count += 1
+            self._sum += seconds
+            if seconds > self._max:
+                self._max = seconds
+
+    def getStats(self):
+        with self._lock:
+            bucketCounts = list(self._bucketCounts)
+            count, total, maximum = self._count, self._sum, self._max
+
+        return {
+            'type': 'histogram',
+            'count': count,
+            'sum': total,
+            'mean': total / count if count > 0 else 0.0,
+            'max': maximum,
+            **{f'p{percentile}': self._getPercentile(bucketCounts, count, percentile, maximum)
+               for percentile in [50, 90, 99]}
+        }
+
+    def formatPrometheus(self, metricName, labels):
+        with self._lock:
+            bucketCounts = list(self._bucketCounts)
+            count, total = self._count, self._sum
+
+        lines = []
+        cumulative = 0
+        for bound, bucketCount in zip(_bucketBounds, bucketCounts):
+            cumulative += bucketCount
+            lines.append(f'{metricName}_bucket{_formatLabels(labels, le=f"{bound:g}")}'
+                         f' {cumulative}')
+        lines.append(f'{metricName}_bucket{_formatLabels(labels, le="+Inf")} {count}')
+        lines.append(f'{metricName}_sum{_formatLabels(labels)} {total}')
+        lines.append(f'{metricName}_count{_formatLabels(labels)} {count}')
+        return lines
+
+    @staticmethod
+    def _getPercentile(bucketCounts, count, percentile, maximum):
+        # Returns the upper bound of the bucket that the percentile falls in
+        if count < 1:
+            return 0.0
+        target = count * percentile / 100
+        cumulative = 0
+        for i, bucketCount in enumerate(bucketCounts):
+            cumulative += bucketCount
+            if cumulative >= target:
+                return min(_bucketBounds[i], maximum) if i < len(_bucketBounds) else maximum
+        return maximum
+
+
+class _Counter:
+    prometheusType = 'counter'
+
+    def __init__(self):
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def add(self, increment):
+        with self._lock:
+            self._count += increment
+
+    def getStats(self):
+        return {'type': 'counter', 'count': self._count}
+
+    def formatPrometheus(self, metricName, labels):
+        return [f'{metricName}_total{_formatLabels(labels)} {self._count}']
+
+
+class _Gauge:
+    prometheusType = 'gauge'
+
+    def __init__(self):
+        self._value = 0
+        self._max = 0
+
+    def set(self, value):
+        # Plain assignments, a lost maximum update under contention is acceptable
+        self._value = value
+        if value > self._max:
+            self._max = value
+
+    def getStats(self):
+        return {'type': 'gauge', 'value': self._value, 'max': self._max}
+
+    def formatPrometheus(self, metricName, labels):
+        return [f'{metricName}{_formatLabels(labels)} {self._value}']
+
+
+def _formatKey(name, labels):
+    if not labels:
+        return name
+    return name + '{' + ','.join(f'{key}={value}' for key, value in labels) + '}'
+
+
+def _formatLabels(labels, **extraLabels):
+    allLabels = list(labels) + list(extraLabels.items())
+    if not allLabels:
+        return ''
+    escaped = [(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+               for key, value in allLabels]
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def _sanitizeName(name):
+    return ''.join(c if c.isalnum() or c == '_' else '_' for c in name)
+
+
+_nullMeasurement = _NullMeasurement()
+_bucketBounds = [10 ** (exponent / 4) for exponent in range(-24, 9)]  # 1 µs to 100 s
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -54,3 +54,36 @@ class FrameworkUtils(base.FrameworkUtils):
         QtCore.QAbstractEventDispatcher.instance(
             QtCore.QThread.currentThread()
         ).processEvents(QtCore.QEventLoop.AllEvents)
+
+    @staticmethod
+    def moveToMainThread(obj):
+        app = QtCore.QCoreApplication.instance()
+        if app is not None:
+            _moveObjectsToThread(obj, QtCore.QThread.currentThread(), app.thread(), set())
+
+
+def _moveObjectsToThread(obj, fromThread, toThread, visited):
+    # Moves obj and the QObjects that it refers to through its attributes, such as the submanagers
+    # of a manager and their timers, since they are not children of obj in the Qt sense. Objects
+    # that have been moved to other threads on purpose, such as workers, are left alone. Only
+    # ImSwitch's own objects are searched, not e.g. device libraries.
+    if id(obj) in visited:
+        return
+    visited.add(id(obj))
+
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        values = obj
+    elif isinstance(obj, dict):
+        values = obj.values()
+    elif isinstance(obj, QtCore.QObject):
+        if obj.thread() is not fromThread:
+            return
+        obj.moveToThread(toThread)
+        values = vars(obj).values()
+    elif type(obj).__module__.startswith('imswitch.') and hasattr(obj, '__dict__'):
+        values = vars(obj).values()
+    else:
+        return
+
+    for value in list(values):
+        _moveObjectsToThread(value, fromThread, toThread, visited)
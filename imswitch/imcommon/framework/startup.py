@@ -0,0 +1,217 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .qt import FrameworkUtils
+
+
+@dataclass(frozen=True)
+class StartupStage:
+    name: str
+    start: float
+    """ Start time in seconds, relative to when ImSwitch started. """
+    duration: float
+    thread: str
+
+
+class StartupReport:
+    """ Collects how long the stages of ImSwitch's startup take, such as
+    module imports and manager and controller initialization, so that they
+    can be logged as a timing report once the window is shown. """
+
+    _stages: List[StartupStage] = []
+    _lock = threading.Lock()
+
+    @classmethod
+    def measure(cls, name: str):
+        """ Returns a context manager that records the time spent inside it as
+        the stage with the given name. """
+        return _StageMeasurement(name)
+
+    @classmethod
+    def record(cls, name: str, start: float, end: float) -> None:
+        """ Records a stage from perf_counter timestamps. """
+        stage = StartupStage(name, start - _startTime, end - start,
+                             threading.current_thread().name)
+        with cls._lock:
+            cls._stages.append(stage)
+
+    @classmethod
+    def getStages(cls) -> List[StartupStage]:
+        with cls._lock:
+            return sorted(cls._stages, key=lambda stage: stage.start)
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._stages = []
+
+    @classmethod
+    def formatReport(cls) -> str:
+        """ Returns the recorded stages in the order they started, one per
+        line, with their start times, durations and the threads they ran
+        on. """
+        stages = cls.getStages()
+        if not stages:
+            return ''
+
+        nameWidth = max(len(stage.name) for stage in stages)
+        lines = [f'{"Stage":<{nameWidth}}  {"Start":>8}  {"Duration":>9}  Thread']
+        for stage in stages:
+            lines.append(f'{stage.name:<{nameWidth}}  {stage.start:7.3f}s  {stage.duration:8.3f}s'
+                         f'  {stage.thread}')
+        lines.append(f'Total: {max(stage.start + stage.duration for stage in stages):.3f}s')
+        return '\n'.join(lines)
+
+
+class StartupGraph:
+    """ Initializes a set of objects, such as managers, of which some depend
+    on others. Each step is started as soon as the steps it depends on have
+    finished, on a pool of worker threads, so that independent devices
+    connect at the same time instead of one after the other. The calling
+    thread keeps processing events while it waits, so that the GUI stays
+    responsive.
+
+    Objects created on a worker thread are moved to the calling thread when
+    they have been created, so that their slots run there just like those
+    of objects created on the main thread. Connections that are made on a
+    worker thread to plain functions or methods, rather than to signals or
+    slots, are however tied to the worker thread and stop working when it
+    finishes. Steps that make such connections, e.g. to the signals of
+    objects created by other steps, must therefore run on the calling
+    thread. """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._steps: Dict[str, _Step] = {}
+
+    def add(self, name: str, factory: Callable[..., Any],
+            dependencies: Iterable[str] = (), inCallerThread: bool = False) -> None:
+        """ Adds a step that creates an object by calling factory. The
+        objects created by the steps named in dependencies are passed to
+        factory as keyword arguments. If inCallerThread is true, the step
+        always runs on the thread that calls run. """
+        if name in self._steps:
+            raise ValueError(f'Step "{name}" has already been added')
+        self._steps[name] = _Step(name, factory, tuple(dependencies), inCallerThread)
+
+    def run(self, parallel: bool = True, maxWorkers: Optional[int] = None) -> Dict[str, Any]:
+        """ Runs all steps and returns the created objects by step name. If
+        parallel is false, the steps are run on the calling thread, in the
+        order they were added as far as the dependencies allow. If a step
+        raises an exception, no further steps are started and the exception
+        is raised once the running steps have finished. """
+        for step in self._steps.values():
+            unknownDependencies = set(step.dependencies) - self._steps.keys()
+            if unknownDependencies:
+                raise ValueError(f'Step "{step.name}" depends on unknown steps'
+                                 f' {sorted(unknownDependencies)}')
+
+        with StartupReport.measure(self._name):
+            if not parallel:
+                return self._runSerially()
+            return self._runInParallel(maxWorkers)
+
+    def _runSerially(self):
+        results = {}
+        pending = dict(self._steps)
+        while pending:
+            step = next((step for step in pending.values()
+                         if all(dependency in results for dependency in step.dependencies)),
+                        None)
+            if step is None:
+                raise ValueError(f'Steps {sorted(pending)} have circular dependencies')
+
+            del pending[step.name]
+            results[step.name] = self._runStep(step, results, moveToCallerThread=False)
+        return results
+
+    def _runInParallel(self, maxWorkers):
+        results = {}
+        pending = dict(self._steps)
+        running = {}
+        with ThreadPoolExecutor(maxWorkers, thread_name_prefix=self._name) as executor:
+            while pending or running:
+                readySteps = [step for step in pending.values()
+                              if all(dependency in results for dependency in step.dependencies)]
+                for step in readySteps:
+                    if not step.inCallerThread:
+                        del pending[step.name]
+                        future = executor.submit(self._runStep, step, dict(results),
+                                                 moveToCallerThread=True)
+                        running[future] = step.name
+
+                # Steps that run on this thread are run one at a time, so that the steps that
+                # depend on them are started as early as possible
+                callerStep = next((step for step in readySteps if step.inCallerThread), None)
+                if callerStep is not None:
+                    del pending[callerStep.name]
+                    results[callerStep.name] = self._runStep(callerStep, results,
+                                                             moveToCallerThread=False)
+                    continue
+
+                if not running:
+                    raise ValueError(f'Steps {sorted(pending)} have circular dependencies')
+
+                done, _ = wait(running, timeout=_eventProcessingInterval,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+
+                if not done:
+                    FrameworkUtils.processPendingEventsCurrThread()
+        return results
+
+    def _runStep(self, step, results, moveToCallerThread):
+        with StartupReport.measure(f'{self._name}.{step.name}'):
+            obj = step.factory(**{dependency: results[dependency]
+                                  for dependency in step.dependencies})
+        if moveToCallerThread:
+            FrameworkUtils.moveToMainThread(obj)
+        return obj
+
+
+@dataclass(frozen=True)
+class _Step:
+    name: str
+    factory: Callable[..., Any]
+    dependencies: tuple
+    inCallerThread: bool
+
+
+class _StageMeasurement:
+    __slots__ = ('_name', '_start')
+
+    def __init__(self, name):
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        StartupReport.record(self._name, self._start, time.perf_counter())
+
+
+_startTime = time.perf_counter()
+_eventProcessingInterval = 0.05
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
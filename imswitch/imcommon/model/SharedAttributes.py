@@ -1,37 +1,38 @@
 import json
+import sys
+from contextlib import contextmanager
 
 from imswitch.imcommon.framework import Signal, SignalInterface
 
 
 class SharedAttributes(SignalInterface):
+    """ Attributes shared between the parts of a module, keyed by tuples of
+    strings. Changes are announced through sigAttributeSet (once per key),
+    sigAttributesSet (once per set or batch of sets, with all the changes) and
+    to the callbacks subscribed to a prefix of the changed key. Sets made
+    inside a batch are announced when the outermost batch ends, with only the
+    last value of each key. """
+
     sigAttributeSet = Signal(object, object)  # (key, value)
+    sigAttributesSet = Signal(object)  # (changes)
 
     def __init__(self):
         super().__init__()
         self._data = {}
+        self._hdf5Attrs = {}
+        self._nestedAttrs = {}
+        self._subscribers = {}
+        self._batchDepth = 0
+        self._batchChanges = {}
 
     def getHDF5Attributes(self):
         """ Returns a dictionary of HDF5 attributes representing this object.
         """
-        attrs = {}
-        for key, value in self._data.items():
-            attrs[':'.join(key)] = value
-
-        return attrs
+        return self._hdf5Attrs.copy()
 
     def getJSON(self):
         """ Returns a JSON representation of this instance. """
-        attrs = {}
-        for key, value in self._data.items():
-            parent = attrs
-            for i in range(len(key) - 1):
-                if key[i] not in parent:
-                    parent[key[i]] = {}
-                parent = parent[key[i]]
-
-            parent[key[-1]] = value
-
-        return json.dumps(attrs)
+        return json.dumps(self._nestedAttrs)
 
     def update(self, data):
         """ Updates this object with the data in the given dictionary or
@@ -39,8 +40,38 @@ class SharedAttributes(SignalInterface):
         if isinstance(data, SharedAttributes):
             data = data._data
 
-        for key, value in data.items():
-            self[key] = value
+        with self.batch():
+            for key, value in data.items():
+                self[key] = value
+
+    @contextmanager
+    def batch(self):
+        """ Context manager that holds back the announcement of the attributes
+        set inside it until it ends (or, if nested, until the outermost batch
+        ends). Each key is then announced once, with its last value. The
+        attributes themselves are updated right away. """
+        self._batchDepth += 1
+        try:
+            yield self
+        finally:
+            self._batchDepth -= 1
+            if self._batchDepth == 0:
+                changes, self._batchChanges = self._batchChanges, {}
+                if changes:
+                    self._announce(changes)
+
+    def subscribe(self, prefix, callback):
+        """ Calls callback(key, value) whenever an attribute whose key starts
+        with prefix is set. The callback is called from the thread that sets
+        the attribute. """
+        self._validateKey(prefix)
+        self._subscribers.setdefault(prefix, []).append(callback)
+
+    def unsubscribe(self, prefix, callback):
+        """ Removes a callback added with subscribe. """
+        self._subscribers[prefix].remove(callback)
+        if not self._subscribers[prefix]:
+            del self._subscribers[prefix]
 
     def __getitem__(self, key):
         self._validateKey(key)
@@ -49,7 +80,18 @@ class SharedAttributes(SignalInterface):
     def __setitem__(self, key, value):
         self._validateKey(key)
         self._data[key] = value
-        self.sigAttributeSet.emit(key, value)
+        self._hdf5Attrs[':'.join(key)] = value
+
+        parent = self._nestedAttrs
+        for keySegment in key[:-1]:
+            parent = parent.setdefault(keySegment, {})
+        parent[key[-1]] = value
+
+        if self._batchDepth > 0:
+            self._batchChanges.pop(key, None)  # Announce in the order of the last sets
+            self._batchChanges[key] = value
+        else:
+            self._announce({key: value})
 
     def __iter__(self):
         yield from self._data.items()
@@ -64,6 +106,19 @@ class SharedAttributes(SignalInterface):
             attrs[keyTuple] = value
         return attrs
 
+    def _announce(self, changes):
+        for key, value in changes.items():
+            for i in range(len(key) + 1):
+                for callback in tuple(self._subscribers.get(key[:i], ())):
+                    try:
+                        callback(key, value)
+                    except Exception:
+                        # Like an exception in a slot, this shouldn't stop the other subscribers
+                        sys.excepthook(*sys.exc_info())
+            self.sigAttributeSet.emit(key, value)
+
+        self.sigAttributesSet.emit(changes)
+
     @staticmethod
     def _validateKey(key):
         if type(key) is not tuple:
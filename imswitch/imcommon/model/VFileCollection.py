@@ -1,15 +1,68 @@
 from dataclasses import dataclass
 from io import IOBase
-from typing import Union
+from typing import Any, Dict, Union
 
 import h5py
+import numpy as np
 
 from imswitch.imcommon.framework import Signal, SignalInterface
 
 
+class VArrayFile:
+    """ VArrayFile is an in-memory recording that holds its datasets as NumPy
+    arrays, which are passed around by reference. Unlike an in-memory HDF5
+    file, it is only serialized (to HDF5) when it is saved to the disk. """
+
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.datasets: Dict[str, np.ndarray] = {}
+        self.datasetAttrs: Dict[str, Dict[str, Any]] = {}
+        self.frameMetadata: Dict[str, np.ndarray] = {}  # Per-frame metadata tables
+        self.attrs: Dict[str, Any] = {}
+        self.closed = False
+
+    def save(self, filePath):
+        """ Writes the datasets and their attributes to an HDF5 file. """
+        with h5py.File(filePath, 'w') as file:
+            file.attrs.update(self.attrs)
+            for datasetName, data in self.datasets.items():
+                dataset = file.create_dataset(datasetName, data=data)
+                dataset.attrs.update(self.datasetAttrs.get(datasetName, {}))
+            for datasetName, table in self.frameMetadata.items():
+                file.create_dataset(f'frame_metadata/{datasetName}', data=table)
+
+    def close(self):
+        """ Releases the datasets. """
+        self.datasets.clear()
+        self.datasetAttrs.clear()
+        self.frameMetadata.clear()
+        self.closed = True
+
+    def keys(self):
+        return self.datasets.keys()
+
+    def get(self, datasetName):
+        return self.datasets.get(datasetName)
+
+    def __getitem__(self, datasetName):
+        return self.datasets[datasetName]
+
+    def __contains__(self, datasetName):
+        return datasetName in self.datasets
+
+    def __iter__(self):
+        return iter(self.datasets)
+
+    def __len__(self):
+        return len(self.datasets)
+
+    def __str__(self):
+        return str(self.filename)
+
+
 @dataclass
 class VFileItem:
-    data: Union[IOBase, h5py.File]
+    data: Union[IOBase, h5py.File, VArrayFile]
     filePath: str
     savedToDisk: bool
 
@@ -42,6 +95,8 @@ class VFileCollection(SignalInterface):
         elif isinstance(self._data[name].data, h5py.File):
             with open(filePath, 'wb') as file:
                 file.write(self._data[name].data.id.get_file_image())
+        elif isinstance(self._data[name].data, VArrayFile):
+            self._data[name].data.save(filePath)
         else:
             raise TypeError(f'Data has unsupported type "{type(self._data[name].data).__name__}"')
 
@@ -1,18 +1,42 @@
 import inspect
+from concurrent.futures import Future
 
-from imswitch.imcommon.framework import Mutex, Signal, SignalInterface
+from imswitch.imcommon.framework import Signal, SignalInterface, Thread
 
 
 class APIExport:
-    """ Decorator for methods that should be exported to API. """
+    """ Decorator for methods that should be exported to API. If runOnUIThread
+    is True, calls are executed on the UI thread, regardless of the thread
+    they are made from.
+
+    The remaining arguments only concern the REST API: requestType is the HTTP
+    method the function is bound to; functions that change the state of the
+    instrument may use ``'POST'`` or ``'PUT'``, in which case the arguments are
+    passed as a JSON object in the request body instead of as query
+    parameters. Such functions can still be called with GET and query
+    parameters for compatibility, but that route is deprecated. timeout is
+    the maximum time in seconds that a request may take, and maxConcurrency
+    the maximum number of requests to the function that may be handled at the
+    same time (further requests wait for their turn). None means that the
+    server defaults apply. """
+
+    def __init__(self, *, runOnUIThread=False, requestType='GET', timeout=None,
+                 maxConcurrency=None):
+        if requestType not in _requestTypes:
+            raise ValueError(f'Unsupported request type "{requestType}"')
 
-    def __init__(self, *, runOnUIThread=False):
         self._APIExport = True
         self._APIRunOnUIThread = runOnUIThread
+        self._APIRequestType = requestType
+        self._APITimeout = timeout
+        self._APIMaxConcurrency = maxConcurrency
 
     def __call__(self, func):
         func._APIExport = self._APIExport
         func._APIRunOnUIThread = self._APIRunOnUIThread
+        func._APIRequestType = self._APIRequestType
+        func._APITimeout = self._APITimeout
+        func._APIMaxConcurrency = self._APIMaxConcurrency
         return func
 
 
@@ -41,6 +65,9 @@ def generateAPI(objs, *, missingAttributeErrorMsg=None):
                 wrapper = _UIThreadExecWrapper(subObj)
                 exportedFuncs[subObjName] = wrapper
                 wrapper.module = subObj.__module__.split('.')[-1]
+                for attrName in ['_APIRequestType', '_APITimeout', '_APIMaxConcurrency']:
+                    if hasattr(subObj, attrName):
+                        setattr(wrapper, attrName, getattr(subObj, attrName))
             else:
                 exportedFuncs[subObjName] = subObj
 
@@ -49,9 +76,11 @@ def generateAPI(objs, *, missingAttributeErrorMsg=None):
 
 
 class _UIThreadExecWrapper(SignalInterface):
-    """ Wrapper for executing the specified function on the UI thread. """
+    """ Wrapper for executing the specified function on the UI thread. Calling
+    the wrapper waits for the function to finish and returns its return value
+    or raises its exception; callAsync returns a future instead. """
 
-    wrappingSignal = Signal()
+    wrappingSignal = Signal(object, object, object)  # (future, args, kwargs)
 
     def __init__(self, apiFunc):
         super().__init__()
@@ -61,20 +90,35 @@ class _UIThreadExecWrapper(SignalInterface):
         self.__doc__ = apiFunc.__doc__
 
         self._apiFunc = apiFunc
-        self._execMutex = Mutex()
         self.wrappingSignal.connect(self._apiCall)
 
     def __call__(self, *args, **kwargs):
-        self._execMutex.lock()
-        self._args = args
-        self._kwargs = kwargs
-        self.wrappingSignal.emit()
+        return self.callAsync(*args, **kwargs).result()
+
+    def callAsync(self, *args, **kwargs) -> Future:
+        """ Schedules a call to the function on the UI thread and returns a
+        future that will hold its result. If called from the UI thread, the
+        function is executed right away. """
+        future = Future()
+        if Thread.currentThread() == self.thread():
+            self._apiCall(future, args, kwargs)
+        else:
+            self.wrappingSignal.emit(future, args, kwargs)
+        return future
+
+    def _apiCall(self, future, args, kwargs):
+        if not future.set_running_or_notify_cancel():
+            return  # Cancelled while waiting for its turn
 
-    def _apiCall(self):
         try:
-            self._apiFunc(*self._args, **self._kwargs)
-        finally:
-            self._execMutex.unlock()
+            result = self._apiFunc(*args, **kwargs)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+
+_requestTypes = ['GET', 'POST', 'PUT']
 
 
 # Copyright (C) 2020-2021 ImSwitch developers
@@ -36,22 +36,7 @@ def initLogger(obj, *, instanceName=None, tryInheritParent=False):
     """ Initializes a logger for the specified object. obj should be either a
     class, object or string. """
 
-    logger = None
-
-    if tryInheritParent:
-        # Use logger from first parent in stack that has one
-        for frameInfo in inspect.stack():
-            frameLocals = frameInfo[0].f_locals
-            if 'self' not in frameLocals:
-                continue
-
-            parent = frameLocals['self']
-            parentRef = weakref.ref(parent)
-            if parentRef not in objLoggers:
-                continue
-
-            logger = objLoggers[parentRef]
-            break
+    logger = _getParentLogger() if tryInheritParent else None
 
     if logger is None:
         # Create logger
@@ -74,3 +59,21 @@ def initLogger(obj, *, instanceName=None, tryInheritParent=False):
             objLoggers[objRef] = logger
 
     return logger
+
+
+def _getParentLogger():
+    """ Returns the logger of the first parent in the stack that has one, or
+    None if there is no such parent. """
+    for frameInfo in inspect.stack():
+        frameLocals = frameInfo[0].f_locals
+        if 'self' not in frameLocals:
+            continue
+
+        try:
+            parentRef = weakref.ref(frameLocals['self'])
+        except TypeError:
+            continue  # Not weakly referenceable, so can't have a logger
+        if parentRef in objLoggers:
+            return objLoggers[parentRef]
+
+    return None
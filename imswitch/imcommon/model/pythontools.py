@@ -1,6 +1,9 @@
+import importlib
 import re
 import sys
+import threading
 import traceback
+import types
 
 from imswitch.imcommon.model import initLogger
 
@@ -51,6 +54,42 @@ def dictToROClass(src, *, missingAttributeErrorMsg=None):
     return ROClass()
 
 
+class LazyModule(types.ModuleType):
+    """ Stand-in for a module that is only imported when one of its
+    attributes is first accessed, for heavy libraries (such as device SDKs)
+    that are only needed by some setups. Submodules that are not imported by
+    the module itself are imported on access as well, e.g.
+    ``LazyModule('nidaqmx').constants``. """
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_LazyModule__lock'] = threading.Lock()
+        self.__dict__['_LazyModule__module'] = None
+
+    def __getattr__(self, attr):
+        module = self.__module
+        if module is None:
+            with self.__lock:
+                if self.__module is None:
+                    self.__dict__['_LazyModule__module'] = importlib.import_module(self.__name__)
+            module = self.__module
+
+        try:
+            return getattr(module, attr)
+        except AttributeError:
+            if attr.startswith('__'):
+                raise
+            submoduleName = f'{self.__name__}.{attr}'
+            try:
+                return importlib.import_module(submoduleName)
+            except ModuleNotFoundError as e:
+                if e.name != submoduleName:
+                    raise
+                raise AttributeError(
+                    f'Module "{self.__name__}" has no attribute "{attr}"'
+                ) from None
+
+
 def installExceptHook():
     if not (hasattr(sys.excepthook, 'implements')
             and sys.excepthook.implements('ExceptionHandler')):
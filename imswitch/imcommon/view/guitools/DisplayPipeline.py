@@ -0,0 +1,205 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class DisplayImage:
+    """ An image prepared for display by DisplayPipeline. """
+
+    data: np.ndarray
+    """ The pixels to display. """
+
+    factor: int
+    """ The decimation factor; each pixel of data covers factor x factor
+    pixels of the original frame. """
+
+    offset: Tuple[int, int]
+    """ The (y, x) position in the original frame of the top left corner of
+    data. """
+
+    binned: bool = False
+    """ Whether the pixels of data are block means rather than samples of the
+    original frame. """
+
+    @property
+    def region(self) -> Tuple[int, int, int, int]:
+        """ The part of the original frame covered by data, as
+        ``(top, left, bottom, right)``. """
+        return (self.offset[0], self.offset[1],
+                self.offset[0] + self.data.shape[0] * self.factor,
+                self.offset[1] + self.data.shape[1] * self.factor)
+
+    @property
+    def translate(self) -> Tuple[float, float]:
+        """ The (y, x) position, in pixels of the original frame, at which the
+        center of the first pixel of data should be drawn so that it lines up
+        with the original frame. """
+        shift = (self.factor - 1) / 2 if self.binned else 0
+        return self.offset[0] + shift, self.offset[1] + shift
+
+
+class DisplayPipeline:
+    """ Prepares frames for display at the resolution they are actually shown
+    at, so that large frames don't have to be uploaded and processed in full
+    when they are zoomed out. The current frame is decimated by a power of two
+    chosen from the zoom, by taking every n-th pixel (method ``'stride'``) or
+    by averaging n x n blocks (method ``'mean'``). The decimated levels are
+    cached until the next frame, so zooming and panning don't recompute them.
+    When zoomed in to full resolution, only the visible part of the frame
+    (plus a margin, so that small pans don't require a new upload) is
+    returned. Frames that are not 2D are passed through as they are. """
+
+    def __init__(self, method: str = 'stride', cropMargin: float = 0.25,
+                 fullFrameFraction: float = 0.5):
+        if method not in ['stride', 'mean']:
+            raise ValueError(f'Unsupported decimation method "{method}"')
+
+        self._method = method
+        self._cropMargin = cropMargin
+        self._fullFrameFraction = fullFrameFraction
+        self._frame = None
+        self._levels = {}
+        self._current = None
+
+    @property
+    def frame(self) -> Optional[np.ndarray]:
+        """ The current frame at full resolution. """
+        return self._frame
+
+    def setFrame(self, frame: np.ndarray) -> None:
+        """ Sets the frame to display and discards the cached levels of the
+        previous one. """
+        self._frame = frame
+        self._levels = {1: frame}
+        self._current = None
+
+    def render(self, pixelZoom: Optional[float] = None,
+               visibleRegion: Optional[Tuple[float, float, float, float]] = None
+               ) -> Optional[DisplayImage]:
+        """ Returns the current frame prepared for display at pixelZoom screen
+        pixels per frame pixel, with the ``(top, left, bottom, right)`` region
+        of the frame visible. If the image needed is the same as the one last
+        returned, that very object is returned again, so callers can skip
+        uploading it. """
+        frame = self._frame
+        if frame is None:
+            return None
+        if frame.ndim != 2 or pixelZoom is None or pixelZoom <= 0:
+            return self._setCurrent(DisplayImage(frame, 1, (0, 0)))
+
+        factor = getDecimationFactor(frame.shape, pixelZoom)
+        current = self._current
+        if factor > 1:
+            if current is not None and current.factor == factor:
+                return current
+            return self._setCurrent(DisplayImage(self._getLevel(factor), factor, (0, 0),
+                                                 binned=self._method == 'mean'))
+
+        if visibleRegion is None:
+            return self._setCurrent(DisplayImage(frame, 1, (0, 0)))
+        return self._renderRegion(visibleRegion)
+
+    def _renderRegion(self, visibleRegion):
+        """ Returns the current frame at full resolution, cropped to the
+        visible region if that is small enough to be worth it. """
+        frame = self._frame
+        current = self._current
+        height, width = frame.shape
+        top, left, bottom, right = visibleRegion
+        top, left = max(int(np.floor(top)), 0), max(int(np.floor(left)), 0)
+        bottom, right = min(int(np.ceil(bottom)), height), min(int(np.ceil(right)), width)
+        if bottom <= top or right <= left:
+            return current if current is not None else self._setCurrent(
+                DisplayImage(frame, 1, (0, 0))
+            )
+
+        if (bottom - top) * (right - left) >= self._fullFrameFraction * frame.size:
+            if current is not None and current.factor == 1 and current.data.shape == frame.shape:
+                return current
+            return self._setCurrent(DisplayImage(frame, 1, (0, 0)))
+
+        return self._crop(top, left, bottom, right)
+
+    def _crop(self, top, left, bottom, right):
+        """ Returns the current frame cropped to the specified region plus a
+        margin, unless the last returned crop already contains the region. """
+        current = self._current
+        if current is not None and current.factor == 1:
+            currentTop, currentLeft, currentBottom, currentRight = current.region
+            if (currentTop <= top and currentLeft <= left and
+                    currentBottom >= bottom and currentRight >= right):
+                return current
+
+        height, width = self._frame.shape
+        marginY = int((bottom - top) * self._cropMargin)
+        marginX = int((right - left) * self._cropMargin)
+        top, left = max(top - marginY, 0), max(left - marginX, 0)
+        bottom, right = min(bottom + marginY, height), min(right + marginX, width)
+        return self._setCurrent(DisplayImage(self._frame[top:bottom, left:right], 1, (top, left)))
+
+    def _setCurrent(self, displayImage):
+        self._current = displayImage
+        return displayImage
+
+    def _getLevel(self, factor):
+        if factor in self._levels:
+            return self._levels[factor]
+
+        if self._method == 'stride':
+            level = np.ascontiguousarray(self._frame[::factor, ::factor])
+        else:
+            level = binBy2(self._getLevel(factor // 2))
+        self._levels[factor] = level
+        return level
+
+
+def getDecimationFactor(shape: Tuple[int, int], pixelZoom: float) -> int:
+    """ Returns the largest power of two that an image of the specified shape
+    can be decimated by without dropping below one image pixel per screen
+    pixel at pixelZoom screen pixels per image pixel. """
+    if pixelZoom >= 1:
+        return 1
+
+    factor = 2 ** int(np.floor(np.log2(1 / pixelZoom)))
+    while factor > 1 and min(shape) // factor < 1:
+        factor //= 2
+    return factor
+
+
+def binBy2(image: np.ndarray) -> np.ndarray:
+    """ Returns the means of the 2x2 blocks of an image, in the data type of
+    the image. An odd last row or column is left out. """
+    height, width = image.shape[0] // 2 * 2, image.shape[1] // 2 * 2
+    image = image[:height, :width]
+    if np.issubdtype(image.dtype, np.floating):
+        accumulatorType = np.promote_types(image.dtype, np.float32)
+    else:
+        accumulatorType = np.int64 if np.issubdtype(image.dtype, np.signedinteger) else np.uint64
+    total = image[0::2, 0::2].astype(accumulatorType)
+    total += image[1::2, 0::2]
+    total += image[0::2, 1::2]
+    total += image[1::2, 1::2]
+    if np.issubdtype(image.dtype, np.floating):
+        total /= 4
+    else:
+        total //= 4
+    return total.astype(image.dtype, copy=False)
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,149 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class LevelsEngine:
+    """ Computes display levels for a stream of frames from a subsample of
+    their pixels, without a full pass over every frame. Every frame
+    contributes a strided subsample of at most maxSamples pixels to a running
+    histogram, which is smoothed exponentially with the given smoothing
+    factor (the weight of the newest frame). The sampling grid is shifted
+    from frame to frame, so that all pixels are eventually taken into account.
+
+    In ``'minmax'`` mode, the levels span from 0 to the (smoothed) brightest
+    pixel; in ``'percentile'`` mode, they span from the lowPercentile to the
+    highPercentile percentile of the pixel values. New levels are only
+    reported when they have drifted by more than driftThreshold (as a fraction
+    of the current level range), which keeps the display from flickering on
+    noisy data. """
+
+    def __init__(self, mode: str = 'minmax', *, lowPercentile: float = 0.1,
+                 highPercentile: float = 99.9, maxSamples: int = 65536,
+                 smoothing: float = 0.2, driftThreshold: float = 0.02, numBins: int = 1024):
+        if mode not in ['minmax', 'percentile']:
+            raise ValueError(f'Unsupported levels mode "{mode}"')
+        if not 0 <= lowPercentile < highPercentile <= 100:
+            raise ValueError('Percentiles must satisfy 0 <= lowPercentile < highPercentile <= 100')
+
+        self._mode = mode
+        self._lowPercentile = lowPercentile
+        self._highPercentile = highPercentile
+        self._maxSamples = maxSamples
+        self._smoothing = smoothing
+        self._driftThreshold = driftThreshold
+        self._numBins = numBins
+        self.reset()
+
+    @property
+    def levels(self) -> Optional[Tuple[float, float]]:
+        """ The levels last reported by update, or None if no frame has been
+        processed since the engine was reset. """
+        return self._levels
+
+    def reset(self) -> None:
+        """ Discards the running statistics, so that the next frame determines
+        the levels on its own. """
+        self._histogram = None
+        self._range = None
+        self._max = None
+        self._levels = None
+        self._phase = 0
+
+    def update(self, frame: np.ndarray) -> Optional[Tuple[float, float]]:
+        """ Adds a frame to the running statistics and returns the new levels
+        as a ``(minimum, maximum)`` tuple if they have drifted from the
+        previously reported ones, or None if they haven't. """
+        sample = self._getSample(frame)
+        if sample.size < 1:
+            return None
+
+        if self._mode == 'minmax':
+            sampleMax = float(sample.max())
+            self._max = sampleMax if self._max is None else (
+                self._max + self._smoothing * (sampleMax - self._max)
+            )
+            levels = (0, self._max + 2)
+        else:
+            self._addToHistogram(sample)
+            levels = self._getPercentileLevels()
+
+        if self._levels is not None:
+            low, high = self._levels
+            tolerance = self._driftThreshold * max(high - low, np.finfo(float).eps)
+            if abs(levels[0] - low) <= tolerance and abs(levels[1] - high) <= tolerance:
+                return None
+
+        self._levels = levels
+        return levels
+
+    def _getSample(self, frame):
+        frame = np.asarray(frame)
+        if frame.ndim == 2:
+            step = max(int(np.ceil(np.sqrt(frame.size / self._maxSamples))), 1)
+            rowPhase, colPhase = divmod(self._phase % (step * step), step)
+            sample = frame[rowPhase::step, colPhase::step]
+        else:
+            step = max(int(np.ceil(frame.size / self._maxSamples)), 1)
+            sample = frame.reshape(-1)[self._phase % step::step]
+        self._phase += 1
+        return sample
+
+    def _addToHistogram(self, sample):
+        sampleMin, sampleMax = float(sample.min()), float(sample.max())
+        if self._range is None or sampleMin < self._range[0] or sampleMax > self._range[1]:
+            # The values are outside the binned range, so start over with a wider range
+            low, high = sampleMin, sampleMax
+            if self._range is not None:
+                low, high = min(low, self._range[0]), max(high, self._range[1])
+            headroom = (high - low) * _rangeHeadroom
+            low = low - headroom if low < 0 else max(low - headroom, 0)
+            self._range = (low, high + headroom + 1)
+            self._histogram = None
+
+        low, high = self._range
+        indices = ((sample.astype(np.float32, copy=False) - low) *
+                   (self._numBins / (high - low))).astype(np.intp)
+        np.clip(indices, 0, self._numBins - 1, out=indices)
+        histogram = np.bincount(indices.ravel(), minlength=self._numBins) / indices.size
+
+        if self._histogram is None:
+            self._histogram = histogram
+        else:
+            self._histogram += self._smoothing * (histogram - self._histogram)
+
+    def _getPercentileLevels(self):
+        low, high = self._range
+        binEdges = np.linspace(low, high, self._numBins + 1)
+        cumulative = np.concatenate(([0], np.cumsum(self._histogram)))
+        cumulative /= cumulative[-1]
+
+        def getValueAt(fraction):
+            # Interpolate linearly within the first bin in which the fraction is reached
+            i = int(np.clip(np.searchsorted(cumulative, fraction), 1, self._numBins))
+            binFraction = cumulative[i] - cumulative[i - 1]
+            position = (fraction - cumulative[i - 1]) / binFraction if binFraction > 0 else 0
+            return float(binEdges[i - 1] + position * (binEdges[i] - binEdges[i - 1]))
+
+        return (getValueAt(self._lowPercentile / 100),
+                getValueAt(self._highPercentile / 100))
+
+
+_rangeHeadroom = 0.1
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -1,9 +1,11 @@
 from .BetterPushButton import BetterPushButton
 from .BetterSlider import BetterSlider
 from .CheckableComboBox import CheckableComboBox
+from .DisplayPipeline import DisplayImage, DisplayPipeline
 from .FloatSlider import FloatSlider
 from .dialogtools import askYesNoQuestion, askForFilePath, askForFolderPath, askForTextInput
 from .imagetools import bestLevels, minmaxLevels
+from .LevelsEngine import LevelsEngine
 from .stylesheet import getBaseStyleSheet
 from .texttools import ordinalSuffix
 from .FileWatcher import FileWatcher
@@ -9,29 +9,15 @@ def bestLevels(arr):
     limit = pixelCount / 10
     threshold = pixelCount / 5000
     hist, bin_edges = np.histogram(arr, 256)
-    i = 0
-    found = False
-    count = 0
-    while True:
-        i += 1
-        count = hist[i]
-        if count > limit:
-            count = 0
-        found = count > threshold
-        if found or i >= 255:
-            break
-    hmin = i
-
-    i = 256
-    while True:
-        i -= 1
-        count = hist[i]
-        if count > limit:
-            count = 0
-        found = count > threshold
-        if found or i < 1:
-            break
-    hmax = i
+
+    # Bins with more than limit pixels are ignored; the levels are set at the first and last
+    # remaining bins with more than threshold pixels
+    hist[hist > limit] = 0
+    found = hist > threshold
+    lowBins = np.flatnonzero(found[1:255])
+    hmin = lowBins[0] + 1 if len(lowBins) > 0 else 255
+    highBins = np.flatnonzero(found)
+    hmax = highBins[-1] if len(highBins) > 0 else 0
 
     return bin_edges[hmin], bin_edges[hmax]
 
@@ -4,17 +4,15 @@ __title__ = 'Hardware Control'
 
 def getMainViewAndController(moduleCommChannel, *_args,
                              overrideSetupInfo=None, overrideOptions=None, **_kwargs):
-    from imswitch.imcommon.model import initLogger
+    from imswitch.imcommon.framework import StartupReport
     from .controller import ImConMainController
-    from .model import configfiletools
-    from .view import ViewSetupInfo, ImConMainView
-
-    logger = initLogger('imcontrol init')
+    from .view import ImConMainView
 
     def pickSetup(options):
         import dataclasses
         import sys
         from qtpy import QtWidgets
+        from imswitch.imcontrol.model import configfiletools
         from imswitch.imcontrol.view import PickSetupDialog
 
         # Let user pick the setup to use
@@ -23,10 +21,57 @@ def getMainViewAndController(moduleCommChannel, *_args,
         result = pickSetupDialog.exec_()
         setupFileName = pickSetupDialog.getSelectedSetup()
         if result != QtWidgets.QDialog.Accepted or not setupFileName:
-            logger.critical('User did not pick a setup to use')
+            _getLogger().critical('User did not pick a setup to use')
             sys.exit()
         return dataclasses.replace(options, setupFileName=setupFileName)
 
+    options, setupInfo = _loadOptionsAndSetupInfo(pickSetup, overrideSetupInfo, overrideOptions)
+
+    with StartupReport.measure('imcontrol.view'):
+        view = ImConMainView(options, setupInfo)
+    try:
+        with StartupReport.measure('imcontrol.controller'):
+            controller = ImConMainController(options, setupInfo, view, moduleCommChannel)
+    except Exception as e:
+        # TODO: To broad exception
+        view.close()
+        raise e
+
+    return view, controller
+
+
+def getHeadlessController(moduleCommChannel, *_args,
+                          overrideSetupInfo=None, overrideOptions=None, **_kwargs):
+    """ Creates the main controller without a GUI, for running ImSwitch
+    headless. Only the widgets that have headless counterparts are included,
+    and no views or napari are imported. """
+    from imswitch.imcommon.framework import StartupReport
+    from .controller import ImConMainController
+    from .view import ImConHeadlessView
+
+    def pickSetup(options):
+        import sys
+        _getLogger().critical('No setup to use has been picked; pick one in the GUI or set'
+                              ' setupFileName in the imcontrol options file')
+        sys.exit(1)
+
+    options, setupInfo = _loadOptionsAndSetupInfo(pickSetup, overrideSetupInfo, overrideOptions)
+    if not setupInfo.pyroServerInfo.active:
+        _getLogger().warning('The API server is not active in the setup, so ImSwitch cannot be'
+                             ' controlled while running headless; set pyroServerInfo.active to'
+                             ' true to enable it')
+
+    view = ImConHeadlessView(options, setupInfo)
+    with StartupReport.measure('imcontrol.controller'):
+        controller = ImConMainController(options, setupInfo, view, moduleCommChannel)
+
+    return controller
+
+
+def _loadOptionsAndSetupInfo(pickSetup, overrideSetupInfo, overrideOptions):
+    from .model import configfiletools
+    from .view import ViewSetupInfo
+
     if overrideOptions is None:
         options, optionsDidNotExist = configfiletools.loadOptions()
         if optionsDidNotExist:
@@ -47,17 +92,13 @@ def getMainViewAndController(moduleCommChannel, *_args,
     else:
         setupInfo = overrideSetupInfo
 
-    logger.debug(f'Setup used: {options.setupFileName}')
-    
-    view = ImConMainView(options, setupInfo)
-    try:
-        controller = ImConMainController(options, setupInfo, view, moduleCommChannel)
-    except Exception as e:
-        # TODO: To broad exception
-        view.close()
-        raise e
+    _getLogger().debug(f'Setup used: {options.setupFileName}')
+    return options, setupInfo
 
-    return view, controller
+
+def _getLogger():
+    from imswitch.imcommon.model import initLogger
+    return initLogger('imcontrol init')
 
 
 # Copyright (C) 2020-2021 ImSwitch developers
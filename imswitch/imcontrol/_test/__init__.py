@@ -337,6 +337,79 @@ setupInfoWithoutWidgets = ViewSetupInfo.from_json("""
 }
 """, infer_missing=True)
 
+setupInfoPointScanSimulated = ViewSetupInfo.from_json("""
+{
+    "detectors": {
+        "APD": {
+            "analogChannel": null,
+            "digitalLine": null,
+            "managerName": "APDManager",
+            "managerProperties": {
+                "ctrInputLine": "Dev1/ctr0",
+                "terminal": "PFI0"
+            },
+            "forAcquisition": true
+        }
+    },
+    "lasers": {
+        "640": {
+            "analogChannel": null,
+            "digitalLine": "Dev1/port0/line2",
+            "managerName": "NidaqLaserManager",
+            "managerProperties": {},
+            "wavelength": 640,
+            "valueRangeMin": 0,
+            "valueRangeMax": 1,
+            "valueRangeStep": 1
+        }
+    },
+    "positioners": {
+        "GalvoX": {
+            "analogChannel": "Dev1/ao0",
+            "digitalLine": null,
+            "managerName": "NidaqPositionerManager",
+            "managerProperties": {
+                "conversionFactor": 10.0,
+                "minVolt": -10,
+                "maxVolt": 10,
+                "vel_max": 0.1,
+                "acc_max": 0.0001
+            },
+            "axes": ["X"],
+            "forScanning": true
+        },
+        "GalvoY": {
+            "analogChannel": "Dev1/ao1",
+            "digitalLine": null,
+            "managerName": "NidaqPositionerManager",
+            "managerProperties": {
+                "conversionFactor": 10.0,
+                "minVolt": -10,
+                "maxVolt": 10,
+                "vel_max": 0.1,
+                "acc_max": 0.0001
+            },
+            "axes": ["Y"],
+            "forScanning": true
+        }
+    },
+    "scan": {
+        "scanWidgetType": "PointScan",
+        "scanDesigner": "GalvoScanDesigner",
+        "scanDesignerParams": {},
+        "TTLCycleDesigner": "PointScanTTLCycleDesigner",
+        "TTLCycleDesignerParams": {},
+        "sampleRate": 100000
+    },
+    "nidaq": {
+        "timerCounterChannel": "Dev1/ctr2",
+        "startTrigger": true,
+        "simulated": true
+    },
+    "availableWidgets": []
+}
+""", infer_missing=True)
+
 
 # Copyright (C) 2020-2021 ImSwitch developers
 # This file is part of ImSwitch.
@@ -0,0 +1,461 @@
+""" Live view latency benchmark.
+
+Runs the live view of a SyntheticCameraManager that stamps every frame with
+the time it was captured (see the ``stampFrames`` manager property), along the
+same path that frames take in the GUI: through the LVWorker, the detector's
+sigImageUpdated, the CommunicationChannel and the ImageController, to the
+image widget. For every requested combination of frame size and live view
+update period, it reports percentiles of the latency from capture to
+sigImageUpdated, from the signal to the ImageController (which is also when
+the frame becomes available to API clients such as the frame stream), from
+the controller to the display, and from capture to display, as well as the
+achieved display frame rate. The report is written as JSON, and can be
+compared against a previously stored report to detect regressions::
+
+    python -m imswitch.imcontrol._test.benchmark.liveview --size 512x512 2048x2048 \\
+        --update-period 30 100 300 --output current.json --baseline baseline.json
+
+By default, frames are displayed by a stand-in for ImageWidget that only holds
+on to them. With ``--napari``, the real napari-based ImageWidget is used, which
+requires a display (or QT_QPA_PLATFORM=offscreen).
+
+The exit code is 1 if any case regressed by more than the tolerance.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List
+
+import numpy as np
+from qtpy import QtCore
+
+import imswitch
+from imswitch import __version__
+from imswitch.imcommon.controller import ModuleCommunicationChannel
+from imswitch.imcontrol.controller import ImConMainController
+from imswitch.imcontrol.controller.basecontrollers import ImConWidgetControllerFactory
+from imswitch.imcontrol.controller.controllers import ImageController
+from imswitch.imcontrol.model import DetectorInfo, Options
+from imswitch.imcontrol.model.managers.detectors.SyntheticCameraManager import readFrameStamp
+from imswitch.imcontrol.view import ImConHeadlessView, ViewSetupInfo
+
+
+@dataclass(frozen=True)
+class LiveViewBenchmarkCase:
+    """ A single live view configuration to benchmark. """
+
+    width: int = 512
+    height: int = 512
+    updatePeriod: int = 100
+    """ Period in milliseconds at which the live view polls the detector.
+    Not used if notifying is true. """
+
+    notifying: bool = False
+    """ Whether the detector notifies the live view of new frames, instead of
+    being polled. """
+
+    fps: float = 100
+    duration: float = 5.0
+    """ Measurement duration in seconds, after the warmup. """
+
+    warmup: float = 0.5
+    """ Time in seconds after starting the live view during which frames are
+    not measured. """
+
+    @property
+    def name(self) -> str:
+        mode = 'Notify' if self.notifying else f'Poll{self.updatePeriod}ms'
+        return f'{mode}-{self.width}x{self.height}@{self.fps:g}fps'
+
+    def toJSON(self) -> dict:
+        return asdict(self)
+
+
+def makeCases(sizes, updatePeriods, fpsValues, duration, notifying=(False,),
+              **kwargs) -> List[LiveViewBenchmarkCase]:
+    """ Returns the cases for every combination of the given (width, height)
+    sizes, update periods, frame rates and notifying modes. The update period
+    is not varied for notifying cases, since it is not used for them. """
+    cases = []
+    for notify, (width, height), updatePeriod, fps in itertools.product(
+            notifying, sizes, updatePeriods, fpsValues):
+        if notify and updatePeriod != updatePeriods[0]:
+            continue
+        cases.append(LiveViewBenchmarkCase(width, height, updatePeriod, notify, fps, duration,
+                                           **kwargs))
+    return cases
+
+
+def runLiveViewCase(case: LiveViewBenchmarkCase, useNapari: bool = False) -> Dict[str, float]:
+    """ Runs a single case and returns its results. """
+    setupInfo = ViewSetupInfo(detectors={'Camera': _makeDetectorInfo(case)},
+                              availableWidgets=False)
+    options = Options(setupFileName='')
+    moduleCommChannel = ModuleCommunicationChannel()
+    moduleCommChannel.register(imswitch.imcontrol)
+    mainController = ImConMainController(options, setupInfo, ImConHeadlessView(options, setupInfo),
+                                         moduleCommChannel)
+
+    probes = _LatencyProbes()
+    imageController = None
+    liveViewHandle = None
+    detectorsManager = mainController.masterController.detectorsManager
+    try:
+        detectorsManager.setUpdatePeriod(case.updatePeriod)
+        detectorsManager['Camera'].sigImageUpdated.connect(probes.frameEmitted,
+                                                           QtCore.Qt.DirectConnection)
+
+        # The image controller is created just like for the GUI, but reports when it receives
+        # frames and when it has handed them to the widget
+        factory = ImConWidgetControllerFactory(setupInfo, mainController.masterController,
+                                               mainController.commChannel, moduleCommChannel)
+        imageWidget = (_makeNapariImageWidget(probes) if useNapari
+                       else _TimingImageWidget(probes))
+        imageController = factory.createController(_ProbedImageController, imageWidget)
+        imageController.probes = probes
+
+        liveViewHandle = detectorsManager.startAcquisition(liveView=True)
+        start = time.time()
+        probes.measureFrom(start + case.warmup)
+        _runEventLoop(case.warmup + case.duration)
+        probes.measureUntil(time.time())
+    finally:
+        if liveViewHandle is not None:
+            detectorsManager.stopAcquisition(liveViewHandle, liveView=True)
+        if imageController is not None:
+            imageController.closeEvent()
+        mainController.closeEvent()
+
+    return probes.getResults(case.duration)
+
+
+def runLiveViewBenchmark(cases: List[LiveViewBenchmarkCase], useNapari: bool = False,
+                         log=print) -> dict:
+    """ Runs the given cases and returns the report. """
+    report = {
+        'benchmark': 'liveview',
+        'imswitchVersion': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpuCount': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'display': 'napari' if useNapari else 'headless',
+        'cases': {}
+    }
+
+    for case in cases:
+        if log is not None:
+            log(f'Running {case.name}')
+        results = runLiveViewCase(case, useNapari)
+        report['cases'][case.name] = {'config': case.toJSON(), 'results': results}
+        if log is not None:
+            log(f'  {results["displayFps"]:.1f} fps displayed,'
+                f' p50 capture-to-display {_formatMs(results["captureToDisplayP50"])},'
+                f' p99 {_formatMs(results["captureToDisplayP99"])}')
+
+    return report
+
+
+def compareToBaseline(report: dict, baseline: dict, tolerance: float = 0.1,
+                      minLatencyChange: float = 0.002) -> List[str]:
+    """ Compares a report with a baseline report and returns a description of
+    every regression. A metric regresses if it is worse than in the baseline
+    by more than the relative tolerance; latencies must in addition have
+    grown by more than minLatencyChange seconds, so that jitter in short
+    latencies is not reported. Cases that are not in both reports are
+    ignored. """
+    regressions = []
+    for name, case in report['cases'].items():
+        if name not in baseline['cases']:
+            continue
+
+        results = case['results']
+        baseResults = baseline['cases'][name]['results']
+        for metric, higherIsBetter in _comparedMetrics.items():
+            value, baseValue = results.get(metric), baseResults.get(metric)
+            if value is None or baseValue is None or baseValue == 0:
+                continue
+            if not higherIsBetter and value - baseValue <= minLatencyChange:
+                continue
+
+            change = (value - baseValue) / baseValue
+            if (-change if higherIsBetter else change) > tolerance:
+                regressions.append(f'{name}: {metric} {value:.4g} vs. {baseValue:.4g}'
+                                   f' in baseline ({change:+.1%})')
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m imswitch.imcontrol._test.benchmark.liveview',
+        description='Benchmarks live view latency with a synthetic camera.'
+    )
+    parser.add_argument('--size', nargs='+', default=['512x512', '2048x2048'],
+                        help='frame sizes as WIDTHxHEIGHT')
+    parser.add_argument('--update-period', nargs='+', type=int, default=[30, 100, 300],
+                        help='live view update periods in milliseconds')
+    parser.add_argument('--fps', nargs='+', type=float, default=[100],
+                        help='camera frame rates')
+    parser.add_argument('--mode', nargs='+', default=['poll', 'notify'],
+                        choices=['poll', 'notify'],
+                        help='whether the live view polls the camera or is notified of frames')
+    parser.add_argument('--duration', type=float, default=5, help='seconds per case')
+    parser.add_argument('--napari', action='store_true',
+                        help='display frames in the napari-based ImageWidget')
+    parser.add_argument('--output', help='file to write the JSON report to')
+    parser.add_argument('--baseline', help='JSON report to compare the results with')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='relative change that counts as a regression')
+    args = parser.parse_args(argv)
+
+    cases = makeCases(
+        sizes=[tuple(int(n) for n in size.lower().split('x')) for size in args.size],
+        updatePeriods=args.update_period,
+        fpsValues=args.fps,
+        duration=args.duration,
+        notifying=[mode == 'notify' for mode in args.mode]
+    )
+
+    if args.napari:
+        from qtpy import QtWidgets
+        app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)  # noqa: F841
+    else:
+        app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication(sys.argv)  # noqa: F841
+
+    report = runLiveViewBenchmark(cases, args.napari)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if not set(report['cases']) & set(baseline['cases']):
+            print('No cases in common with baseline')
+            return 1
+        regressions = compareToBaseline(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+        print('No regressions compared to baseline')
+
+    return 0
+
+
+class _LatencyProbes:
+    """ Collects the times at which each frame passes the points along the
+    live view path. Frames are identified by the frame numbers stamped into
+    them. All times are from time.time(), like the stamps. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._captureTimes = {}
+        self._signalTimes = {}
+        self._controllerTimes = {}
+        self._displayTimes = {}
+        self._currentFrameNumber = None
+        self._measureFrom = np.inf
+        self._measureUntil = np.inf
+
+    def measureFrom(self, startTime):
+        self._measureFrom = startTime
+
+    def measureUntil(self, endTime):
+        self._measureUntil = endTime
+
+    def frameEmitted(self, image, _init, _scale):
+        """ Called on the live view thread when the detector emits a frame. """
+        now = time.time()
+        frameNumber, captureTime = readFrameStamp(image)
+        if not self._measureFrom <= captureTime <= self._measureUntil:
+            return
+        with self._lock:
+            self._captureTimes[frameNumber] = captureTime
+            self._signalTimes[frameNumber] = now
+
+    def controllerStarted(self, image):
+        """ Called when the ImageController starts handling a frame. """
+        self._currentFrameNumber, _ = readFrameStamp(image)
+        with self._lock:
+            self._controllerTimes[self._currentFrameNumber] = time.time()
+
+    def controllerFinished(self):
+        self._currentFrameNumber = None
+
+    def displayed(self):
+        """ Called when the image widget has been given the frame that the
+        ImageController is handling. """
+        if self._currentFrameNumber is not None:
+            with self._lock:
+                self._displayTimes[self._currentFrameNumber] = time.time()
+
+    def getResults(self, duration):
+        with self._lock:
+            frameNumbers = sorted(self._captureTimes.keys() & self._displayTimes.keys())
+            captureTimes = np.array([self._captureTimes[n] for n in frameNumbers])
+            signalTimes = np.array([self._signalTimes[n] for n in frameNumbers])
+            controllerTimes = np.array([self._controllerTimes[n] for n in frameNumbers])
+            displayTimes = np.array([self._displayTimes[n] for n in frameNumbers])
+            numEmitted = len(self._signalTimes)
+
+        results = {
+            'emittedFrames': numEmitted,
+            'displayedFrames': len(frameNumbers),
+            'displayFps': len(frameNumbers) / duration,
+        }
+        for prefix, latencies in [('captureToSignal', signalTimes - captureTimes),
+                                  ('signalToController', controllerTimes - signalTimes),
+                                  ('controllerToDisplay', displayTimes - controllerTimes),
+                                  ('captureToDisplay', displayTimes - captureTimes)]:
+            for percentile in _percentiles:
+                results[f'{prefix}P{percentile}'] = (
+                    float(np.percentile(latencies, percentile)) if len(latencies) > 0 else None
+                )
+            results[f'{prefix}Max'] = float(latencies.max()) if len(latencies) > 0 else None
+        return results
+
+
+class _ProbedImageController(ImageController):
+    """ ImageController that reports to probes when it handles a frame. """
+
+    probes = None
+
+    def update(self, detectorName, im, init, scale, isCurrentDetector):
+        if self.probes is not None:
+            self.probes.controllerStarted(im)
+        try:
+            super().update(detectorName, im, init, scale, isCurrentDetector)
+        finally:
+            if self.probes is not None:
+                self.probes.controllerFinished()
+
+
+class _TimingImageWidget(QtCore.QObject):
+    """ Stand-in for ImageWidget that only holds on to the frames it is given
+    and reports when it has been given one. The viewport always shows whole
+    frames at their original resolution. """
+
+    sigViewChanged = QtCore.Signal()
+
+    def __init__(self, probes):
+        super().__init__()
+        self._probes = probes
+        self._images = {}
+        self._levels = {}
+        self._shape = (1, 1)
+
+    def setLiveViewLayers(self, names):
+        self._images = {name: np.zeros((1, 1)) for name in names}
+
+    def getImage(self, name):
+        return self._images[name]
+
+    def setImage(self, name, im, scale, translate=None):
+        self._images[name] = im
+        self._shape = im.shape[-2:]
+        self._probes.displayed()
+
+    def getImageDisplayLevels(self, name):
+        return self._levels.get(name, (0, 1))
+
+    def setImageDisplayLevels(self, name, minimum, maximum):
+        self._levels[name] = (minimum, maximum)
+
+    def getCenterViewbox(self):
+        return self._shape[1] / 2, self._shape[0] / 2
+
+    def getViewport(self):
+        return 1, (self._shape[0] / 2, self._shape[1] / 2), self._shape
+
+    def updateGrid(self, imShape):
+        pass
+
+    def resetView(self):
+        pass
+
+
+def _makeNapariImageWidget(probes):
+    from imswitch.imcontrol.view.widgets import ImageWidget
+
+    class TimingImageWidget(ImageWidget):
+        def setImage(self, name, im, scale, translate=None):
+            super().setImage(name, im, scale, translate)
+            probes.displayed()
+
+    widget = TimingImageWidget()
+    widget.resize(1024, 1024)
+    widget.show()
+    return widget
+
+
+def _runEventLoop(duration):
+    loop = QtCore.QEventLoop()
+    QtCore.QTimer.singleShot(int(duration * 1000), loop.quit)
+    loop.exec_()
+
+
+def _makeDetectorInfo(case):
+    return DetectorInfo(
+        analogChannel=None,
+        digitalLine=None,
+        managerName='SyntheticCameraManager',
+        managerProperties={
+            'width': case.width,
+            'height': case.height,
+            'fps': case.fps,
+            'pattern': 'beads',
+            'useProducerThread': case.notifying,
+            'stampFrames': True
+        },
+        forAcquisition=True
+    )
+
+
+def _formatMs(seconds):
+    return f'{seconds * 1000:.1f} ms' if seconds is not None else 'n/a'
+
+
+_percentiles = (50, 90, 99)
+_comparedMetrics = {  # metric: whether higher is better
+    'displayFps': True,
+    'captureToSignalP50': False,
+    'captureToSignalP99': False,
+    'signalToControllerP50': False,
+    'signalToControllerP99': False,
+    'controllerToDisplayP50': False,
+    'controllerToDisplayP99': False,
+    'captureToDisplayP50': False,
+    'captureToDisplayP99': False
+}
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,404 @@
+""" Recording throughput benchmark.
+
+Records from a SyntheticCameraManager for a fixed duration with every
+requested combination of save format, save mode and recording mode, and
+reports the achieved frame rate and throughput, the number of frames lost,
+percentiles of the chunk write latency and of the per-frame latency (from the
+time a frame was acquired until it had been written), and the peak resident
+memory of the process. The report is written as JSON, and can be compared
+against a previously stored report to detect regressions::
+
+    python -m imswitch.imcontrol._test.benchmark.recording --size 2048x2048 \\
+        --fps 100 --duration 10 --output current.json --baseline baseline.json
+
+The exit code is 1 if any case regressed by more than the tolerance.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import psutil
+
+from imswitch import __version__
+from imswitch.imcontrol.model import (
+    DetectorInfo, DetectorsManager, RecordingManager, RecMode, SaveFormat, SaveMode,
+    WriteQueuePolicy
+)
+from imswitch.imcontrol.model.managers.RecordingManager import (
+    ArrayStorer, DEFAULT_STORER_MAP
+)
+
+
+@dataclass(frozen=True)
+class RecordingBenchmarkCase:
+    """ A single recording configuration to benchmark. """
+
+    saveFormat: SaveFormat
+    saveMode: SaveMode
+    recMode: RecMode
+    width: int = 512
+    height: int = 512
+    fps: float = 100
+    duration: float = 5.0
+    """ Recording duration in seconds. In SpecFrames mode, the number of
+    frames that the camera produces in this time is recorded. """
+
+    pattern: str = 'noise'
+    writeQueuePolicy: WriteQueuePolicy = WriteQueuePolicy.Block
+
+    @property
+    def name(self) -> str:
+        formatName = 'Array' if self.saveMode == SaveMode.RAMArray else self.saveFormat.name
+        return (f'{formatName}-{self.saveMode.name}-{self.recMode.name}'
+                f'-{self.width}x{self.height}@{self.fps:g}fps')
+
+    def toJSON(self) -> dict:
+        return {key: value.name if hasattr(value, 'name') else value
+                for key, value in asdict(self).items()}
+
+
+def makeCases(saveFormats, saveModes, recModes, sizes, fpsValues, duration,
+              **kwargs) -> List[RecordingBenchmarkCase]:
+    """ Returns the cases for every combination of the given save formats,
+    save modes, recording modes, (width, height) sizes and frame rates.
+    Combinations that would duplicate another case are left out: RAMArray
+    mode ignores the save format, and formats that cannot be streamed to
+    memory are written to disk in RAM modes. """
+    cases = []
+    for saveFormat, saveMode, recMode, (width, height), fps in itertools.product(
+            saveFormats, saveModes, recModes, sizes, fpsValues):
+        if saveMode == SaveMode.RAMArray and saveFormat != saveFormats[0]:
+            continue
+        if (saveMode in [SaveMode.RAM, SaveMode.DiskAndRAM] and
+                not DEFAULT_STORER_MAP[saveFormat].canStreamToMemory):
+            continue
+        cases.append(RecordingBenchmarkCase(saveFormat, saveMode, recMode, width, height, fps,
+                                            duration, **kwargs))
+    return cases
+
+
+def runRecordingCase(case: RecordingBenchmarkCase, outputDir: str) -> Dict[str, float]:
+    """ Runs a single case, writing any files to outputDir, and returns its
+    results. """
+    timings = _WriteTimings()
+    storerMap = {saveFormat: _makeTimedStorerType(storerType, timings)
+                 for saveFormat, storerType in DEFAULT_STORER_MAP.items()}
+    detectorsManager = DetectorsManager({'Camera': _makeDetectorInfo(case)}, updatePeriod=100)
+    recordingManager = RecordingManager(
+        detectorsManager, storerMap=storerMap,
+        arrayStorerType=_makeTimedStorerType(ArrayStorer, timings)
+    )
+    rssSampler = _RssSampler()
+    rssSampler.start()
+    try:
+        start = time.perf_counter()
+        recordingManager.startRecording(
+            detectorNames=['Camera'],
+            recMode=case.recMode,
+            savename=os.path.join(outputDir, case.name),
+            saveMode=case.saveMode,
+            attrs={'Camera': {}},
+            saveFormat=case.saveFormat,
+            recFrames=max(int(round(case.fps * case.duration)), 1),
+            recTime=case.duration,
+            writeQueuePolicy=case.writeQueuePolicy
+        )
+        if case.recMode == RecMode.UntilStop:
+            time.sleep(case.duration)
+        else:
+            deadline = time.perf_counter() + case.duration + _completionTimeout
+            while recordingManager.record and time.perf_counter() < deadline:
+                time.sleep(0.01)
+        recordingManager.endRecording(emitSignal=False, wait=True)
+        elapsed = time.perf_counter() - start
+    finally:
+        rssSampler.stop()
+        for file in recordingManager._memRecordings.values():
+            file.close()
+        recordingManager._memRecordings.clear()
+        detectorsManager.finalize()
+
+    return timings.getResults(elapsed, rssSampler)
+
+
+def runRecordingBenchmark(cases: List[RecordingBenchmarkCase], outputDir: Optional[str] = None,
+                          log=print) -> dict:
+    """ Runs the given cases and returns the report. Files are written to
+    outputDir if specified, and otherwise to a temporary directory that is
+    removed afterwards. """
+    report = {
+        'benchmark': 'recording',
+        'imswitchVersion': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpuCount': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'cases': {}
+    }
+
+    for case in cases:
+        if log is not None:
+            log(f'Running {case.name}')
+        if outputDir is not None:
+            results = runRecordingCase(case, outputDir)
+        else:
+            with tempfile.TemporaryDirectory(prefix='imswitch_bench_') as tempDir:
+                results = runRecordingCase(case, tempDir)
+        report['cases'][case.name] = {'config': case.toJSON(), 'results': results}
+        if log is not None:
+            log(f'  {results["achievedFps"]:.1f} fps, {results["throughputMBps"]:.1f} MB/s,'
+                f' {results["lostFrames"]} frames lost,'
+                f' p99 write latency {_formatMs(results["writeLatencyP99"])},'
+                f' peak RSS {results["peakRssMB"]:.0f} MB')
+
+    return report
+
+
+def compareToBaseline(report: dict, baseline: dict, tolerance: float = 0.1,
+                      lostFramesTolerance: float = 0.001) -> List[str]:
+    """ Compares a report with a baseline report and returns a description of
+    every regression. A metric regresses if it is worse than in the baseline
+    by more than the relative tolerance; the fraction of lost frames regresses
+    if it has grown by more than lostFramesTolerance. Cases that are not in
+    both reports are ignored. """
+    regressions = []
+    for name, case in report['cases'].items():
+        if name not in baseline['cases']:
+            continue
+
+        results = case['results']
+        baseResults = baseline['cases'][name]['results']
+        for metric, higherIsBetter in _comparedMetrics.items():
+            value, baseValue = results.get(metric), baseResults.get(metric)
+            if value is None or baseValue is None or baseValue == 0:
+                continue
+
+            change = (value - baseValue) / baseValue
+            if (-change if higherIsBetter else change) > tolerance:
+                regressions.append(f'{name}: {metric} {value:.4g} vs. {baseValue:.4g}'
+                                   f' in baseline ({change:+.1%})')
+
+        lostFraction = results['lostFrames'] / max(results['expectedFrames'], 1)
+        baseLostFraction = baseResults['lostFrames'] / max(baseResults['expectedFrames'], 1)
+        if lostFraction - baseLostFraction > lostFramesTolerance:
+            regressions.append(f'{name}: {lostFraction:.2%} of frames lost vs.'
+                               f' {baseLostFraction:.2%} in baseline')
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m imswitch.imcontrol._test.benchmark.recording',
+        description='Benchmarks recording throughput with a synthetic camera.'
+    )
+    parser.add_argument('--formats', nargs='+', default=['HDF5', 'TIFF', 'ZARR'],
+                        choices=[saveFormat.name for saveFormat in SaveFormat])
+    parser.add_argument('--save-modes', nargs='+', default=['Disk', 'RAM', 'RAMArray'],
+                        choices=['Disk', 'RAM', 'DiskAndRAM', 'RAMArray'])
+    parser.add_argument('--rec-modes', nargs='+', default=['SpecTime'],
+                        choices=['SpecFrames', 'SpecTime', 'UntilStop'])
+    parser.add_argument('--size', nargs='+', default=['512x512', '2048x2048'],
+                        help='frame sizes as WIDTHxHEIGHT')
+    parser.add_argument('--fps', nargs='+', type=float, default=[100])
+    parser.add_argument('--duration', type=float, default=5, help='seconds per case')
+    parser.add_argument('--pattern', default='noise', choices=['noise', 'beads', 'scan'])
+    parser.add_argument('--queue-policy', default='Block',
+                        choices=[policy.name for policy in WriteQueuePolicy])
+    parser.add_argument('--output-dir', help='directory to record to; a temporary directory'
+                                             ' is used if not specified')
+    parser.add_argument('--output', help='file to write the JSON report to')
+    parser.add_argument('--baseline', help='JSON report to compare the results with')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='relative change that counts as a regression')
+    args = parser.parse_args(argv)
+
+    cases = makeCases(
+        saveFormats=[SaveFormat[name] for name in args.formats],
+        saveModes=[SaveMode[name] for name in args.save_modes],
+        recModes=[RecMode[name] for name in args.rec_modes],
+        sizes=[tuple(int(n) for n in size.lower().split('x')) for size in args.size],
+        fpsValues=args.fps,
+        duration=args.duration,
+        pattern=args.pattern,
+        writeQueuePolicy=WriteQueuePolicy[args.queue_policy]
+    )
+
+    from qtpy import QtCore
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication(sys.argv)  # noqa: F841
+
+    report = runRecordingBenchmark(cases, args.output_dir)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if not set(report['cases']) & set(baseline['cases']):
+            print('No cases in common with baseline')
+            return 1
+        regressions = compareToBaseline(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+        print('No regressions compared to baseline')
+
+    return 0
+
+
+class _WriteTimings:
+    """ Collects the write latencies and frame numbers reported by the timed
+    storers. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chunkLatencies = []
+        self._frameLatencies = []
+        self._frameNumbers = []
+        self._numBytes = 0
+
+    def chunkWritten(self, frames, metadata, start, end):
+        with self._lock:
+            self._chunkLatencies.append(end - start)
+            self._numBytes += frames.nbytes
+            if metadata is not None:
+                # Frame timestamps are host wall-clock times
+                self._frameLatencies.append(time.time() - metadata['hostTimestamp'])
+                self._frameNumbers.append(metadata['frameNumber'])
+
+    def getResults(self, elapsed, rssSampler):
+        with self._lock:
+            frameNumbers = np.concatenate(self._frameNumbers or [np.empty(0, dtype=np.int64)])
+            frameLatencies = np.concatenate(self._frameLatencies or [np.empty(0)])
+            chunkLatencies = np.array(self._chunkLatencies)
+            numBytes = self._numBytes
+
+        numFrames = len(frameNumbers)
+        expectedFrames = (int(frameNumbers.max() - frameNumbers.min() + 1)
+                          if numFrames > 0 else 0)
+        results = {
+            'elapsed': elapsed,
+            'recordedFrames': numFrames,
+            'expectedFrames': expectedFrames,
+            'lostFrames': expectedFrames - numFrames,
+            'achievedFps': numFrames / elapsed,
+            'throughputMBps': numBytes / 1024 ** 2 / elapsed,
+            'numWrites': len(chunkLatencies),
+            'meanFramesPerWrite': numFrames / max(len(chunkLatencies), 1),
+            'peakRssMB': rssSampler.peakRss / 1024 ** 2,
+            'rssIncreaseMB': (rssSampler.peakRss - rssSampler.startRss) / 1024 ** 2
+        }
+        for prefix, latencies in [('writeLatency', chunkLatencies),
+                                  ('frameLatency', frameLatencies)]:
+            for percentile in _percentiles:
+                results[f'{prefix}P{percentile}'] = (
+                    float(np.percentile(latencies, percentile)) if len(latencies) > 0 else None
+                )
+            results[f'{prefix}Max'] = float(latencies.max()) if len(latencies) > 0 else None
+        return results
+
+
+class _RssSampler:
+    """ Samples the resident memory of the process in a background thread. """
+
+    def __init__(self, interval=0.01):
+        self._process = psutil.Process()
+        self._interval = interval
+        self._stopEvent = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.startRss = self.peakRss = self._process.memory_info().rss
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopEvent.set()
+        self._thread.join()
+        self._sample()
+
+    def _run(self):
+        while not self._stopEvent.wait(self._interval):
+            self._sample()
+
+    def _sample(self):
+        self.peakRss = max(self.peakRss, self._process.memory_info().rss)
+
+
+def _makeTimedStorerType(storerType, timings):
+    class TimedStorer(storerType):
+        def stream(self, data=None, metadata=None, **kwargs):
+            start = time.perf_counter()
+            super().stream(data, metadata, **kwargs)
+            end = time.perf_counter()
+            for channel, frames in (data or {}).items():
+                timings.chunkWritten(frames, (metadata or {}).get(channel), start, end)
+
+    TimedStorer.__name__ = f'Timed{storerType.__name__}'
+    return TimedStorer
+
+
+def _makeDetectorInfo(case):
+    return DetectorInfo(
+        analogChannel=None,
+        digitalLine=None,
+        managerName='SyntheticCameraManager',
+        managerProperties={
+            'width': case.width,
+            'height': case.height,
+            'fps': case.fps,
+            'pattern': case.pattern
+        },
+        forAcquisition=True
+    )
+
+
+def _formatMs(seconds):
+    return f'{seconds * 1000:.1f} ms' if seconds is not None else 'n/a'
+
+
+_percentiles = (50, 90, 99)
+_comparedMetrics = {  # metric: whether higher is better
+    'achievedFps': True,
+    'throughputMBps': True,
+    'writeLatencyP50': False,
+    'writeLatencyP99': False,
+    'frameLatencyP50': False,
+    'frameLatencyP99': False,
+    'peakRssMB': False
+}
+_completionTimeout = 60  # seconds
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
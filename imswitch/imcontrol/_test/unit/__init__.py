@@ -79,6 +79,22 @@ detectorInfosNonSquare = {
     )
 }
 
+detectorInfosSynthetic = {
+    'CAM': DetectorInfo(
+        analogChannel=None,
+        digitalLine=3,
+        managerName='SyntheticCameraManager',
+        managerProperties={
+            'width': 320,
+            'height': 240,
+            'fps': 500,
+            'pattern': 'beads',
+            'numBankFrames': 16
+        },
+        forAcquisition=True
+    )
+}
+
 
 # Copyright (C) 2020-2021 ImSwitch developers
 # This file is part of ImSwitch.
@@ -1,8 +1,15 @@
+import time
+from dataclasses import replace
+
 import numpy as np
 import pytest
 
-from imswitch.imcontrol.model import DetectorsManager
-from . import detectorInfosBasic, detectorInfosMulti, detectorInfosNonSquare
+from imswitch.imcontrol.model import DetectorInfo, DetectorsManager
+from imswitch.imcontrol.model.managers.detectors.FrameRingBuffer import FrameRingBuffer
+from imswitch.imcontrol.model.managers.detectors.SyntheticCameraManager import readFrameStamp
+from . import (
+    detectorInfosBasic, detectorInfosMulti, detectorInfosNonSquare, detectorInfosSynthetic
+)
 
 
 def getImage(qtbot, detectorsManager):
@@ -55,6 +62,200 @@ def test_acquisition_liveview_multi(qtbot, currentDetector):
     assert not np.all(receivedImage == receivedImage[0, 0])  # Assert that not all pixels are same
 
 
+def test_acquisition_liveview_synthetic(qtbot):
+    detectorsManager = DetectorsManager(detectorInfosSynthetic, updatePeriod=100)
+    receivedImage = getImage(qtbot, detectorsManager)
+
+    assert receivedImage is not None
+    assert receivedImage.shape == (240, 320)
+    assert not np.all(receivedImage == receivedImage[0, 0])  # Assert that not all pixels are same
+
+
+def test_acquisition_liveview_event_driven(qtbot):
+    # The polling period is long enough that all updates must come from frame notifications
+    detectorInfo = replace(detectorInfosSynthetic['CAM'], liveViewFps=20)
+    detectorsManager = DetectorsManager({'CAM': detectorInfo}, updatePeriod=60000)
+    assert detectorsManager['CAM'].notifiesNewFrames
+
+    inits = []
+    detectorsManager.sigImageUpdated.connect(lambda _, __, init, ___, ____: inits.append(init))
+    handle = detectorsManager.startAcquisition(liveView=True)
+    try:
+        with qtbot.waitSignal(detectorsManager.sigImageUpdated, timeout=1000):
+            pass
+        qtbot.wait(1000)
+    finally:
+        detectorsManager.stopAcquisition(handle, liveView=True)
+
+    assert inits[0] is False  # First frame
+    assert all(inits[1:])
+    assert 10 <= len(inits) <= 22  # Limited to 20 fps, although the camera runs at 500 fps
+
+
+def test_acquisition_liveview_buffered_camera(qtbot):
+    # Cameras with a frame buffer are read out by a producer thread that notifies about frames
+    detectorsManager = DetectorsManager(detectorInfosBasic, updatePeriod=60000)
+    camera = detectorsManager['CAM']
+    assert camera.notifiesNewFrames
+
+    handle = detectorsManager.startAcquisition(liveView=True)
+    try:
+        with qtbot.waitSignal(detectorsManager.sigImageUpdated, timeout=5000):
+            pass
+        frames, metadata = camera.getChunkWithMetadata()
+    finally:
+        detectorsManager.stopAcquisition(handle, liveView=True)
+
+    assert len(frames) > 0
+    assert np.all(np.diff(metadata['frameNumber']) == 1)
+
+
+def test_acquisition_liveview_polled_fps(qtbot):
+    # Detectors that don't notify about new frames are polled at their target frame rate
+    polledInfo = replace(detectorInfosSynthetic['CAM'], managerProperties={
+        **detectorInfosSynthetic['CAM'].managerProperties, 'useProducerThread': False
+    })
+    detectorInfos = {'CAM': replace(polledInfo, liveViewFps=20), 'Default': polledInfo}
+    detectorsManager = DetectorsManager(detectorInfos, updatePeriod=60000)
+    assert not detectorsManager['CAM'].notifiesNewFrames
+
+    updates = []
+    detectorsManager.sigImageUpdated.connect(lambda name, *_: updates.append(name))
+    handle = detectorsManager.startAcquisition(liveView=True)
+    try:
+        qtbot.wait(1000)
+    finally:
+        detectorsManager.stopAcquisition(handle, liveView=True)
+
+    assert 10 <= updates.count('CAM') <= 22
+    assert updates.count('Default') == 0
+
+
+def test_synthetic_camera_overrun(qtbot):
+    detectorInfo = replace(
+        detectorInfosSynthetic['CAM'],
+        managerProperties={**detectorInfosSynthetic['CAM'].managerProperties,
+                           'fps': 1000, 'bufferFrames': 10, 'useProducerThread': False}
+    )
+    detectorsManager = DetectorsManager({'CAM': detectorInfo}, updatePeriod=100)
+    camera = detectorsManager['CAM']
+
+    camera.startAcquisition()
+    try:
+        time.sleep(0.1)
+        frames, metadata = camera.getChunkWithMetadata()
+    finally:
+        camera.stopAcquisition()
+
+    assert frames.shape[1:] == (240, 320)
+    assert len(frames) == len(metadata) == 10  # Older frames were overwritten
+    assert np.all(np.diff(metadata['frameNumber']) == 1)
+    stats = camera.getFrameStats()
+    assert stats.overwrittenFrames == stats.pushedFrames - 10
+    assert stats.droppedFrames == 0
+
+
+def test_synthetic_camera_stamps(qtbot):
+    detectorInfo = replace(
+        detectorInfosSynthetic['CAM'],
+        managerProperties={**detectorInfosSynthetic['CAM'].managerProperties,
+                           'stampFrames': True, 'useProducerThread': False}
+    )
+    detectorsManager = DetectorsManager({'CAM': detectorInfo}, updatePeriod=100)
+    camera = detectorsManager['CAM']
+
+    camera.startAcquisition()
+    try:
+        time.sleep(0.05)
+        frames, metadata = camera.getChunkWithMetadata()
+        latestFrame = camera.getLatestFrame()
+    finally:
+        camera.stopAcquisition()
+
+    assert len(frames) > 0
+    for frame, frameMetadata in zip(frames, metadata):
+        assert readFrameStamp(frame) == (frameMetadata['frameNumber'],
+                                         frameMetadata['deviceTimestamp'])
+    assert readFrameStamp(latestFrame)[0] >= metadata['frameNumber'][-1]
+    assert readFrameStamp(camera._bank[0])[0] != 0  # The bank itself is left unstamped
+
+
+def test_tis_live_view_in_chunks():
+    detectorInfo = DetectorInfo(analogChannel=None, digitalLine=None, managerName='TISManager',
+                                managerProperties={'cameraListIndex': 'mock', 'tis': {}},
+                                forAcquisition=True)
+    detectorsManager = DetectorsManager({'CAM': detectorInfo}, updatePeriod=100)
+    camera = detectorsManager['CAM']
+
+    latestFrames = [camera.getLatestFrame() for _ in range(3)]
+    frames, metadata = camera.getChunkWithMetadata()
+    # The live view frames go through the frame buffer, so they are recorded as well
+    assert len(frames) == 4
+    assert list(metadata['frameNumber']) == [0, 1, 2, 3]
+    assert all(np.array_equal(frames[i], latestFrames[i]) for i in range(3))
+    assert frames.base is None  # The chunk is a copy that can wait to be written
+
+
+def test_thorcam_snap():
+    detectorInfo = DetectorInfo(analogChannel=None, digitalLine=None,
+                                managerName='ThorcamManager',
+                                managerProperties={'cameraListIndex': 'mock', 'gxipycam': {}},
+                                forAcquisition=True)
+    detectorsManager = DetectorsManager({'CAM': detectorInfo}, updatePeriod=100)
+    camera = detectorsManager['CAM']
+
+    snap = camera.getLatestFrame(is_save=True)
+    assert snap.ndim == 3 and len(snap) == 1
+    frames = camera.getChunk()
+    assert len(frames) == 2
+    assert np.array_equal(frames[0], snap[0])
+
+
+def test_frame_ring_buffer_views():
+    buffer = FrameRingBuffer(numSlots=4)
+    assert buffer.getLatest() is None
+    assert buffer.getChunk().shape[0] == 0
+
+    frames = np.arange(3 * 2 * 2, dtype=np.uint16).reshape(3, 2, 2)
+    buffer.pushChunk(frames)
+    chunk = buffer.getChunk()
+    assert np.array_equal(chunk, frames)
+    assert chunk.base is not None  # Contiguous chunks are views
+    assert np.array_equal(buffer.getLatest(), frames[-1])
+    assert not np.shares_memory(chunk, buffer.getLatest())  # The latest frame is a copy
+
+    # Wraps around the end of the buffer
+    buffer.pushChunk(frames + 100)
+    chunk, metadata = buffer.readChunk()
+    assert np.array_equal(chunk, frames + 100)
+    assert list(metadata['frameNumber']) == [3, 4, 5]
+    assert buffer.getChunk().shape[0] == 0
+
+    buffer.pushChunk(frames[:2])
+    chunk, metadata = buffer.readChunk(copy=True)
+    assert np.array_equal(chunk, frames[:2])
+    assert chunk.base is None and metadata.base is None
+
+
+def test_frame_ring_buffer_overwrite_and_drop():
+    buffer = FrameRingBuffer(numSlots=4)
+    frames = np.zeros((6, 2, 2), dtype=np.uint16)
+    buffer.pushChunk(frames, frameIds=[0, 1, 2, 5, 6, 7])
+
+    chunk, metadata = buffer.readChunk()
+    assert len(chunk) == 4
+    assert list(metadata['frameNumber']) == [2, 5, 6, 7]
+    assert list(metadata['droppedBefore']) == [0, 2, 0, 0]
+    stats = buffer.getStats()
+    assert stats.pushedFrames == 6
+    assert stats.overwrittenFrames == 2
+    assert stats.droppedFrames == 2
+
+    buffer.push(frames[0])
+    buffer.flush()
+    assert buffer.getChunk().shape[0] == 0
+
+
 # Copyright (C) 2020-2021 ImSwitch developers
 # This file is part of ImSwitch.
 #
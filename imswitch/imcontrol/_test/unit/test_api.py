@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from imswitch.imcommon.model import APIExport, generateAPI
+from imswitch.imcontrol.controller.server import ImSwitchServer
+from imswitch.imcontrol.controller.server.ImSwitchServer import app
+from imswitch.imcontrol.model import SetupInfo
+from imswitch.imcontrol.model.SetupInfo import PyroServerInfo
+
+
+class APIProvider:
+    def __init__(self):
+        self.calledFromThreads = []
+        self.values = {}
+        self.running = 0
+        self.maxRunning = 0
+        self.lock = threading.Lock()
+
+    @APIExport(runOnUIThread=True)
+    def getUIThreadValue(self, value: int) -> int:
+        self.calledFromThreads.append(threading.current_thread())
+        if value < 0:
+            raise ValueError('Negative value')
+        return 2 * value
+
+    @APIExport()
+    def getTestValue(self, key: str) -> str:
+        return self.values.get(key)
+
+    @APIExport(requestType='POST')
+    def setTestValue(self, key: str, value: str = 'default') -> None:
+        self.values[key] = value
+
+    @APIExport(timeout=0.1)
+    def testSlowCall(self) -> None:
+        time.sleep(0.5)
+
+    @APIExport(maxConcurrency=1)
+    def testLimitedCall(self) -> None:
+        with self.lock:
+            self.running += 1
+            self.maxRunning = max(self.maxRunning, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+
+
+def test_api_ui_thread_calls(qtbot):
+    provider = APIProvider()
+    api = generateAPI([provider])
+
+    # Calls from the UI thread are executed right away
+    assert api.getUIThreadValue(2) == 4
+    with pytest.raises(ValueError):
+        api.getUIThreadValue(-1)
+
+    # Calls from other threads are executed on the UI thread, and their results are returned
+    future = None
+
+    def callFromThread():
+        nonlocal future
+        future = api.getUIThreadValue.callAsync(value=5)
+
+    thread = threading.Thread(target=callFromThread)
+    thread.start()
+    thread.join()
+    qtbot.waitUntil(lambda: future.done())
+    assert future.result() == 10
+    assert provider.calledFromThreads == [threading.main_thread()] * 3
+
+
+def test_api_rest_server():
+    provider = APIProvider()
+    server = ImSwitchServer(generateAPI([provider]), SetupInfo(pyroServerInfo=PyroServerInfo()))
+    server.createAPI()
+    client = TestClient(app)
+
+    response = client.post('/test_api/setTestValue', json={'key': 'a', 'value': 'b'})
+    assert response.status_code == 200
+    assert provider.values == {'a': 'b'}
+    assert client.post('/test_api/setTestValue', json={'key': 'c'}).status_code == 200
+    assert provider.values['c'] == 'default'
+    # The GET route that the function used to have is kept, although deprecated
+    response = client.get('/test_api/setTestValue', params={'key': 'd', 'value': 'e'})
+    assert response.status_code == 200
+    assert provider.values['d'] == 'e'
+    assert client.put('/test_api/setTestValue', json={'key': 'a'}).status_code == 405
+
+    response = client.get('/test_api/getTestValue', params={'key': 'a'})
+    assert response.status_code == 200
+    assert response.json() == 'b'
+
+    assert client.get('/test_api/testSlowCall').status_code == 504
+
+    async def getConcurrently():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as asyncClient:
+            return await asyncio.gather(
+                *[asyncClient.get('/test_api/testLimitedCall') for _ in range(4)]
+            )
+
+    assert all(response.status_code == 200 for response in asyncio.run(getConcurrently()))
+    assert provider.maxRunning == 1
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,85 @@
+import copy
+
+from imswitch.imcontrol.model import RecMode, SaveFormat, SaveMode
+from imswitch.imcontrol._test.benchmark import liveview
+from imswitch.imcontrol._test.benchmark.recording import (
+    compareToBaseline, makeCases, runRecordingBenchmark
+)
+
+
+def test_recording_benchmark(qtbot):
+    cases = makeCases(saveFormats=[SaveFormat.HDF5, SaveFormat.TIFF],
+                      saveModes=[SaveMode.Disk, SaveMode.RAMArray],
+                      recModes=[RecMode.SpecFrames], sizes=[(64, 48)], fpsValues=[200],
+                      duration=0.25)
+    assert [case.name for case in cases] == [
+        'HDF5-Disk-SpecFrames-64x48@200fps',
+        'Array-RAMArray-SpecFrames-64x48@200fps',
+        'TIFF-Disk-SpecFrames-64x48@200fps'
+    ]
+
+    report = runRecordingBenchmark(cases, log=None)
+    assert report['cases'].keys() == {case.name for case in cases}
+    for case in report['cases'].values():
+        results = case['results']
+        assert results['recordedFrames'] == 50
+        assert results['recordedFrames'] + results['lostFrames'] == results['expectedFrames']
+        assert results['achievedFps'] > 0
+        assert results['writeLatencyP50'] <= results['writeLatencyP99'] <= \
+            results['writeLatencyMax']
+        assert results['peakRssMB'] > 0
+
+    assert compareToBaseline(report, report) == []
+
+    regressed = copy.deepcopy(report)
+    regressedResults = regressed['cases']['HDF5-Disk-SpecFrames-64x48@200fps']['results']
+    regressedResults['throughputMBps'] /= 2
+    regressedResults['lostFrames'] = regressedResults['expectedFrames'] // 2
+    regressions = compareToBaseline(regressed, report)
+    assert len(regressions) == 2
+    assert all(regression.startswith('HDF5-Disk-SpecFrames') for regression in regressions)
+
+
+def test_liveview_benchmark(qtbot):
+    cases = liveview.makeCases(sizes=[(64, 48)], updatePeriods=[50, 100], fpsValues=[200],
+                               duration=0.5, notifying=[False, True], warmup=0.2)
+    assert [case.name for case in cases] == [
+        'Poll50ms-64x48@200fps', 'Poll100ms-64x48@200fps', 'Notify-64x48@200fps'
+    ]
+
+    report = liveview.runLiveViewBenchmark(cases, log=None)
+    assert report['cases'].keys() == {case.name for case in cases}
+    for case in report['cases'].values():
+        results = case['results']
+        assert 0 < results['displayedFrames'] <= results['emittedFrames']
+        assert results['displayFps'] > 0
+        for stage in ['captureToSignal', 'signalToController', 'controllerToDisplay']:
+            assert 0 <= results[f'{stage}P50'] <= results[f'{stage}P99'] <= results[f'{stage}Max']
+        assert results['captureToDisplayP50'] >= results['captureToSignalP50']
+
+    # Polling every 50 ms shows about twice as many frames as polling every 100 ms
+    pollResults = [report['cases'][case.name]['results'] for case in cases[:2]]
+    assert pollResults[0]['displayFps'] > 1.5 * pollResults[1]['displayFps']
+
+    assert liveview.compareToBaseline(report, report) == []
+    regressed = copy.deepcopy(report)
+    regressed['cases']['Notify-64x48@200fps']['results']['captureToDisplayP99'] += 0.1
+    regressions = liveview.compareToBaseline(regressed, report)
+    assert len(regressions) == 1
+    assert regressions[0].startswith('Notify-64x48@200fps: captureToDisplayP99')
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+from imswitch.imcommon.view.guitools.DisplayPipeline import (
+    DisplayPipeline, binBy2, getDecimationFactor
+)
+from imswitch.imcommon.view.guitools.LevelsEngine import LevelsEngine
+
+
+def test_decimation_factor():
+    assert getDecimationFactor((2048, 2048), 2) == 1
+    assert getDecimationFactor((2048, 2048), 1) == 1
+    assert getDecimationFactor((2048, 2048), 0.3) == 2
+    assert getDecimationFactor((2048, 2048), 0.25) == 4
+    assert getDecimationFactor((4, 2048), 0.001) == 4  # Never less than one pixel high
+
+
+@pytest.mark.parametrize('dtype', [np.uint16, np.int16, np.float32])
+def test_bin_by_2(dtype):
+    image = np.arange(5 * 7, dtype=dtype).reshape(5, 7)
+    binned = binBy2(image)
+    assert binned.dtype == dtype
+    assert binned.shape == (2, 3)
+    expected = image[:4, :6].astype(np.float64).reshape(2, 2, 3, 2).mean(axis=(1, 3))
+    np.testing.assert_allclose(binned, np.floor(expected) if dtype != np.float32 else expected)
+
+
+@pytest.mark.parametrize('method', ['stride', 'mean'])
+def test_display_pipeline_decimation(method):
+    frame = np.random.default_rng(0).integers(0, 4096, (2048, 2048), dtype=np.uint16)
+    pipeline = DisplayPipeline(method=method)
+    pipeline.setFrame(frame)
+
+    displayImage = pipeline.render(0.25, (0, 0, 2048, 2048))
+    assert displayImage.factor == 4
+    assert displayImage.data.shape == (512, 512)
+    assert displayImage.region == (0, 0, 2048, 2048)
+    if method == 'stride':
+        np.testing.assert_array_equal(displayImage.data, frame[::4, ::4])
+        assert displayImage.translate == (0, 0)
+    else:
+        np.testing.assert_array_equal(displayImage.data, binBy2(binBy2(frame)))
+        assert displayImage.translate == (1.5, 1.5)
+
+    # Panning at the same zoom reuses the decimated image
+    assert pipeline.render(0.25, (100, 100, 2148, 2148)) is displayImage
+
+    # A new frame is decimated again
+    pipeline.setFrame(frame + 1)
+    assert pipeline.render(0.25, (0, 0, 2048, 2048)) is not displayImage
+
+
+def test_display_pipeline_crop():
+    frame = np.arange(1024 * 1024, dtype=np.uint32).reshape(1024, 1024)
+    pipeline = DisplayPipeline(cropMargin=0.25)
+    pipeline.setFrame(frame)
+
+    # Zoomed in, only the visible region and a margin around it is displayed
+    displayImage = pipeline.render(4, (400, 500, 600, 700))
+    assert displayImage.factor == 1
+    assert displayImage.offset == (350, 450)
+    assert displayImage.data.shape == (300, 300)
+    assert displayImage.data[0, 0] == frame[350, 450]
+
+    # Small pans within the margin don't need a new image
+    assert pipeline.render(4, (420, 520, 620, 720)) is displayImage
+    assert pipeline.render(4, (0, 0, 200, 200)) is not displayImage
+
+    # Most of the frame is visible, so the whole frame is displayed
+    displayImage = pipeline.render(1, (0, 0, 1024, 800))
+    assert displayImage.data is frame
+
+    # Frames that are not 2D are passed through
+    pipeline.setFrame(np.zeros((3, 64, 64)))
+    assert pipeline.render(0.1, (0, 0, 64, 64)).data.shape == (3, 64, 64)
+
+
+def test_levels_engine_percentile():
+    rng = np.random.default_rng(0)
+    frame = rng.gamma(2, 200, (2048, 2048)).astype(np.uint16)
+    engine = LevelsEngine('percentile', lowPercentile=1, highPercentile=99)
+
+    low, high = engine.update(frame)
+    expectedLow, expectedHigh = np.percentile(frame, [1, 99])
+    assert abs(low - expectedLow) < 0.05 * expectedHigh
+    assert abs(high - expectedHigh) < 0.05 * expectedHigh
+
+    # More noisy frames with the same statistics don't change the levels
+    for _ in range(10):
+        assert engine.update(rng.gamma(2, 200, (2048, 2048)).astype(np.uint16)) is None
+    assert engine.levels == (low, high)
+
+    # The levels follow the frames once the statistics have changed
+    for _ in range(20):
+        engine.update(rng.gamma(2, 200, (2048, 2048)).astype(np.uint16) * 2)
+    assert abs(engine.levels[1] - 2 * expectedHigh) < 0.1 * expectedHigh
+
+
+def test_levels_engine_minmax():
+    frame = np.full((512, 512), 100, dtype=np.uint16)
+    engine = LevelsEngine('minmax', smoothing=1)
+    assert engine.update(frame) == (0, 102)
+    assert engine.update(frame + 1) is None  # Within the drift threshold
+    assert engine.update(frame * 2) == (0, 202)
+
+    engine.reset()
+    assert engine.levels is None
+    assert engine.update(frame) == (0, 102)
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
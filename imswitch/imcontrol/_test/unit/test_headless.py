@@ -0,0 +1,167 @@
+import inspect
+import os
+import re
+import subprocess
+import sys
+
+import h5py
+import pytest
+
+import imswitch
+import imswitch.imcontrol
+from imswitch.imcommon.controller import ModuleCommunicationChannel
+from imswitch.imcontrol.controller import controllers
+from imswitch.imcontrol.model import Options, WriteQueuePolicy
+from imswitch.imcontrol.view import ViewSetupInfo, headless
+from . import detectorInfosSynthetic
+
+
+setupInfoHeadless = ViewSetupInfo.from_json("""
+{
+    "lasers": {
+        "473": {
+            "analogChannel": 3,
+            "digitalLine": 2,
+            "managerName": "NidaqLaserManager",
+            "managerProperties": {},
+            "wavelength": 473,
+            "valueRangeMin": 0,
+            "valueRangeMax": 5
+        }
+    },
+    "positioners": {
+        "X": {
+            "analogChannel": null,
+            "digitalLine": null,
+            "managerName": "MockPositionerManager",
+            "managerProperties": {},
+            "axes": ["X"],
+            "forPositioning": true
+        }
+    },
+    "availableWidgets": ["Image", "Settings", "View", "Recording", "Laser", "Positioner"]
+}
+""", infer_missing=True)
+setupInfoHeadless.detectors = detectorInfosSynthetic
+
+
+@pytest.fixture
+def headlessController(qtbot, tmp_path):
+    options = Options.from_json(f"""
+    {{
+        "setupFileName": "",
+        "recording": {{
+            "outputFolder": {repr(str(tmp_path))},
+            "includeDateInOutputFolder": false
+        }}
+    }}
+    """.replace("'", '"'))
+
+    moduleCommChannel = ModuleCommunicationChannel()
+    moduleCommChannel.register(imswitch.imcontrol)
+    controller = imswitch.imcontrol.getHeadlessController(
+        moduleCommChannel, overrideSetupInfo=setupInfoHeadless, overrideOptions=options
+    )
+    yield controller
+    controller.closeEvent()
+
+
+def test_headless_imports_no_gui():
+    # Checked in a new interpreter, since other tests may already have imported napari
+    code = ('import sys; import imswitch.imcontrol.controller, imswitch.imcontrol.view.headless;'
+            ' assert "napari" not in sys.modules and "vispy" not in sys.modules')
+    subprocess.run([sys.executable, '-c', code], check=True,
+                   cwd=os.path.dirname(os.path.dirname(imswitch.__file__)))
+
+
+def test_headless_app_imports_no_widgets():
+    code = ('import sys; import imswitch.imcommon;'
+            ' assert "qtpy.QtWidgets" not in sys.modules and "qdarkstyle" not in sys.modules')
+    subprocess.run([sys.executable, '-c', code], check=True,
+                   cwd=os.path.dirname(os.path.dirname(imswitch.__file__)))
+
+
+@pytest.mark.parametrize('widgetKey', ['Settings', 'View', 'Recording', 'Laser', 'Positioner',
+                                       'Tiling'])
+def test_headless_widget_methods(widgetKey):
+    # Every widget attribute that the controller uses must be provided by the headless widget
+    controllerSource = inspect.getsource(getattr(controllers, f'{widgetKey}Controller'))
+    widgetAttrNames = set(re.findall(r'self\._widget\.(\w+)', controllerSource))
+    widget = getattr(headless, f'{widgetKey}Widget')(Options.from_json('{}', infer_missing=True))
+    assert widgetAttrNames
+    for attrName in widgetAttrNames:
+        assert hasattr(widget, attrName), attrName
+
+    with pytest.raises(AttributeError):
+        widget.setUndefined(True)
+
+
+def test_headless_controllers(headlessController):
+    # Widgets without a headless counterpart are left out
+    assert set(headlessController.controllers.keys()) == {
+        'Settings', 'View', 'Recording', 'Laser', 'Positioner'
+    }
+
+
+def test_headless_devices(headlessController):
+    api = headlessController.api
+    master = headlessController.masterController
+
+    api.setLaserValue('473', 3)
+    api.setLaserActive('473', True)
+    assert headlessController.controllers['Laser']._widget.getValue('473') == 3
+    assert headlessController.controllers['Laser']._widget.isLaserActive('473')
+
+    api.movePositioner('X', 'X', 10)
+    api.setPositioner('X', 'X', 25)
+    assert api.getPositionerPositions() == {'X': {'X': 25}}
+
+    api.setDetectorROI('CAM', (16, 8), (128, 96))
+    assert master.detectorsManager['CAM'].frameStart == (16, 8)
+    assert master.detectorsManager['CAM'].shape == (128, 96)
+
+
+def test_headless_recording(qtbot, headlessController, tmp_path):
+    api = headlessController.api
+    commChannel = headlessController.controllers['Recording']._commChannel
+
+    with qtbot.waitSignal(commChannel.sigUpdateImage, timeout=5000):
+        api.setLiveViewActive(True)
+    api.setLiveViewActive(False)
+
+    with pytest.raises(ValueError):
+        api.setWriteQueueOptions('Unbounded')
+    api.setWriteQueueOptions('DropOldest', 0.5)
+
+    api.setRecFilename('headless')
+    api.setRecModeSpecFrames(10)
+    api.startRecording()
+    recordingManager = headlessController.masterController.recordingManager
+    qtbot.waitUntil(lambda: not recordingManager.record, timeout=10000)
+
+    with h5py.File(tmp_path / 'headless_rec_CAM.hdf5') as file:
+        assert file['CAM'].shape[0] == 10
+
+    # The write statistics reach the controller, along with the write queue options used
+    qtbot.waitUntil(lambda: api.getWriteStats().get('CAM', {}).get('writtenFrames') == 10,
+                    timeout=5000)
+    recordingWorker = recordingManager._RecordingManager__recordingWorker
+    assert recordingWorker.writeQueuePolicy == WriteQueuePolicy.DropOldest
+    assert recordingWorker.writeQueueMaxBytes == 1024 ** 3 // 2
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+from imswitch.imcommon.framework import Instrumentation
+
+
+@pytest.fixture
+def instrumentation():
+    Instrumentation.reset()
+    Instrumentation.enable()
+    yield Instrumentation
+    Instrumentation.disable()
+    Instrumentation.reset()
+
+
+def test_instrumentation_disabled():
+    Instrumentation.reset()
+
+    @Instrumentation.timed('disabledCall')
+    def call():
+        return 1
+
+    assert call() == 1
+    with Instrumentation.measure('disabledMeasure'):
+        pass
+    Instrumentation.count('disabledCount')
+    Instrumentation.setGauge('disabledGauge', 1)
+    assert Instrumentation.getStats() == {}
+
+
+def test_instrumentation_metrics(instrumentation):
+    @instrumentation.timed('call')
+    def call(duration):
+        time.sleep(duration)
+
+    for _ in range(9):
+        call(0)
+    call(0.05)
+    with instrumentation.measure('getChunk', detector='Camera'):
+        pass
+    instrumentation.count('frames', 5, detector='Camera')
+    instrumentation.count('frames', 2, detector='Camera')
+    instrumentation.setGauge('queueDepth', 10)
+    instrumentation.setGauge('queueDepth', 3)
+
+    stats = instrumentation.getStats()
+    assert stats.keys() == {'call', 'frames{detector=Camera}', 'getChunk{detector=Camera}',
+                            'queueDepth'}
+    assert stats['call']['count'] == 10
+    assert stats['call']['p50'] < 0.01
+    assert 0.05 <= stats['call']['max'] == stats['call']['p99'] < 1
+    assert stats['frames{detector=Camera}']['count'] == 7
+    assert stats['queueDepth'] == {'type': 'gauge', 'value': 3, 'max': 10}
+    assert 'call: n=10' in instrumentation.formatSummary()
+
+    text = instrumentation.formatPrometheus()
+    assert '# TYPE imswitch_call histogram' in text
+    assert 'imswitch_call_bucket{le="+Inf"} 10' in text
+    assert 'imswitch_call_count 10' in text
+    assert 'imswitch_frames_total{detector="Camera"} 7' in text
+    assert 'imswitch_queueDepth 3' in text
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
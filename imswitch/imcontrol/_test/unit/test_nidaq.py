@@ -0,0 +1,160 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from imswitch.imcontrol._test import setupInfoPointScanSimulated
+from imswitch.imcontrol.model import NidaqManager, ScanManagerPointScan
+from imswitch.imcontrol.model.interfaces import nidaqmx_mock
+from imswitch.imcontrol.model.managers.detectors.APDManager import APDManager
+
+
+@pytest.fixture
+def simulatedDevice():
+    device = nidaqmx_mock.device
+    defaults = device.timeScale, device.stallTimeout, device.sample, device.rng
+    device.timeScale = None
+    device.rng = np.random.default_rng(0)
+    yield device
+    device.timeScale, device.stallTimeout, device.sample, device.rng = defaults
+
+
+def test_simulated_point_scan(qtbot, simulatedDevice):
+    # Only the quadrant with positive galvo voltages is bright
+    simulatedDevice.sample = lambda outputs: 1e7 * ((outputs['Dev1/ao0'] > 0) &
+                                                    (outputs['Dev1/ao1'] > 0))
+
+    stageParameters = {'target_device': ['GalvoX', 'GalvoY'],
+                       'axis_length': [20, 20],
+                       'axis_step_size': [1, 1],
+                       'axis_centerpos': [0, 0],
+                       'axis_startpos': [[0], [0]],
+                       'sequence_time': 10e-6,
+                       'phase_delay': 0}
+    TTLParameters = {'target_device': ['640'],
+                     'TTL_sequence': ['h1'],
+                     'TTL_sequence_axis': ['None'],
+                     'sequence_time': 10e-6}
+    signalDict, scanInfoDict = ScanManagerPointScan(setupInfoPointScanSimulated).makeFullScan(
+        stageParameters, TTLParameters
+    )
+
+    nidaqManager = NidaqManager(setupInfoPointScanSimulated)
+    apdManager = APDManager(setupInfoPointScanSimulated.detectors['APD'], 'APD', nidaqManager)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', RuntimeWarning)
+        nidaqManager.setDigital('640', True)  # The static task must make way for the scan
+    assert simulatedDevice.getOutputValue('Dev1/port0/line2')
+
+    for repetitions in [1, 2]:
+        startTime = simulatedDevice.time
+        with qtbot.waitSignal(nidaqManager.sigScanDone, timeout=10000):
+            nidaqManager.runScan(signalDict, scanInfoDict, repetitions=repetitions)
+        qtbot.waitUntil(lambda: apdManager._scanThread.isFinished(), timeout=5000)
+        qtbot.wait(50)  # For the queued image updates
+
+        assert simulatedDevice.time - startTime == pytest.approx(
+            scanInfoDict['scan_samples_total'] * repetitions / 1e5, abs=1e-4
+        )
+        image = apdManager.getLatestFrame()[0]
+        assert image.shape == (20, 20)
+        assert np.all(image[:10] == 0)
+        assert np.all(image[:, :10] == 0)
+        assert np.all(image[10:, 11:] > 50)
+
+    # The scan has released the lines
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', RuntimeWarning)
+        nidaqManager.setDigital('640', False)
+    assert not simulatedDevice.getOutputValue('Dev1/port0/line2')
+
+
+def test_simulated_device_timing(simulatedDevice):
+    simulatedDevice.sample = lambda outputs: 1e6 * outputs['Dev1/ao0']
+
+    aoTask = nidaqmx_mock.Task('AO')
+    coTask = nidaqmx_mock.Task('CO')
+    ciTask = nidaqmx_mock.Task('CI')
+    try:
+        aoTask.ao_channels.add_ao_voltage_chan('Dev1/ao0')
+        aoTask.timing.cfg_samp_clk_timing(
+            1000, source='100kHzTimebase',
+            sample_mode=nidaqmx_mock.constants.AcquisitionType.FINITE, samps_per_chan=200
+        )
+        aoTask.write(np.repeat([1.0, 3.0], 100))
+
+        coTask.co_channels.add_co_pulse_chan_freq('Dev1/ctr2', freq=1e4)
+        coTask.timing.cfg_implicit_timing(samps_per_chan=2000)
+        coTask.triggers.arm_start_trigger.dig_edge_src = 'ao/StartTrigger'
+
+        ciTask.ci_channels.add_ci_count_edges_chan('Dev1/ctr0')
+        ciTask.timing.cfg_samp_clk_timing(
+            1e4, source='ctr2InternalOutput',
+            sample_mode=nidaqmx_mock.constants.AcquisitionType.FINITE, samps_per_chan=2000
+        )
+        ciTask.triggers.arm_start_trigger.dig_edge_src = 'ao/StartTrigger'
+
+        # Nothing happens before the trigger
+        ciTask.start()
+        coTask.start()
+        startTime = simulatedDevice.time
+        with pytest.raises(nidaqmx_mock.DaqError):
+            ciTask.read(1, timeout=0.05)
+        assert simulatedDevice.time == startTime
+
+        aoTask.start()
+        counts = np.diff(ciTask.read(2000), prepend=0)
+        assert simulatedDevice.time - startTime == pytest.approx(0.2, abs=1e-3)
+        assert counts[:1000].mean() == pytest.approx(100, rel=0.05)
+        assert counts[1000:].mean() == pytest.approx(300, rel=0.05)
+
+        aoTask.wait_until_done()
+        assert simulatedDevice.getOutputValue('Dev1/ao0') == 3.0
+    finally:
+        for task in [aoTask, coTask, ciTask]:
+            task.close()
+
+
+def test_simulated_device_errors(simulatedDevice):
+    simulatedDevice.stallTimeout = 0.05
+
+    task = nidaqmx_mock.Task('DO')
+    otherTask = nidaqmx_mock.Task('OtherDO')
+    try:
+        task.do_channels.add_do_chan('Dev1/port0/line0')
+        task.timing.cfg_samp_clk_timing(
+            1000, sample_mode=nidaqmx_mock.constants.AcquisitionType.FINITE, samps_per_chan=100
+        )
+        task.out_stream.regen_mode = \
+            nidaqmx_mock.constants.RegenerationMode.DONT_ALLOW_REGENERATION
+        task.write(np.ones(50, dtype=bool))
+        task.start()
+
+        otherTask.do_channels.add_do_chan('Dev1/port0/line0')
+        with pytest.raises(nidaqmx_mock.DaqError, match='reserved'):
+            otherTask.start()
+
+        # Only half of the samples were written
+        with pytest.raises(nidaqmx_mock.DaqError) as excInfo:
+            task.wait_until_done()
+        assert excInfo.value.error_code == -200290
+    finally:
+        task.close()
+        otherTask.close()
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
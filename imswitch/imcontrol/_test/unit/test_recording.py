@@ -1,9 +1,21 @@
+import functools
+
+import numpy as np
 import pytest
 
 import h5py
+import tifffile
 
-from imswitch.imcontrol.model import DetectorsManager, RecordingManager, RecMode, SaveMode
-from . import detectorInfosBasic, detectorInfosMulti, detectorInfosNonSquare
+from imswitch.imcommon.model import VArrayFile
+from imswitch.imcontrol.model import (
+    DetectorsManager, RecordingManager, RecMode, SaveFormat, SaveMode, WriteQueuePolicy
+)
+from imswitch.imcontrol.model.managers.RecordingManager import FrameWriteQueue, HDF5Storer
+from imswitch.imcontrol.model.managers.detectors import HamamatsuManager
+from imswitch.imcontrol.model.managers.detectors.FrameRingBuffer import FrameRingBuffer
+from . import (
+    detectorInfosBasic, detectorInfosMulti, detectorInfosNonSquare, detectorInfosSynthetic
+)
 
 
 def record(qtbot, detectorInfos, *args, **kwargs):
@@ -30,6 +42,13 @@ def record(qtbot, detectorInfos, *args, **kwargs):
     return filePerDetector, savedToDiskPerDetector
 
 
+def recordToDisk(qtbot, detectorInfos, *args, **kwargs):
+    detectorsManager = DetectorsManager(detectorInfos, updatePeriod=100)
+    recordingManager = RecordingManager(detectorsManager)
+    recordingManager.startRecording(*args, **kwargs)
+    qtbot.waitUntil(lambda: not recordingManager.record, timeout=30000)
+
+
 @pytest.mark.parametrize('detectorInfos,numFrames',
                          [(detectorInfosBasic, 10), (detectorInfosNonSquare, 53)])
 def test_recording_spec_frames(qtbot, detectorInfos, numFrames):
@@ -90,6 +109,237 @@ def test_recording_spec_time(qtbot, detectorInfos):
         assert savedToDisk is False
 
 
+@pytest.mark.parametrize('recMode,recArgs',
+                         [(RecMode.SpecFrames, {'recFrames': 20}),
+                          (RecMode.SpecTime, {'recTime': 2})])
+def test_recording_ram_array(qtbot, tmp_path, recMode, recArgs):
+    filePerDetector, savedToDiskPerDetector = record(
+        qtbot,
+        detectorInfosNonSquare,
+        detectorNames=list(detectorInfosNonSquare.keys()),
+        recMode=recMode,
+        savename=str(tmp_path / 'test_ram_array'),
+        saveMode=SaveMode.RAMArray,
+        attrs={detectorName: {'testAttr1': 2} for detectorName in detectorInfosNonSquare.keys()},
+        **recArgs
+    )
+
+    for detectorName, file in filePerDetector.items():
+        assert isinstance(file, VArrayFile)
+        data = file[detectorName]
+        assert isinstance(data, np.ndarray)
+        assert data.shape[0] > 0
+        if recMode == RecMode.SpecFrames:
+            assert data.shape[0] == recArgs['recFrames']
+        assert file.datasetAttrs[detectorName]['testAttr1'] == 2
+        assert file.datasetAttrs[detectorName]['writing'] is False
+        frameNumbers = file.frameMetadata[detectorName]['frameNumber']
+        assert len(frameNumbers) == data.shape[0]
+        assert np.all(np.diff(frameNumbers) > 0)
+
+        # Only serialized when saved
+        savePath = tmp_path / f'{detectorName}.hdf5'
+        file.save(savePath)
+        with h5py.File(savePath, 'r') as h5pyFile:
+            assert np.array_equal(h5pyFile[detectorName][:], data)
+            assert h5pyFile[detectorName].attrs['testAttr1'] == 2
+        file.close()
+    for savedToDisk in savedToDiskPerDetector.values():
+        assert savedToDisk is False
+
+
+def test_recording_tiff_multi_detector(qtbot, tmp_path):
+    # TIFF files can't hold several detectors, so each one still gets its own file
+    recordToDisk(
+        qtbot,
+        detectorInfosMulti,
+        detectorNames=list(detectorInfosMulti.keys()),
+        recMode=RecMode.SpecFrames,
+        savename=str(tmp_path / 'test_multi'),
+        saveMode=SaveMode.Disk,
+        saveFormat=SaveFormat.TIFF,
+        singleMultiDetectorFile=True,
+        attrs={detectorName: {} for detectorName in detectorInfosMulti.keys()},
+        recFrames=10
+    )
+
+    for detectorName in detectorInfosMulti.keys():
+        with tifffile.TiffFile(tmp_path / f'test_multi_{detectorName}.tiff') as file:
+            assert len(file.pages) == 10
+
+
+def test_recording_tiff_single_lapse_file(qtbot, tmp_path):
+    for _ in range(2):
+        recordToDisk(
+            qtbot,
+            detectorInfosBasic,
+            detectorNames=['CAM'],
+            recMode=RecMode.ScanLapse,
+            savename=str(tmp_path / 'test_lapse'),
+            saveMode=SaveMode.Disk,
+            saveFormat=SaveFormat.TIFF,
+            singleLapseFile=True,
+            attrs={'CAM': {}},
+            recFrames=5
+        )
+
+    with tifffile.TiffFile(tmp_path / 'test_lapse_CAM.tiff') as file:
+        assert len(file.pages) == 10
+        assert [series.shape[0] for series in file.series] == [5, 5]
+
+
+def test_recording_frame_metadata_small_buffer(qtbot, tmp_path, monkeypatch):
+    # The frame buffer is overwritten many times over while the frames wait to be written
+    monkeypatch.setattr(HamamatsuManager, 'FrameRingBuffer',
+                        functools.partial(FrameRingBuffer, numSlots=8))
+    recordToDisk(
+        qtbot,
+        detectorInfosBasic,
+        detectorNames=['CAM'],
+        recMode=RecMode.SpecFrames,
+        savename=str(tmp_path / 'test_small_buffer'),
+        saveMode=SaveMode.Disk,
+        saveFormat=SaveFormat.HDF5,
+        attrs={'CAM': {}},
+        recFrames=100
+    )
+
+    with h5py.File(tmp_path / 'test_small_buffer_CAM.hdf5', 'r') as file:
+        frameNumbers = file['frame_metadata']['CAM']['frameNumber']
+        assert len(frameNumbers) == 100
+        assert np.all(np.diff(frameNumbers) > 0)
+
+
+def test_recording_synthetic_camera(qtbot, tmp_path):
+    filePerDetector, _ = record(
+        qtbot,
+        detectorInfosSynthetic,
+        detectorNames=['CAM'],
+        recMode=RecMode.SpecFrames,
+        savename=str(tmp_path / 'test_synthetic'),
+        saveMode=SaveMode.RAMArray,
+        attrs={'CAM': {}},
+        recFrames=200
+    )
+
+    file = filePerDetector['CAM']
+    assert file['CAM'].shape == (200, 240, 320)
+    frameNumbers = file.frameMetadata['CAM']['frameNumber']
+    droppedBefore = file.frameMetadata['CAM']['droppedBefore']
+    # Every frame number is accounted for, either as recorded or as dropped by the camera
+    assert frameNumbers[-1] - frameNumbers[0] + 1 == len(frameNumbers) + droppedBefore[1:].sum()
+    file.close()
+
+
+def test_write_queue_drop_oldest():
+    frames = np.zeros((2, 10, 10), dtype=np.uint16)
+    queue = FrameWriteQueue(maxBytes=2 * frames.nbytes, policy=WriteQueuePolicy.DropOldest)
+    for i in range(5):
+        queue.put(frames + i)
+    queue.close()
+
+    stats = queue.getStats()
+    assert stats.droppedFrames == 6
+    assert stats.queuedBytes == 2 * frames.nbytes
+
+    assert queue.get()[0][0, 0, 0] == 3
+    assert queue.get()[0][0, 0, 0] == 4
+    assert queue.get() is None
+
+
+def test_write_queue_spill_to_ram():
+    frames = np.zeros((2, 10, 10), dtype=np.uint16)
+    queue = FrameWriteQueue(maxBytes=frames.nbytes, policy=WriteQueuePolicy.SpillToRAM)
+    for _ in range(3):
+        queue.put(frames)
+
+    stats = queue.getStats()
+    assert stats.droppedFrames == 0
+    assert stats.queuedFrames == 6
+    assert stats.spilledBytes == 2 * frames.nbytes
+
+
+def test_write_queue_failed_write():
+    frames = np.zeros((2, 10, 10), dtype=np.uint16)
+    queue = FrameWriteQueue()
+    for _ in range(3):
+        queue.put(frames)
+
+    failedFrames, _ = queue.get()
+    queue.chunkFailed(len(failedFrames), OSError('No space left on device'))
+
+    stats = queue.getStats()
+    assert stats.writtenFrames == 0
+    assert stats.failedFrames == 6
+    assert stats.queuedFrames == 0
+    assert queue.get() is None
+    with pytest.raises(RuntimeError):
+        queue.put(frames)
+
+
+class FailingStorer(HDF5Storer):
+    def stream(self, data=None, metadata=None, **kwargs):
+        raise OSError('No space left on device')
+
+
+def test_recording_failed_write(qtbot, tmp_path):
+    detectorsManager = DetectorsManager(detectorInfosBasic, updatePeriod=100)
+    recordingManager = RecordingManager(detectorsManager,
+                                        storerMap={SaveFormat.HDF5: FailingStorer})
+
+    statsPerDetector = {}
+    recordingManager.sigRecordingWriteStatsUpdated.connect(
+        lambda detectorName, stats: statsPerDetector.update({detectorName: stats})
+    )
+
+    with qtbot.captureExceptions() as exceptions:
+        recordingManager.startRecording(
+            detectorNames=['CAM'],
+            recMode=RecMode.UntilStop,
+            savename=str(tmp_path / 'test_failed_write'),
+            saveMode=SaveMode.Disk,
+            attrs={'CAM': {}}
+        )
+        # The recording stops by itself once a write has failed
+        qtbot.waitUntil(lambda: not recordingManager.record, timeout=30000)
+        qtbot.waitUntil(lambda: 'CAM' in statsPerDetector)
+
+    assert any(isinstance(exception[1], RuntimeError) for exception in exceptions)
+    assert statsPerDetector['CAM'].writtenFrames == 0
+    assert statsPerDetector['CAM'].failedFrames > 0
+
+
+def test_recording_write_stats(qtbot):
+    detectorInfos = detectorInfosBasic
+    numFrames = 10
+    detectorsManager = DetectorsManager(detectorInfos, updatePeriod=100)
+    recordingManager = RecordingManager(detectorsManager)
+
+    statsPerDetector = {}
+    recordingManager.sigRecordingWriteStatsUpdated.connect(
+        lambda detectorName, stats: statsPerDetector.update({detectorName: stats})
+    )
+
+    recordingManager.startRecording(
+        detectorNames=list(detectorInfos.keys()),
+        recMode=RecMode.SpecFrames,
+        savename='test_write_stats',
+        saveMode=SaveMode.RAM,
+        attrs={detectorName: {} for detectorName in detectorInfos.keys()},
+        recFrames=numFrames,
+        writeQueuePolicy=WriteQueuePolicy.SpillToRAM
+    )
+    with qtbot.waitSignals([recordingManager.sigMemoryRecordingAvailable for _ in detectorInfos],
+                           timeout=30000):
+        pass
+    qtbot.waitUntil(lambda: statsPerDetector.keys() == detectorInfos.keys())
+
+    for stats in statsPerDetector.values():
+        assert stats.writtenFrames == numFrames
+        assert stats.droppedFrames == 0
+        assert stats.queuedFrames == 0
+
+
 # Copyright (C) 2020-2021 ImSwitch developers
 # This file is part of ImSwitch.
 #
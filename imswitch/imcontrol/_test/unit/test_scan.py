@@ -1,9 +1,15 @@
+import copy
 import os
 
 import numpy as np
 
-from imswitch.imcontrol._test import setupInfoBasic
-from imswitch.imcontrol.model import ScanManagerBase
+from imswitch.imcontrol._test import setupInfoBasic, setupInfoPointScanSimulated
+from imswitch.imcontrol.model import ScanManagerBase, ScanManagerPointScan
+from imswitch.imcontrol.model.managers.NidaqManager import SignalStream
+from imswitch.imcontrol.model.signaldesigners.basesignaldesigners import SignalCache
+from imswitch.imcontrol.model.signaldesigners.compactsignals import (
+    ConcatenatedSignal, RepeatedSignal, StepSignal, zeroSignal
+)
 
 
 def test_scan_signals():
@@ -50,6 +56,146 @@ def test_scan_signals():
     assert np.count_nonzero(fullsig['TTLCycleSignalsDict']['405']) == 51840
     assert np.all(~fullsig['TTLCycleSignalsDict']['488'])
 
+
+def test_signal_stream():
+    signals = [np.arange(10, dtype=float), np.arange(10, dtype=float) * -1]
+
+    stream = SignalStream(signals, repetitions=3)
+    assert stream.numChannels == 2
+    assert stream.periodSamples == 10
+    assert stream.totalSamples == 30
+    blocks = list(stream.blocks(4))
+    assert [block.shape for block in blocks] == [(2, 4)] * 7 + [(2, 2)]
+    np.testing.assert_array_equal(np.concatenate(blocks, axis=1),
+                                  np.tile(np.array(signals), 3))
+
+    # Blocks that span two repetitions
+    np.testing.assert_array_equal(stream.getBlock(8, 12)[0], [8, 9, 0, 1])
+
+    # Compact signals are read block by block
+    stream = SignalStream([RepeatedSignal(np.arange(3.0), 2), np.arange(6.0)], repetitions=2)
+    assert stream.periodSamples == 6
+    np.testing.assert_array_equal(stream.getBlock(4, 8), [[1, 2, 0, 1], [4, 5, 0, 1]])
+
+    # Repeated until stopped, so the blocks don't end
+    stream = SignalStream([np.array([True, False, False])], repetitions=None)
+    assert stream.totalSamples is None
+    blocks = stream.blocks(2)
+    np.testing.assert_array_equal(np.concatenate([next(blocks) for _ in range(5)], axis=1)[0],
+                                  [True, False, False] * 3 + [True])
+
+
+def test_signal_cache():
+    # Keys don't depend on dict order or container and number types
+    assert SignalCache.makeKey({'a': [1, 2.0], 'b': np.float64(3)}) == \
+           SignalCache.makeKey({'b': 3, 'a': (1.0, 2)})
+    assert SignalCache.makeKey([1, 2]) != SignalCache.makeKey([2, 1])
+    assert SignalCache.makeKey(np.arange(3)) != SignalCache.makeKey(np.arange(4))
+
+    cache = SignalCache(maxBytes=1000)
+    signal = cache.get('a', lambda: np.zeros(100))
+    assert cache.get('a', lambda: np.ones(100)) is signal
+    assert not signal.flags.writeable
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # The least recently used entry is dropped when the cache is full
+    cache.get('b', lambda: np.zeros(100))
+    assert 'a' not in cache
+    assert 'b' in cache
+
+
+def test_point_scan_signal_cache():
+    stageParameters = {'target_device': ['GalvoX', 'GalvoY'],
+                       'axis_length': [20, 20],
+                       'axis_step_size': [1, 1],
+                       'axis_centerpos': [0, 0],
+                       'axis_startpos': [[0], [0]],
+                       'sequence_time': 10e-6,
+                       'phase_delay': 0}
+    TTLParameters = {'target_device': ['640', '488'],
+                     'TTL_sequence': ['h1', 'h1,l1'],
+                     'TTL_sequence_axis': ['None', 'GalvoY'],
+                     'sequence_time': 10e-6}
+
+    scanManager = ScanManagerPointScan(setupInfoPointScanSimulated)
+    signalDict, scanInfoDict = scanManager.makeFullScan(stageParameters, TTLParameters)
+
+    # Unchanged parameters give the cached signals
+    signalDictAgain, scanInfoDictAgain = scanManager.makeFullScan(
+        copy.deepcopy(stageParameters), copy.deepcopy(TTLParameters)
+    )
+    assert scanInfoDictAgain == scanInfoDict
+    for signals in ['scanSignalsDict', 'TTLCycleSignalsDict']:
+        for target, signal in signalDict[signals].items():
+            assert signalDictAgain[signals][target] is signal
+
+    # Only the signal of the changed TTL target is regenerated
+    TTLParameters['TTL_sequence'] = ['h1', 'l1,h1']
+    signalDictNew, _ = scanManager.makeFullScan(stageParameters, TTLParameters)
+    for target, signal in signalDict['scanSignalsDict'].items():
+        assert signalDictNew['scanSignalsDict'][target] is signal
+    for target in ['640', 'line_clock', 'frame_clock']:
+        assert signalDictNew['TTLCycleSignalsDict'][target] is \
+               signalDict['TTLCycleSignalsDict'][target]
+    np.testing.assert_array_equal(np.asarray(signalDictNew['TTLCycleSignalsDict']['488']),
+                                  ~np.asarray(signalDict['TTLCycleSignalsDict']['488']) &
+                                  np.asarray(signalDict['TTLCycleSignalsDict']['640']))
+
+
+def test_compact_signals():
+    line = np.linspace(0, 1, 5)
+    signal = ConcatenatedSignal([
+        zeroSignal(3),
+        RepeatedSignal(ConcatenatedSignal([line, StepSignal([2.0, 3.0], [2, 1])]), 4, period=10),
+        line[::-1]
+    ])
+    expected = np.concatenate([np.zeros(3),
+                               np.tile(np.concatenate([line, [2, 2, 3], np.zeros(2)]), 4),
+                               line[::-1]])
+
+    assert len(signal) == len(expected) == 48
+    np.testing.assert_array_equal(np.asarray(signal), expected)
+    np.testing.assert_array_equal(np.concatenate(list(signal.blocks(7))), expected)
+    np.testing.assert_array_equal(signal[5:30], expected[5:30])
+    assert signal[17] == expected[17]
+    assert signal[-1] == expected[-1]
+    assert (signal.min(), signal.max()) == (0, 3)
+    assert signal.nbytes < expected.nbytes
+
+
+def test_point_scan_compact_signals():
+    # 2000x2000 pixels with a 1 ms dwell time, more than an hour of scanning, which would take
+    # GBs per channel as full arrays
+    stageParameters = {'target_device': ['GalvoX', 'GalvoY'],
+                       'axis_length': [100, 100],
+                       'axis_step_size': [0.05, 0.05],
+                       'axis_centerpos': [0, 0],
+                       'axis_startpos': [[0], [0]],
+                       'sequence_time': 1e-3,
+                       'phase_delay': 0}
+    TTLParameters = {'target_device': ['640'],
+                     'TTL_sequence': ['h1'],
+                     'TTL_sequence_axis': ['None'],
+                     'sequence_time': 1e-3}
+    signalDict, scanInfoDict = ScanManagerPointScan(setupInfoPointScanSimulated).makeFullScan(
+        stageParameters, TTLParameters
+    )
+    signals = [*signalDict['scanSignalsDict'].values(),
+               *signalDict['TTLCycleSignalsDict'].values()]
+    samplesTotal = scanInfoDict['scan_samples_total']
+    assert samplesTotal > 4e8
+    assert all(len(signal) == samplesTotal for signal in signals)
+    assert sum(signal.nbytes for signal in signals) < 1e7
+
+    # Lines in the middle of the scan are the same repeated period
+    galvoX = signalDict['scanSignalsDict']['GalvoX']
+    period = scanInfoDict['scan_samples_d2_period']
+    middle = samplesTotal // 2
+    np.testing.assert_array_equal(galvoX.getBlock(middle, middle + 1000),
+                                  galvoX.getBlock(middle + period, middle + period + 1000))
+    assert galvoX[-1] == 0
+
+
 # Copyright (C) 2020-2021 ImSwitch developers
 # This file is part of ImSwitch.
 #
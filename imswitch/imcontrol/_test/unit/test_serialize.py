@@ -0,0 +1,141 @@
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import Pyro5.api
+import Pyro5.server
+import pytest
+
+from imswitch.imcontrol.controller.server._serialize import (
+    SerNDArray, SlotOverwrittenError, register_serializers
+)
+
+
+@pytest.fixture
+def serializer():
+    ser = SerNDArray()
+    yield ser
+    SerNDArray.ZERO_COPY = False
+    for client in list(SerNDArray.SENDING_RINGS):
+        SerNDArray.release_client(client)
+    for ring in SerNDArray.RECEIVING_RINGS.values():
+        ring.close()
+    SerNDArray.RECEIVING_RINGS.clear()
+
+
+def test_serialize_ring_roundtrip(serializer):
+    arrays = [np.random.default_rng(i).integers(0, 4096, (64, 48), dtype=np.uint16)
+              for i in range(3)]
+    dicts = [serializer.to_dict(array) for array in arrays]
+
+    # All arrays go through the same ring, one slot after another
+    assert len({d['shm'] for d in dicts}) == 1
+    assert [d['seq'] for d in dicts] == [1, 2, 3]
+    assert len({d['slot'] for d in dicts}) == 3
+    for array, d in zip(arrays, dicts):
+        received = serializer.from_dict('', dict(d))
+        np.testing.assert_array_equal(received, array)
+        assert received.flags.writeable
+
+    # Arrays too large for the slots get a new ring
+    large = np.ones(2 * 1024 * 1024, dtype=np.uint8)
+    d = serializer.to_dict(large)
+    assert d['shm'] != dicts[0]['shm']
+    np.testing.assert_array_equal(serializer.from_dict('', d), large)
+
+    # Arrays that can't live in shared memory are sent inline
+    d = serializer.to_dict(np.zeros((0, 3)))
+    assert 'shm' not in d
+    assert serializer.from_dict('', d).shape == (0, 3)
+
+
+def test_serialize_ring_zero_copy_and_overwrite(serializer):
+    SerNDArray.ZERO_COPY = True
+    d = serializer.to_dict(np.arange(10))
+    view = serializer.from_dict('', dict(d))
+    np.testing.assert_array_equal(view, np.arange(10))
+    assert not view.flags.writeable
+
+    # Once the slot has been reused, the old array can no longer be read
+    for i in range(SerNDArray.NUM_SLOTS):
+        serializer.to_dict(np.arange(10) + i + 1)
+    with pytest.raises(SlotOverwrittenError):
+        serializer.from_dict('', dict(d))
+
+
+@contextmanager
+def pyroProxy(server):
+    previousSerializer = Pyro5.config.SERIALIZER
+    Pyro5.config.SERIALIZER = 'msgpack'
+    register_serializers()
+    daemon = Pyro5.server.Daemon(host='localhost')
+    uri = daemon.register(Pyro5.server.expose(server))
+    thread = threading.Thread(target=daemon.requestLoop, daemon=True)
+    thread.start()
+    try:
+        with Pyro5.api.Proxy(uri) as proxy:
+            yield proxy
+    finally:
+        daemon.shutdown()
+        thread.join()
+        Pyro5.config.SERIALIZER = previousSerializer
+
+
+def test_serialize_over_pyro(serializer):
+    class Server:
+        def getFrame(self, value):
+            return np.full((480, 640), value, dtype=np.uint16)
+
+    with pyroProxy(Server) as proxy:
+        for value in range(2 * SerNDArray.NUM_SLOTS):
+            frame = proxy.getFrame(value)
+            assert frame.shape == (480, 640)
+            assert (frame == value).all()
+        assert len(SerNDArray.SENDING_RINGS) == 1
+
+
+def test_serialize_over_pyro_many_arrays(serializer):
+    # A reply with more arrays than the ring has slots doesn't overwrite its own arrays
+    class Server:
+        def getFrames(self, numFrames):
+            return [np.full((480, 640), value, dtype=np.uint16) for value in range(numFrames)]
+
+    with pyroProxy(Server) as proxy:
+        for numFrames in [2 * SerNDArray.NUM_SLOTS + 1, SerNDArray.NUM_SLOTS + 1]:
+            frames = proxy.getFrames(numFrames)
+            assert len(frames) == numFrames
+            for value, frame in enumerate(frames):
+                assert (frame == value).all()
+
+
+def test_serialize_over_pyro_growing_arrays(serializer):
+    # The ring that the small array was sent through stays valid when a larger array in the
+    # same reply needs a new ring
+    class Server:
+        def getArrays(self):
+            return [np.full(10, 1, dtype=np.uint8), np.full(4 * 1024 * 1024, 2, dtype=np.uint8),
+                    np.full(10, 3, dtype=np.uint8)]
+
+    with pyroProxy(Server) as proxy:
+        for _ in range(2):
+            small, large, small2 = proxy.getArrays()
+            assert (small == 1).all() and len(small) == 10
+            assert (large == 2).all() and len(large) == 4 * 1024 * 1024
+            assert (small2 == 3).all()
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,78 @@
+import json
+
+from imswitch.imcommon.model import SharedAttributes
+
+
+def test_shared_attributes_views():
+    attrs = SharedAttributes()
+    attrs[('Positioner', 'X', 'Position')] = 1.5
+    attrs[('Positioner', 'Y', 'Position')] = 2
+    attrs[('Rec', 'Mode')] = 'SpecFrames'
+    attrs[('Positioner', 'X', 'Position')] = 3
+
+    assert attrs.getHDF5Attributes() == {
+        'Positioner:X:Position': 3, 'Positioner:Y:Position': 2, 'Rec:Mode': 'SpecFrames'
+    }
+    assert json.loads(attrs.getJSON()) == {
+        'Positioner': {'X': {'Position': 3}, 'Y': {'Position': 2}}, 'Rec': {'Mode': 'SpecFrames'}
+    }
+
+    # The returned attributes are a snapshot
+    hdf5Attrs = attrs.getHDF5Attributes()
+    attrs[('Rec', 'Mode')] = 'SpecTime'
+    assert hdf5Attrs['Rec:Mode'] == 'SpecFrames'
+
+
+def test_shared_attributes_batch_and_subscribe():
+    attrs = SharedAttributes()
+    positionerChanges = []
+    allChanges = []
+    batches = []
+    attrs.subscribe(('Positioner',), lambda key, value: positionerChanges.append((key, value)))
+    attrs.subscribe((), lambda key, value: allChanges.append((key, value)))
+    attrs.sigAttributesSet.connect(batches.append)
+
+    attrs[('Laser', '488', 'Value')] = 10
+    assert positionerChanges == []
+    assert allChanges == [(('Laser', '488', 'Value'), 10)]
+
+    with attrs.batch():
+        for position in range(100):
+            attrs[('Positioner', 'X', 'Position')] = position
+        with attrs.batch():
+            attrs[('Positioner', 'Y', 'Position')] = 5
+        attrs[('Laser', '488', 'Value')] = 20
+        assert attrs[('Positioner', 'X', 'Position')] == 99  # Values are updated right away
+        assert positionerChanges == []  # ...but not announced until the batch ends
+
+    assert positionerChanges == [(('Positioner', 'X', 'Position'), 99),
+                                 (('Positioner', 'Y', 'Position'), 5)]
+    assert len(allChanges) == 4
+    assert len(batches) == 2
+    assert batches[1] == {('Positioner', 'X', 'Position'): 99,
+                          ('Positioner', 'Y', 'Position'): 5,
+                          ('Laser', '488', 'Value'): 20}
+
+    # update() is a batch too
+    other = SharedAttributes()
+    other[('Positioner', 'Z', 'Position')] = 1
+    other[('Positioner', 'Z', 'Speed')] = 2
+    attrs.update(other)
+    assert len(batches) == 3
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,131 @@
+import sys
+import threading
+import time
+
+import pytest
+from qtpy import QtCore
+
+from imswitch.imcommon.framework import Signal, SignalInterface, StartupGraph, StartupReport
+from imswitch.imcommon.model import pythontools
+
+
+@pytest.fixture
+def startupReport():
+    StartupReport.reset()
+    yield StartupReport
+    StartupReport.reset()
+
+
+@pytest.mark.parametrize('parallel', [False, True])
+def test_startup_graph_dependencies(qtbot, startupReport, parallel):
+    graph = StartupGraph('test')
+    graph.add('low', lambda: 'low')
+    graph.add('high', lambda low, other: f'high({low},{other})', ['low', 'other'])
+    graph.add('other', lambda low: f'other({low})', ['low'])
+
+    assert graph.run(parallel=parallel) == {
+        'low': 'low', 'other': 'other(low)', 'high': 'high(low,other(low))'
+    }
+    assert [stage.name for stage in startupReport.getStages()][:2] == ['test', 'test.low']
+    assert 'test.high' in startupReport.formatReport()
+
+
+def test_startup_graph_parallel(qtbot, startupReport):
+    graph = StartupGraph('test')
+    threadNames = {}
+
+    def slowStep(name):
+        time.sleep(0.3)
+        threadNames[name] = threading.current_thread().name
+        return SignalInterface()
+
+    for name in ['a', 'b', 'c']:
+        graph.add(name, lambda name=name: slowStep(name))
+
+    start = time.perf_counter()
+    results = graph.run(parallel=True)
+    assert time.perf_counter() - start < 0.8
+    assert len(set(threadNames.values())) == 3
+
+    # Objects created on the worker threads are handed over to the calling thread
+    for obj in results.values():
+        assert obj.thread() is QtCore.QThread.currentThread()
+
+
+def test_startup_graph_caller_thread(qtbot, startupReport):
+    class Device(SignalInterface):
+        sigValueChanged = Signal(int)
+
+    values = []
+
+    def connect(device):
+        assert threading.current_thread() is threading.main_thread()
+        device.sigValueChanged.connect(lambda value: values.append(value))
+        return device
+
+    graph = StartupGraph('test')
+    graph.add('device', Device)
+    graph.add('manager', connect, ['device'], inCallerThread=True)
+    results = graph.run(parallel=True)
+
+    # Emitted from another thread, so that the connection is queued
+    emitter = threading.Thread(target=lambda: results['manager'].sigValueChanged.emit(5))
+    emitter.start()
+    emitter.join()
+    qtbot.waitUntil(lambda: values == [5], timeout=1000)
+
+
+def test_startup_graph_errors(qtbot, startupReport):
+    started = []
+
+    def failingStep():
+        raise RuntimeError('Device not found')
+
+    graph = StartupGraph('test')
+    graph.add('failing', failingStep)
+    graph.add('dependent', lambda failing: started.append('dependent'), ['failing'])
+    with pytest.raises(RuntimeError, match='Device not found'):
+        graph.run(parallel=True)
+    assert started == []
+
+    graph = StartupGraph('test')
+    graph.add('a', lambda b: None, ['b'])
+    graph.add('b', lambda a: None, ['a'])
+    for parallel in [False, True]:
+        with pytest.raises(ValueError, match='circular'):
+            graph.run(parallel=parallel)
+
+    graph = StartupGraph('test')
+    graph.add('a', lambda missing: None, ['missing'])
+    with pytest.raises(ValueError, match='unknown'):
+        graph.run()
+
+
+def test_lazy_module():
+    sys.modules.pop('colorsys', None)
+    colorsys = pythontools.LazyModule('colorsys')
+    assert 'colorsys' not in sys.modules
+    assert colorsys.rgb_to_hsv(1, 0, 0) == (0, 1, 1)
+    assert 'colorsys' in sys.modules
+
+    email = pythontools.LazyModule('email')
+    assert email.charset.Charset is not None  # Submodule not imported by the package itself
+    with pytest.raises(AttributeError):
+        email.noSuchAttribute
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
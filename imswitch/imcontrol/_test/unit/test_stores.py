@@ -1,9 +1,16 @@
 from dataclasses import dataclass
+from types import SimpleNamespace
 import os
 import pytest
-from imswitch.imcontrol.model.managers.RecordingManager import ZarrStorer, HDF5Storer, TiffStorer
+from imswitch.imcommon.model import VArrayFile
+from imswitch.imcontrol.model.managers.RecordingManager import (
+    ArrayStorer, ZarrStorer, HDF5Storer, TiffStorer
+)
 from imswitch.imcontrol.model.managers.DetectorsManager import DetectorsManager
+from imswitch.imcontrol.model.managers.detectors.DetectorManager import createFrameMetadata
 import numpy as np
+import h5py
+import tifffile
 import zarr
 
 
@@ -43,4 +50,141 @@ def test_hdf5_storer(tmpdir, fake_manager):
     path = os.path.join(tmpdir, "test")
     storer = HDF5Storer(path, {"test_channel": fake_manager})
     storer.snap({"test_channel": np.zeros((100,100))}, {"test_channel": {"test": 3}})
-    assert os.path.exists(path + "_test_channel.h5"), "path does not exist"
\ No newline at end of file
+    assert os.path.exists(path + "_test_channel.h5"), "path does not exist"
+
+
+@pytest.mark.parametrize("storerType", [ZarrStorer, HDF5Storer, TiffStorer])
+def test_storer_stream(tmpdir, fake_manager, storerType):
+    """Test that frames streamed in several chunks all end up in the file"""
+    path = os.path.join(tmpdir, f"test.{storerType.streamExtension}")
+    storer = storerType(path, {"test_channel": fake_manager})
+    storer.openStream("test_channel", path, {"test": 3})
+    for i in range(50):
+        storer.stream({"test_channel": np.full((3, 100, 100), i, dtype=np.int16)})
+    assert storer.getNumStreamedFrames("test_channel") == 150
+    storer.closeStream("test_channel")
+
+    if storerType is ZarrStorer:
+        data = zarr.open(path)["test_channel"][:]
+    elif storerType is HDF5Storer:
+        with h5py.File(path) as file:
+            data = file["test_channel"][:]
+    else:
+        with tifffile.TiffFile(path) as file:
+            data = np.concatenate([series.asarray() for series in file.series])
+    assert data.shape == (150, 100, 100)
+    assert data[-1, 0, 0] == 49
+
+
+@pytest.mark.parametrize("storerType", [ZarrStorer, HDF5Storer, TiffStorer])
+def test_storer_stream_frame_metadata(tmpdir, fake_manager, storerType):
+    """Test that per-frame metadata is saved as a table next to the frames"""
+    path = os.path.join(tmpdir, f"test.{storerType.streamExtension}")
+    storer = storerType(path, {"test_channel": fake_manager})
+    storer.openStream("test_channel", path)
+    for i in range(3):
+        metadata = createFrameMetadata(2, frameNumbers=[2 * i, 2 * i + 1], exposure=0.01)
+        storer.stream({"test_channel": np.zeros((2, 100, 100), dtype=np.uint16)},
+                      metadata={"test_channel": metadata})
+    storer.closeStream("test_channel")
+
+    if storerType is ZarrStorer:
+        table = zarr.open(path)["frame_metadata/test_channel"][:]
+    elif storerType is HDF5Storer:
+        with h5py.File(path) as file:
+            table = file["frame_metadata/test_channel"][:]
+    else:
+        table = np.genfromtxt(os.path.join(tmpdir, "test_frames.csv"), delimiter=",",
+                              names=True)
+    assert list(table["frameNumber"]) == list(range(6))
+    assert np.allclose(table["exposure"], 0.01)
+    assert np.all(np.isnan(table["deviceTimestamp"]))
+
+
+def test_hdf5_storer_stream_preallocated(tmpdir, fake_manager):
+    """Test that unused preallocated frames are removed when closing the stream"""
+    path = os.path.join(tmpdir, "test.hdf5")
+    storer = HDF5Storer(path, {"test_channel": fake_manager})
+    storer.openStream("test_channel", path, numFrames=10)
+    storer.stream({"test_channel": np.zeros((4, 100, 100))})
+    storer.closeStream("test_channel")
+
+    with h5py.File(path) as file:
+        assert file["test_channel"].shape == (4, 100, 100)
+        assert not file["test_channel"].attrs["writing"]
+
+
+def test_zarr_storer_stream_options(tmpdir, fake_manager):
+    """Test that the zarr storer keeps the data type and uses the chunking and
+    compression options"""
+    path = os.path.join(tmpdir, "test.zarr")
+    storer = ZarrStorer(path, {"test_channel": fake_manager}, chunkFrames=4, chunkShape=(32, 32),
+                        compressor="zstd", nestedDirectories=True, numEncodeThreads=2)
+    storer.openStream("test_channel", path)
+    for i in range(5):
+        storer.stream({"test_channel": np.full((3, 100, 100), 40000 + i, dtype=np.uint16)})
+    storer.closeStream("test_channel")
+
+    dataset = zarr.open(path)["test_channel"]
+    assert dataset.shape == (15, 100, 100)
+    assert dataset.chunks == (4, 32, 32)
+    assert dataset.dtype == np.uint16
+    assert dataset.compressor.codec_id == "zstd"
+    assert dataset[14, 99, 99] == 40004
+    assert os.path.isdir(os.path.join(path, "test_channel", "0"))
+
+
+def test_tiff_storer_stream_rollover(tmpdir):
+    """Test that tiff streams continue in numbered files and carry OME metadata"""
+    path = os.path.join(tmpdir, "test.ome.tiff")
+    manager = MockDetectorsManager(shape=(100, 100), pixelSizeUm=[1, 0.5, 0.5])
+    storer = TiffStorer(path, {"test_channel": manager}, ome=True, maxFramesPerFile=4)
+    storer.openStream("test_channel", path, {"Rec:Mode": "SpecFrames"})
+    for i in range(5):
+        storer.stream({"test_channel": np.full((2, 100, 100), i, dtype=np.uint16)})
+    storer.closeStream("test_channel")
+
+    paths = [path] + [os.path.join(tmpdir, f"test_{i}.ome.tiff") for i in (1, 2)]
+    shapes = []
+    for filePath in paths:
+        with tifffile.TiffFile(filePath) as file:
+            assert file.is_bigtiff
+            assert file.is_ome
+            assert "SpecFrames" in file.ome_metadata
+            assert 'PhysicalSizeX="0.5"' in file.ome_metadata
+            shapes.append(file.series[0].shape)
+    assert shapes == [(4, 100, 100), (4, 100, 100), (2, 100, 100)]
+
+
+def test_tiff_storer_stream_append_scan(tmpdir, fake_manager):
+    """Test that appended scans continue in the last file of the previous scans"""
+    path = os.path.join(tmpdir, "test.tiff")
+    for scan in range(2):
+        storer = TiffStorer(path, {"test_channel": fake_manager}, maxFramesPerFile=4)
+        storer.openStream("test_channel", path, appendScan=True)
+        storer.stream({"test_channel": np.full((3, 100, 100), scan, dtype=np.uint16)},
+                      metadata={"test_channel": createFrameMetadata(3)})
+        storer.closeStream("test_channel")
+
+    with tifffile.TiffFile(path) as file:
+        assert [page.asarray()[0, 0] for page in file.pages] == [0, 0, 0, 1]
+    with tifffile.TiffFile(os.path.join(tmpdir, "test_1.tiff")) as file:
+        assert len(file.pages) == 2
+    frameMetadata = np.genfromtxt(os.path.join(tmpdir, "test_frames.csv"), delimiter=",",
+                                  names=True)
+    assert len(frameMetadata) == 6
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="requires /dev/shm")
+@pytest.mark.parametrize("freeBytes,sharedMemory", [(1024 ** 4, True), (1024, False)])
+def test_array_storer_shared_memory(monkeypatch, fake_manager, freeBytes, sharedMemory):
+    """Test that preallocated recordings only use shared memory if they fit in it"""
+    monkeypatch.setattr(os, "statvfs", lambda path: SimpleNamespace(f_bavail=freeBytes,
+                                                                    f_frsize=1))
+    file = VArrayFile("test")
+    storer = ArrayStorer("test", {"test_channel": fake_manager})
+    storer.openStream("test_channel", file, numFrames=10)
+    storer.stream({"test_channel": np.ones((10, 100, 100), dtype=np.uint16)})
+    storer.closeStream("test_channel")
+    assert isinstance(file["test_channel"], np.memmap) == sharedMemory
+    assert file["test_channel"].sum() == 10 * 100 * 100
@@ -0,0 +1,118 @@
+import importlib.util
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from imswitch.imcommon.framework import Signal, SignalInterface
+from imswitch.imcommon.model import generateAPI
+from imswitch.imcontrol.controller.server import (
+    decodeFrameMessage, FrameStreamOptions, ImSwitchServer
+)
+from imswitch.imcontrol.controller.server.ImSwitchServer import app
+from imswitch.imcontrol.controller.server._stream import (
+    encodeFrame, isEncodingAvailable, StreamFrame
+)
+from imswitch.imcontrol.model import SetupInfo
+
+
+class CommChannel(SignalInterface):
+    sigUpdateImage = Signal(str, np.ndarray, bool, list, bool)
+
+
+requiresLz4 = pytest.mark.skipif(not isEncodingAvailable('lz4'), reason='lz4 is not installed')
+
+
+def makeImage(value=0):
+    return np.arange(64 * 48, dtype=np.uint16).reshape(48, 64) + value
+
+
+@pytest.mark.parametrize('encoding', ['raw', pytest.param('lz4', marks=requiresLz4), 'png'])
+def test_stream_encoding_lossless(encoding):
+    image = makeImage()
+    frame = StreamFrame('Camera', image, [1, 1], 0.0, 3, True)
+    options = FrameStreamOptions(roi=(8, 4, 32, 20), downsample=2, encoding=encoding)
+
+    header, decoded = decodeFrameMessage(encodeFrame(frame, options))
+    assert header['frameNumber'] == 3
+    assert header['shape'] == [10, 16]
+    assert header['dtype'] == 'uint16'
+    assert header['scale'] == [2, 2]
+    assert header['offset'] == [8, 4]
+    np.testing.assert_array_equal(decoded, image[4:24:2, 8:40:2])
+
+
+def test_stream_encoding_jpeg():
+    image = makeImage()
+    frame = StreamFrame('Camera', image, [1, 1], 0.0, 0, True)
+    _, decoded = decodeFrameMessage(encodeFrame(frame, FrameStreamOptions(encoding='jpeg')))
+    assert decoded.shape == image.shape
+    assert decoded.dtype == np.uint8
+    assert decoded[0, 0] < 10 and decoded[-1, -1] > 245  # Scaled to the full 8-bit range
+
+
+def test_stream_options_from_query():
+    options = FrameStreamOptions.fromQuery({'roi': '1,2,3,4', 'downsample': '2', 'maxFps': '5'})
+    assert options == FrameStreamOptions(roi=(1, 2, 3, 4), downsample=2, maxFps=5)
+    with pytest.raises(ValueError):
+        FrameStreamOptions.fromQuery({'encoding': 'gif'})
+    with pytest.raises(ValueError):
+        FrameStreamOptions.fromQuery({'roi': '1,2,3'})
+
+
+def test_stream_options_missing_package(monkeypatch):
+    monkeypatch.setattr(importlib.util, 'find_spec', lambda name: None)
+    with pytest.raises(ValueError, match='lz4'):
+        FrameStreamOptions(encoding='lz4')
+    assert FrameStreamOptions(encoding='raw').encoding == 'raw'
+
+
+def test_stream_websocket(qtbot):
+    commChannel = CommChannel()
+    server = ImSwitchServer(generateAPI([]), SetupInfo(), commChannel)
+    server.createAPI()
+    client = TestClient(app)
+
+    commChannel.sigUpdateImage.emit('Camera', makeImage(0), False, [1, 1], True)
+    commChannel.sigUpdateImage.emit('Other', makeImage(5), False, [1, 1], False)
+    encoding = 'lz4' if isEncodingAvailable('lz4') else 'raw'
+    with client.websocket_connect(f'/stream/frames?encoding={encoding}') as websocket:
+        # The latest frame of the current detector is sent right away
+        header, image = decodeFrameMessage(websocket.receive_bytes())
+        assert header['detector'] == 'Camera'
+        np.testing.assert_array_equal(image, makeImage(0))
+
+        for value in range(1, 4):
+            commChannel.sigUpdateImage.emit('Camera', makeImage(value), True, [1, 1], True)
+
+        # Frames that arrive while the client is busy are skipped
+        received = []
+        while not received or received[-1][0]['frameNumber'] < 3:
+            received.append(decodeFrameMessage(websocket.receive_bytes()))
+        header, image = received[-1]
+        np.testing.assert_array_equal(image, makeImage(3))
+        assert len(received) + header['droppedFrames'] == 3
+
+    with client.websocket_connect('/stream/frames?detector=Other&downsample=4') as websocket:
+        header, image = decodeFrameMessage(websocket.receive_bytes())
+        assert header['detector'] == 'Other'
+        np.testing.assert_array_equal(image, makeImage(5)[::4, ::4])
+
+    server.stop()
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -1,7 +1,7 @@
-from typing import Mapping
+from typing import Any, Mapping
 
 import numpy as np
-from imswitch.imcommon.framework import Signal, SignalInterface
+from imswitch.imcommon.framework import Instrumentation, Signal, SignalInterface
 from imswitch.imcommon.model import pythontools, APIExport, SharedAttributes
 from imswitch.imcommon.model import initLogger
 
@@ -42,6 +42,8 @@ class CommunicationChannel(SignalInterface):
 
     sigUpdateRecTime = Signal(int)  # (recTime)
 
+    sigRecordingWriteStatsUpdated = Signal(str, object)  # (detectorName, WriteQueueStats)
+
     sigMemorySnapAvailable = Signal(
         str, np.ndarray, object, bool
     )  # (name, image, filePath, savedToDisk)
@@ -113,11 +115,16 @@ class CommunicationChannel(SignalInterface):
         self.__main._moduleCommChannel.sigExecutionFinished.connect(self.executionFinished)
 
     def getCenterViewbox(self):
-        """ Returns the center point of the viewbox, as an (x, y) tuple. """
+        """ Returns the center point of the viewbox, as an (x, y) tuple. If
+        there is no image widget, e.g. when running headless, the center of
+        the current detector's frame is returned instead. """
         if 'Image' in self.__main.controllers:
             return self.__main.controllers['Image'].getCenterViewbox()
         else:
-            raise RuntimeError('Required image widget not available')
+            shape = self.__main.masterController.detectorsManager.execOnCurrent(
+                lambda c: c.shape
+            )
+            return shape[0] / 2, shape[1] / 2
 
     def getDimsScan(self):
         if 'Scan' in self.__main.controllers:
@@ -151,6 +158,21 @@ class CommunicationChannel(SignalInterface):
     def isExecuting(self):
         return self._scriptExecution
 
+    @APIExport()
+    def getPerformanceStats(self) -> Mapping[str, Mapping[str, Any]]:
+        """ Returns the performance metrics recorded so far, keyed by metric
+        name and labels. Durations are in seconds. Metrics are only recorded
+        while instrumentation is enabled. """
+        return Instrumentation.getStats()
+
+    @APIExport()
+    def setPerformanceInstrumentationEnabled(self, enabled: bool) -> None:
+        """ Sets whether performance metrics are recorded. """
+        if enabled:
+            Instrumentation.enable()
+        else:
+            Instrumentation.disable()
+
     @APIExport()
     def signals(self) -> Mapping[str, Signal]:
         """ Returns signals that can be used with e.g. the getWaitForSignal
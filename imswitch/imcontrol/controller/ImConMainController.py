@@ -6,7 +6,7 @@ from imswitch.imcommon.controller import MainController, PickDatasetsController
 from imswitch.imcommon.model import (
     ostools, initLogger, generateAPI, generateShortcuts, SharedAttributes
 )
-from imswitch.imcommon.framework import Thread
+from imswitch.imcommon.framework import Instrumentation, StartupReport, Thread, Timer
 from .server import ImSwitchServer
 from imswitch.imcontrol.model import configfiletools
 from imswitch.imcontrol.view import guitools
@@ -51,11 +51,15 @@ class ImConMainController(MainController):
         self.controllers = {}
 
         for widgetKey, widget in self.__mainView.widgets.items():
-            self.controllers[widgetKey] = self.__factory.createController(
-                (getattr(controllers, f'{widgetKey}Controller')
-                if widgetKey != 'Scan' else
-                getattr(controllers, f'{widgetKey}Controller{self.__setupInfo.scan.scanWidgetType}')), widget
-            )
+            if widgetKey != 'Scan':
+                controllerType = getattr(controllers, f'{widgetKey}Controller')
+            else:
+                controllerType = getattr(
+                    controllers, f'{widgetKey}Controller{self.__setupInfo.scan.scanWidgetType}'
+                )
+            with StartupReport.measure(f'controllers.{widgetKey}'):
+                self.controllers[widgetKey] = self.__factory.createController(controllerType,
+                                                                              widget)
 
         # Generate API
         self.__api = None
@@ -73,8 +77,17 @@ class ImConMainController(MainController):
         self.__shortcuts = generateShortcuts(shorcutObjs)
         self.__mainView.addShortcuts(self.__shortcuts)
 
+        # Performance instrumentation
+        self.__instrumentationTimer = None
+        if setupInfo.instrumentation.enabled:
+            Instrumentation.enable()
+            if setupInfo.instrumentation.logPeriod is not None:
+                self.__instrumentationTimer = Timer()
+                self.__instrumentationTimer.timeout.connect(self.logInstrumentationSummary)
+                self.__instrumentationTimer.start(int(setupInfo.instrumentation.logPeriod * 1000))
+
         if setupInfo.pyroServerInfo.active:
-            self._serverWorker = ImSwitchServer(self.__api, setupInfo)
+            self._serverWorker = ImSwitchServer(self.__api, setupInfo, self.__commChannel)
             self.__logger.debug(self.__api)
             self._thread = Thread()
             self._serverWorker.moveToThread(self._thread)
@@ -82,6 +95,14 @@ class ImConMainController(MainController):
             self._thread.finished.connect(self._serverWorker.stop)
             self._thread.start()
 
+    @property
+    def masterController(self):
+        return self.__masterController
+
+    @property
+    def commChannel(self):
+        return self.__commChannel
+
     @property
     def api(self):
         return self.__api
@@ -142,8 +163,18 @@ class ImConMainController(MainController):
         configfiletools.saveOptions(options)
         ostools.restartSoftware()
 
+    def logInstrumentationSummary(self):
+        if not Instrumentation.isEnabled():
+            return
+
+        summary = Instrumentation.formatSummary()
+        if summary:
+            self.__logger.info(f'Performance summary:\n{summary}')
+
     def closeEvent(self):
         self.__logger.debug('Shutting down')
+        if self.__instrumentationTimer is not None:
+            self.__instrumentationTimer.stop()
         self.__factory.closeAllCreatedControllers()
         self.__masterController.closeEvent()
 
@@ -1,3 +1,4 @@
+from imswitch.imcommon.framework import StartupGraph
 from imswitch.imcommon.model import VFileItem, initLogger
 from imswitch.imcontrol.model import (
     DetectorsManager, LasersManager, MultiManager, NidaqManager, PositionersManager, RecordingManager, RS232sManager, 
@@ -17,47 +18,63 @@ class MasterController:
         self.__commChannel = commChannel
         self.__moduleCommChannel = moduleCommChannel
 
-        # Init managers
-        self.nidaqManager = NidaqManager(self.__setupInfo)
-        #self.pulseStreamerManager = PulseStreamerManager(self.__setupInfo)
-        self.rs232sManager = RS232sManager(self.__setupInfo.rs232devices)
-
-        lowLevelManagers = {
-            'nidaqManager': self.nidaqManager,
-            #'pulseStreamerManager' : self.pulseStreamerManager,
-            'rs232sManager': self.rs232sManager
-        }
-
-        self.detectorsManager = DetectorsManager(self.__setupInfo.detectors, updatePeriod=300,
-                                                 **lowLevelManagers)
-        self.lasersManager = LasersManager(self.__setupInfo.lasers,
-                                           **lowLevelManagers)
-        self.positionersManager = PositionersManager(self.__setupInfo.positioners,
-                                                     **lowLevelManagers)
-        self.rotatorsManager = RotatorsManager(self.__setupInfo.rotators,
-                                               **lowLevelManagers)
-
-        self.recordingManager = RecordingManager(self.detectorsManager)
-        self.slmManager = SLMManager(self.__setupInfo.slm)
+        # Init managers. Managers that don't depend on each other are initialized in parallel if
+        # enabled in the setup (off by default), as connecting to devices may take a while.
+        graph = StartupGraph('managers')
+        graph.add('nidaqManager', lambda: NidaqManager(self.__setupInfo))
+        self.__addMultiManager(graph, 'rs232sManager', RS232sManager, 'rs232',
+                               self.__setupInfo.rs232devices)
+
+        lowLevelManagerNames = [
+            'nidaqManager',
+            'rs232sManager'
+        ]
+
+        self.__addMultiManager(graph, 'detectorsManager', DetectorsManager, 'detectors',
+                               self.__setupInfo.detectors, lowLevelManagerNames,
+                               updatePeriod=300)
+        self.__addMultiManager(graph, 'lasersManager', LasersManager, 'lasers',
+                               self.__setupInfo.lasers, lowLevelManagerNames)
+        self.__addMultiManager(graph, 'positionersManager', PositionersManager, 'positioners',
+                               self.__setupInfo.positioners, lowLevelManagerNames)
+        self.__addMultiManager(graph, 'rotatorsManager', RotatorsManager, 'rotators',
+                               self.__setupInfo.rotators, lowLevelManagerNames)
+
+        graph.add('recordingManager',
+                  lambda detectorsManager: RecordingManager(detectorsManager),
+                  ['detectorsManager'], inCallerThread=True)
+        graph.add('slmManager', lambda: SLMManager(self.__setupInfo.slm))
 
         if self.__setupInfo.microscopeStand:
-            self.standManager = StandManager(self.__setupInfo.microscopeStand,
-                                             **lowLevelManagers)
+            graph.add('standManager',
+                      lambda **lowLevelManagers: StandManager(self.__setupInfo.microscopeStand,
+                                                              **lowLevelManagers),
+                      lowLevelManagerNames)
 
         # Generate scanManager type according to setupInfo
+        scanManagerTypeRecognized = True
         if self.__setupInfo.scan:
             if self.__setupInfo.scan.scanWidgetType == "PointScan":
-                self.scanManager = ScanManagerPointScan(self.__setupInfo)
+                graph.add('scanManager', lambda: ScanManagerPointScan(self.__setupInfo))
             elif self.__setupInfo.scan.scanWidgetType == "Base":
-                self.scanManager = ScanManagerBase(self.__setupInfo)
+                graph.add('scanManager', lambda: ScanManagerBase(self.__setupInfo))
             elif self.__setupInfo.scan.scanWidgetType == "MoNaLISA":
-                self.scanManager = ScanManagerMoNaLISA(self.__setupInfo)
+                graph.add('scanManager', lambda: ScanManagerMoNaLISA(self.__setupInfo))
             else:
-                self.__logger.error(
-                    'ScanWidgetType in SetupInfo["scan"] not recognized, choose one of the following:'
-                    ' ["Base", "PointScan", "MoNaLISA"].'
-                )
-                return
+                scanManagerTypeRecognized = False
+
+        managers = graph.run(parallel=self.__setupInfo.startup.parallelInit,
+                             maxWorkers=self.__setupInfo.startup.maxWorkers)
+        for managerName, manager in managers.items():
+            if managerName.endswith('Manager'):
+                setattr(self, managerName, manager)
+
+        if not scanManagerTypeRecognized:
+            self.__logger.error(
+                'ScanWidgetType in SetupInfo["scan"] not recognized, choose one of the following:'
+                ' ["Base", "PointScan", "MoNaLISA"].'
+            )
+            return
 
         # Connect signals
         cc = self.__commChannel
@@ -72,6 +89,9 @@ class MasterController:
         self.recordingManager.sigRecordingEnded.connect(cc.sigRecordingEnded)
         self.recordingManager.sigRecordingFrameNumUpdated.connect(cc.sigUpdateRecFrameNum)
         self.recordingManager.sigRecordingTimeUpdated.connect(cc.sigUpdateRecTime)
+        self.recordingManager.sigRecordingWriteStatsUpdated.connect(
+            cc.sigRecordingWriteStatsUpdated
+        )
         self.recordingManager.sigMemorySnapAvailable.connect(cc.sigMemorySnapAvailable)
         self.recordingManager.sigMemoryRecordingAvailable.connect(self.memoryRecordingAvailable)
 
@@ -90,6 +110,23 @@ class MasterController:
             if isinstance(attr, MultiManager):
                 attr.finalize()
 
+    @staticmethod
+    def __addMultiManager(graph, managerName, managerType, subManagersPackage, deviceInfos,
+                          lowLevelManagerNames=(), **kwargs):
+        # The devices are connected to on a worker thread, while the manager itself is created on
+        # this thread, since it connects to the signals of its devices
+        devicesStepName = f'{subManagersPackage}Devices'
+        graph.add(devicesStepName,
+                  lambda **lowLevelManagers: MultiManager.createSubManagers(
+                      deviceInfos, subManagersPackage, **lowLevelManagers
+                  ),
+                  lowLevelManagerNames)
+        graph.add(managerName,
+                  lambda **results: managerType(deviceInfos, **kwargs,
+                                                subManagers=results.pop(devicesStepName),
+                                                **results),
+                  [devicesStepName, *lowLevelManagerNames], inCallerThread=True)
+
 
 # Copyright (C) 2020-2021 ImSwitch developers
 # This file is part of ImSwitch.
@@ -87,7 +87,8 @@ class SuperScanController(ImConWidgetController):
         # Connect CommunicationChannel signals
         self._commChannel.sigRunScan.connect(self.runScanExternal)
         self._commChannel.sigAbortScan.connect(self.abortScan)
-        self._commChannel.sharedAttrs.sigAttributeSet.connect(self.attrChanged)
+        self._commChannel.sharedAttrs.subscribe((_attrCategoryStage,), self.attrChanged)
+        self._commChannel.sharedAttrs.subscribe((_attrCategoryTTL,), self.attrChanged)
         self._commChannel.sigToggleBlockScanWidget.connect(lambda block: self.toggleBlockWidget(block))
         self._commChannel.sigRequestScanParameters.connect(self.sendScanParameters)
         self._commChannel.sigSetAxisCenters.connect(lambda devices, centers: self.setCenterParameters(devices, centers))
@@ -221,18 +222,16 @@ class SuperScanController(ImConWidgetController):
         self._widget.setEnabled(block)
 
     def setSharedAttr(self, category, attr, value):
+        settingAttr = self.settingAttr
         self.settingAttr = True
         try:
             self._commChannel.sharedAttrs[(category, attr)] = value
         finally:
-            self.settingAttr = False
+            self.settingAttr = settingAttr
 
     def updateScanStageAttrs(self):
         self.getParameters()
 
-        for key, value in self._analogParameterDict.items():
-            self.setSharedAttr(_attrCategoryStage, key, value)
-
         positiveDirections = []
         for i in range(len(self.positioners)):
             positionerName = self._analogParameterDict['target_device'][i]
@@ -240,15 +239,27 @@ class SuperScanController(ImConWidgetController):
                 positiveDirection = self._setupInfo.positioners[positionerName].isPositiveDirection
                 positiveDirections.append(positiveDirection)
 
-        self.setSharedAttr(_attrCategoryStage, 'positive_direction', positiveDirections)
+        self.settingAttr = True
+        try:
+            with self._commChannel.sharedAttrs.batch():
+                for key, value in self._analogParameterDict.items():
+                    self.setSharedAttr(_attrCategoryStage, key, value)
+                self.setSharedAttr(_attrCategoryStage, 'positive_direction', positiveDirections)
+        finally:
+            self.settingAttr = False
 
     def updateScanTTLAttrs(self):
         self.getParameters()
 
-        for key, value in self._digitalParameterDict.items():
-            self.setSharedAttr(_attrCategoryTTL, key, value)
+        self.settingAttr = True
+        try:
+            with self._commChannel.sharedAttrs.batch():
+                for key, value in self._digitalParameterDict.items():
+                    self.setSharedAttr(_attrCategoryTTL, key, value)
+        finally:
+            self.settingAttr = False
 
-    @APIExport(runOnUIThread=True)
+    @APIExport(runOnUIThread=True, requestType='POST')
     def runScan(self) -> None:
         """ Runs a scan with the set scanning parameters. """
         self.runScanAdvanced(sigScanStartingEmitted=False)
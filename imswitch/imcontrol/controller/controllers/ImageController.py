@@ -1,3 +1,4 @@
+from imswitch.imcommon.framework import Instrumentation
 from imswitch.imcontrol.view import guitools
 from ..basecontrollers import LiveUpdatedController
 from imswitch.imcommon.model import initLogger
@@ -17,9 +18,25 @@ class ImageController(LiveUpdatedController):
         self._lastShape = self._master.detectorsManager.execOnCurrent(lambda c: c.shape)
         self._shouldResetView = False
 
-        self._widget.setLiveViewLayers(
-            self._master.detectorsManager.getAllDeviceNames(lambda c: c.forAcquisition)
+        detectorNames = self._master.detectorsManager.getAllDeviceNames(
+            lambda c: c.forAcquisition
         )
+        self._widget.setLiveViewLayers(detectorNames)
+
+        # Frames are decimated to the resolution they are displayed at before being shown
+        self._displayPipelines = {detectorName: guitools.DisplayPipeline()
+                                  for detectorName in detectorNames}
+        self._displayScales = {}
+        self._displayedImages = {}
+
+        autoLevelsInfo = self._setupInfo.autoLevels
+        self._continuousAutoLevels = autoLevelsInfo.continuous
+        self._levelsEngines = {
+            detectorName: guitools.LevelsEngine(autoLevelsInfo.mode,
+                                                lowPercentile=autoLevelsInfo.lowPercentile,
+                                                highPercentile=autoLevelsInfo.highPercentile)
+            for detectorName in detectorNames
+        }
 
         # Connect CommunicationChannel signals
         self._commChannel.sigUpdateImage.connect(self.update)
@@ -31,6 +48,9 @@ class ImageController(LiveUpdatedController):
         self._commChannel.sigMemorySnapAvailable.connect(self.memorySnapAvailable)
         self._commChannel.sigSetExposure.connect(lambda t: self.setExposure(t))
 
+        # Connect ImageWidget signals
+        self._widget.sigViewChanged.connect(self.viewChanged)
+
     def autoLevels(self, detectorNames=None, im=None):
         """ Set histogram levels automatically with current detector image."""
         if detectorNames is None:
@@ -39,11 +59,18 @@ class ImageController(LiveUpdatedController):
             )
 
         for detectorName in detectorNames:
-            if im is None:
-                im = self._widget.getImage(detectorName)
-
-            # self._widget.setImageDisplayLevels(detectorName, *guitools.bestLevels(im))
-            self._widget.setImageDisplayLevels(detectorName, *guitools.minmaxLevels(im))
+            detectorIm = im
+            if detectorIm is None:
+                detectorIm = self._displayPipelines[detectorName].frame
+                if detectorIm is None:
+                    detectorIm = self._widget.getImage(detectorName)
+
+            # Levels are computed from this image alone, without smoothing
+            levelsEngine = self._levelsEngines[detectorName]
+            levelsEngine.reset()
+            levels = levelsEngine.update(detectorIm)
+            if levels is not None:
+                self._widget.setImageDisplayLevels(detectorName, *levels)
 
     def addItemToVb(self, item):
         """ Add item from communication channel to viewbox."""
@@ -54,18 +81,58 @@ class ImageController(LiveUpdatedController):
         """ Remove item from communication channel to viewbox."""
         self._widget.removeItem(item)
 
+    @Instrumentation.timed('ImageController.update')
     def update(self, detectorName, im, init, scale, isCurrentDetector):
         """ Update new image in the viewbox. """
         if np.prod(im.shape)>1: # TODO: This seems weird!
 
             if not init:
                 self.autoLevels([detectorName], im)
+            elif self._continuousAutoLevels:
+                # Only changes the levels once the frame statistics have drifted
+                levels = self._levelsEngines[detectorName].update(im)
+                if levels is not None:
+                    self._widget.setImageDisplayLevels(detectorName, *levels)
 
-            self._widget.setImage(detectorName, im, scale)
+            self._displayPipelines[detectorName].setFrame(im)
+            self._displayScales[detectorName] = scale
+            self.showImage(detectorName)
 
             if not init or self._shouldResetView:
                 self.adjustFrame(instantResetView=True)
 
+    def viewChanged(self):
+        """ Redisplays the current frames at the resolution needed for the new
+        zoom and position of the view. """
+        for detectorName in self._displayScales.keys():
+            self.showImage(detectorName)
+
+    def showImage(self, detectorName):
+        """ Displays the current frame of the specified detector, decimated or
+        cropped to what is visible in the view. """
+        scale = self._displayScales[detectorName]
+        pixelZoom, visibleRegion = None, None
+        if len(scale) == 2:
+            zoom, center, canvasSize = self._widget.getViewport()
+            pixelZoom = zoom * min(scale)
+            visibleRegion = tuple(
+                (center[axis] + sign * canvasSize[axis] / 2 / zoom) / scale[axis]
+                for sign in [-1, 1] for axis in [0, 1]
+            )
+
+        displayImage = self._displayPipelines[detectorName].render(pixelZoom, visibleRegion)
+        if displayImage is self._displayedImages.get(detectorName):
+            return  # Already displayed, no need to upload it again
+
+        self._displayedImages[detectorName] = displayImage
+        translate = None
+        if displayImage.data.ndim == 2:
+            translate = [offset * axisScale
+                         for offset, axisScale in zip(displayImage.translate, scale)]
+        self._widget.setImage(detectorName, displayImage.data,
+                              [axisScale * displayImage.factor for axisScale in scale],
+                              translate)
+
     def adjustFrame(self, shape=None, instantResetView=False):
         """ Adjusts the viewbox to a new width and height. """
 
@@ -37,7 +37,7 @@ class LaserController(ImConWidgetController):
         self._widget.setScanDefaultPreset(self._setupInfo.defaultLaserPresetForScan)
 
         # Connect CommunicationChannel signals
-        self._commChannel.sharedAttrs.sigAttributeSet.connect(self.attrChanged)
+        self._commChannel.sharedAttrs.subscribe((_attrCategory,), self.attrChanged)
         self._commChannel.sigScanStarting.connect(lambda: self.scanChanged(True))
         self._commChannel.sigScanBuilt.connect(self.scanBuilt)
         self._commChannel.sigScanEnded.connect(lambda: self.scanChanged(False))
@@ -265,7 +265,7 @@ class LaserController(ImConWidgetController):
         defaultPreset = self._setupInfo.laserPresets[self._setupInfo.defaultLaserPresetForScan]
         defaultPreset[laserName] = guitools.LaserPresetInfo(value=laserValue)
 
-    @APIExport(runOnUIThread=True)
+    @APIExport(runOnUIThread=True, requestType='POST')
     def sendTrigger(self, triggerId: int):
         """ Sends a trigger puls through external device """
         #TODo: Very special case, try to move in seperate manager 
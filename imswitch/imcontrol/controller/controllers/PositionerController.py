@@ -28,7 +28,7 @@ class PositionerController(ImConWidgetController):
                     self.setSharedAttr(pName, axis, _positionAttr, pManager.speed)
 
         # Connect CommunicationChannel signals
-        self._commChannel.sharedAttrs.sigAttributeSet.connect(self.attrChanged)
+        self._commChannel.sharedAttrs.subscribe((_attrCategory,), self.attrChanged)
         self._commChannel.sigSetSpeed.connect(lambda speed: self.setSpeedGUI(speed))
 
         # Connect PositionerWidget signals
@@ -123,7 +123,7 @@ class PositionerController(ImConWidgetController):
         number of micrometers. """
         self._widget.setStepSize(positionerName, stepSize)
 
-    @APIExport(runOnUIThread=True)
+    @APIExport(runOnUIThread=True, requestType='POST')
     def movePositioner(self, positionerName: str, axis: str, dist: float) -> None:
         """ Moves the specified positioner axis by the specified number of
         micrometers. """
@@ -144,13 +144,13 @@ class PositionerController(ImConWidgetController):
         """ Moves the specified positioner axis to the specified position. """
         self._master.positionersManager[positionerName].setEnabled(is_enabled)
 
-    @APIExport(runOnUIThread=True)
+    @APIExport(runOnUIThread=True, requestType='POST')
     def stepPositionerUp(self, positionerName: str, axis: str) -> None:
         """ Moves the specified positioner axis in positive direction by its
         set step size. """
         self.stepUp(positionerName, axis)
 
-    @APIExport(runOnUIThread=True)
+    @APIExport(runOnUIThread=True, requestType='POST')
     def stepPositionerDown(self, positionerName: str, axis: str) -> None:
         """ Moves the specified positioner axis in negative direction by its
         set step size. """
@@ -1,11 +1,14 @@
 import os
 import time
-from typing import Optional, Union, List
+from dataclasses import asdict
+from typing import Dict, Optional, Union, List
 import numpy as np
 
 from imswitch.imcommon.framework import Timer
 from imswitch.imcommon.model import ostools, APIExport
-from imswitch.imcontrol.model import RecMode, SaveMode, SaveFormat
+from imswitch.imcontrol.model import (
+    RecMode, SaveMode, SaveFormat, WriteQueuePolicy, WriteQueueStats
+)
 from ..basecontrollers import ImConWidgetController
 from imswitch.imcommon.model import initLogger
 
@@ -27,6 +30,12 @@ class RecordingController(ImConWidgetController):
         self.endedRecording = False
         self.lapseCurrent = -1
         self.lapseTotal = 0
+        self.storerOptions = {}  # { saveFormat: options }
+        self.writeQueueOptions = makeWriteQueueOptions(
+            self._setupInfo.recording.writeQueuePolicy,
+            self._setupInfo.recording.writeQueueMaxGigabytes
+        )
+        self.writeStats = {}  # { detectorName: WriteQueueStats }
 
         self._widget.setsaveFormat(SaveFormat.HDF5.value)
         self._widget.setSnapSaveMode(SaveMode.Disk.value)
@@ -45,7 +54,8 @@ class RecordingController(ImConWidgetController):
         self._commChannel.sigScanDone.connect(self.scanDone)
         self._commChannel.sigUpdateRecFrameNum.connect(self.updateRecFrameNum)
         self._commChannel.sigUpdateRecTime.connect(self.updateRecTime)
-        self._commChannel.sharedAttrs.sigAttributeSet.connect(self.attrChanged)
+        self._commChannel.sigRecordingWriteStatsUpdated.connect(self.writeStatsUpdated)
+        self._commChannel.sharedAttrs.subscribe((_attrCategory,), self.attrChanged)
         self._commChannel.sigSnapImg.connect(self.snap)
         self._commChannel.sigSnapImgPrev.connect(self.snapImagePrev)
         self._commChannel.sigStartRecordingExternal.connect(self.startRecording)
@@ -95,12 +105,14 @@ class RecordingController(ImConWidgetController):
 
         attrs = {detectorName: self._commChannel.sharedAttrs.getHDF5Attributes()
                  for detectorName in detectorNames}
+        saveFormat = SaveFormat(self._widget.getsaveFormat())
         
         self._master.recordingManager.snap(detectorNames,
                                            savename,
                                            SaveMode(self._widget.getSnapSaveMode()),
-                                           SaveFormat(self._widget.getsaveFormat()),
-                                           attrs)
+                                           saveFormat,
+                                           attrs,
+                                           storerOptions=self.storerOptions.get(saveFormat))
         
     def snapNumpy(self):
         self.updateRecAttrs(isSnapping=True)
@@ -135,7 +147,7 @@ class RecordingController(ImConWidgetController):
 
         self._master.recordingManager.snapImagePrev(detectorName,
                                                     savename,
-                                                    SaveFormat(self._widget.getSnapSaveFormat()),
+                                                    SaveFormat(self._widget.getsaveFormat()),
                                                     image,
                                                     attrs)
 
@@ -154,17 +166,22 @@ class RecordingController(ImConWidgetController):
                 self._commChannel.sigScanStarting.emit()  # To get correct values from sharedAttrs
 
             detectorsBeingCaptured = self.getDetectorNamesToCapture()
+            saveFormat = SaveFormat(self._widget.getsaveFormat())
+            saveMode = SaveMode(self._widget.getRecSaveMode())
 
             self.recordingArgs = {
                 'detectorNames': detectorsBeingCaptured,
                 'recMode': self.recMode,
                 'savename': self.savename,
-                'saveMode': SaveMode(self._widget.getRecSaveMode()),
-                'saveFormat': SaveFormat(self._widget.getsaveFormat()),
+                'saveMode': saveMode,
+                'saveFormat': saveFormat,
+                'storerOptions': (self.storerOptions.get(saveFormat)
+                                  if saveMode != SaveMode.RAMArray else None),
                 'attrs': {detectorName: self._commChannel.sharedAttrs.getHDF5Attributes()
                           for detectorName in detectorsBeingCaptured},
                 'singleMultiDetectorFile': (len(detectorsBeingCaptured) > 1 and
-                                            self._widget.getMultiDetectorSingleFile())
+                                            self._widget.getMultiDetectorSingleFile()),
+                **self.writeQueueOptions
             }
 
             if self.recMode == RecMode.SpecFrames:
@@ -219,6 +236,7 @@ class RecordingController(ImConWidgetController):
 
     def recordingStarted(self):
         self._widget.setFieldsEnabled(False)
+        self.writeStats = {}
 
     def recordingCycleEnded(self):
         if (self._widget.isRecButtonChecked() and self.recMode == RecMode.ScanLapse and
@@ -257,6 +275,25 @@ class RecordingController(ImConWidgetController):
         if self.recMode == RecMode.SpecTime:
             self._widget.updateRecTime(recTime)
 
+    def writeStatsUpdated(self, detectorName, stats):
+        """ Warns about frames that were dropped or queued beyond the write
+        queue size limit since the last update, because they arrived faster
+        than they could be written. """
+        lastStats = self.writeStats.get(detectorName, WriteQueueStats())
+        self.writeStats[detectorName] = stats
+        if stats.droppedFrames > lastStats.droppedFrames:
+            self.__logger.warning(
+                f'Dropped {stats.droppedFrames - lastStats.droppedFrames} frames from'
+                f' {detectorName} because its write queue is full'
+                f' ({stats.droppedFrames} so far in this recording)'
+            )
+        if stats.spilledBytes > lastStats.spilledBytes:
+            self.__logger.warning(
+                f'Queued {(stats.spilledBytes - lastStats.spilledBytes) / 1024 ** 2:.1f} MB'
+                f' from {detectorName} beyond its write queue size limit'
+                f' ({stats.queuedBytes / 1024 ** 2:.1f} MB waiting to be written)'
+            )
+
     def specFrames(self):
         self._widget.checkSpecFrames()
         self._widget.setEnabledParams(specFrames=True)
@@ -341,29 +378,35 @@ class RecordingController(ImConWidgetController):
             self._widget.setTimelapseFreq(value)
 
     def setSharedAttr(self, attr, value):
+        settingAttr = self.settingAttr
         self.settingAttr = True
         try:
             self._commChannel.sharedAttrs[(_attrCategory, attr)] = value
         finally:
-            self.settingAttr = False
+            self.settingAttr = settingAttr
 
     def updateRecAttrs(self, *, isSnapping):
-        self.setSharedAttr(_framesAttr, 'null')
-        self.setSharedAttr(_timeAttr, 'null')
-        self.setSharedAttr(_lapseTimeAttr, 'null')
-        self.setSharedAttr(_freqAttr, 'null')
-
-        if isSnapping:
-            self.setSharedAttr(_recModeAttr, 'Snap')
-        else:
-            self.setSharedAttr(_recModeAttr, self.recMode.name)
-            if self.recMode == RecMode.SpecFrames:
-                self.setSharedAttr(_framesAttr, self._widget.getNumExpositions())
-            elif self.recMode == RecMode.SpecTime:
-                self.setSharedAttr(_timeAttr, self._widget.getTimeToRec())
-            elif self.recMode == RecMode.ScanLapse:
-                self.setSharedAttr(_lapseTimeAttr, self._widget.getTimelapseTime())
-                self.setSharedAttr(_freqAttr, self._widget.getTimelapseFreq())
+        self.settingAttr = True
+        try:
+            with self._commChannel.sharedAttrs.batch():
+                self.setSharedAttr(_framesAttr, 'null')
+                self.setSharedAttr(_timeAttr, 'null')
+                self.setSharedAttr(_lapseTimeAttr, 'null')
+                self.setSharedAttr(_freqAttr, 'null')
+
+                if isSnapping:
+                    self.setSharedAttr(_recModeAttr, 'Snap')
+                else:
+                    self.setSharedAttr(_recModeAttr, self.recMode.name)
+                    if self.recMode == RecMode.SpecFrames:
+                        self.setSharedAttr(_framesAttr, self._widget.getNumExpositions())
+                    elif self.recMode == RecMode.SpecTime:
+                        self.setSharedAttr(_timeAttr, self._widget.getTimeToRec())
+                    elif self.recMode == RecMode.ScanLapse:
+                        self.setSharedAttr(_lapseTimeAttr, self._widget.getTimelapseTime())
+                        self.setSharedAttr(_freqAttr, self._widget.getTimelapseFreq())
+        finally:
+            self.settingAttr = False
 
     def sendScanFreq(self):
         freq = self.getTimelapseFreq()
@@ -372,7 +415,7 @@ class RecordingController(ImConWidgetController):
     def getTimelapseFreq(self):
         return self._widget.getTimelapseFreq()
 
-    @APIExport(runOnUIThread=True)
+    @APIExport(runOnUIThread=True, requestType='POST')
     def snapImage(self, output: bool = False) -> Optional[np.ndarray]:
         """ Take a snap and save it to a .tiff file at the set file path. """
         if output:
@@ -380,7 +423,7 @@ class RecordingController(ImConWidgetController):
         else:
             self.snap()
 
-    @APIExport(runOnUIThread=True)
+    @APIExport(runOnUIThread=True, requestType='POST')
     def startRecording(self) -> None:
         """ Starts recording with the set settings to the set file path. """
         self._widget.setRecButtonChecked(True)
@@ -453,6 +496,67 @@ class RecordingController(ImConWidgetController):
         """ Sets the folder to save recordings into. """
         self._widget.setRecFolder(folderPath)
 
+    @APIExport(runOnUIThread=True, requestType='POST')
+    def setZarrOptions(self, chunkFrames: int = 1, chunkHeight: int = 512, chunkWidth: int = 512,
+                       keepDtype: bool = True, compressor: Optional[str] = 'blosc-lz4',
+                       compressionLevel: int = 5, bitshuffle: bool = False,
+                       nestedDirectories: bool = False, numEncodeThreads: int = 1) -> None:
+        """ Sets how snaps and recordings are stored in the Zarr format:
+        the number of frames and the height and width in pixels of each chunk,
+        whether to keep the data type of the detector images (otherwise, they
+        are stored as 16-bit signed integers), the compressor ('blosc-lz4',
+        'blosc-zstd', 'zstd' or None), the compression level, whether Blosc
+        should shuffle bits instead of bytes, whether to store the chunks in
+        nested directories and the number of threads to compress with. """
+        self.storerOptions[SaveFormat.ZARR] = {
+            'chunkFrames': chunkFrames,
+            'chunkShape': (chunkHeight, chunkWidth),
+            'dtype': None if keepDtype else 'i2',
+            'compressor': compressor,
+            'compressionLevel': compressionLevel,
+            'bitshuffle': bitshuffle,
+            'nestedDirectories': nestedDirectories,
+            'numEncodeThreads': numEncodeThreads
+        }
+
+    @APIExport(runOnUIThread=True, requestType='POST')
+    def setTiffOptions(self, ome: bool = False, maxFramesPerFile: Optional[int] = None,
+                       maxGigabytesPerFile: Optional[float] = None) -> None:
+        """ Sets how recordings are stored in the TIFF format: whether to
+        write OME-XML metadata, and after how many frames or gigabytes a
+        recording continues in a new file (None for no limit). """
+        self.storerOptions[SaveFormat.TIFF] = {
+            'ome': ome,
+            'maxFramesPerFile': maxFramesPerFile,
+            'maxBytesPerFile': (int(maxGigabytesPerFile * 1024 ** 3)
+                                if maxGigabytesPerFile is not None else None)
+        }
+
+    @APIExport(runOnUIThread=True, requestType='POST')
+    def setWriteQueueOptions(self, policy: str = 'Block', maxGigabytes: float = 1) -> None:
+        """ Sets what happens to new frames when a detector's write queue is
+        full during a recording ('Block' to wait for room, 'DropOldest' to
+        discard the oldest queued frames or 'SpillToRAM' to keep queuing
+        beyond the limit), and how many gigabytes may wait to be written per
+        detector. Applies to recordings started afterwards. """
+        self.writeQueueOptions = makeWriteQueueOptions(policy, maxGigabytes)
+
+    @APIExport(runOnUIThread=True)
+    def getWriteStats(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        """ Returns the write queue statistics of each detector in the current
+        or last recording, such as the number of frames written and dropped
+        so far. """
+        return {detectorName: asdict(stats) for detectorName, stats in self.writeStats.items()}
+
+
+def makeWriteQueueOptions(policy, maxGigabytes):
+    """ Returns the write queue arguments of RecordingManager.startRecording
+    for the given policy name (see WriteQueuePolicy) and size limit. """
+    if policy not in WriteQueuePolicy.__members__:
+        raise ValueError(f'Unsupported write queue policy "{policy}"')
+    return {'writeQueuePolicy': WriteQueuePolicy[policy],
+            'writeQueueMaxBytes': int(maxGigabytes * 1024 ** 3)}
+
 
 _attrCategory = 'Rec'
 _recModeAttr = 'Mode'
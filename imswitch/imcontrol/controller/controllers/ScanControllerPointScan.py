@@ -19,6 +19,8 @@ class ScanControllerPointScan(SuperScanController):
         self.updateScanStageAttrs()
         self.updateScanTTLAttrs()
 
+        self._master.nidaqManager.sigScanRepetitionDone.connect(self.scanRepetitionDone)
+
     def setParameters(self):
         self.settingParameters = True
         try:
@@ -79,8 +81,10 @@ class ScanControllerPointScan(SuperScanController):
                     position = self._analogParameterDict['axis_centerpos'][index]
                     self._master.positionersManager[positionerName].setPosition(position, 0)
                     #self._logger.debug(f'Set {positionerName} center to {position} before scan')
-            # run scan
-            self._master.nidaqManager.runScan(self.signalDict, self.scanInfoDict)
+            # run scan, repeated scans are run as one output stream until repeat is unchecked
+            repetitions = None if self._widget.repeatEnabled() else 1
+            self._master.nidaqManager.runScan(self.signalDict, self.scanInfoDict,
+                                              repetitions=repetitions)
         except Exception:
             self._logger.error(traceback.format_exc())
             self.isRunning = False
@@ -104,6 +108,10 @@ class ScanControllerPointScan(SuperScanController):
         else:
             self.runScanAdvanced(sigScanStartingEmitted=True)
 
+    def scanRepetitionDone(self, repetition):
+        if self.isRunning and not self._widget.repeatEnabled():
+            self._master.nidaqManager.stopScan()
+
     def getParameters(self):
         if self.settingParameters:
             return
@@ -67,7 +67,7 @@ class SettingsController(ImConWidgetController):
 
         # Connect CommunicationChannel signals
         self._commChannel.sigDetectorSwitched.connect(self.detectorSwitched)
-        self._commChannel.sharedAttrs.sigAttributeSet.connect(self.attrChanged)
+        self._commChannel.sharedAttrs.subscribe((_attrCategory,), self.attrChanged)
 
         # Connect SettingsWidget signals
         self._widget.sigROIChanged.connect(self.ROIchanged)
@@ -447,6 +447,7 @@ class SettingsController(ImConWidgetController):
                 self.setDetectorParameter(detectorName, key[3], value)
 
     def setSharedAttr(self, detectorName, attr, value, *, isDetectorParameter=False):
+        settingAttr = self.settingAttr
         self.settingAttr = True
         try:
             if not isDetectorParameter:
@@ -455,17 +456,23 @@ class SettingsController(ImConWidgetController):
                 key = (_attrCategory, detectorName, _detectorParameterSubCategory, attr)
             self._commChannel.sharedAttrs[key] = value
         finally:
-            self.settingAttr = False
+            self.settingAttr = settingAttr
 
     def updateSharedAttrs(self):
-        for dName, dManager in self._master.detectorsManager:
-            self.setSharedAttr(dName, _modelAttr, dManager.model)
-            self.setSharedAttr(dName, _pixelSizeAttr, dManager.pixelSizeUm)
-            self.setSharedAttr(dName, _binningAttr, dManager.binning)
-            self.setSharedAttr(dName, _ROIAttr, [*dManager.frameStart, *dManager.shape])
-
-            for parameterName, parameter in dManager.parameters.items():
-                self.setSharedAttr(dName, parameterName, parameter.value, isDetectorParameter=True)
+        self.settingAttr = True
+        try:
+            with self._commChannel.sharedAttrs.batch():
+                for dName, dManager in self._master.detectorsManager:
+                    self.setSharedAttr(dName, _modelAttr, dManager.model)
+                    self.setSharedAttr(dName, _pixelSizeAttr, dManager.pixelSizeUm)
+                    self.setSharedAttr(dName, _binningAttr, dManager.binning)
+                    self.setSharedAttr(dName, _ROIAttr, [*dManager.frameStart, *dManager.shape])
+
+                    for parameterName, parameter in dManager.parameters.items():
+                        self.setSharedAttr(dName, parameterName, parameter.value,
+                                           isDetectorParameter=True)
+        finally:
+            self.settingAttr = False
 
     @APIExport()
     def getDetectorNames(self) -> List[str]:
@@ -1,18 +1,25 @@
+import asyncio
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import Pyro5
 import Pyro5.server
-from imswitch.imcommon.framework import Worker
+from imswitch.imcommon.framework import Instrumentation, Worker
 from imswitch.imcommon.model import initLogger
-from ._serialize import register_serializers
-from fastapi import FastAPI
+from ._serialize import register_serializers, SerNDArray
+from ._stream import encodeFrame, FrameStreamHub, FrameStreamOptions
+from fastapi import Body, FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
 import uvicorn
-from functools import wraps
+from functools import partial, wraps
 
 app = FastAPI()
 
 
 class ImSwitchServer(Worker):
 
-    def __init__(self, api, setupInfo):
+    def __init__(self, api, setupInfo, commChannel=None):
         super().__init__()
 
         self.__logger = initLogger(self, tryInheritParent=True)
@@ -20,7 +27,20 @@ class ImSwitchServer(Worker):
         self._name = setupInfo.pyroServerInfo.name
         self._host = setupInfo.pyroServerInfo.host
         self._port = setupInfo.pyroServerInfo.port
+        self._apiTimeout = setupInfo.pyroServerInfo.apiTimeout
+        self._apiMaxConcurrency = setupInfo.pyroServerInfo.apiMaxConcurrency
+
+        # Blocking API calls are executed here, so that they don't hold up the event loop
+        self._executor = ThreadPoolExecutor(max_workers=setupInfo.pyroServerInfo.apiWorkers,
+                                            thread_name_prefix='ImSwitchAPI')
 
+        # Live view frames are streamed to clients of /stream/frames
+        self._commChannel = commChannel
+        self._frameStreamHub = FrameStreamHub()
+        if commChannel is not None:
+            commChannel.sigUpdateImage.connect(self._frameStreamHub.newFrame)
+
+        self._daemon = None
         self._paused = False
         self._canceled = False
 
@@ -33,11 +53,11 @@ class ImSwitchServer(Worker):
 
             register_serializers()
 
+            self._daemon = _Daemon(host=self._host, port=self._port)
             Pyro5.server.serve(
                 {self: self._name},
                 use_ns=False,
-                host=self._host,
-                port=self._port,
+                daemon=self._daemon,
             )
 
         except:
@@ -45,7 +65,11 @@ class ImSwitchServer(Worker):
         self.__logger.debug("Loop Finished")
 
     def stop(self):
-        self._daemon.shutdown()
+        if self._commChannel is not None:
+            self._commChannel.sigUpdateImage.disconnect(self._frameStreamHub.newFrame)
+        if self._daemon is not None:
+            self._daemon.shutdown()
+        self._executor.shutdown(wait=False)
 
     @app.get("/")
     def createAPI(self):
@@ -53,11 +77,13 @@ class ImSwitchServer(Worker):
         functions = api_dict.keys()
 
         def includeAPI(str, func):
-            @app.get(str)
-            @wraps(func)
-            async def wrapper(*args, **kwargs):
-                return func(*args, **kwargs)
-            return wrapper
+            requestType = getattr(func, '_APIRequestType', 'GET')
+            app.add_api_route(str, self._makeEndpoint(func, requestType), methods=[requestType])
+            if requestType != 'GET':
+                # Functions used to be bound to GET only, keep that working for existing clients
+                app.add_api_route(str, self._makeEndpoint(func, 'GET'), methods=['GET'],
+                                  deprecated=True)
+            return func
 
         def includePyro(func):
             @Pyro5.server.expose
@@ -73,6 +99,125 @@ class ImSwitchServer(Worker):
                 module = func.__module__.split('.')[-1]
             self.func = includePyro(includeAPI("/"+module+"/"+f, func))
 
+        if self._commChannel is not None:
+            app.add_api_websocket_route('/stream/frames', self.streamFrames)
+
+        app.add_api_route('/metrics', self.metrics, response_class=PlainTextResponse)
+
+    def metrics(self):
+        """ Returns the performance metrics in the Prometheus text format. """
+        return PlainTextResponse(Instrumentation.formatPrometheus(),
+                                 media_type='text/plain; version=0.0.4')
+
+    async def streamFrames(self, websocket: WebSocket):
+        """ Streams live view frames to a WebSocket client as binary messages,
+        each with a header describing the frame (see decodeFrameMessage). The
+        frames can be cropped, downsampled and encoded through the query
+        parameters detector, roi (x,y,width,height), downsample, encoding
+        (raw, lz4, png or jpeg), quality and maxFps. Frames that arrive while
+        the previous one is still being sent are skipped. """
+
+        try:
+            options = FrameStreamOptions.fromQuery(websocket.query_params)
+        except (KeyError, ValueError) as e:
+            await websocket.close(code=1008, reason=str(e))
+            return
+
+        await websocket.accept()
+        client = self._frameStreamHub.connect(options)
+        loop = asyncio.get_running_loop()
+        try:
+            lastSendTime = None
+            while True:
+                frame = await client.next()
+                if options.maxFps is not None and lastSendTime is not None:
+                    delay = lastSendTime + 1 / options.maxFps - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                        frame = client.takeNewer(frame)
+                lastSendTime = time.monotonic()
+
+                # Encoding can take a while for large frames, so don't do it on the event loop
+                message = await loop.run_in_executor(self._executor, encodeFrame, frame, options,
+                                                     client.droppedFrames)
+                await websocket.send_bytes(message)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self._frameStreamHub.disconnect(client)
+
+    def _makeEndpoint(self, func, requestType):
+        """ Returns a request handler that calls func without blocking the
+        event loop; on the UI thread if func is to be run there, otherwise in
+        the executor. Calls that take longer than the timeout of func are
+        answered with status 504, and exceptions raised by func with status
+        500. """
+
+        timeout = getattr(func, '_APITimeout', None) or self._apiTimeout
+        call = self._makeLimitedCall(func)
+
+        @wraps(func)
+        async def endpoint(**kwargs):
+            try:
+                return await asyncio.wait_for(call(kwargs), timeout)
+            except asyncio.TimeoutError:
+                raise HTTPException(status_code=504,
+                                    detail=f'{func.__name__} did not finish within {timeout} s')
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f'{type(e).__name__}: {e}')
+
+        endpoint.__signature__ = _getEndpointSignature(func, requestType)
+        return endpoint
+
+    def _makeLimitedCall(self, func):
+        """ Returns a coroutine function that calls func with the given
+        keyword arguments, with no more calls running at the same time than
+        the concurrency limit of func allows. """
+
+        maxConcurrency = getattr(func, '_APIMaxConcurrency', None) or self._apiMaxConcurrency
+        semaphore = None  # Created on first use, so that it belongs to the server's event loop
+
+        async def call(kwargs):
+            if hasattr(func, 'callAsync'):
+                return await asyncio.wrap_future(func.callAsync(**kwargs))
+            else:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, partial(func, **kwargs))
+
+        async def callLimited(kwargs):
+            nonlocal semaphore
+            if maxConcurrency is None:
+                return await call(kwargs)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(maxConcurrency)
+            async with semaphore:
+                return await call(kwargs)
+
+        return callLimited
+
+
+def _getEndpointSignature(func, requestType):
+    """ Returns the signature of the request handler for func. """
+    signature = inspect.signature(func)
+    if requestType != 'GET':
+        # Take the arguments from a JSON object in the request body
+        signature = signature.replace(parameters=[
+            param.replace(default=Body(
+                ... if param.default is inspect.Parameter.empty else param.default,
+                embed=True
+            ))
+            for param in signature.parameters.values()
+        ])
+    return signature
+
+
+class _Daemon(Pyro5.server.Daemon):
+    """ Pyro daemon that frees the shared-memory ring used to send arrays to a
+    client when the client disconnects. """
+
+    def clientDisconnect(self, conn):
+        SerNDArray.release_client(conn)
+
 
 # Copyright (C) 2020-2022 ImSwitch developers
 # This file is part of ImSwitch.
@@ -1 +1,2 @@
 from .ImSwitchServer import ImSwitchServer
+from ._stream import decodeFrameMessage, FrameStreamOptions
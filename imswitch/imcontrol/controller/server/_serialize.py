@@ -1,11 +1,13 @@
 import atexit
+import threading
 from abc import ABC, abstractmethod
 from multiprocessing.shared_memory import SharedMemory
-from typing import Deque, Generic, TypeVar
+from typing import Any, Dict, Generic, Optional, Tuple, TypeVar
 
 import numpy as np
 import Pyro5
 import Pyro5.api
+from Pyro5.callcontext import current_context
 
 T = TypeVar("T")
 
@@ -45,37 +47,237 @@ class Serializer(ABC, Generic[T]):
         return f"{cls.type_().__module__}.{cls.type_().__name__}"
 
 
+class ShmRing:
+    """A named shared-memory block divided into a fixed number of equally sized
+    slots that arrays are written to in turn. Each slot is preceded by a header
+    holding the sequence number of the array currently in it (0 if empty, -1
+    while being written), so that a reader can tell whether the slot still holds
+    the array it was told about, or whether it has already been reused."""
+
+    def __init__(self, num_slots: int, slot_size: int, name: Optional[str] = None):
+        self.num_slots = num_slots
+        self.slot_size = slot_size
+        self._data_offset = _align(num_slots * _HEADER_ITEMSIZE)
+        self._owner = name is None
+        if self._owner:
+            self.shm = SharedMemory(create=True, size=self._data_offset + num_slots * slot_size)
+        else:
+            self.shm = SharedMemory(name=name, create=False)
+        self._headers = np.ndarray((num_slots,), dtype=np.int64, buffer=self.shm.buf)
+        if self._owner:
+            self._headers[:] = 0
+        self._next_seq = 1
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def next_slot(self) -> int:
+        """The slot that the next array will be written to."""
+        with self._lock:
+            return self._next_seq % self.num_slots
+
+    def write(self, obj: np.ndarray) -> Tuple[int, int]:
+        """Copy ``obj`` into the next slot, returning ``(slot, seq)``."""
+        if obj.nbytes > self.slot_size:
+            raise ValueError(f"Array of {obj.nbytes} bytes does not fit in a"
+                             f" {self.slot_size} byte slot")
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+        slot = seq % self.num_slots
+        self._headers[slot] = -1
+        self.view(slot, obj.shape, obj.dtype)[...] = obj
+        self._headers[slot] = seq
+        return slot, seq
+
+    def view(self, slot: int, shape, dtype) -> np.ndarray:
+        """Return an array backed directly by the memory of ``slot``."""
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf,
+                          offset=self._data_offset + slot * self.slot_size)
+
+    def holds(self, slot: int, seq: int) -> bool:
+        """Whether ``slot`` (still) holds the array with sequence number ``seq``."""
+        return int(self._headers[slot]) == seq
+
+    def close(self):
+        # arrays handed out as zero-copy views keep the buffer exported
+        del self._headers
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+        if self._owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class SlotOverwrittenError(RuntimeError):
+    """Raised when a received array has been overwritten in its ring slot
+    before it could be read, i.e. the client is more than ``NUM_SLOTS`` arrays
+    behind the server."""
+    pass
+
+
+class _SendingRings:
+    """The ring that arrays are sent to a Pyro client through, and the rings it
+    has replaced that are still referenced by the message being serialized.
+    A slot that holds an array of the current message is never reused, and a
+    replaced ring is only freed once the client has sent its next request,
+    i.e. when it has read the previous reply."""
+
+    def __init__(self):
+        self.ring: Optional[ShmRing] = None
+        self.message = None
+        self.message_slots = set()  # slots of ring that hold arrays of the current message
+        self.retired = []
+
+    def start_message(self, message):
+        for ring in self.retired:
+            ring.close()
+        self.retired = []
+        self.message = message
+        self.message_slots = set()
+
+    def replace(self, ring: ShmRing):
+        if self.ring is not None:
+            if self.message_slots:
+                self.retired.append(self.ring)
+            else:
+                self.ring.close()
+        self.ring = ring
+        self.message_slots = set()
+
+    def close(self):
+        self.start_message(None)
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+
 class SerNDArray(Serializer[np.ndarray]):
-    SHM_SENT: Deque[SharedMemory] = Deque(maxlen=15)
+    """Passes arrays through a shared-memory ring rather than through the Pyro
+    connection. The sending side allocates one ring per Pyro client the first
+    time it sends an array to it (and reallocates it if an array does not fit
+    in its slots); only the ring name and geometry, slot index, sequence number,
+    shape and dtype are sent over msgpack. Slots are not reused within a
+    single reply, so arrays beyond the first ``NUM_SLOTS`` of a reply are sent
+    inline instead. The receiving side attaches to the ring once and copies
+    the array out of its slot, or, if ``ZERO_COPY`` is set, returns a read-only
+    view of the slot. Such a view is only valid until the server has sent
+    ``NUM_SLOTS`` more arrays to the same client."""
+
+    NUM_SLOTS: int = 8
+    ZERO_COPY: bool = False
+
+    SENDING_RINGS: Dict[Any, _SendingRings] = {}  # keyed by Pyro client connection
+    RECEIVING_RINGS: Dict[str, ShmRing] = {}  # keyed by shared-memory name
+    _rings_lock = threading.Lock()
 
     def to_dict(self, obj: np.ndarray):
-        shm = SharedMemory(create=True, size=obj.nbytes)
-        SerNDArray.SHM_SENT.append(shm)
-        b: np.ndarray = np.ndarray(obj.shape, dtype=obj.dtype, buffer=shm.buf)
-        b[:] = obj[:]
+        obj = np.asarray(obj)
+        if obj.dtype.hasobject or obj.nbytes < 1:
+            return _to_inline_dict(obj)
+
+        client = current_context.client
+        # Arrays serialized outside of a Pyro call are not part of a message
+        message = current_context.seq if client is not None else None
+        ring = SerNDArray.get_sending_ring(client, obj.nbytes, message)
+        if ring is None:
+            return _to_inline_dict(obj)
+
+        slot, seq = ring.write(obj)
         return {
-            "shm": shm.name,
+            "shm": ring.name,
+            "num_slots": ring.num_slots,
+            "slot_size": ring.slot_size,
+            "slot": slot,
+            "seq": seq,
             "shape": obj.shape,
             "dtype": str(obj.dtype),
         }
 
     def from_dict(self, classname: str, d: dict):
-        """convert dict from `ndarray_to_dict` back to np.ndarray"""
-        shm = SharedMemory(name=d["shm"], create=False)
-        array = np.ndarray(d["shape"], dtype=d["dtype"], buffer=shm.buf).copy()
-        shm.close()
-        shm.unlink()
+        """convert dict from `to_dict` back to np.ndarray"""
+        if "shm" not in d:
+            return np.array(d["data"], dtype=d["dtype"]).reshape(d["shape"])
+
+        ring = SerNDArray.get_receiving_ring(d["shm"], d["num_slots"], d["slot_size"])
+        slot, seq = d["slot"], d["seq"]
+        view = ring.view(slot, d["shape"], d["dtype"])
+        if SerNDArray.ZERO_COPY:
+            view.flags.writeable = False
+            array = view
+        else:
+            array = view.copy()
+        if not ring.holds(slot, seq):
+            raise SlotOverwrittenError(
+                f"Array {seq} was overwritten in slot {slot} of {d['shm']} before it was read"
+            )
         return array
 
+    @classmethod
+    def get_sending_ring(cls, client, nbytes: int, message=None) -> Optional[ShmRing]:
+        """Return the ring to write an array of ``nbytes`` to for a Pyro client,
+        or None if all its slots already hold arrays of ``message``, the
+        sequence number of the reply being serialized."""
+        with cls._rings_lock:
+            sending = cls.SENDING_RINGS.get(client)
+            if sending is None:
+                sending = cls.SENDING_RINGS[client] = _SendingRings()
+            if message is None or message != sending.message:
+                # the client has read the previous reply before sending this request
+                sending.start_message(message)
+
+            if sending.ring is None or sending.ring.slot_size < nbytes:
+                slot_size = _align(max(nbytes, _MIN_SLOT_SIZE), _MIN_SLOT_SIZE)
+                sending.replace(ShmRing(cls.NUM_SLOTS, slot_size))
+
+            slot = sending.ring.next_slot()
+            if slot in sending.message_slots:
+                return None
+            if message is not None:
+                sending.message_slots.add(slot)
+            return sending.ring
+
+    @classmethod
+    def get_receiving_ring(cls, name: str, num_slots: int, slot_size: int) -> ShmRing:
+        with cls._rings_lock:
+            ring = cls.RECEIVING_RINGS.get(name)
+            if ring is None:
+                # rings are replaced when the server reallocates them, so older
+                # ones from the same server are no longer needed
+                while len(cls.RECEIVING_RINGS) >= _MAX_RECEIVING_RINGS:
+                    cls.RECEIVING_RINGS.pop(next(iter(cls.RECEIVING_RINGS))).close()
+                ring = cls.RECEIVING_RINGS[name] = ShmRing(num_slots, slot_size, name=name)
+            return ring
+
+    @classmethod
+    def release_client(cls, client):
+        """Free the rings allocated for a Pyro client, e.g. when it disconnects."""
+        with cls._rings_lock:
+            sending = cls.SENDING_RINGS.pop(client, None)
+        if sending is not None:
+            sending.close()
+
 
 @atexit.register  # pragma: no cover
 def _cleanup():
-    for shm in SerNDArray.SHM_SENT:
-        shm.close()
-        try:
-            shm.unlink()
-        except FileNotFoundError:
-            pass
+    for rings in (SerNDArray.SENDING_RINGS, SerNDArray.RECEIVING_RINGS):
+        for ring in rings.values():
+            ring.close()
+        rings.clear()
+
+
+def _to_inline_dict(obj: np.ndarray) -> dict:
+    return {"data": obj.tolist(), "shape": obj.shape, "dtype": str(obj.dtype)}
+
+
+def _align(nbytes: int, alignment: int = 64) -> int:
+    return -(-nbytes // alignment) * alignment
 
 
 def remove_shm_from_resource_tracker():
@@ -109,6 +311,11 @@ def register_serializers():
             i.register()
 
 
+_HEADER_ITEMSIZE = np.dtype(np.int64).itemsize
+_MIN_SLOT_SIZE = 1024 * 1024
+_MAX_RECEIVING_RINGS = 4
+
+
 # BSD 3-Clause License
 #
 # Copyright (c) 2021, Talley Lambert
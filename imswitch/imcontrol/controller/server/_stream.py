@@ -0,0 +1,275 @@
+import asyncio
+import importlib.util
+import io
+import json
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class FrameStreamOptions:
+    """ What a frame stream client wants to receive. """
+
+    detectorName: Optional[str] = None
+    """ Detector to stream frames from. None means the current detector. """
+
+    downsample: int = 1
+    """ Only every n-th pixel along each axis is sent. """
+
+    roi: Optional[Tuple[int, int, int, int]] = None
+    """ Part of the frame to send, as ``(x, y, width, height)``, before
+    downsampling. None means the whole frame. """
+
+    encoding: str = 'raw'
+    """ ``'raw'``, ``'lz4'``, ``'png'`` or ``'jpeg'``. ``'lz4'`` requires
+    the optional lz4 package. """
+
+    quality: int = 85
+    """ JPEG quality. """
+
+    maxFps: Optional[float] = None
+    """ Maximum number of frames sent per second. None means as many as the
+    client can take. """
+
+    def __post_init__(self):
+        if self.encoding not in _encodings:
+            raise ValueError(f'Unsupported encoding "{self.encoding}"')
+        if not isEncodingAvailable(self.encoding):
+            raise ValueError(f'Encoding "{self.encoding}" requires the'
+                             f' {_encodingPackages[self.encoding]} package to be installed')
+        if self.downsample < 1:
+            raise ValueError('downsample must be at least 1')
+        if self.roi is not None and (len(self.roi) != 4 or min(self.roi[2:]) < 1):
+            raise ValueError('roi must be given as x,y,width,height')
+        if self.maxFps is not None and self.maxFps <= 0:
+            raise ValueError('maxFps must be positive')
+
+    @classmethod
+    def fromQuery(cls, params: Mapping[str, str]) -> 'FrameStreamOptions':
+        """ Parses options from request query parameters. Raises ValueError if
+        they are invalid. """
+        return cls(
+            detectorName=params.get('detector'),
+            downsample=int(params.get('downsample', 1)),
+            roi=(tuple(int(value) for value in params['roi'].split(','))
+                 if params.get('roi') else None),
+            encoding=params.get('encoding', 'raw'),
+            quality=int(params.get('quality', 85)),
+            maxFps=float(params['maxFps']) if params.get('maxFps') else None
+        )
+
+
+@dataclass(frozen=True)
+class StreamFrame:
+    detectorName: str
+    image: np.ndarray
+    scale: List[float]
+    timestamp: float
+    frameNumber: int
+    isCurrentDetector: bool
+
+
+class FrameStreamHub:
+    """ Passes the live view frames of sigUpdateImage on to the connected
+    stream clients. Receiving a frame only hands a reference to each client;
+    clients that are still busy with a previous frame have it replaced, so
+    slow clients skip frames instead of holding up the acquisition or other
+    clients. """
+
+    def __init__(self):
+        self._clients: Set[FrameStreamClient] = set()
+        self._latestFrames: Dict[str, StreamFrame] = {}
+        self._frameNumbers: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def clientCount(self) -> int:
+        return len(self._clients)
+
+    def newFrame(self, detectorName, image, init, scale, isCurrentDetector):
+        """ Slot for sigUpdateImage. """
+        with self._lock:
+            frameNumber = self._frameNumbers.get(detectorName, 0)
+            self._frameNumbers[detectorName] = frameNumber + 1
+            frame = StreamFrame(detectorName, image, scale, time.time(), frameNumber,
+                                isCurrentDetector)
+            self._latestFrames[detectorName] = frame
+            clients = list(self._clients)
+
+        for client in clients:
+            client.offer(frame)
+
+    def connect(self, options: FrameStreamOptions) -> 'FrameStreamClient':
+        """ Registers a client. Must be called from the event loop that the
+        client will be served from. The client is handed the latest frame
+        right away, if there is one. """
+        client = FrameStreamClient(options, asyncio.get_running_loop())
+        with self._lock:
+            self._clients.add(client)
+            latestFrames = list(self._latestFrames.values())
+        for frame in latestFrames:
+            client.offer(frame)
+        return client
+
+    def disconnect(self, client: 'FrameStreamClient') -> None:
+        with self._lock:
+            self._clients.discard(client)
+
+
+class FrameStreamClient:
+    """ Holds the next frame to send to a client. """
+
+    def __init__(self, options: FrameStreamOptions, loop: asyncio.AbstractEventLoop):
+        self.options = options
+        self.droppedFrames = 0
+        self._loop = loop
+        self._pending = None
+        self._frameAvailable = asyncio.Event()
+        self._lock = threading.Lock()
+
+    def offer(self, frame: StreamFrame) -> None:
+        """ Makes frame the next one to send, replacing any that has not been
+        sent yet. May be called from any thread. """
+        if self.options.detectorName is not None:
+            if frame.detectorName != self.options.detectorName:
+                return
+        elif not frame.isCurrentDetector:
+            return
+
+        with self._lock:
+            if self._pending is not None:
+                self.droppedFrames += 1
+            self._pending = frame
+        self._loop.call_soon_threadsafe(self._frameAvailable.set)
+
+    async def next(self) -> StreamFrame:
+        """ Waits for and returns the next frame to send. """
+        while True:
+            await self._frameAvailable.wait()
+            self._frameAvailable.clear()
+            with self._lock:
+                frame, self._pending = self._pending, None
+            if frame is not None:
+                return frame
+
+    def takeNewer(self, frame: StreamFrame) -> StreamFrame:
+        """ Returns the frame that has arrived since frame was taken, if any,
+        and otherwise frame itself. """
+        with self._lock:
+            if self._pending is None:
+                return frame
+            newer, self._pending = self._pending, None
+            self.droppedFrames += 1
+        return newer
+
+
+def isEncodingAvailable(encoding: str) -> bool:
+    """ Returns whether the packages that the specified encoding requires are
+    installed. """
+    package = _encodingPackages.get(encoding)
+    return package is None or importlib.util.find_spec(package) is not None
+
+
+def encodeFrame(frame: StreamFrame, options: FrameStreamOptions, droppedFrames: int = 0) -> bytes:
+    """ Crops, downsamples and encodes a frame according to options, and
+    returns it as a message with a header (see decodeFrameMessage).
+    droppedFrames is the number of frames that the client has skipped so
+    far. """
+    image = frame.image
+    if options.roi is not None:
+        x, y, width, height = options.roi
+        image = image[y:y + height, x:x + width]
+    if options.downsample > 1:
+        image = image[::options.downsample, ::options.downsample]
+
+    if options.encoding in ['raw', 'lz4']:
+        payload = np.ascontiguousarray(image).tobytes()
+        if options.encoding == 'lz4':
+            import lz4.frame
+            payload = lz4.frame.compress(payload)
+    else:
+        payload = _encodeImageFile(image, options)
+
+    header = {
+        'detector': frame.detectorName,
+        'frameNumber': frame.frameNumber,
+        'timestamp': frame.timestamp,
+        'shape': image.shape,
+        'dtype': str(image.dtype),
+        'encoding': options.encoding,
+        'scale': [scale * options.downsample for scale in frame.scale],
+        'offset': options.roi[:2] if options.roi is not None else (0, 0),
+        'droppedFrames': droppedFrames
+    }
+    return packFrameMessage(header, payload)
+
+
+def packFrameMessage(header: Dict[str, Any], payload: bytes) -> bytes:
+    """ Returns a message consisting of the length of the JSON-encoded header
+    as a 32-bit little-endian integer, the header and the payload. """
+    headerBytes = json.dumps(header).encode('utf-8')
+    return struct.pack('<I', len(headerBytes)) + headerBytes + payload
+
+
+def decodeFrameMessage(message: bytes) -> Tuple[Dict[str, Any], np.ndarray]:
+    """ Returns the header and image of a message sent by the frame stream.
+    PNG and JPEG images are decoded as stored, i.e. possibly scaled to 8-bit
+    integers. """
+    headerLength, = struct.unpack_from('<I', message)
+    header = json.loads(message[4:4 + headerLength].decode('utf-8'))
+    payload = message[4 + headerLength:]
+
+    encoding = header['encoding']
+    if encoding in ['raw', 'lz4']:
+        if encoding == 'lz4':
+            import lz4.frame
+            payload = lz4.frame.decompress(payload)
+        image = np.frombuffer(payload, dtype=header['dtype']).reshape(header['shape'])
+    else:
+        from PIL import Image
+        image = np.asarray(Image.open(io.BytesIO(payload)))
+    return header, image
+
+
+def _encodeImageFile(image, options):
+    from PIL import Image
+
+    supportedTypes = [np.uint8] if options.encoding == 'jpeg' else [np.uint8, np.uint16]
+    if image.dtype not in supportedTypes:
+        # Scale to 8 bits, from the minimum to the maximum of the image
+        image = image.astype(np.float32)
+        low, high = float(image.min()), float(image.max())
+        image = ((image - low) * (255 / max(high - low, 1e-12))).astype(np.uint8)
+
+    buffer = io.BytesIO()
+    if options.encoding == 'jpeg':
+        Image.fromarray(image).save(buffer, format='JPEG', quality=options.quality)
+    else:
+        Image.fromarray(image).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+_encodings = ['raw', 'lz4', 'png', 'jpeg']
+_encodingPackages = {'lz4': 'lz4'}  # Optional packages that encodings require
+
+
+# Copyright (C) 2020-2022 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -45,6 +45,14 @@ class DetectorInfo(DeviceInfo):
     forFocusLock: bool = False
     """ Whether the detector is used for focus lock. """
 
+    liveViewFps: Optional[float] = None
+    """ Rate in frames per second at which the live view is updated with
+    frames from the detector. If the detector manager notifies about new
+    frames, this is the maximum rate, and ``null`` updates it as often as the
+    display refresh rate allows. Otherwise, the detector is polled at this
+    rate (up to the display refresh rate), and ``null`` polls it every 300 ms.
+    """
+
 
 @dataclass(frozen=True)
 class LaserInfo(DeviceInfo):
@@ -246,6 +254,10 @@ class NidaqInfo:
     startTrigger: bool = False
     """ Boolean for start triggering for sync. """
 
+    simulated: bool = False
+    """ Whether to run the NI-DAQ tasks on a simulated device instead of the
+    NI-DAQmx driver, e.g. to test scans without hardware. """
+
     def getTimerCounterChannel(self):
         """ :meta private: """
         if isinstance(self.timerCounterChannel, int):
@@ -266,6 +278,57 @@ class PyroServerInfo:
     host: Optional[str] = '127.0.0.1'
     port: Optional[int] = 54333
     active: Optional[bool] = False
+    apiWorkers: int = 8
+    """ Number of threads that API calls made through the REST API are
+    executed in (except for those that run on the UI thread). """
+    apiTimeout: Optional[float] = None
+    """ Default maximum time in seconds that a REST API call may take. None
+    means no limit. """
+    apiMaxConcurrency: Optional[int] = None
+    """ Default maximum number of calls to each REST API function that are
+    handled at the same time. None means no limit. """
+
+
+@dataclass(frozen=True)
+class InstrumentationInfo:
+    enabled: bool = False
+    """ Whether to record performance metrics, such as how long detector
+    reads, storer writes, NI-DAQ calls and live view updates take. They can
+    be retrieved through the API and the server's /metrics endpoint. """
+
+    logPeriod: Optional[float] = 60
+    """ Interval in seconds at which a summary of the metrics is logged while
+    instrumentation is enabled. None disables the summary. """
+
+
+@dataclass(frozen=True)
+class RecordingInfo:
+    writeQueuePolicy: str = 'Block'
+    """ What to do with new frames when a detector's write queue is full
+    during a recording, because frames arrive faster than they can be
+    written: ``Block`` waits until there is room again, ``DropOldest``
+    discards the oldest frames waiting to be written, and ``SpillToRAM``
+    keeps queuing frames in RAM beyond the size limit. """
+
+    writeQueueMaxGigabytes: float = 1
+    """ How much data in gigabytes may wait to be written per detector
+    during a recording. """
+
+
+@dataclass(frozen=True)
+class StartupInfo:
+    parallelInit: bool = False
+    """ Whether managers that don't depend on each other (e.g. the detectors
+    and the lasers) are initialized at the same time, on worker threads. The
+    devices of a single manager are always initialized one after the other.
+    Only enable this if the device libraries of the setup can be used from
+    threads other than the main thread. When disabled (the default), managers
+    are initialized one after the other on the main thread, so slow devices
+    delay the start of the module. """
+
+    maxWorkers: Optional[int] = None
+    """ Maximum number of managers initialized at the same time. None means
+    a number chosen by Python based on the number of CPUs. """
 
 
 @dataclass_json(undefined=Undefined.INCLUDE)
@@ -323,6 +386,15 @@ class SetupInfo:
 
     pyroServerInfo: PyroServerInfo = field(default_factory=PyroServerInfo)
 
+    instrumentation: InstrumentationInfo = field(default_factory=InstrumentationInfo)
+    """ Performance instrumentation settings. """
+
+    recording: RecordingInfo = field(default_factory=RecordingInfo)
+    """ Recording settings. """
+
+    startup: StartupInfo = field(default_factory=StartupInfo)
+    """ Startup settings. """
+
     _catchAll: CatchAll = None
 
     def getDevice(self, deviceName):
@@ -1,4 +1,24 @@
-from .hamamatsu import HamamatsuCamera, HamamatsuCameraMR
-from .hamamatsu_mock import MockHamamatsu
-from .lantzlasers import LantzLaser
-from .standamotor import StandaMotor, MockStandaMotor
\ No newline at end of file
+import importlib
+
+
+# The interfaces load device libraries when they are imported, so they are only imported when
+# they're first used, rather than all of them whenever one of them is needed
+_interfaceModules = {
+    'HamamatsuCamera': 'hamamatsu',
+    'HamamatsuCameraMR': 'hamamatsu',
+    'MockHamamatsu': 'hamamatsu_mock',
+    'LantzLaser': 'lantzlasers',
+    'StandaMotor': 'standamotor',
+    'MockStandaMotor': 'standamotor'
+}
+
+
+def __getattr__(name):
+    if name not in _interfaceModules:
+        raise AttributeError(f'Module "{__name__}" has no attribute "{name}"')
+    module = importlib.import_module(f'{__name__}.{_interfaceModules[name]}')
+    return getattr(module, name)
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(_interfaceModules.keys()))
@@ -245,6 +245,7 @@ class HamamatsuCamera:
         self.frame_x = 0
         self.frame_y = 0
         self.last_frame_number = 0
+        self.last_frame_timestamps = None  # DCAM frame timestamps are not read out
         self.properties = {}
         self.max_backlog = 0
         self.number_image_buffers = 0
@@ -812,7 +813,8 @@ class HamamatsuCameraMR(HamamatsuCamera):
         for n in self.newFrames():
             im = self.hcam_data[n].getData()
             frames.append(np.reshape(im, (self.frame_y, self.frame_x)))
-        return np.array(frames), (self.frame_y, self.frame_x)
+        # The frames are views of the camera buffers; the caller copies them where needed
+        return frames, (self.frame_y, self.frame_x)
 
     def getLast(self):
         b_index, f_count = self.getAq_Info()
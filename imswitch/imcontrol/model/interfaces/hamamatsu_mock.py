@@ -65,6 +65,7 @@ class MockHamamatsu:
         self.frame_y = 500
         self.frame_bytes = self.frame_x * self.frame_y * 2
         self.last_frame_number = 0
+        self.last_frame_timestamps = None
         self.properties = {}
         self.max_backlog = 0
         self.number_image_buffers = 0
@@ -137,6 +138,12 @@ class MockHamamatsu:
             (time.time_ns() - self.mock_start_time) / 10e8 * self.properties['internal_frame_rate']
         )
         num_frames = cur_frame_number - self.last_frame_number
+        # Mock camera timestamps (in seconds) of the frames, as if taken at the exact frame rate
+        self.last_frame_timestamps = (
+            self.mock_start_time / 10e8 +
+            np.arange(self.last_frame_number + 1, cur_frame_number + 1) /
+            self.properties['internal_frame_rate']
+        )
         self.last_frame_number = cur_frame_number
 
         for i in range(num_frames):
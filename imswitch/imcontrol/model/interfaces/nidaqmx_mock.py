@@ -0,0 +1,881 @@
+""" Simulated NI-DAQmx driver, with the part of the nidaqmx package's API that
+NidaqManager uses. Tasks run on a single simulated device in virtual time:
+sample clocks, clocks shared between tasks (e.g. ao/SampleClock or a
+counter's internal output) and start triggers are followed, so that the
+tasks of a scan stay in step just like on a real card. Virtual time moves
+forward when a thread waits for a task (wait_until_done or read), either as
+fast as possible or at a fixed ratio to real time. Counter input tasks count
+photons from a simulated sample, based on the values of the outputs at the
+time of each sample, e.g. the galvo positions of a point scan. Analog
+inputs are not simulated.
+
+Like on the real device, output tasks that aren't regenerated stop with an
+error if they run out of samples, and inputs fail if they aren't read fast
+enough. In both cases, the device first waits for up to stallTimeout
+seconds of real time for the application to catch up, so that slow
+machines don't fail scans that would work on real hardware. """
+
+import enum
+import itertools
+import math
+import re
+import threading
+import time
+import types
+
+import numpy as np
+
+from imswitch.imcommon.model import initLogger
+
+
+class constants:
+    """ The constants of nidaqmx.constants that are used with this module. """
+
+    class AcquisitionType(enum.Enum):
+        FINITE = 10178
+        CONTINUOUS = 10123
+
+    class Edge(enum.Enum):
+        RISING = 10280
+        FALLING = 10171
+
+    class CountDirection(enum.Enum):
+        COUNT_UP = 10128
+        COUNT_DOWN = 10124
+
+    class DataTransferActiveTransferMode(enum.Enum):
+        DMA = 10054
+        INTERRUPT = 10204
+
+    class FrequencyUnits(enum.Enum):
+        HZ = 10373
+
+    class TriggerType(enum.Enum):
+        DIGITAL_EDGE = 10150
+
+    class RegenerationMode(enum.Enum):
+        ALLOW_REGENERATION = 10097
+        DONT_ALLOW_REGENERATION = 10158
+
+    class EveryNSamplesEventType(enum.Enum):
+        ACQUIRED_INTO_BUFFER = 1
+        TRANSFERRED_FROM_BUFFER = 2
+
+    WAIT_INFINITELY = -1.0
+    READ_ALL_AVAILABLE = -1
+
+
+class DaqError(Exception):
+    """ Error reported by the simulated device. """
+
+    def __init__(self, message, error_code, task_name=''):
+        super().__init__(f'{message}\nStatus Code: {error_code}')
+        self.error_code = error_code
+        self.task_name = task_name
+
+
+class DaqNotFoundError(Exception):
+    pass
+
+
+class DaqFunctionNotSupportedError(Exception):
+    pass
+
+
+_lib = types.SimpleNamespace(DaqNotFoundError=DaqNotFoundError,
+                             DaqFunctionNotSupportedError=DaqFunctionNotSupportedError)
+
+
+class BeadSample:
+    """ Simulated sample of beads on a square grid, as seen by a point
+    detector. Returns the count rate in counts per second for the values of
+    the device's outputs, from the two analog outputs that position the
+    beam. Distances are in the output units, i.e. volts. If no channels are
+    given, the first two analog outputs with values are used. """
+
+    def __init__(self, xChannel=None, yChannel=None, spacing=0.5, width=0.05, peakRate=1e7,
+                 background=1e4):
+        self.xChannel = xChannel
+        self.yChannel = yChannel
+        self.spacing = spacing
+        self.width = width
+        self.peakRate = peakRate
+        self.background = background
+
+    def __call__(self, outputs):
+        analogChannels = sorted(channel for channel in outputs if '/ao' in channel)
+        xChannel = self.xChannel or (analogChannels[0] if len(analogChannels) > 0 else None)
+        yChannel = self.yChannel or (analogChannels[1] if len(analogChannels) > 1 else None)
+        x = outputs[xChannel] if xChannel in outputs else 0.0
+        y = outputs[yChannel] if yChannel in outputs else 0.0
+        return self.getRate(x, y)
+
+    def getRate(self, x, y):
+        """ Returns the count rate with the beam at the given position. """
+        dx = x - self.spacing * np.round(np.asarray(x) / self.spacing)
+        dy = y - self.spacing * np.round(np.asarray(y) / self.spacing)
+        return self.background + self.peakRate * np.exp(-(dx ** 2 + dy ** 2) /
+                                                        (2 * self.width ** 2))
+
+
+class MockNidaqDevice:
+    """ The simulated device that all tasks run on. """
+
+    def __init__(self):
+        self.__logger = initLogger(self)
+
+        self.timeScale = 1.0
+        """ Virtual seconds per real second while tasks are running. None
+        runs them as fast as possible. """
+
+        self.stallTimeout = 1.0
+        """ Real time in seconds that the device waits for an output buffer
+        to be written, or an input buffer to be read, before failing. """
+
+        self.sample = BeadSample()
+        """ Callable that returns the count rates of the counter inputs from
+        a dict of output channel names to arrays of output values. """
+
+        self.rng = np.random.default_rng()
+
+        self._condition = threading.Condition(threading.RLock())
+        self._tasks = []  # Tasks that have been started and not yet stopped
+        self._reserved = {}  # Physical channel name -> task
+        self._outputValues = {}  # Physical channel name -> value when not generating samples
+        self._time = 0.0
+        self._syncTime = (0.0, time.perf_counter())
+
+    @property
+    def time(self):
+        """ Current virtual time in seconds. """
+        return self._time
+
+    def getOutputValue(self, channel):
+        """ Returns the last value that was output on the given channel or
+        line, outside buffered generation. """
+        return self._outputValues.get(channel, 0)
+
+    def reset(self):
+        """ Resets the virtual time and the outputs. Must not be called while
+        tasks are running. """
+        with self._condition:
+            if self._tasks or self._reserved:
+                raise RuntimeError('Tasks are still using the device')
+            self._time = 0.0
+            self._outputValues = {}
+
+    def _reserve(self, task):
+        with self._condition:
+            for channel in task._channels:
+                owner = self._reserved.get(channel)
+                if owner is not None and owner is not task:
+                    raise DaqError(f'The specified resource is reserved. The operation could not'
+                                   f' be completed as specified.\nResource: {channel}\n'
+                                   f'Task reserving the resource: {owner.name}',
+                                   _errorReserved, task.name)
+            for channel in task._channels:
+                self._reserved[channel] = task
+
+    def _unreserve(self, task):
+        with self._condition:
+            for channel in task._channels:
+                if self._reserved.get(channel) is task:
+                    del self._reserved[channel]
+
+    def _start(self, task):
+        with self._condition:
+            if not self._tasks:
+                self._syncTime = (self._time, time.perf_counter())
+            self._tasks.append(task)
+            if task._getTriggerSource() is None:
+                self._trigger([task])
+            self._condition.notify_all()
+
+    def _trigger(self, tasks):
+        """ Starts the clocks of the given tasks, and those of the tasks
+        that are triggered by them, at the current time. """
+        toTrigger = list(tasks)
+        while toTrigger:
+            task = toTrigger.pop(0)
+            task._triggerTime = self._time
+            task._resolveClock()
+            for other in self._tasks:
+                if other._triggerTime is not None:
+                    if other._clockPending and other._getClockMaster() is task:
+                        other._resolveClock()
+                elif other not in toTrigger and other._getTriggerSource() == task._kind:
+                    toTrigger.append(other)
+
+    def _stop(self, task):
+        with self._condition:
+            if task in self._tasks:
+                task._stopTime = self._time
+                self._storeLastValues(task)
+                self._tasks.remove(task)
+            self._condition.notify_all()
+
+    def _storeLastValues(self, task):
+        if task._kind in ('ao', 'do') and task._generated > 0:
+            values = task._getValues(np.array([task._generated - 1]))
+            for channel, channelValues in zip(task._channels, values):
+                self._outputValues[channel] = channelValues[0]
+
+    def _advanceTo(self, target):
+        """ Runs the started tasks until the virtual time reaches target, or
+        until the pacing to real time or a stalled buffer stops it. Returns
+        whether any progress was made. """
+        with self._condition:
+            startTime = self._time
+            while self._time < target:
+                stepEnd = min(target, self._time + _maxStep)
+                if self.timeScale is None:
+                    if not any(task._origin is not None for task in self._tasks):
+                        # Nothing is clocked yet, e.g. the tasks wait for a trigger from a task
+                        # that the application is about to start
+                        break
+                else:
+                    syncVirtual, syncReal = self._syncTime
+                    allowed = syncVirtual + (time.perf_counter() - syncReal) * self.timeScale
+                    if allowed <= self._time:
+                        self._condition.wait(min(_pacingInterval,
+                                                 (target - self._time) / self.timeScale))
+                        continue
+                    stepEnd = min(stepEnd, allowed)
+
+                stepEnd = self._limitByBuffers(stepEnd)
+                if stepEnd <= self._time:
+                    break  # Stalled, the caller checks the state of its task and tries again
+                self._step(stepEnd)
+            return self._time > startTime
+
+    def _limitByBuffers(self, stepEnd):
+        """ Limits the step so that no output runs out of samples and no input
+        buffer overflows. If a buffer prevents any progress, waits for the
+        application to write or read it, and fails the task if that takes too
+        long. """
+        for task in list(self._tasks):
+            limitIndex = task._getBufferLimitIndex()
+            if limitIndex is None:
+                continue
+
+            limitTime = task._getSampleTime(limitIndex)
+            if limitTime > stepEnd:
+                task._stallStart = None
+                continue
+            if limitTime - 2 * _timeEps > self._time:
+                stepEnd = limitTime - _timeEps
+                task._stallStart = None
+                continue
+
+            # The buffer is empty (output) or full (input) right now
+            if task._stallStart is None:
+                task._stallStart = time.perf_counter()
+            waited = time.perf_counter() - task._stallStart
+            if waited < self.stallTimeout:
+                self._condition.wait(min(_pacingInterval, self.stallTimeout - waited))
+                return self._time
+            if task._kind in ('ao', 'do'):
+                task._fail(DaqError('The generation has stopped to prevent the regeneration of'
+                                    ' old samples. Your application was unable to write samples'
+                                    ' to the background buffer fast enough to prevent old'
+                                    ' samples from being regenerated.',
+                                    _errorUnderflow, task.name))
+            else:
+                task._fail(DaqError('The application is not able to keep up with the hardware'
+                                    ' acquisition.', _errorOverflow, task.name))
+            return self._time
+        return stepEnd
+
+    def _step(self, stepEnd):
+        # Counter inputs count photons from the sample based on the outputs at each sample
+        for task in self._tasks:
+            if task._kind != 'ci' or task._triggerTime is None:
+                continue
+            numAcquired = task._getSamplesUntil(stepEnd)
+            if numAcquired <= task._acquired:
+                continue
+            sampleTimes = task._getSampleTimes(task._acquired, numAcquired)
+            rates = np.broadcast_to(self.sample(self._getOutputsAt(sampleTimes)),
+                                    sampleTimes.shape)
+            counts = self.rng.poisson(np.clip(rates, 0, None) / task._rate)
+            cumulativeCounts = task._count + np.cumsum(counts)
+            task._count = int(cumulativeCounts[-1])
+            task._inputBlocks.append(cumulativeCounts.astype(np.uint32))
+            task._acquired = numAcquired
+
+        self._time = stepEnd
+
+        for task in list(self._tasks):
+            if task._kind in ('ao', 'do', 'co') and task._triggerTime is not None:
+                task._generated = task._getSamplesUntil(stepEnd)
+                task._fireEvents()
+                task._dropGeneratedBlocks()
+            if task._isDone():
+                self._storeLastValues(task)
+                self._tasks.remove(task)
+        self._condition.notify_all()
+
+    def _getOutputsAt(self, times):
+        """ Returns the values of all outputs at the given times, by physical
+        channel name. """
+        outputs = {channel: np.full(len(times), value)
+                   for channel, value in self._outputValues.items()}
+        for task in self._tasks:
+            if task._kind not in ('ao', 'do') or task._triggerTime is None or task._onDemand:
+                continue
+            indices = np.floor((times - task._origin) * task._rate + _timeEps).astype(np.int64)
+            indices -= task._firstTick
+            generated = indices < task._getSamplesUntil(times[-1])
+            started = (indices >= 0) & generated
+            if not np.any(started):
+                continue
+            values = task._getValues(np.clip(indices, 0, None)[started])
+            for channel, channelValues in zip(task._channels, values):
+                channelOutputs = outputs.setdefault(
+                    channel, np.full(len(times), self._outputValues.get(channel, 0),
+                                     dtype=channelValues.dtype)
+                )
+                channelOutputs[started] = channelValues
+        return outputs
+
+
+class Task:
+    """ Simulated NI-DAQmx task. """
+
+    def __init__(self, new_task_name=''):
+        self.name = new_task_name or f'_unnamedTask<{next(_taskCounter)}>'
+        self.ao_channels = _AOChannelCollection(self)
+        self.do_channels = _DOChannelCollection(self)
+        self.ci_channels = _CIChannelCollection(self)
+        self.co_channels = _COChannelCollection(self)
+        self.timing = _Timing()
+        self.triggers = _Triggers()
+        self.out_stream = _OutStream()
+
+        self._kind = None
+        self._channels = []
+        self._state = 'created'
+        self._error = None
+        self._everyNSamples = None
+        self._everyNCallback = None
+        self._nextEvent = None
+        self._reset()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    @property
+    def _onDemand(self):
+        return self._kind in ('ao', 'do') and not self.timing._configured
+
+    @property
+    def _clockPending(self):
+        return self._triggerTime is not None and self._origin is None
+
+    def start(self):
+        self._checkNotClosed()
+        if self._state == 'running':
+            return
+
+        device._reserve(self)
+        self._error = None
+        self._state = 'running'
+        if self._onDemand:
+            return
+
+        with device._condition:
+            self._reset(keepData=True)
+            self._regenerate = (self._kind in ('ao', 'do') and
+                                self.out_stream.regen_mode !=
+                                constants.RegenerationMode.DONT_ALLOW_REGENERATION)
+            if self._kind in ('ao', 'do'):
+                if self._written < 1:
+                    device._unreserve(self)
+                    self._state = 'created'
+                    raise DaqError('Write cannot be performed, because the number of channels in'
+                                   ' the data does not match the number of channels in the task,'
+                                   ' or no data was written before the task was started.',
+                                   _errorNoData, self.name)
+                self._bufferSize = max(self.out_stream.output_buf_size or 0, self._written)
+                if self._regenerate:
+                    self._regenerationData = np.concatenate([block for _, block in self._blocks],
+                                                            axis=1)
+            elif self._kind == 'ci':
+                self._bufferSize = self.timing.samp_quant_samp_per_chan
+            self._nextEvent = self._everyNSamples
+            device._start(self)
+
+    def stop(self):
+        if self._state == 'closed':
+            return
+
+        device._stop(self)
+        device._unreserve(self)
+        if self._state == 'running':
+            self._state = 'stopped'
+
+    def close(self):
+        if self._state == 'closed':
+            return
+
+        self.stop()
+        self._state = 'closed'
+        self._blocks = []
+        self._inputBlocks = []
+        self._regenerationData = None
+
+    def is_task_done(self):
+        self._checkNotClosed()
+        return self._state != 'running' or self._isDone()
+
+    def wait_until_done(self, timeout=10.0):
+        self._checkNotClosed()
+        if self._onDemand or self._state != 'running':
+            self._raiseIfFailed()
+            return
+
+        deadline = _getDeadline(timeout)
+        while True:
+            with device._condition:
+                self._raiseIfFailed()
+                if self._state != 'running':
+                    self._checkNotClosed()
+                    return
+                if self._isDone():
+                    return
+                doneTime = self._getSampleTime(self._total - 1) if self._origin is not None \
+                    else math.inf
+                if time.perf_counter() > deadline:
+                    raise DaqError('Wait Until Done did not indicate all samples were acquired'
+                                   ' or generated within the timeout.', _errorWaitTimeout,
+                                   self.name)
+                if not device._advanceTo(min(doneTime, device.time + _maxStep)):
+                    device._condition.wait(_pacingInterval)
+
+    def write(self, data, auto_start=False, timeout=10.0):
+        self._checkNotClosed()
+        if self._kind not in ('ao', 'do'):
+            raise DaqError('Write is only supported for output tasks.', _errorNotSupported,
+                           self.name)
+
+        data = self._getChannelData(data)
+        if self._onDemand:
+            return self._writeOnDemand(data, auto_start)
+
+        with device._condition:
+            if self._state == 'running':
+                self._waitForBufferSpace(data.shape[1], timeout)
+            self._blocks.append((self._written, data.copy()))
+            self._written += data.shape[1]
+            device._condition.notify_all()
+
+        if auto_start and self._state != 'running':
+            self.start()
+        return data.shape[1]
+
+    def _getChannelData(self, data):
+        """ Returns the data as a 2D array with one row per channel. """
+        data = np.asarray(data)
+        if len(self._channels) == 1:
+            data = np.atleast_1d(data)[np.newaxis, :]
+        elif data.ndim == 1:
+            data = data[:, np.newaxis]
+        if data.shape[0] != len(self._channels):
+            raise DaqError('Write cannot be performed, because the number of channels in the'
+                           ' data does not match the number of channels in the task.',
+                           _errorNoData, self.name)
+        return data
+
+    def _writeOnDemand(self, data, auto_start):
+        if self._state != 'running':
+            if not auto_start:
+                raise DaqError('Task must be started before writing on-demand data.',
+                               _errorNotStarted, self.name)
+            self.start()
+        with device._condition:
+            for channel, value in zip(self._channels, data[:, -1]):
+                device._outputValues[channel] = value.item()
+        return data.shape[1]
+
+    def _waitForBufferSpace(self, numSamples, timeout):
+        """ Waits until the given number of samples fit in the buffer of the
+        running task. Must be called with the device condition held. """
+        if self._regenerate:
+            raise DaqError('Writing to a running task that regenerates its buffer is not'
+                           ' supported by the simulated device.', _errorNotSupported,
+                           self.name)
+        deadline = _getDeadline(timeout)
+        while self._written + numSamples - self._generated > self._bufferSize:
+            self._raiseIfFailed()
+            if time.perf_counter() > deadline:
+                raise DaqError('Some or all of the samples to write could not be'
+                               ' written to the buffer yet.', _errorWriteTimeout,
+                               self.name)
+            device._condition.wait(_pacingInterval)
+
+    def read(self, number_of_samples_per_channel=constants.READ_ALL_AVAILABLE, timeout=10.0):
+        self._checkNotClosed()
+        if self._kind != 'ci':
+            raise DaqError('Read is only supported for counter input tasks.', _errorNotSupported,
+                           self.name)
+
+        numSamples = number_of_samples_per_channel
+        deadline = _getDeadline(timeout)
+        while True:
+            with device._condition:
+                self._raiseIfFailed()
+                available = self._acquired - self._read
+                if numSamples == constants.READ_ALL_AVAILABLE:
+                    numSamples = available
+                if available >= numSamples:
+                    break
+                if self._state != 'running' or (self._origin is not None and
+                                                self._getSamplesUntil(math.inf) <
+                                                self._read + numSamples):
+                    raise DaqError('Finite acquisition or generation has been stopped before'
+                                   ' the requested number of samples were acquired or'
+                                   ' generated.', _errorStopped, self.name)
+                if time.perf_counter() > deadline:
+                    raise DaqError('Some or all of the samples requested have not yet been'
+                                   ' acquired.', _errorReadTimeout, self.name)
+                readyTime = self._getSampleTime(self._read + numSamples - 1) \
+                    if self._origin is not None else math.inf
+                if not device._advanceTo(min(readyTime, device.time + _maxStep)):
+                    device._condition.wait(_pacingInterval)
+
+        with device._condition:
+            samples = np.concatenate(self._inputBlocks) if self._inputBlocks \
+                else np.zeros(0, dtype=np.uint32)
+            self._inputBlocks = [samples[numSamples:]]
+            self._read += numSamples
+            device._condition.notify_all()
+        samples = samples[:numSamples].tolist()
+        return samples[0] if number_of_samples_per_channel == 1 else samples
+
+    def register_every_n_samples_transferred_from_buffer_event(self, sample_interval,
+                                                               callback_method):
+        self._checkNotClosed()
+        if self._state == 'running':
+            raise DaqError('Every N samples events must be registered before the task is'
+                           ' started.', _errorNotSupported, self.name)
+        self._everyNSamples = sample_interval
+        self._everyNCallback = callback_method
+
+    def _reset(self, keepData=False):
+        if not keepData:
+            self._blocks = []  # (index of first sample, samples) of written output samples
+            self._written = 0
+        self._inputBlocks = []
+        self._regenerationData = None
+        self._regenerate = False
+        self._bufferSize = None
+        self._generated = 0
+        self._acquired = 0
+        self._read = 0
+        self._count = 0
+        self._triggerTime = None
+        self._stopTime = math.inf
+        self._stallStart = None
+        self._master = None
+        self._origin = None
+        self._rate = None
+        self._firstTick = 0
+        if self._kind == 'ci':
+            self._count = self.ci_channels._initialCount
+        self._total = self.timing.samp_quant_samp_per_chan \
+            if self.timing.samp_quant_samp_mode == constants.AcquisitionType.FINITE else math.inf
+
+    def _addChannels(self, kind, channels):
+        if self._kind is not None and self._kind != kind:
+            raise DaqError('Channels of different types cannot be added to the same task.',
+                           _errorNotSupported, self.name)
+        self._kind = kind
+        for channel in np.atleast_1d(channels):
+            self._channels.extend(channel.strip() for channel in str(channel).split(','))
+
+    def _checkNotClosed(self):
+        if self._state == 'closed':
+            raise DaqError('Task specified is invalid or does not exist.', _errorInvalidTask,
+                           self.name)
+
+    def _raiseIfFailed(self):
+        if self._error is not None:
+            raise self._error
+
+    def _fail(self, error):
+        self._error = error
+        device._stop(self)
+
+    def _getTriggerSource(self):
+        """ Returns the task type (e.g. "ao") whose start trigger starts this
+        task, or None if it starts immediately. """
+        source = self.triggers.start_trigger._source or \
+            self.triggers.arm_start_trigger.dig_edge_src
+        if not source:
+            return None
+        match = re.search(r'(ao|do|ai|di)/StartTrigger$', source)
+        return match.group(1) if match else None
+
+    def _getClockMaster(self):
+        """ Returns the running task whose clock this task's sample clock
+        comes from, or None if it has its own clock. """
+        source = self.timing.samp_clk_src or ''
+        match = re.search(r'(ao|do|ai|di)/SampleClock$', source)
+        if match:
+            return next((task for task in device._tasks
+                         if task._kind == match.group(1) and task is not self), _missing)
+        match = re.search(r'(ctr\d+)InternalOutput$', source)
+        if match:
+            return next((task for task in device._tasks if task._kind == 'co' and
+                         any(channel.endswith(match.group(1)) for channel in task._channels)),
+                        _missing)
+        return None
+
+    def _resolveClock(self):
+        """ Sets up the timing of the task's samples once it has been
+        triggered. If the clock comes from a task that hasn't started yet,
+        the samples start with that task's first sample. """
+        master = self._getClockMaster()
+        if master is None:
+            self._master = None
+            self._origin = self._triggerTime
+            self._rate = self.timing._getRate()
+            self._firstTick = 0
+        elif master is _missing or master._origin is None:
+            self._origin = None  # Resolved when the clock starts
+        else:
+            self._master = master
+            self._origin = master._origin
+            self._rate = master._rate
+            self._firstTick = max(master._firstTick,
+                                  math.ceil((self._triggerTime - master._origin) * master._rate
+                                            - _timeEps))
+
+    def _getClockTicksUntil(self, t):
+        """ Returns the number of ticks of the clock that the samples are
+        taken on, counted from the origin, that this task receives until time
+        t. """
+        if self._origin is None:
+            return 0
+        t = min(t, self._stopTime)
+        if self._master is not None:
+            ticks = self._master._getClockTicksUntil(t)
+        elif t == math.inf:
+            ticks = math.inf
+        else:
+            ticks = math.floor((t - self._origin) * self._rate + _timeEps) + 1 if t >= \
+                self._origin else 0
+        return min(max(ticks, self._firstTick), self._firstTick + self._total)
+
+    def _getSamplesUntil(self, t):
+        """ Returns the number of samples the task has taken or generated
+        until time t. """
+        return self._getClockTicksUntil(t) - self._firstTick
+
+    def _getSampleTime(self, index):
+        """ Returns the time of the sample with the given index, inf if it
+        will never happen. """
+        if self._origin is None or index >= self._getSamplesUntil(math.inf):
+            return math.inf
+        return self._origin + (self._firstTick + index) / self._rate
+
+    def _getSampleTimes(self, start, stop):
+        return self._origin + (self._firstTick + np.arange(start, stop)) / self._rate
+
+    def _getBufferLimitIndex(self):
+        """ Returns the index of the first sample that doesn't fit in the
+        buffer, or None if the buffer can't limit the task. """
+        if self._triggerTime is None or self._origin is None:
+            return None
+        if self._kind in ('ao', 'do') and not self._regenerate:
+            return self._written
+        if self._kind == 'ci' and self._total == math.inf and self._bufferSize:
+            return self._read + self._bufferSize
+        return None
+
+    def _getValues(self, indices):
+        """ Returns the output samples with the given indices, one row per
+        channel. """
+        if self._regenerate:
+            return self._regenerationData[:, indices % self._regenerationData.shape[1]]
+
+        values = np.zeros((len(self._channels), len(indices)),
+                          dtype=self._blocks[0][1].dtype if self._blocks else float)
+        for blockStart, block in self._blocks:
+            inBlock = (indices >= blockStart) & (indices < blockStart + block.shape[1])
+            values[:, inBlock] = block[:, indices[inBlock] - blockStart]
+        return values
+
+    def _dropGeneratedBlocks(self):
+        if self._regenerate:
+            return
+        # Keep the last block, for the values that are held after the generation ends
+        while len(self._blocks) > 1 and self._blocks[0][0] + self._blocks[0][1].shape[1] <= \
+                self._generated - 1:
+            self._blocks.pop(0)
+
+    def _fireEvents(self):
+        if self._everyNCallback is None:
+            return
+        while self._generated >= self._nextEvent and self._state == 'running':
+            self._nextEvent += self._everyNSamples
+            try:
+                self._everyNCallback(
+                    id(self), constants.EveryNSamplesEventType.TRANSFERRED_FROM_BUFFER.value,
+                    self._everyNSamples, None
+                )
+            except Exception:
+                _logger.exception(f'Every N samples callback of task "{self.name}" failed')
+
+    def _isDone(self):
+        if self._kind == 'ci':
+            return self._acquired >= self._total
+        return self._generated >= self._total
+
+
+class _Timing:
+    def __init__(self):
+        self._configured = False
+        self.samp_clk_src = None
+        self.samp_clk_rate = None
+        self.samp_quant_samp_mode = constants.AcquisitionType.FINITE
+        self.samp_quant_samp_per_chan = 1000
+        self._implicitRate = None
+
+    def cfg_samp_clk_timing(self, rate, source='', active_edge=constants.Edge.RISING,
+                            sample_mode=constants.AcquisitionType.FINITE, samps_per_chan=1000):
+        self._configured = True
+        self.samp_clk_src = source
+        self.samp_clk_rate = rate
+        self.samp_quant_samp_mode = sample_mode
+        self.samp_quant_samp_per_chan = samps_per_chan
+
+    def cfg_implicit_timing(self, sample_mode=constants.AcquisitionType.FINITE,
+                            samps_per_chan=1000):
+        self._configured = True
+        self.samp_clk_src = None
+        self.samp_quant_samp_mode = sample_mode
+        self.samp_quant_samp_per_chan = samps_per_chan
+
+    def _getRate(self):
+        return self._implicitRate if self._implicitRate is not None else self.samp_clk_rate
+
+
+class _StartTrigger:
+    def __init__(self):
+        self._source = None
+
+    def cfg_dig_edge_start_trig(self, trigger_source, trigger_edge=constants.Edge.RISING):
+        self._source = trigger_source
+
+    def disable_start_trig(self):
+        self._source = None
+
+
+class _ArmStartTrigger:
+    def __init__(self):
+        self.dig_edge_src = None
+        self.trig_type = None
+
+
+class _Triggers:
+    def __init__(self):
+        self.start_trigger = _StartTrigger()
+        self.arm_start_trigger = _ArmStartTrigger()
+
+
+class _OutStream:
+    def __init__(self):
+        self.regen_mode = constants.RegenerationMode.ALLOW_REGENERATION
+        self.output_buf_size = None
+
+
+class _ChannelCollection:
+    def __init__(self, task):
+        self._task = task
+
+
+class _AOChannelCollection(_ChannelCollection):
+    def add_ao_voltage_chan(self, physical_channel, name_to_assign_to_channel='', min_val=-10.0,
+                            max_val=10.0, **_):
+        self._task._addChannels('ao', physical_channel)
+        return types.SimpleNamespace(name=physical_channel, ao_min=min_val, ao_max=max_val)
+
+
+class _DOChannelCollection(_ChannelCollection):
+    def add_do_chan(self, lines, name_to_assign_to_lines='', **_):
+        self._task._addChannels('do', lines)
+        return types.SimpleNamespace(name=lines)
+
+
+class _CIChannelCollection(_ChannelCollection):
+    _initialCount = 0
+
+    def add_ci_count_edges_chan(self, counter, name_to_assign_to_channel='',
+                                edge=constants.Edge.RISING, initial_count=0,
+                                count_direction=constants.CountDirection.COUNT_UP):
+        self._task._addChannels('ci', counter)
+        self._initialCount = initial_count
+        return types.SimpleNamespace(name=counter, ci_count_edges_term=None,
+                                     ci_data_xfer_mech=None)
+
+
+class _COChannelCollection(_ChannelCollection):
+    def add_co_pulse_chan_freq(self, counter, name_to_assign_to_channel='',
+                               units=constants.FrequencyUnits.HZ, idle_state=None,
+                               initial_delay=0.0, freq=1.0, duty_cycle=0.5):
+        self._task._addChannels('co', counter)
+        self._task.timing._implicitRate = freq
+        return types.SimpleNamespace(name=counter, co_pulse_freq=freq,
+                                     co_pulse_duty_cyc=duty_cycle)
+
+
+def _getDeadline(timeout):
+    if timeout is None or timeout < 0:
+        return math.inf
+    return time.perf_counter() + timeout
+
+
+_logger = initLogger('nidaqmx_mock')
+_taskCounter = itertools.count()
+_missing = object()  # Clock master that hasn't started yet
+
+_maxStep = 0.01  # Longest virtual time step in seconds
+_pacingInterval = 0.002  # Real time in seconds between checks while waiting
+_timeEps = 1e-9
+
+_errorReserved = -50103
+_errorNotSupported = -200452
+_errorNoData = -200462
+_errorNotStarted = -200473
+_errorInvalidTask = -200088
+_errorStopped = -200010
+_errorReadTimeout = -200284
+_errorWaitTimeout = -200560
+_errorWriteTimeout = -200292
+_errorUnderflow = -200290
+_errorOverflow = -200279
+
+device = MockNidaqDevice()
+""" The simulated device. Its attributes can be changed to configure the
+simulation, e.g. the sample or the time scale. """
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
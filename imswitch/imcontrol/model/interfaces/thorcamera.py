@@ -4,8 +4,6 @@ import time
 import cv2
 from imswitch.imcommon.model import initLogger
 
-import collections
-
 
 import numpy as np
 import matplotlib.pyplot as plt
@@ -53,11 +51,7 @@ class ThorCamera:
         self.gain = gain
         self.cameraNo = cameraNo
 
-        # reserve some space for the framebuffer
-        NBuffer = 60
-        self.frame_buffer = collections.deque(maxlen=NBuffer)
-        self.frameid_buffer = collections.deque(maxlen=NBuffer)
-        
+        # frames are buffered by ThorcamManager
         #%% starting the camera thread
         self.camera = None
 
@@ -1,8 +1,10 @@
-from time import sleep
+import time
 
 import numpy as np
 
-from imswitch.imcommon.framework import Mutex, Signal, SignalInterface, Thread, Timer, Worker
+from imswitch.imcommon.framework import (
+    Instrumentation, Mutex, Signal, SignalInterface, Thread, Timer, Worker
+)
 from .MultiManager import MultiManager
 
 
@@ -17,8 +19,9 @@ class DetectorsManager(MultiManager, SignalInterface):
         str, np.ndarray, bool, list, bool
     )  # (detectorName, image, init, scale, isCurrentDetector)
     sigNewFrame = Signal()
+    _sigFramesAvailable = Signal(str)  # (detectorName)
 
-    def __init__(self, detectorInfos, updatePeriod, **lowLevelManagers):
+    def __init__(self, detectorInfos, updatePeriod, *, maxLiveViewFps=60, **lowLevelManagers):
         MultiManager.__init__(self, detectorInfos, 'detectors', **lowLevelManagers)
         SignalInterface.__init__(self)
 
@@ -37,13 +40,17 @@ class DetectorsManager(MultiManager, SignalInterface):
                 )
             )
             self._subManagers[detectorName].sigNewFrame.connect(lambda: self.sigNewFrame.emit())
+            self._subManagers[detectorName].sigFramesAvailable.connect(self._sigFramesAvailable)
 
             # Set as default if first detector
             if self._currentDetectorName is None:
                 self._currentDetectorName = detectorName
 
-        # A timer will collect the new frame and update it through the communication channel
-        self._lvWorker = LVWorker(self, updatePeriod)
+        # The live view worker collects new frames and passes them on through sigImageUpdated
+        self._lvWorker = LVWorker(self, updatePeriod, maxLiveViewFps)
+        for detectorName, detectorInfo in detectorInfos.items():
+            if detectorInfo.liveViewFps is not None:
+                self._lvWorker.setTargetFps(detectorName, detectorInfo.liveViewFps)
         self._thread = Thread()
         self._lvWorker.moveToThread(self._thread)
         self._thread.started.connect(self._lvWorker.run)
@@ -117,7 +124,6 @@ class DetectorsManager(MultiManager, SignalInterface):
             self.execOnAll(lambda c: c.startAcquisition(), condition=lambda c: c.forAcquisition)
             self.sigAcquisitionStarted.emit()
         if enableLV:
-            sleep(0.3)
             self._thread.start()
 
         return handle
@@ -154,36 +160,133 @@ class DetectorsManager(MultiManager, SignalInterface):
             self.sigAcquisitionStopped.emit()
 
     def setUpdatePeriod(self, updatePeriod):
+        """ Sets the interval in milliseconds at which the live view is
+        updated with frames from detectors that don't notify about new
+        frames. """
         self._lvWorker.setUpdatePeriod(updatePeriod)
         self._thread.quit()
         self._thread.wait()
         self._thread.start()
 
+    def setLiveViewFps(self, detectorName, fps):
+        """ Sets the rate in frames per second at which the live view is
+        updated with frames from the specified detector. Detectors that notify
+        about new frames are updated at most at this rate, None meaning as
+        often as the display refresh rate allows. Other detectors are polled
+        at this rate, None meaning every updatePeriod milliseconds; this takes
+        effect the next time the live view is started. """
+        self._validateManagedDeviceName(detectorName)
+        self._lvWorker.setTargetFps(detectorName, fps)
+
 
 class LVWorker(Worker):
-    def __init__(self, detectorsManager, updatePeriod):
+    """ Passes new frames on to the live view. Detectors that notify about new
+    frames are updated as soon as a frame arrives, but no more often than
+    their target frame rate and maxFps (the display refresh rate) allow.
+    Other detectors are polled at their target frame rate (limited to
+    maxFps), or every updatePeriod milliseconds if they have none. """
+
+    def __init__(self, detectorsManager, updatePeriod, maxFps=60):
         super().__init__()
         self._detectorsManager = detectorsManager
         self._updatePeriod = updatePeriod
-        self._vtimer = None
+        self._maxFps = maxFps
+        self._targetFps = {}
+        self._pollTimers = []
+        self._delayTimers = {}
+        self._lastUpdateTimes = {}
+        self._initializedDetectorNames = set()
 
     def run(self):
-        self._detectorsManager.execOnAll(lambda c: c.updateLatestFrame(False),
-                                         condition=lambda c: c.forAcquisition)
-        self._vtimer = Timer()
-        self._vtimer.timeout.connect(
-            lambda: self._detectorsManager.execOnAll(lambda c: c.updateLatestFrame(True),
-                                                     condition=lambda c: c.forAcquisition)
+        self._lastUpdateTimes.clear()
+        self._initializedDetectorNames.clear()
+
+        notifyingNames = self._detectorsManager.getAllDeviceNames(
+            lambda c: c.forAcquisition and c.notifiesNewFrames
+        )
+        polledNames = self._detectorsManager.getAllDeviceNames(
+            lambda c: c.forAcquisition and not c.notifiesNewFrames
         )
-        self._vtimer.start(self._updatePeriod)
+
+        for detectorName in notifyingNames:
+            timer = Timer(singleShot=True)
+            timer.timeout.connect(
+                lambda detectorName=detectorName: self._updateDetector(detectorName)
+            )
+            self._delayTimers[detectorName] = timer
+        if notifyingNames:
+            self._detectorsManager._sigFramesAvailable.connect(self.framesAvailable)
+            for detectorName in notifyingNames:
+                # Notifications may have been held back while the live view was stopped
+                self._detectorsManager[detectorName].clearFrameNotification()
+
+        # Detectors polled at the same period share a timer
+        polledNamesByPeriod = {}
+        for detectorName in polledNames:
+            polledNamesByPeriod.setdefault(self._getPollPeriod(detectorName), []).append(
+                detectorName
+            )
+        for period, detectorNames in polledNamesByPeriod.items():
+            timer = Timer()
+            timer.timeout.connect(
+                lambda detectorNames=detectorNames: [self._updateDetector(detectorName)
+                                                     for detectorName in detectorNames]
+            )
+            timer.start(period)
+            self._pollTimers.append(timer)
 
     def stop(self):
-        if self._vtimer is not None:
-            self._vtimer.stop()
+        if self._delayTimers:
+            self._detectorsManager._sigFramesAvailable.disconnect(self.framesAvailable)
+            for timer in self._delayTimers.values():
+                timer.stop()
+            self._delayTimers = {}
+
+        for timer in self._pollTimers:
+            timer.stop()
+        self._pollTimers = []
+
+    def framesAvailable(self, detectorName):
+        timer = self._delayTimers.get(detectorName)
+        if timer is None or timer.isActive():
+            return  # Not running, or an update is already scheduled
+
+        Instrumentation.count('liveViewNotifications', detector=detectorName)
+
+        delay = (self._lastUpdateTimes.get(detectorName, -np.inf) +
+                 self._getMinInterval(detectorName) - time.perf_counter())
+        if delay > 0:
+            timer.start(int(np.ceil(delay * 1000)))
+        else:
+            self._updateDetector(detectorName)
 
     def setUpdatePeriod(self, updatePeriod):
         self._updatePeriod = updatePeriod
 
+    def setTargetFps(self, detectorName, fps):
+        self._targetFps[detectorName] = fps
+
+    def _updateDetector(self, detectorName):
+        self._lastUpdateTimes[detectorName] = time.perf_counter()
+        # init is False for the first frame after starting, so that the levels are adjusted to it
+        self._detectorsManager[detectorName].updateLatestFrame(
+            detectorName in self._initializedDetectorNames
+        )
+        self._initializedDetectorNames.add(detectorName)
+
+    def _getPollPeriod(self, detectorName):
+        """ Returns the period in milliseconds at which the specified detector
+        is polled if it doesn't notify about new frames. """
+        if self._targetFps.get(detectorName) is None:
+            return self._updatePeriod
+        return max(int(round(self._getMinInterval(detectorName) * 1000)), 1)
+
+    def _getMinInterval(self, detectorName):
+        fps = self._maxFps
+        if self._targetFps.get(detectorName) is not None:
+            fps = min(fps, self._targetFps[detectorName])
+        return 1 / fps
+
 
 class NoDetectorsError(RuntimeError):
     """ Error raised when a function related to the current detector is called
@@ -10,22 +10,32 @@ class MultiManager(ABC):
     Intended to be extended for each type of manager. """
 
     @abstractmethod
-    def __init__(self, managedDeviceInfos, subManagersPackage, **lowLevelManagers):
-        #self.__logger = initLogger(self, instanceName='MultiManager')
-        self._subManagers = {}
+    def __init__(self, managedDeviceInfos, subManagersPackage, subManagers=None,
+                 **lowLevelManagers):
+        if subManagers is None:
+            subManagers = self.createSubManagers(managedDeviceInfos, subManagersPackage,
+                                                 **lowLevelManagers)
+        self._subManagers = subManagers
+
+    @staticmethod
+    def createSubManagers(managedDeviceInfos, subManagersPackage, **lowLevelManagers):
+        """ Creates the sub-managers for the given devices and returns them by
+        device name. The result can be passed as subManagers to the
+        constructor, so that the devices can be connected to on another thread
+        than the one that the manager itself is created on. """
+        subManagers = {}
         currentPackage = '.'.join(__name__.split('.')[:-1])
         if managedDeviceInfos:
             for managedDeviceName, managedDeviceInfo in managedDeviceInfos.items():
                 # Create sub-manager
-                #self.__logger.debug(f'{currentPackage}.{subManagersPackage}, {managedDeviceInfo.managerName}')
-                #self.__logger.debug(managedDeviceInfo)
                 package = importlib.import_module(
                     pythontools.joinModulePath(f'{currentPackage}.{subManagersPackage}',
-                                            managedDeviceInfo.managerName)
+                                               managedDeviceInfo.managerName)
                 )
                 manager = getattr(package, managedDeviceInfo.managerName)
-                self._subManagers[managedDeviceName] = manager(
+                subManagers[managedDeviceName] = manager(
                     managedDeviceInfo, managedDeviceName, **lowLevelManagers)
+        return subManagers
 
     def hasDevices(self):
         """ Returns whether this manager manages any devices. """
@@ -1,21 +1,30 @@
+import itertools
 import operator
+import queue
+import threading
 import traceback
 import warnings
 
-import nidaqmx
-import nidaqmx._lib
-import nidaqmx.constants
 import numpy as np
 
-from imswitch.imcommon.framework import Signal, SignalInterface, Thread
-from imswitch.imcommon.model import initLogger
+from imswitch.imcommon.framework import Instrumentation, Signal, SignalInterface, Thread
+from imswitch.imcommon.model import initLogger, pythontools
+from ..signaldesigners.compactsignals import CompactSignal
+
+# Only imported when a task is created, setups without an NI-DAQ shouldn't need to load the driver
+nidaqmx = pythontools.LazyModule('nidaqmx')
 
 
 class NidaqManager(SignalInterface):
-    """ For interaction with NI-DAQ hardware interfaces. """
+    """ For interaction with NI-DAQ hardware interfaces. The tasks are created
+    through the nidaqmx package, or through the simulated device in
+    nidaqmx_mock if the setup's NI-DAQ is simulated, which implements the
+    same API. """
 
     sigScanBuilt = Signal(object, object, object)  # (scanInfoDict, signalDict, deviceList)
     sigScanStarted = Signal()
+    sigScanRepetitionDone = Signal(int)  # (number of repetitions done)
+    sigScanStopping = Signal()
     sigScanDone = Signal()
 
     sigScanBuildFailed = Signal()
@@ -25,11 +34,24 @@ class NidaqManager(SignalInterface):
         self.__logger = initLogger(self)
 
         self.__setupInfo = setupInfo
+        if setupInfo.nidaq.simulated:
+            from imswitch.imcontrol.model.interfaces import nidaqmx_mock
+            self.__nidaqmx = nidaqmx_mock
+        else:
+            self.__nidaqmx = nidaqmx
         self.tasks = {}
         self.doTaskWaiter = None
         self.aoTaskWaiter = None
         self.timerTaskWaiter = None
+        self.continuousTask = None
         self.busy = False
+        self.signalSent = False
+        self.__outputWriters = []
+        self.__repetitions = 1
+        self.__repetitionsDone = 0
+        self.__samplesTransferred = 0
+        self.__staticTasks = {}
+        self.__staticTasksLock = threading.Lock()
         self.__timerCounterChannel = setupInfo.nidaq.getTimerCounterChannel()
         self.__startTrigger = setupInfo.nidaq.startTrigger
 
@@ -38,6 +60,8 @@ class NidaqManager(SignalInterface):
             if taskWaiter is not None:
                 taskWaiter.quit()
                 taskWaiter.wait()
+        if self.__staticTasks:
+            self.__releaseStaticTasks()
         if hasattr(super(), '__del__'):
             super().__del__()
 
@@ -58,7 +82,7 @@ class NidaqManager(SignalInterface):
                            reference_trigger='ai/StartTrigger'):
         """ Simplified function to create an analog output task """
         #self.__logger.debug(f'Create AO task: {name}')
-        aotask = nidaqmx.Task(name)
+        aotask = self.__nidaqmx.Task(name)
         channels = np.atleast_1d(channels)
 
         for channel in channels:
@@ -76,7 +100,7 @@ class NidaqManager(SignalInterface):
     def __createLineDOTask(self, name, lines, acquisitionType, source, rate, sampsInScan=1000,
                            starttrig=False, reference_trigger='ai/StartTrigger'):
         """ Simplified function to create a digital output task """
-        dotask = nidaqmx.Task(name)
+        dotask = self.__nidaqmx.Task(name)
 
         lines = np.atleast_1d(lines)
 
@@ -93,20 +117,23 @@ class NidaqManager(SignalInterface):
     def __createChanCITask(self, name, channel, acquisitionType, source, rate, sampsInScan=1000,
                            starttrig=False, reference_trigger='ai/StartTrigger', terminal='PFI0'):
         """ Simplified function to create a counter input task """
-        citask = nidaqmx.Task(name)
+        citask = self.__nidaqmx.Task(name)
         citaskchannel = citask.ci_channels.add_ci_count_edges_chan(
             channel,
             initial_count=0,
-            edge=nidaqmx.constants.Edge.RISING,
-            count_direction=nidaqmx.constants.CountDirection.COUNT_UP
+            edge=self.__nidaqmx.constants.Edge.RISING,
+            count_direction=self.__nidaqmx.constants.CountDirection.COUNT_UP
         )
         citaskchannel.ci_count_edges_term = terminal
         # not sure if below is needed/what is standard/if I should use DMA (seems to be preferred)
         # or INTERRUPT (as in Imspector, more load on CPU)
-        citaskchannel.ci_data_xfer_mech = nidaqmx.constants.DataTransferActiveTransferMode.DMA
+        citaskchannel.ci_data_xfer_mech = \
+            self.__nidaqmx.constants.DataTransferActiveTransferMode.DMA
 
         if acquisitionType == 'finite':
-            acqType = nidaqmx.constants.AcquisitionType.FINITE
+            acqType = self.__nidaqmx.constants.AcquisitionType.FINITE
+        elif acquisitionType == 'continuous':
+            acqType = self.__nidaqmx.constants.AcquisitionType.CONTINUOUS
         citask.timing.cfg_samp_clk_timing(source=source,
                                           rate=rate,
                                           sample_mode=acqType,
@@ -115,24 +142,27 @@ class NidaqManager(SignalInterface):
         # citask.channels.ci_ctr_timebase_master_timebase_div = 20
         if starttrig:
             citask.triggers.arm_start_trigger.dig_edge_src = reference_trigger
-            citask.triggers.arm_start_trigger.trig_type = nidaqmx.constants.TriggerType.DIGITAL_EDGE
+            citask.triggers.arm_start_trigger.trig_type = \
+                self.__nidaqmx.constants.TriggerType.DIGITAL_EDGE
 
         #self.__logger.debug(f'Created CI task: {name}')
         return citask
 
     def __createChanCOTask(self, name, channel, rate, sampsInScan=1000, starttrig=False,
-                           reference_trigger='ai/StartTrigger'):
-        cotask = nidaqmx.Task(name)
+                           reference_trigger='ai/StartTrigger', acquisitionType=None):
+        cotask = self.__nidaqmx.Task(name)
         self.cotaskchannel = cotask.co_channels.add_co_pulse_chan_freq(
-            channel, freq=rate, units=nidaqmx.constants.FrequencyUnits.HZ
+            channel, freq=rate, units=self.__nidaqmx.constants.FrequencyUnits.HZ
         )
-        # cotask.timing.cfg_implicit_timing(sample_mode=nidaqmx.constants.AcquisitionType.CONTINUOUS)
-        cotask.timing.cfg_implicit_timing(sample_mode=nidaqmx.constants.AcquisitionType.FINITE,
+        if acquisitionType is None:
+            acquisitionType = self.__nidaqmx.constants.AcquisitionType.FINITE
+        cotask.timing.cfg_implicit_timing(sample_mode=acquisitionType,
                                           samps_per_chan=sampsInScan)
 
         if starttrig:
             cotask.triggers.arm_start_trigger.dig_edge_src = reference_trigger
-            cotask.triggers.arm_start_trigger.trig_type = nidaqmx.constants.TriggerType.DIGITAL_EDGE
+            cotask.triggers.arm_start_trigger.trig_type = \
+                self.__nidaqmx.constants.TriggerType.DIGITAL_EDGE
 
         #self.__logger.debug(f'Created CO task: {name}')
         return cotask
@@ -141,7 +171,7 @@ class NidaqManager(SignalInterface):
                            min_val=-0.5, max_val=10.0, sampsInScan=1000, starttrig=False,
                            reference_trigger='ai/StartTrigger'):
         """ Simplified function to create an analog input task """
-        aitask = nidaqmx.Task(name)
+        aitask = self.__nidaqmx.Task(name)
         for channel in channels:
             aitask.ai_channels.add_ai_voltage_chan(channel)
         aitask.timing.cfg_samp_clk_timing(source=source,
@@ -168,6 +198,7 @@ class NidaqManager(SignalInterface):
         else:
             return self.tasks[taskName].read(samples, timeout)
 
+    @Instrumentation.timed('NidaqManager.setDigital')
     def setDigital(self, target, enable):
         """ Function to set the digital line to a specific target
         to either "high" or "low" voltage """
@@ -175,37 +206,9 @@ class NidaqManager(SignalInterface):
         if line is None:
             raise NidaqManagerError('Target has no digital output assigned to it')
         else:
-            if not self.busy:
-                self.busy = True
-                try:
-                    acquisitionTypeFinite = nidaqmx.constants.AcquisitionType.FINITE
-                    tasklen = 100
-                    dotask = self.__createLineDOTask('setDigitalTask',
-                                                        line,
-                                                        acquisitionTypeFinite,
-                                                        r'100kHzTimebase',
-                                                        100000,
-                                                        tasklen,
-                                                        False)
-                    # signal = np.array([enable])
-                    signal = enable * np.ones(tasklen, dtype=bool)
-                    try:
-                        dotask.write(signal, auto_start=True)
-                    except Exception:
-                        self.__logger.exception(Exception)
-                        self.__logger.warning(
-                            'Attempted writing digital data that is too large or too small, or other'
-                            ' error when writing the task.'
-                        )
-                    dotask.wait_until_done()
-                    dotask.stop()
-                    dotask.close()
-                except (nidaqmx._lib.DaqNotFoundError, nidaqmx._lib.DaqFunctionNotSupportedError,
-                        nidaqmx.DaqError) as e:
-                    warnings.warn(str(e), RuntimeWarning)
-                finally:
-                    self.busy = False
+            self.__writeStatic(('do', line), lambda: self.__createStaticDOTask(line), bool(enable))
 
+    @Instrumentation.timed('NidaqManager.setAnalog')
     def setAnalog(self, target, voltage, min_val=-1, max_val=1):
         """ Function to set the analog channel to a specific target
         to a certain voltage """
@@ -213,168 +216,271 @@ class NidaqManager(SignalInterface):
         if channel is None:
             raise NidaqManagerError('Target has no analog output assigned to it')
         else:
-            if not self.busy:
-                self.busy = True
+            self.__writeStatic(('ao', channel, min_val, max_val),
+                               lambda: self.__createStaticAOTask(channel, min_val, max_val),
+                               float(voltage))
+
+    def __writeStatic(self, key, createTask, value):
+        """ Writes a single value to the on-demand task for a line or channel.
+        The task is created on first use and kept open, so that later writes
+        don't have to wait for the driver to set up a task. Writes are
+        ignored while a scan is using the outputs. """
+        with self.__staticTasksLock:
+            if self.busy:
+                return
+
+            try:
+                task = self.__staticTasks.get(key)
+                if task is None:
+                    # A channel only has one task, e.g. when its range has changed
+                    for otherKey in [otherKey for otherKey in self.__staticTasks
+                                     if otherKey[:2] == key[:2]]:
+                        self.__staticTasks.pop(otherKey).close()
+
+                    task = createTask()
+                    self.__staticTasks[key] = task
+                    task.start()
+
+                try:
+                    task.write(value)
+                except self.__nidaqmx.DaqError:
+                    # Recreate the task on the next write, in case it's no longer usable
+                    self.__staticTasks.pop(key).close()
+                    raise
+            except (self.__nidaqmx._lib.DaqNotFoundError,
+                    self.__nidaqmx._lib.DaqFunctionNotSupportedError,
+                    self.__nidaqmx.DaqError) as e:
+                warnings.warn(str(e), RuntimeWarning)
+
+    def __releaseStaticTasks(self):
+        """ Closes the on-demand tasks, so that the lines and channels can be
+        used by a hardware-timed task. They are recreated by the next
+        setDigital/setAnalog call after it has finished. """
+        with self.__staticTasksLock:
+            for task in self.__staticTasks.values():
                 try:
-                    acquisitionTypeFinite = nidaqmx.constants.AcquisitionType.FINITE
-                    tasklen = 10
-                    aotask = self.__createChanAOTask('setAnalogTask',
-                                                     channel,
-                                                     acquisitionTypeFinite,
-                                                     r'100kHzTimebase',
-                                                     100000, min_val, max_val, tasklen, False)
-
-                    signal = voltage * np.ones(tasklen, dtype=float)
-                    try:
-                        aotask.write(signal, auto_start=True)
-                    except Exception:
-                        self.__logger.error(
-                            'Attempted writing analog data that is too large or too small, or other'
-                            ' error when writing the task.'
-                        )
-                    aotask.wait_until_done()
-                    aotask.stop()
-                    aotask.close()
-                except (nidaqmx._lib.DaqNotFoundError, nidaqmx._lib.DaqFunctionNotSupportedError,
-                        nidaqmx.DaqError) as e:
-                    warnings.warn(str(e), RuntimeWarning)
-                finally:
-                    self.busy = False
-
-    def runScan(self, signalDic, scanInfoDict):
+                    task.close()
+                except self.__nidaqmx.DaqError:
+                    self.__logger.warning('Failed to close static output task')
+            self.__staticTasks = {}
+
+    def __createStaticDOTask(self, line):
+        """ Creates an on-demand (software-timed) digital output task """
+        dotask = self.__nidaqmx.Task()
+        dotask.do_channels.add_do_chan(line)
+        return dotask
+
+    def __createStaticAOTask(self, channel, min_val, max_val):
+        """ Creates an on-demand (software-timed) analog output task """
+        aotask = self.__nidaqmx.Task()
+        aotask.ao_channels.add_ao_voltage_chan(channel, min_val=min_val, max_val=max_val)
+        return aotask
+
+    @Instrumentation.timed('NidaqManager.runScan')
+    def runScan(self, signalDic, scanInfoDict, repetitions=1):
         """ Function assuming that the user wants to run a full scan with a stage
         controlled by analog voltage outputs and a cycle of TTL pulses continuously
-        running. """
+        running. The scan is run the given number of times back to back, or
+        until stopScan is called if repetitions is None. """
         if not self.busy:
-            self.busy = True
+            with self.__staticTasksLock:
+                self.busy = True
+            self.__releaseStaticTasks()
             self.signalSent = False
             self.__logger.debug('Create nidaq scan...')
 
             try:
-                # TODO: fill this
-                stageDic = signalDic['scanSignalsDict']
-                ttlDic = signalDic['TTLCycleSignalsDict']
-
-                AOTargetChanPairs = self.__makeSortedTargets('getAnalogChannel')
-                AOdevices = []
-                AOsignals = []
-                AOchannels = []
-
-                for device, channel in AOTargetChanPairs:
-                    #self.__logger.debug(f'Device {device}, channel {channel} is part of scan')
-                    if device not in stageDic:
-                        continue
-                    AOdevices.append(device)
-                    AOsignals.append(stageDic[device])
-                    AOchannels.append(channel)
-
-                DOTargetChanPairs = self.__makeSortedTargets('getDigitalLine')
-                DOdevices = []
-                DOsignals = []
-                DOlines = []
-
-                for device, line in DOTargetChanPairs:
-                    if device not in ttlDic or 'Dev' not in line:
-                        continue
-                    DOdevices.append(device)
-                    DOsignals.append(ttlDic[device])
-                    DOlines.append(line)
-                
-                # check if line and frame clock should be outputted, if so add to DO lists
-                if self.__setupInfo.scan.lineClockLine:
-                    DOdevices.append('LineClock')
-                    DOsignals.append(ttlDic['line_clock'])
-                    DOlines.append(self.__setupInfo.scan.lineClockLine)
-                if self.__setupInfo.scan.frameClockLine:
-                    DOdevices.append('FrameClock')
-                    DOsignals.append(ttlDic['frame_clock'])
-                    DOlines.append(self.__setupInfo.scan.frameClockLine)
-
+                AOdevices, AOsignals, AOchannels = self.__getScanAOSignals(
+                    signalDic['scanSignalsDict']
+                )
+                DOdevices, DOsignals, DOlines = self.__getScanDOSignals(
+                    signalDic['TTLCycleSignalsDict']
+                )
                 if len(AOsignals) < 1 and len(DOsignals) < 1:
                     raise NidaqManagerError('No signals to send')
 
+                acquisitionType = self.__resetRepetitions(repetitions)
+
+                # only the first output task reports progress, the other tasks share its clock
+                onTransferred = self.__outputTransferred if repetitions != 1 else None
+
                 # create task waiters and change constants for beginning scan
-                self.aoTaskWaiter = WaitThread()
-                self.doTaskWaiter = WaitThread()
+                self.aoTaskWaiter = WaitThread(self.__nidaqmx)
+                self.doTaskWaiter = WaitThread(self.__nidaqmx)
                 if self.__timerCounterChannel is not None:
-                    self.timerTaskWaiter = WaitThread()
-                    # create timer counter output task, to control the acquisition timing (1 MHz)
-                    detSampsInScan = int(
-                        len(AOsignals[0] if len(AOsignals) > 0 else DOsignals[0]) * (1e6/100e3)
+                    self.__createScanTimerTask(
+                        len(AOsignals[0] if len(AOsignals) > 0 else DOsignals[0]),
+                        repetitions, acquisitionType
                     )
-                    #self.__logger.debug(f'Total detection samples in scan: {detSampsInScan}')
-                    self.timerTask = self.__createChanCOTask(
-                        'TimerTask', channel=self.__timerCounterChannel, rate=1e6,
-                        sampsInScan=detSampsInScan, starttrig=self.__startTrigger,
-                        reference_trigger='ao/StartTrigger'
-                    )
-                    self.timerTaskWaiter.connect(self.timerTask)
-                    self.timerTaskWaiter.sigWaitDone.connect(
-                        lambda: self.taskDone('timer', self.timerTaskWaiter)
-                    )
-                    self.tasks['timer'] = self.timerTask
-                acquisitionTypeFinite = nidaqmx.constants.AcquisitionType.FINITE
-                scanclock = r'100kHzTimebase'
-                clockDO = scanclock
+                clockDO = r'100kHzTimebase'
                 if len(AOsignals) > 0:
-                    scanSampsInScan = len(AOsignals[0])
-                    self.__logger.debug(f'Total scan samples in scan: {scanSampsInScan}')
-                    self.aoTask = self.__createChanAOTask('ScanAOTask', AOchannels,
-                                                          acquisitionTypeFinite, scanclock,
-                                                          100000, min_val=-10, max_val=10,
-                                                          sampsInScan=scanSampsInScan,
-                                                          starttrig=False)
-                    self.tasks['ao'] = self.aoTask
-
-                    # Important to squeeze the array, otherwise we might get an "invalid number of
-                    # channels" error
-                    self.aoTask.write(np.array(AOsignals).squeeze(), auto_start=False)
-
-                    self.aoTaskWaiter.connect(self.aoTask)
-                    self.aoTaskWaiter.sigWaitDone.connect(
-                        lambda: self.taskDone('ao', self.aoTaskWaiter)
-                    )
+                    self.__createScanAOTask(AOchannels, AOsignals, repetitions, acquisitionType,
+                                            onTransferred)
+                    onTransferred = None
                     clockDO = r'ao/SampleClock'
                 if len(DOsignals) > 0:
-                    scanSampsInScan = len(DOsignals[0])
-                    self.doTask = self.__createLineDOTask('ScanDOTask', DOlines,
-                                                          acquisitionTypeFinite, clockDO,
-                                                          100000, sampsInScan=scanSampsInScan,
-                                                          starttrig=self.__startTrigger,
-                                                          reference_trigger='ao/StartTrigger')
-                    self.tasks['do'] = self.doTask
-
-                    # Important to squeeze the array, otherwise we might get an "invalid number of
-                    # channels" error
-                    self.doTask.write(np.array(DOsignals).squeeze(), auto_start=False)
-
-                    self.doTaskWaiter.connect(self.doTask)
-                    self.doTaskWaiter.sigWaitDone.connect(
-                        lambda: self.taskDone('do', self.doTaskWaiter)
-                    )
+                    self.__createScanDOTask(DOlines, DOsignals, repetitions, acquisitionType,
+                                            clockDO, onTransferred)
             except Exception:
                 self.__logger.error(traceback.format_exc())
+                self.__closeOutputWriters()
                 for task in self.tasks.values():
                     task.close()
                 self.tasks = {}
                 self.busy = False
                 self.sigScanBuildFailed.emit()
             else:
-                self.sigScanBuilt.emit(scanInfoDict, signalDic, AOdevices + DOdevices)
-
-                if self.__timerCounterChannel is not None:
-                    self.tasks['timer'].start()
-                    self.timerTaskWaiter.start()
-                if len(DOsignals) > 0:
-                    self.tasks['do'].start()
-                    self.doTaskWaiter.start()
-
-                if len(AOsignals) > 0:
-                    self.tasks['ao'].start()
-                    self.aoTaskWaiter.start()
+                self.sigScanBuilt.emit(dict(scanInfoDict, repetitions=repetitions), signalDic,
+                                       AOdevices + DOdevices)
+                self.__startScanTasks()
                 self.sigScanStarted.emit()
                 self.__logger.info('Nidaq scan started!')
 
+    def __getScanAOSignals(self, stageDic):
+        """ Returns the devices, signals and channels of the analog outputs
+        that are part of the scan. """
+        AOdevices = []
+        AOsignals = []
+        AOchannels = []
+
+        for device, channel in self.__makeSortedTargets('getAnalogChannel'):
+            if device not in stageDic:
+                continue
+            AOdevices.append(device)
+            AOsignals.append(stageDic[device])
+            AOchannels.append(channel)
+
+        return AOdevices, AOsignals, AOchannels
+
+    def __getScanDOSignals(self, ttlDic):
+        """ Returns the devices, signals and lines of the digital outputs that
+        are part of the scan, including the line and frame clocks. """
+        DOdevices = []
+        DOsignals = []
+        DOlines = []
+
+        for device, line in self.__makeSortedTargets('getDigitalLine'):
+            if device not in ttlDic or 'Dev' not in line:
+                continue
+            DOdevices.append(device)
+            DOsignals.append(ttlDic[device])
+            DOlines.append(line)
+
+        # check if line and frame clock should be outputted, if so add to DO lists
+        if self.__setupInfo.scan.lineClockLine:
+            DOdevices.append('LineClock')
+            DOsignals.append(ttlDic['line_clock'])
+            DOlines.append(self.__setupInfo.scan.lineClockLine)
+        if self.__setupInfo.scan.frameClockLine:
+            DOdevices.append('FrameClock')
+            DOsignals.append(ttlDic['frame_clock'])
+            DOlines.append(self.__setupInfo.scan.frameClockLine)
+
+        return DOdevices, DOsignals, DOlines
+
+    def __resetRepetitions(self, repetitions):
+        """ Resets the output streaming state for a scan that is run the given
+        number of times, and returns the acquisition type of its tasks. """
+        self.__outputWriters = []
+        self.__repetitions = repetitions
+        self.__repetitionsDone = 0
+        self.__samplesTransferred = 0
+        if repetitions is None:
+            return self.__nidaqmx.constants.AcquisitionType.CONTINUOUS
+        else:
+            return self.__nidaqmx.constants.AcquisitionType.FINITE
+
+    def __createScanTimerTask(self, periodSamples, repetitions, acquisitionType):
+        """ Creates the timer counter output task, which controls the
+        acquisition timing (1 MHz). """
+        self.timerTaskWaiter = WaitThread(self.__nidaqmx)
+        detSampsInScan = int(periodSamples * (1e6/100e3)) * (repetitions or 1)
+        self.timerTask = self.__createChanCOTask(
+            'TimerTask', channel=self.__timerCounterChannel, rate=1e6,
+            sampsInScan=detSampsInScan, starttrig=self.__startTrigger,
+            reference_trigger='ao/StartTrigger', acquisitionType=acquisitionType
+        )
+        self.timerTaskWaiter.connect(self.timerTask)
+        self.timerTaskWaiter.sigWaitDone.connect(
+            lambda: self.taskDone('timer', self.timerTaskWaiter)
+        )
+        self.tasks['timer'] = self.timerTask
+
+    def __createScanAOTask(self, AOchannels, AOsignals, repetitions, acquisitionType,
+                           onTransferred):
+        """ Creates the analog output task of a scan, and fills its buffer
+        with the start of the signals. """
+        aoStream = SignalStream(AOsignals, repetitions)
+        self.__logger.debug(f'Scan samples per repetition: {aoStream.periodSamples}')
+        self.aoTask = self.__createChanAOTask('ScanAOTask', AOchannels,
+                                              acquisitionType, r'100kHzTimebase',
+                                              100000, min_val=-10, max_val=10,
+                                              sampsInScan=(aoStream.totalSamples or
+                                                           aoStream.periodSamples),
+                                              starttrig=False)
+        self.tasks['ao'] = self.aoTask
+        self.__addOutputWriter(self.aoTask, aoStream, onTransferred)
+
+        self.aoTaskWaiter.connect(self.aoTask)
+        self.aoTaskWaiter.sigWaitDone.connect(
+            lambda: self.taskDone('ao', self.aoTaskWaiter)
+        )
+
+    def __createScanDOTask(self, DOlines, DOsignals, repetitions, acquisitionType, clockDO,
+                           onTransferred):
+        """ Creates the digital output task of a scan, and fills its buffer
+        with the start of the signals. """
+        doStream = SignalStream(DOsignals, repetitions)
+        self.doTask = self.__createLineDOTask('ScanDOTask', DOlines,
+                                              acquisitionType, clockDO,
+                                              100000,
+                                              sampsInScan=(doStream.totalSamples or
+                                                           doStream.periodSamples),
+                                              starttrig=self.__startTrigger,
+                                              reference_trigger='ao/StartTrigger')
+        self.tasks['do'] = self.doTask
+        self.__addOutputWriter(self.doTask, doStream, onTransferred)
+
+        self.doTaskWaiter.connect(self.doTask)
+        self.doTaskWaiter.sigWaitDone.connect(
+            lambda: self.taskDone('do', self.doTaskWaiter)
+        )
+
+    def __addOutputWriter(self, task, stream, onTransferred):
+        writer = _OutputStreamWriter(self.__nidaqmx, task, stream, onTransferred)
+        self.__outputWriters.append(writer)
+        writer.prime()
+
+    def __startScanTasks(self):
+        """ Starts the tasks of a scan that has been built. The analog output
+        task is started last, since the other tasks are triggered by it. """
+        if 'timer' in self.tasks:
+            self.tasks['timer'].start()
+            self.timerTaskWaiter.start()
+        if 'do' in self.tasks:
+            self.tasks['do'].start()
+            self.doTaskWaiter.start()
+        if 'ao' in self.tasks:
+            self.tasks['ao'].start()
+            self.aoTaskWaiter.start()
+
+    def stopScan(self):
+        """ Stops the running scan before it has finished, e.g. a scan that is
+        repeated until stopped. """
+        if not self.busy or self.signalSent or self.continuousTask is not None:
+            return
+
+        self.signalSent = True  # Tasks that finish from now on are handled here
+        self.sigScanStopping.emit()
+        self.__closeOutputWriters()
+        for taskName in list(self.tasks.keys()):
+            try:
+                self.stopTask(taskName)
+            except self.__nidaqmx.DaqError:
+                self.__logger.warning(f'Failed to stop task "{taskName}"')
+        self.tasks = {}
+        self.scanDone()
+
     def stopTask(self, taskName):
         self.tasks[taskName].stop()
         self.tasks[taskName].close()
@@ -388,35 +494,270 @@ class NidaqManager(SignalInterface):
 
     def taskDone(self, taskName, taskWaiter):
         if not taskWaiter.running and not self.signalSent:
+            if taskWaiter.error is not None:
+                # E.g. the output buffer ran empty, stop the tasks that are still waiting for it
+                self.__logger.error(f'Nidaq task "{taskName}" failed: {taskWaiter.error}')
+                self.stopScan()
+                return
+
             self.stopTask(taskName)
             if not self.tasks:
                 self.scanDone()
 
     def scanDone(self):
         self.signalSent = True
+        self.__closeOutputWriters()
         self.busy = False
         self.__logger.info('Nidaq scan finished!')
         self.sigScanDone.emit()
 
     def runContinuous(self, digital_targets, digital_signals):
-        pass
+        """ Outputs the given digital signals on the lines of the given
+        targets, repeating them until stopContinuous is called. The signals
+        are written to the device once and regenerated by it. """
+        if self.busy:
+            return
+
+        lines = []
+        for target in digital_targets:
+            line = self.__setupInfo.getDevice(target).getDigitalLine()
+            if line is None:
+                raise NidaqManagerError(f'Target {target} has no digital output assigned to it')
+            lines.append(line)
+
+        with self.__staticTasksLock:
+            self.busy = True
+        self.__releaseStaticTasks()
+        try:
+            signals = np.array(digital_signals, dtype=bool).reshape(len(lines), -1)
+            self.continuousTask = self.__createLineDOTask(
+                'ContinuousDOTask', lines, self.__nidaqmx.constants.AcquisitionType.CONTINUOUS,
+                r'100kHzTimebase', 100000, sampsInScan=signals.shape[1]
+            )
+            self.continuousTask.out_stream.regen_mode = \
+                self.__nidaqmx.constants.RegenerationMode.ALLOW_REGENERATION
+            self.continuousTask.write(signals[0] if len(signals) == 1 else signals,
+                                      auto_start=False)
+            self.continuousTask.start()
+        except Exception:
+            self.__logger.error(traceback.format_exc())
+            if self.continuousTask is not None:
+                self.continuousTask.close()
+                self.continuousTask = None
+            self.busy = False
+
+    def stopContinuous(self):
+        """ Stops the output started by runContinuous. """
+        if self.continuousTask is None:
+            return
+
+        try:
+            self.continuousTask.stop()
+            self.continuousTask.close()
+        finally:
+            self.continuousTask = None
+            self.busy = False
+
+    def __outputTransferred(self, numSamples):
+        """ Called from the NI-DAQmx callback thread as the samples of the
+        first output task are transferred to the device, which happens just
+        ahead of them being generated. """
+        self.__samplesTransferred += numSamples
+        periodSamples = self.__outputWriters[0].stream.periodSamples
+        while (self.__samplesTransferred >= (self.__repetitionsDone + 1) * periodSamples and
+               (self.__repetitions is None or
+                self.__repetitionsDone + 1 < self.__repetitions)):
+            self.__repetitionsDone += 1
+            self.sigScanRepetitionDone.emit(self.__repetitionsDone)
+
+    def __closeOutputWriters(self):
+        for writer in self.__outputWriters:
+            writer.close()
+        self.__outputWriters = []
+
+
+class SignalStream:
+    """ The samples of a set of output signals, one row per channel, repeated
+    the given number of times (or endlessly if repetitions is None). They are
+    read block by block, so that they can be written to a task while it is
+    running instead of all at once. The signals are arrays or compact signals,
+    the samples of compact signals are only generated for the blocks read. """
+
+    def __init__(self, signals, repetitions=1):
+        self._signals = [signal if isinstance(signal, CompactSignal) else np.asarray(signal)
+                         for signal in signals]
+        self._dtype = np.result_type(*[signal.dtype for signal in self._signals])
+        self.repetitions = repetitions
+
+    @property
+    def numChannels(self):
+        return len(self._signals)
+
+    @property
+    def periodSamples(self):
+        """ Number of samples per channel in one repetition. """
+        return len(self._signals[0])
+
+    @property
+    def totalSamples(self):
+        """ Number of samples per channel in all repetitions, None if the
+        signals are repeated endlessly. """
+        if self.repetitions is None:
+            return None
+        return self.periodSamples * self.repetitions
+
+    def getPeriod(self):
+        """ Returns the samples of one repetition. """
+        return self.getBlock(0, self.periodSamples)
+
+    def getBlock(self, start, stop):
+        """ Returns the samples from index start up to stop, counted from the
+        beginning of the first repetition. """
+        indices = np.arange(start, stop) % self.periodSamples
+        block = np.empty((self.numChannels, len(indices)), dtype=self._dtype)
+        for channel, signal in enumerate(self._signals):
+            block[channel] = signal.take(indices)
+        return block
+
+    def blocks(self, blockSamples):
+        """ Yields the samples of all repetitions in blocks of blockSamples
+        samples per channel. The last block may be shorter. """
+        start = 0
+        totalSamples = self.totalSamples
+        while totalSamples is None or start < totalSamples:
+            stop = start + blockSamples
+            if totalSamples is not None:
+                stop = min(stop, totalSamples)
+            yield self.getBlock(start, stop)
+            start = stop
+
+
+class _OutputStreamWriter:
+    """ Writes a SignalStream to an output task. If one repetition fits in
+    the buffer, it's written once and regenerated by the device. Otherwise,
+    blocks are generated on a producer thread a little ahead of time and
+    written from the task's every-N-samples callback as the device consumes
+    the buffer, so that host memory use doesn't depend on the scan length. """
+
+    def __init__(self, nidaqmxModule, task, stream, onTransferred=None):
+        self.__logger = initLogger(self, tryInheritParent=True)
+        self.nidaqmx = nidaqmxModule
+        self.task = task
+        self.stream = stream
+        self.regenerate = stream.periodSamples <= _maxRegenerationSamples
+        self.underruns = 0
+
+        self._onTransferred = onTransferred
+        self._blocks = None
+        self._blocksDue = 0
+        self._queue = queue.Queue(_streamQueueBlocks)
+        self._producer = None
+        self._stopEvent = threading.Event()
+
+    def prime(self):
+        """ Writes the initial samples to the task's buffer. Must be called
+        before the task is started. """
+        if self.regenerate:
+            self._write(self.stream.getPeriod())
+            if self._onTransferred is not None:
+                self.task.register_every_n_samples_transferred_from_buffer_event(
+                    self.stream.periodSamples, self._transferred
+                )
+            return
+
+        # Without regeneration, the device stops with an error if it runs out of samples rather
+        # than outputting old ones again
+        self.task.out_stream.regen_mode = \
+            self.nidaqmx.constants.RegenerationMode.DONT_ALLOW_REGENERATION
+        self.task.out_stream.output_buf_size = _streamBlockSamples * _streamBufferBlocks
+        self._blocks = self.stream.blocks(_streamBlockSamples)
+        for block in itertools.islice(self._blocks, _streamBufferBlocks):
+            self._write(block)
+
+        self.task.register_every_n_samples_transferred_from_buffer_event(
+            _streamBlockSamples, self._transferred
+        )
+        self._producer = threading.Thread(target=self._produce, name=f'{self.task.name}Producer',
+                                          daemon=True)
+        self._producer.start()
+
+    def close(self):
+        """ Stops generating blocks. """
+        self._stopEvent.set()
+        if self._producer is not None:
+            self._producer.join()
+            self._producer = None
+
+    def _produce(self):
+        for block in self._blocks:
+            while not self._stopEvent.is_set():
+                try:
+                    self._queue.put(block, timeout=_producerPollInterval)
+                    break
+                except queue.Full:
+                    pass
+            else:
+                return
+
+    def _transferred(self, taskHandle, eventType, numSamples, callbackData):
+        if self._onTransferred is not None:
+            self._onTransferred(numSamples)
+
+        if self._blocks is not None:
+            # A block of space has been freed in the buffer, refill it with the next block. If
+            # the producer fell behind earlier, catch up with the blocks that are due.
+            self._blocksDue += 1
+            while self._blocksDue > 0:
+                try:
+                    if self._blocksDue >= _streamBufferBlocks - 1:
+                        # The buffer is about to run empty, give the producer a moment
+                        block = self._queue.get(timeout=_producerPollInterval)
+                    else:
+                        block = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._write(block)
+                self._blocksDue -= 1
+
+            if self._blocksDue > 0 and self._producer is not None and self._producer.is_alive():
+                self.underruns += 1
+                Instrumentation.count('NidaqManager.streamUnderruns', task=self.task.name)
+                if self.underruns == 1:
+                    self.__logger.warning(
+                        f'Signal generation for task "{self.task.name}" is falling behind the'
+                        f' output; {_streamBufferBlocks - self._blocksDue} of'
+                        f' {_streamBufferBlocks} blocks left in the buffer'
+                    )
+        return 0
+
+    def _write(self, block):
+        # Important to squeeze the array, otherwise we might get an "invalid number of
+        # channels" error
+        self.task.write(block[0] if len(block) == 1 else block, auto_start=False)
 
 
 class WaitThread(Thread):
     sigWaitDone = Signal()
 
-    def __init__(self, *args, **lowLevelManagers):
+    def __init__(self, nidaqmxModule=nidaqmx, *args, **lowLevelManagers):
         super().__init__(*args, **lowLevelManagers)
+        self.nidaqmx = nidaqmxModule
         self.task = None
         self.running = False
+        self.error = None
 
     def connect(self, task):
         self.task = task
         self.running = True
+        self.error = None
 
     def run(self):
         if self.running:
-            self.task.wait_until_done(nidaqmx.constants.WAIT_INFINITELY)
+            try:
+                self.task.wait_until_done(self.nidaqmx.constants.WAIT_INFINITELY)
+            except self.nidaqmx.DaqError as e:
+                # The task failed, or it was stopped by stopScan
+                self.error = e
             self.close()
         else:
             self.quit()
@@ -434,6 +775,13 @@ class NidaqManagerError(Exception):
         self.message = message
 
 
+_maxRegenerationSamples = 2 ** 20  # per channel, scans longer than this are streamed
+_streamBlockSamples = 10000
+_streamBufferBlocks = 10
+_streamQueueBlocks = 20
+_producerPollInterval = 0.1
+
+
 # Copyright (C) 2020-2021 ImSwitch developers
 # This file is part of ImSwitch.
 #
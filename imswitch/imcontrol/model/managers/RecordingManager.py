@@ -1,22 +1,30 @@
 import enum
 import os
+import tempfile
+import threading
 import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
 from io import BytesIO
 from typing import Dict, Optional, Type, List
 
 import h5py
+import numcodecs
 import zarr
 import numpy as np
 import tifffile as tiff
 
-from imswitch.imcommon.framework import Signal, SignalInterface, Thread, Worker
-from imswitch.imcommon.model import initLogger
+from imswitch.imcommon.framework import Instrumentation, Signal, SignalInterface, Thread, Worker
+from imswitch.imcommon.model import VArrayFile, initLogger
 from ome_zarr.writer import write_multiscales_metadata
 from ome_zarr.format import format_from_version
 import abc
 import logging
 
 from imswitch.imcontrol.model.managers.DetectorsManager import DetectorsManager
+from imswitch.imcontrol.model.managers.detectors.DetectorManager import createFrameMetadata
 
 logger = logging.getLogger(__name__)
 
@@ -36,23 +44,183 @@ class AsTemporayFile(object):
         os.rename(self.tmp_path, self.path)
 
 
+@dataclass
+class _Stream:
+    """ State of a stream opened with Storer.openStream. """
+    file: object
+    fileKey: object
+    dataset: object = None
+    datasetName: str = None
+    path: str = None
+    numFrames: int = 0
+    capacity: int = 0
+    pending: List[np.ndarray] = field(default_factory=list)
+    writer: object = None
+    attrs: Dict[str, str] = None
+    numFileFrames: int = 0
+    numFileBytes: int = 0
+    frameMetadata: List[np.ndarray] = field(default_factory=list)
+    hasFrameMetadata: bool = False
+    append: bool = False
+
+
 class Storer(abc.ABC):
     """ Base class for storing data"""
+
+    streamExtension: str = None
+    """ File extension used for streamed recordings. """
+
+    canStreamToMemory: bool = False
+    """ Whether streams can be written to file-like objects in addition to
+    file paths. """
+
+    canShareStreamFiles: bool = True
+    """ Whether streams of several channels can be written to the same file.
+    """
+
     def __init__(self, filepath, detectorManager):
         self.filepath = filepath
         self.detectorManager: DetectorsManager = detectorManager
+        self._streams: Dict[str, _Stream] = {}
+        self._files = {}  # { fileKey: [file, numOpenStreams] }
 
     def snap(self, images: Dict[str, np.ndarray], attrs: Dict[str, str] = None):
         """ Stores images and attributes according to the spec of the storer """
         raise NotImplementedError
 
-    def stream(self, data = None, **kwargs):
-        """ Stores data in a streaming fashion. """
+    def openStream(self, channel: str, file, attrs: Dict[str, str] = None, *,
+                   numFrames: Optional[int] = None, appendScan: bool = False):
+        """ Opens a stream that frames from the specified channel can be
+        appended to with stream(). file is the path (or, if the storer can
+        stream to memory, the file-like object) to write to; streams opened
+        with the same file share it. If the total number of frames is known,
+        it can be passed as numFrames so that the space can be allocated up
+        front. If appendScan is True, the frames are added to the file as a
+        new dataset named after the channel and the scan number instead of
+        replacing the file. """
+        raise NotImplementedError
+
+    def stream(self, data: Dict[str, np.ndarray] = None,
+               metadata: Dict[str, np.ndarray] = None, **kwargs):
+        """ Stores data in a streaming fashion. data maps channel names to
+        chunks of frames of shape (numFrames, height, width), which are
+        appended to the streams previously opened for those channels.
+        metadata may map channel names to per-frame metadata records (see
+        DetectorManager.getChunkWithMetadata) for the chunks; these are saved
+        as a table alongside the frames when the stream is closed. """
+        raise NotImplementedError
+
+    def flushStream(self, channel: str):
+        """ Makes sure that the frames streamed so far from the specified
+        channel have been passed on to the file. """
+        pass
+
+    def closeStream(self, channel: str, attrs: Dict[str, str] = None, closeFile: bool = True):
+        """ Finalizes the stream of the specified channel, trimming any space
+        that was allocated but not used and updating the metadata with attrs.
+        Unless closeFile is False, the file is closed once all streams sharing
+        it have been closed. Returns the file object of the stream. """
         raise NotImplementedError
 
+    def getNumStreamedFrames(self, channel: str) -> int:
+        """ Returns the number of frames streamed from the specified channel
+        so far. """
+        return self._streams[channel].numFrames
+
+    def _addFrameMetadata(self, stream, numFrames, metadata):
+        """ Keeps the metadata records of a chunk of frames until the stream
+        is closed. Chunks without metadata get placeholder records, so that
+        the table has a row per frame. """
+        if metadata is not None:
+            stream.hasFrameMetadata = True
+        else:
+            metadata = createFrameMetadata(
+                numFrames,
+                frameNumbers=np.arange(stream.numFrames, stream.numFrames + numFrames)
+            )
+        stream.frameMetadata.append(metadata)
+
+    def _getFrameMetadata(self, stream):
+        """ Returns the metadata table of a stream, or None if no metadata
+        has been streamed. """
+        if not stream.hasFrameMetadata:
+            return None
+        return np.concatenate(stream.frameMetadata)
+
+    def _getFrameShape(self, channel):
+        """ Returns the (height, width) shape of the frames of the specified
+        channel. """
+        shape = self.detectorManager[channel].shape
+        if len(shape) > 2:
+            shape = shape[-2:]
+        return tuple(reversed(shape))
+
+    def _acquireFile(self, file, openFunc):
+        """ Returns the opened file for file, opening it with openFunc if no
+        other stream is using it. """
+        fileKey = file if isinstance(file, str) else id(file)
+        if fileKey not in self._files:
+            self._files[fileKey] = [openFunc(), 0]
+        self._files[fileKey][1] += 1
+        return fileKey, self._files[fileKey][0]
+
+    def _releaseFile(self, fileKey):
+        """ Releases a file acquired with _acquireFile. Returns whether no
+        streams are using the file anymore. """
+        self._files[fileKey][1] -= 1
+        if self._files[fileKey][1] < 1:
+            del self._files[fileKey]
+            return True
+        return False
+
+    @staticmethod
+    def _getGrownCapacity(capacity, requiredCapacity):
+        """ Returns the number of frames to allocate space for when the
+        current capacity is not enough. Space is allocated in large steps so
+        that datasets don't have to be resized for every chunk. """
+        return max(requiredCapacity, capacity + max(_streamGrowthFrames, capacity // 2))
+
+    @staticmethod
+    def _getScanDatasetName(existingNames, channel):
+        scanNum = 0
+        while f'{channel}_scan{scanNum}' in existingNames:
+            scanNum += 1
+        return f'{channel}_scan{scanNum}'
+
 
 class ZarrStorer(Storer):
-    """ A storer that stores the images in a zarr file store """
+    """ A storer that stores the images in a zarr file store.
+
+    Options:
+
+    - ``chunkFrames`` -- number of frames per chunk along the time axis
+    - ``chunkShape`` -- ``(height, width)`` of the chunks in pixels
+    - ``dtype`` -- data type to store the images as; if None, the data type of
+      the images is kept
+    - ``compressor`` -- one of ``'blosc-lz4'``, ``'blosc-zstd'``, ``'zstd'``
+      or None for no compression
+    - ``compressionLevel`` -- compression level passed to the compressor
+    - ``bitshuffle`` -- whether Blosc compressors should shuffle bits instead
+      of bytes before compressing
+    - ``nestedDirectories`` -- whether to store the chunks in nested
+      directories (one per chunk index) instead of all in one directory
+    - ``numEncodeThreads`` -- number of threads to compress chunks with
+    """
+
+    streamExtension = 'zarr'
+
+    def __init__(self, filepath, detectorManager, *, chunkFrames=1, chunkShape=(512, 512),
+                 dtype=None, compressor='blosc-lz4', compressionLevel=5, bitshuffle=False,
+                 nestedDirectories=False, numEncodeThreads=1):
+        super().__init__(filepath, detectorManager)
+        self._chunkFrames = chunkFrames
+        self._chunkShape = tuple(chunkShape)
+        self._dtype = dtype
+        self._compressor = self._getCompressor(compressor, compressionLevel, bitshuffle)
+        self._dimensionSeparator = '/' if nestedDirectories else '.'
+        self._encodePool = (ThreadPoolExecutor(max_workers=numEncodeThreads)
+                            if numEncodeThreads > 1 else None)
+
     def snap(self, images: Dict[str, np.ndarray], attrs: Dict[str, str] = None):
         with AsTemporayFile(f'{self.filepath}.zarr') as path:
             datasets: List[dict] = []
@@ -62,32 +230,149 @@ class ZarrStorer(Storer):
             for channel, image in images.items():
                 shape = self.detectorManager[channel].shape
                 root.create_dataset(channel, data=image, shape=tuple(reversed(shape)),
-                                        chunks=(512, 512), dtype='i2') #TODO: why not dynamic chunking?
+                                    chunks=self._chunkShape, dtype=self._getDtype(image.dtype),
+                                    compressor=self._compressor,
+                                    dimension_separator=self._dimensionSeparator)
 
                 datasets.append({"path": channel, "transformation": None})
             write_multiscales_metadata(root, datasets, format_from_version("0.2"), shape, **attrs)
             logger.info(f"Saved image to zarr file {path}")
 
+    def openStream(self, channel, file, attrs=None, *, numFrames=None, appendScan=False):
+        attrs = attrs if attrs is not None else {}
+        fileKey, root = self._acquireFile(
+            file, lambda: zarr.group(store=zarr.storage.DirectoryStore(file),
+                                     overwrite=not appendScan)
+        )
+
+        datasetName = self._getScanDatasetName(root, channel) if appendScan else channel
+        info: List[dict] = [{"path": datasetName, "transformation": None}]
+        write_multiscales_metadata(root, info, format_from_version("0.2"),
+                                   tuple(reversed(self._getFrameShape(channel))), **attrs)
+
+        # The dataset is created when the first frames arrive, so that it gets their data type
+        self._streams[channel] = _Stream(file=root, fileKey=fileKey, datasetName=datasetName,
+                                         capacity=numFrames or 0)
+
+    def stream(self, data: Dict[str, np.ndarray] = None,
+               metadata: Dict[str, np.ndarray] = None, **kwargs):
+        for channel, frames in (data or {}).items():
+            stream = self._streams[channel]
+            if stream.dataset is None:
+                self._createStreamDataset(channel, frames.dtype)
+            self._addFrameMetadata(stream, len(frames), (metadata or {}).get(channel))
+
+            # Only write whole time chunks, so that chunks don't have to be read back and
+            # compressed again when the next frames arrive
+            stream.pending.append(frames)
+            numPending = sum(len(pendingFrames) for pendingFrames in stream.pending)
+            if numPending >= self._chunkFrames:
+                self._writePending(stream, numPending - numPending % self._chunkFrames)
+
+    def closeStream(self, channel, attrs=None, closeFile=True):
+        if self._streams[channel].dataset is None:
+            self._createStreamDataset(channel, 'u2')
+
+        stream = self._streams.pop(channel)
+        numPending = sum(len(pendingFrames) for pendingFrames in stream.pending)
+        if numPending > 0:
+            self._writePending(stream, numPending)
+
+        stream.dataset.resize(stream.numFrames, *stream.dataset.shape[1:])
+        for key, value in (attrs or {}).items():
+            stream.dataset.attrs[key] = value
+        frameMetadata = self._getFrameMetadata(stream)
+        if frameMetadata is not None:
+            stream.file.require_group(_frameMetadataGroup).create_dataset(
+                stream.datasetName, data=frameMetadata, overwrite=True
+            )
+        stream.dataset.attrs['writing'] = False
+
+        if self._releaseFile(stream.fileKey) and closeFile:
+            stream.file.store.close()
+        if self._encodePool is not None and not self._streams:
+            self._encodePool.shutdown()
+        return stream.file
+
+    def _createStreamDataset(self, channel, dtype):
+        stream = self._streams[channel]
+        shape = self._getFrameShape(channel)
+        # Round up the preallocated frames to whole time chunks
+        capacity = stream.capacity or _streamGrowthFrames
+        capacity += -capacity % self._chunkFrames
+        stream.capacity = capacity
+        stream.dataset = stream.file.create_dataset(
+            stream.datasetName, shape=(capacity, *shape), dtype=self._getDtype(dtype),
+            chunks=(self._chunkFrames, *self._chunkShape), compressor=self._compressor,
+            dimension_separator=self._dimensionSeparator
+        )
+        stream.dataset.attrs['detector_name'] = channel
+        # For ImageJ compatibility
+        stream.dataset.attrs['element_size_um'] = self.detectorManager[channel].pixelSizeUm
+        stream.dataset.attrs['writing'] = True
+
+    def _writePending(self, stream, numFrames):
+        """ Writes the first numFrames pending frames of a stream to its
+        dataset. """
+        pending = np.concatenate(stream.pending) if len(stream.pending) > 1 else stream.pending[0]
+        frames, rest = pending[:numFrames], pending[numFrames:]
+        stream.pending = [rest] if len(rest) > 0 else []
+
+        start, end = stream.numFrames, stream.numFrames + numFrames
+        if end > stream.capacity:
+            stream.capacity = self._getGrownCapacity(stream.capacity, end)
+            stream.capacity += -stream.capacity % self._chunkFrames
+            stream.dataset.resize(stream.capacity, *stream.dataset.shape[1:])
+
+        if self._encodePool is None:
+            stream.dataset[start:end] = frames
+        else:
+            # Rows of chunks are stored in separate files, so they can be compressed and written
+            # in parallel; the compressors release the GIL while working
+            rowHeight = self._chunkShape[0]
+            futures = [
+                self._encodePool.submit(stream.dataset.__setitem__,
+                                        (slice(start, end), slice(y, y + rowHeight)),
+                                        frames[:, y:y + rowHeight])
+                for y in range(0, frames.shape[1], rowHeight)
+            ]
+            for future in futures:
+                future.result()
+
+        stream.numFrames = end
+
+    def _getDtype(self, imageDtype):
+        return self._dtype if self._dtype is not None else imageDtype
+
+    @staticmethod
+    def _getCompressor(name, level, bitshuffle):
+        if name is None:
+            return None
+
+        shuffle = numcodecs.Blosc.BITSHUFFLE if bitshuffle else numcodecs.Blosc.SHUFFLE
+        if name == 'blosc-lz4':
+            return numcodecs.Blosc(cname='lz4', clevel=level, shuffle=shuffle)
+        elif name == 'blosc-zstd':
+            return numcodecs.Blosc(cname='zstd', clevel=level, shuffle=shuffle)
+        elif name == 'zstd':
+            return numcodecs.Zstd(level=level)
+        else:
+            raise ValueError(f'Unsupported zarr compressor "{name}"')
+
 
 class HDF5Storer(Storer):
     """ A storer that stores the images in a series of hd5 files """
+
+    streamExtension = 'hdf5'
+    canStreamToMemory = True
+
     def snap(self, images: Dict[str, np.ndarray], attrs: Dict[str, str] = None):
         for channel, image in images.items():
             with AsTemporayFile(f'{self.filepath}_{channel}.h5') as path:
                 file = h5py.File(path, 'w')
                 shape = self.detectorManager[channel].shape
                 dataset = file.create_dataset('data', tuple(reversed(shape)), dtype='i2')
-                for key, value in attrs[channel].items():
-                    try:
-                        dataset.attrs[key] = value
-                    except:
-                        logger.debug(f'Could not put key:value pair {key}:{value} in hdf5 metadata.')
-
-                dataset.attrs['detector_name'] = channel
-
-                # For ImageJ compatibility
-                dataset.attrs['element_size_um'] = \
-                    self.detectorManager[channel].pixelSizeUm
+                self._setDatasetAttrs(dataset, channel, attrs[channel])
 
                 if image.ndim == 3:
                     dataset[:, ...] = np.moveaxis(image, [0, 1, 2], [2, 1, 0])
@@ -98,22 +383,318 @@ class HDF5Storer(Storer):
             
                 file.close()
                 logger.info(f"Saved image to hdf5 file {path}")
+
+    def openStream(self, channel, file, attrs=None, *, numFrames=None, appendScan=False):
+        fileKey, h5file = self._acquireFile(file,
+                                            lambda: h5py.File(file, 'a' if appendScan else 'w-'))
+
+        datasetName = self._getScanDatasetName(h5file, channel) if appendScan else channel
+        shape = self._getFrameShape(channel)
+        # The initial number of frames must not be 0; otherwise, too much disk space may get
+        # allocated. Frames that are allocated but not written are removed when closing.
+        capacity = numFrames if numFrames else _streamGrowthFrames
+        dataset = h5file.create_dataset(datasetName, (capacity, *shape),
+                                        maxshape=(None, *shape), chunks=(1, *shape), dtype='i2')
+        self._setDatasetAttrs(dataset, channel, attrs if attrs is not None else {})
+        dataset.attrs['writing'] = True
+
+        self._streams[channel] = _Stream(file=h5file, fileKey=fileKey, dataset=dataset,
+                                         datasetName=datasetName, capacity=capacity)
+
+    def stream(self, data: Dict[str, np.ndarray] = None,
+               metadata: Dict[str, np.ndarray] = None, **kwargs):
+        for channel, frames in (data or {}).items():
+            stream = self._streams[channel]
+            n = len(frames)
+            self._addFrameMetadata(stream, n, (metadata or {}).get(channel))
+            if stream.numFrames + n > stream.capacity:
+                stream.capacity = self._getGrownCapacity(stream.capacity, stream.numFrames + n)
+                stream.dataset.resize(stream.capacity, axis=0)
+
+            stream.dataset[stream.numFrames:stream.numFrames + n, :, :] = frames
+            stream.numFrames += n
+
+    def flushStream(self, channel):
+        self._streams[channel].file.flush()
+
+    def closeStream(self, channel, attrs=None, closeFile=True):
+        stream = self._streams.pop(channel)
+        stream.dataset.resize(stream.numFrames, axis=0)
+        self._setDatasetAttrs(stream.dataset, channel, attrs or {})
+        frameMetadata = self._getFrameMetadata(stream)
+        if frameMetadata is not None:
+            metadataGroup = stream.file.require_group(_frameMetadataGroup)
+            if stream.datasetName in metadataGroup:
+                del metadataGroup[stream.datasetName]
+            metadataGroup.create_dataset(stream.datasetName, data=frameMetadata)
+        stream.dataset.attrs['writing'] = False
+
+        if self._releaseFile(stream.fileKey):
+            if closeFile:
+                stream.file.close()
+            else:
+                stream.file.flush()
+        return stream.file
+
+    def _setDatasetAttrs(self, dataset, channel, attrs):
+        for key, value in attrs.items():
+            try:
+                dataset.attrs[key] = value
+            except:
+                logger.debug(f'Could not put key:value pair {key}:{value} in hdf5 metadata.')
+
+        dataset.attrs['detector_name'] = channel
+
+        # For ImageJ compatibility
+        dataset.attrs['element_size_um'] = \
+            self.detectorManager[channel].pixelSizeUm
         
 
 class TiffStorer(Storer):
-    """ A storer that stores the images in a series of tiff files """
+    """ A storer that stores the images in a series of tiff files. Streams
+    are written as BigTIFF files, so they are not limited to 4 GB.
+
+    Options:
+
+    - ``ome`` -- whether to write OME-XML metadata to streamed files
+    - ``maxFramesPerFile`` -- number of frames after which a stream continues
+      in a new file, with a number appended to the file name; None for no
+      limit
+    - ``maxBytesPerFile`` -- like maxFramesPerFile, but for the size of the
+      frames in a file
+    """
+
+    streamExtension = 'tiff'
+    canShareStreamFiles = False
+
+    def __init__(self, filepath, detectorManager, *, ome=False, maxFramesPerFile=None,
+                 maxBytesPerFile=None):
+        super().__init__(filepath, detectorManager)
+        self._ome = ome
+        self._maxFramesPerFile = maxFramesPerFile
+        self._maxBytesPerFile = maxBytesPerFile
+        if ome:
+            self.streamExtension = 'ome.tiff'
+
     def snap(self, images: Dict[str, np.ndarray], attrs: Dict[str, str] = None):
         for channel, image in images.items():
             with AsTemporayFile(f'{self.filepath}_{channel}.tiff') as path:
                 tiff.imwrite(path, image,) # TODO: Parse metadata to tiff meta data
                 logger.info(f"Saved image to tiff file {path}")
 
+    def openStream(self, channel, file, attrs=None, *, numFrames=None, appendScan=False):
+        # Scans are appended as new series, to the last file if the previous scans rolled over
+        path = self._getLastRolloverPath(file) if appendScan else file
+        self._streams[channel] = _Stream(file=file, fileKey=file, path=path,
+                                         attrs=dict(attrs) if attrs is not None else {},
+                                         append=appendScan)
+
+    def stream(self, data: Dict[str, np.ndarray] = None,
+               metadata: Dict[str, np.ndarray] = None, **kwargs):
+        for channel, frames in (data or {}).items():
+            stream = self._streams[channel]
+            self._addFrameMetadata(stream, len(frames), (metadata or {}).get(channel))
+            for frame in frames:
+                if stream.writer is None:
+                    self._openStreamFile(stream)
+                if self._isStreamFileFull(stream, frame):
+                    self._closeStreamFile(channel, stream)
+                    stream.path = self._getRolloverPath(stream.file)
+                    self._openStreamFile(stream)
+
+                # Writing the frames contiguously to an open file keeps the cost per frame
+                # constant, unlike reopening the file to append to it
+                stream.writer.write(frame, contiguous=True, photometric='minisblack',
+                                    metadata={'axes': 'TYX'})
+                stream.numFileFrames += 1
+                stream.numFileBytes += frame.nbytes
+                stream.numFrames += 1
+
+    def closeStream(self, channel, attrs=None, closeFile=True):
+        stream = self._streams.pop(channel)
+        stream.attrs.update(attrs or {})
+        if stream.writer is not None:
+            self._closeStreamFile(channel, stream)
+
+        frameMetadata = self._getFrameMetadata(stream)
+        if frameMetadata is not None:
+            # TIFF has no place for tables, so the metadata of all the files of the stream is
+            # written to a CSV file next to the first one
+            metadataPath = self._getFrameMetadataPath(stream.file)
+            appendMetadata = stream.append and os.path.exists(metadataPath)
+            with open(metadataPath, 'a' if appendMetadata else 'w') as metadataFile:
+                np.savetxt(metadataFile, frameMetadata, delimiter=',',
+                           header='' if appendMetadata else ','.join(frameMetadata.dtype.names),
+                           comments='', fmt=['%d', '%.6f', '%.6f', '%g', '%d'])
+        return stream.path
+
+    def _openStreamFile(self, stream):
+        stream.numFileFrames = 0
+        stream.numFileBytes = 0
+        if stream.append and os.path.exists(stream.path):
+            with tiff.TiffFile(stream.path) as file:
+                stream.numFileFrames = len(file.pages)
+                stream.numFileBytes = stream.numFileFrames * file.pages.first.nbytes
+        stream.writer = tiff.TiffWriter(stream.path, bigtiff=True, ome=False,
+                                        append=stream.append)
+
+    def _isStreamFileFull(self, stream, frame):
+        # A file always gets at least one frame, even if it's larger than maxBytesPerFile
+        return stream.numFileFrames > 0 and (
+            (self._maxFramesPerFile is not None and
+             stream.numFileFrames >= self._maxFramesPerFile) or
+            (self._maxBytesPerFile is not None and
+             stream.numFileBytes + frame.nbytes > self._maxBytesPerFile)
+        )
+
+    def _closeStreamFile(self, channel, stream):
+        stream.writer.close()
+        stream.writer = None
+        if self._ome:
+            tiff.tiffcomment(stream.path, comment=self._getOMEXML(channel, stream).encode())
+
+    def _getOMEXML(self, channel, stream):
+        with tiff.TiffFile(stream.path) as file:
+            page = file.pages.first
+            shape, dtype = page.shape, page.dtype
+
+        pixelSizeUm = self.detectorManager[channel].pixelSizeUm
+        omeXML = tiff.OmeXml(Creator='ImSwitch')
+        omeXML.addimage(
+            dtype=dtype, shape=(stream.numFileFrames, *shape),
+            storedshape=(stream.numFileFrames, 1, 1, *shape, 1), axes='TYX', Name=channel,
+            PhysicalSizeX=pixelSizeUm[-1], PhysicalSizeY=pixelSizeUm[-2],
+            MapAnnotation={key: str(value) for key, value in stream.attrs.items()}
+        )
+        return omeXML.tostring(declaration=True)
+
+    @classmethod
+    def _getFrameMetadataPath(cls, path):
+        return f'{cls._splitExt(path)[0]}_frames.csv'
+
+    @classmethod
+    def _getLastRolloverPath(cls, path):
+        """ Returns the path of the last file that a stream written to path
+        has rolled over to, or path if it has not rolled over. """
+        pathWithoutExt, pathExt = cls._splitExt(path)
+        lastPath, numExisting = path, 1
+        while os.path.exists(f'{pathWithoutExt}_{numExisting}{pathExt}'):
+            lastPath = f'{pathWithoutExt}_{numExisting}{pathExt}'
+            numExisting += 1
+        return lastPath
+
+    @classmethod
+    def _getRolloverPath(cls, path):
+        pathWithoutExt, pathExt = cls._splitExt(path)
+        numExisting = 1
+        while os.path.exists(f'{pathWithoutExt}_{numExisting}{pathExt}'):
+            numExisting += 1
+        return f'{pathWithoutExt}_{numExisting}{pathExt}'
+
+    @staticmethod
+    def _splitExt(path):
+        """ Splits the extension off path, keeping .ome.tiff as a whole. """
+        pathWithoutExt, pathExt = os.path.splitext(path)
+        if pathWithoutExt.endswith('.ome'):
+            pathWithoutExt, pathExt = pathWithoutExt[:-len('.ome')], f'.ome{pathExt}'
+        return pathWithoutExt, pathExt
+
+
+class ArrayStorer(Storer):
+    """ A storer that keeps streamed frames in memory as NumPy arrays in a
+    VArrayFile, which can be handed to other modules without copying the data
+    and is only serialized (to HDF5) when it is saved to the disk. When the
+    number of frames is known up front, the whole recording is allocated at
+    once, backed by shared memory if available; otherwise, the arrays grow in
+    large steps.
+
+    Options:
+
+    - ``useSharedMemory`` -- whether to back preallocated recordings by a
+      memory-mapped file in /dev/shm instead of the process heap; recordings
+      that don't fit in the free space of /dev/shm are kept on the heap
+    """
+
+    streamExtension = 'hdf5'
+    canStreamToMemory = True
+
+    def __init__(self, filepath, detectorManager, *, useSharedMemory=True):
+        super().__init__(filepath, detectorManager)
+        self._useSharedMemory = useSharedMemory
+
+    def openStream(self, channel, file, attrs=None, *, numFrames=None, appendScan=False):
+        if not isinstance(file, VArrayFile):
+            raise TypeError(f'{self.__class__.__name__} can only stream to a VArrayFile')
+
+        datasetName = self._getScanDatasetName(file, channel) if appendScan else channel
+        # The array is allocated when the first frames arrive, as their dtype is not known before
+        self._streams[channel] = _Stream(file=file, fileKey=id(file), datasetName=datasetName,
+                                         capacity=numFrames or 0,
+                                         attrs=dict(attrs) if attrs is not None else {})
+        file.datasetAttrs[datasetName] = {'writing': True}
+
+    def stream(self, data: Dict[str, np.ndarray] = None,
+               metadata: Dict[str, np.ndarray] = None, **kwargs):
+        for channel, frames in (data or {}).items():
+            stream = self._streams[channel]
+            n = len(frames)
+            self._addFrameMetadata(stream, n, (metadata or {}).get(channel))
+            if stream.dataset is None:
+                stream.dataset = self._allocate(channel, stream.capacity or
+                                                max(n, _streamGrowthFrames),
+                                                frames.dtype, preallocated=stream.capacity > 0)
+                stream.capacity = len(stream.dataset)
+            elif stream.numFrames + n > stream.capacity:
+                stream.capacity = self._getGrownCapacity(stream.capacity, stream.numFrames + n)
+                grown = self._allocate(channel, stream.capacity, stream.dataset.dtype)
+                grown[:stream.numFrames] = stream.dataset[:stream.numFrames]
+                stream.dataset = grown
+
+            stream.dataset[stream.numFrames:stream.numFrames + n] = frames
+            stream.numFrames += n
+
+    def closeStream(self, channel, attrs=None, closeFile=True):
+        stream = self._streams.pop(channel)
+        if stream.dataset is None:
+            stream.dataset = np.empty((0, *self._getFrameShape(channel)), dtype='i2')
+
+        # Slicing trims the frames that were allocated but not recorded without copying
+        stream.file.datasets[stream.datasetName] = stream.dataset[:stream.numFrames]
+        stream.attrs.update(attrs or {})
+        stream.attrs['detector_name'] = channel
+        stream.attrs['element_size_um'] = self.detectorManager[channel].pixelSizeUm
+        stream.attrs['writing'] = False
+        stream.file.datasetAttrs[stream.datasetName] = stream.attrs
+        frameMetadata = self._getFrameMetadata(stream)
+        if frameMetadata is not None:
+            stream.file.frameMetadata[stream.datasetName] = frameMetadata
+        return stream.file
+
+    def _allocate(self, channel, numFrames, dtype, preallocated=False):
+        shape = (numFrames, *self._getFrameShape(channel))
+        if preallocated and self._useSharedMemory and os.path.isdir(_sharedMemoryDir):
+            # The file system is sparse, so writing beyond its free space would crash the process
+            # with SIGBUS instead of raising an error
+            nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            fsStats = os.statvfs(_sharedMemoryDir)
+            if fsStats.f_bavail * fsStats.f_frsize >= nbytes:
+                # The file is removed right away; the mapping stays valid until the array is freed
+                with tempfile.NamedTemporaryFile(dir=_sharedMemoryDir,
+                                                 prefix='imswitch_rec_') as file:
+                    return np.memmap(file, dtype=dtype, mode='w+', shape=shape)
+
+            logger.warning(f'Not enough space in {_sharedMemoryDir} for the recording of'
+                           f' {channel} ({nbytes / 1024 ** 2:.0f} MB), keeping it on the heap'
+                           f' instead')
+        return np.empty(shape, dtype=dtype)
+
 
 class SaveMode(enum.Enum):
     Disk = 1
     RAM = 2
     DiskAndRAM = 3
     Numpy = 4
+    RAMArray = 5
 
 
 class SaveFormat(enum.Enum):
@@ -129,6 +710,166 @@ DEFAULT_STORER_MAP: Dict[str, Type[Storer]] = {
 }
 
 
+class WriteQueuePolicy(enum.Enum):
+    """ What to do with newly acquired frames when a detector's write queue
+    is full during a recording. """
+    Block = 1  # Wait until the writer has freed up enough space
+    DropOldest = 2  # Discard the oldest queued frames to make room
+    SpillToRAM = 3  # Keep queuing in RAM beyond the size limit
+
+
+DEFAULT_WRITE_QUEUE_MAX_BYTES = 1024 ** 3
+
+
+@dataclass
+class WriteQueueStats:
+    """ Snapshot of the state of a detector's write queue. """
+
+    queuedBytes: int = 0
+    """ Size of the frames currently waiting to be written. """
+
+    queuedFrames: int = 0
+    """ Number of frames currently waiting to be written. """
+
+    peakQueuedBytes: int = 0
+    """ Largest value queuedBytes has had during the recording. """
+
+    writtenFrames: int = 0
+    """ Number of frames written so far. """
+
+    failedFrames: int = 0
+    """ Number of frames that could not be written, because writing them
+    failed or because an earlier write failed. """
+
+    droppedFrames: int = 0
+    """ Number of frames discarded because the queue was full. """
+
+    spilledBytes: int = 0
+    """ Amount of data that was queued beyond the size limit. """
+
+    lastWriteLatency: float = 0.0
+    """ Time in seconds it took to write the latest chunk. """
+
+    meanWriteLatency: float = 0.0
+    """ Mean time in seconds it has taken to write a chunk. """
+
+    maxWriteLatency: float = 0.0
+    """ Longest time in seconds it has taken to write a chunk. """
+
+
+class FrameWriteQueue:
+    """ A FIFO queue of frame chunks that is bounded by the total size of the
+    queued frames in bytes. Chunks are put into the queue by the recording
+    worker and taken out by a writer worker, so that slow writes don't hold
+    up the collection of new frames from the detector. """
+
+    def __init__(self, maxBytes=DEFAULT_WRITE_QUEUE_MAX_BYTES, policy=WriteQueuePolicy.Block):
+        self._maxBytes = maxBytes
+        self._policy = policy
+        self._chunks = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._error = None
+        self._stats = WriteQueueStats()
+        self._numWrites = 0
+
+    def put(self, frames, metadata=None):
+        """ Adds a chunk of frames, optionally with their per-frame metadata,
+        to the queue. What happens if there is not enough space left in the
+        queue depends on the queue policy. A chunk is always accepted if the
+        queue is empty, even if it is larger than the size limit. Raises
+        RuntimeError if writing an earlier chunk has failed. """
+        with self._condition:
+            self.raiseIfFailed()
+            if self._closed:
+                raise RuntimeError('Cannot put frames into a closed write queue')
+
+            if self._policy == WriteQueuePolicy.Block:
+                while self._chunks and self._isFullFor(frames) and not self._closed:
+                    self._condition.wait()
+                self.raiseIfFailed()
+            elif self._policy == WriteQueuePolicy.DropOldest:
+                while self._chunks and self._isFullFor(frames):
+                    droppedFrames, _ = self._chunks.popleft()
+                    self._stats.queuedBytes -= droppedFrames.nbytes
+                    self._stats.queuedFrames -= len(droppedFrames)
+                    self._stats.droppedFrames += len(droppedFrames)
+            elif self._policy == WriteQueuePolicy.SpillToRAM:
+                if self._chunks and self._isFullFor(frames):
+                    self._stats.spilledBytes += frames.nbytes
+
+            self._chunks.append((frames, metadata))
+            self._stats.queuedBytes += frames.nbytes
+            self._stats.queuedFrames += len(frames)
+            self._stats.peakQueuedBytes = max(self._stats.peakQueuedBytes,
+                                              self._stats.queuedBytes)
+            self._condition.notify_all()
+
+    def get(self):
+        """ Removes and returns the oldest chunk in the queue as a tuple
+        (frames, metadata), waiting for one to become available if necessary.
+        Returns None once the queue has been closed and all chunks have been
+        taken out. """
+        with self._condition:
+            while not self._chunks and not self._closed:
+                self._condition.wait()
+
+            if not self._chunks:
+                return None
+
+            frames, metadata = self._chunks.popleft()
+            self._stats.queuedBytes -= frames.nbytes
+            self._stats.queuedFrames -= len(frames)
+            self._condition.notify_all()
+            return frames, metadata
+
+    def chunkWritten(self, numFrames, latency):
+        """ Called by the writer when it has written a chunk taken out of the
+        queue, with the number of frames in the chunk and the time in seconds
+        that it took to write it. """
+        with self._condition:
+            self._numWrites += 1
+            self._stats.writtenFrames += numFrames
+            self._stats.lastWriteLatency = latency
+            self._stats.meanWriteLatency += ((latency - self._stats.meanWriteLatency) /
+                                             self._numWrites)
+            self._stats.maxWriteLatency = max(self._stats.maxWriteLatency, latency)
+
+    def chunkFailed(self, numFrames, error):
+        """ Called by the writer when writing a chunk taken out of the queue
+        failed with the given exception. The queue is closed, and the chunks
+        still in it are discarded, as the stream can't be continued after a
+        missing chunk. """
+        with self._condition:
+            self._error = error
+            self._closed = True
+            self._stats.failedFrames += numFrames + self._stats.queuedFrames
+            self._stats.queuedBytes = 0
+            self._stats.queuedFrames = 0
+            self._chunks.clear()
+            self._condition.notify_all()
+
+    def raiseIfFailed(self):
+        """ Raises RuntimeError if writing a chunk has failed. """
+        if self._error is not None:
+            raise RuntimeError(f'Writing frames failed: {self._error}') from self._error
+
+    def close(self):
+        """ Closes the queue. Chunks that are already in the queue can still
+        be taken out. """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def getStats(self) -> WriteQueueStats:
+        """ Returns a snapshot of the queue statistics. """
+        with self._condition:
+            return replace(self._stats)
+
+    def _isFullFor(self, frames):
+        return self._stats.queuedBytes + frames.nbytes > self._maxBytes
+
+
 class RecordingManager(SignalInterface):
     """ RecordingManager handles single frame captures as well as continuous
     recordings of detector data. """
@@ -142,12 +883,15 @@ class RecordingManager(SignalInterface):
     sigMemoryRecordingAvailable = Signal(
         str, object, object, bool
     )  # (name, file, filePath, savedToDisk)
+    sigRecordingWriteStatsUpdated = Signal(str, object)  # (detectorName, WriteQueueStats)
 
-    def __init__(self, detectorsManager, storerMap: Optional[Dict[str, Type[Storer]]] = None):
+    def __init__(self, detectorsManager, storerMap: Optional[Dict[str, Type[Storer]]] = None,
+                 arrayStorerType: Type[Storer] = ArrayStorer):
         super().__init__()
         self.__logger = initLogger(self)
         self.__storerMap = storerMap or DEFAULT_STORER_MAP
-        self._memRecordings = {}  # { filePath: bytesIO }
+        self.__arrayStorerType = arrayStorerType
+        self._memRecordings = {}  # { filePath: bytesIO or VArrayFile }
         self.__detectorsManager = detectorsManager
         self.__record = False
         self.__recordingWorker = RecordingWorker(self)
@@ -171,12 +915,20 @@ class RecordingManager(SignalInterface):
 
     def startRecording(self, detectorNames, recMode, savename, saveMode, attrs,
                        saveFormat=SaveFormat.HDF5, singleMultiDetectorFile=False, singleLapseFile=False,
-                       recFrames=None, recTime=None):
+                       recFrames=None, recTime=None, writeQueuePolicy=WriteQueuePolicy.Block,
+                       writeQueueMaxBytes=DEFAULT_WRITE_QUEUE_MAX_BYTES, storerOptions=None):
         """ Starts a recording with the specified detectors, recording mode,
         file name prefix and attributes to save to the recording per detector.
         In SpecFrames mode, recFrames (the number of frames) must be specified,
         and in SpecTime mode, recTime (the recording time in seconds) must be
-        specified. """
+        specified. Frames are written to disk by one writer thread per
+        detector; writeQueueMaxBytes limits how much data may wait to be
+        written per detector, and writeQueuePolicy decides what happens when
+        that limit is reached. storerOptions are passed on to the storer of
+        the save format, e.g. chunking and compression options for Zarr. In
+        RAMArray save mode, the frames are kept in NumPy arrays instead,
+        regardless of the save format, and storerOptions are passed on to
+        ArrayStorer. """
 
         self.__logger.info('Starting recording')
         self.__record = True
@@ -184,12 +936,17 @@ class RecordingManager(SignalInterface):
         self.__recordingWorker.recMode = recMode
         self.__recordingWorker.savename = savename
         self.__recordingWorker.saveMode = saveMode
-        self.__recordingWorker.saveFormat = saveFormat
+        self.__recordingWorker.storerType = (self.__arrayStorerType
+                                             if saveMode == SaveMode.RAMArray
+                                             else self.__storerMap[saveFormat])
+        self.__recordingWorker.storerOptions = storerOptions or {}
         self.__recordingWorker.attrs = attrs
         self.__recordingWorker.recFrames = recFrames
         self.__recordingWorker.recTime = recTime
         self.__recordingWorker.singleMultiDetectorFile = singleMultiDetectorFile
         self.__recordingWorker.singleLapseFile = singleLapseFile
+        self.__recordingWorker.writeQueuePolicy = writeQueuePolicy
+        self.__recordingWorker.writeQueueMaxBytes = writeQueueMaxBytes
         self.__detectorsManager.execOnAll(lambda c: c.flushBuffers(),
                                           condition=lambda c: c.forAcquisition)
         self.__thread.start()
@@ -211,10 +968,11 @@ class RecordingManager(SignalInterface):
         if wait:
             self.__thread.wait()
 
-    def snap(self, detectorNames, savename, saveMode, saveFormat, attrs):
+    def snap(self, detectorNames, savename, saveMode, saveFormat, attrs, storerOptions=None):
         """ Saves an image with the specified detectors to a file
         with the specified name prefix, save mode, file format and attributes
-        to save to the capture per detector. """
+        to save to the capture per detector. storerOptions are passed on to
+        the storer of the save format. """
         acqHandle = self.__detectorsManager.startAcquisition()
 
         try:
@@ -230,7 +988,7 @@ class RecordingManager(SignalInterface):
 
                 if saveMode == SaveMode.Disk or saveMode == SaveMode.DiskAndRAM:
                     # Save images to disk
-                    store = storer(savename, self.__detectorsManager)
+                    store = storer(savename, self.__detectorsManager, **(storerOptions or {}))
                     store.snap(images, attrs)
 
                 if saveMode == SaveMode.RAM or saveMode == SaveMode.DiskAndRAM:
@@ -308,7 +1066,8 @@ class RecordingWorker(Worker):
         super().__init__()
         self.__logger = initLogger(self)
         self.__recordingManager = recordingManager
-        self.__logger = initLogger(self)
+        self.writeQueuePolicy = WriteQueuePolicy.Block
+        self.writeQueueMaxBytes = DEFAULT_WRITE_QUEUE_MAX_BYTES
 
     def run(self):
         acqHandle = self.__recordingManager.detectorsManager.startAcquisition()
@@ -319,263 +1078,241 @@ class RecordingWorker(Worker):
             self.__recordingManager.detectorsManager.stopAcquisition(acqHandle)
 
     def _record(self):
-        if self.saveFormat == SaveFormat.HDF5 or self.saveFormat == SaveFormat.ZARR:
-            files, fileDests, filePaths = self._getFiles()
-
-        shapes = {detectorName: self.__recordingManager.detectorsManager[detectorName].shape
-                  for detectorName in self.detectorNames}
-
-        currentFrame = {}
-        datasets = {}
-        filenames = {}
-
-        for detectorName in self.detectorNames:
-            currentFrame[detectorName] = 0
-
-            datasetName = detectorName
-            if self.recMode == RecMode.ScanLapse and self.singleLapseFile:
-                # Add scan number to dataset name
-                scanNum = 0
-                datasetNameWithScan = f'{datasetName}_scan{scanNum}'
-                while datasetNameWithScan in files[detectorName]:
-                    scanNum += 1
-                    datasetNameWithScan = f'{datasetName}_scan{scanNum}'
-                datasetName = datasetNameWithScan
-
-            # Initial number of frames must not be 0; otherwise, too much disk space may get
-            # allocated. We remove this default frame later on if no frames are captured.
-            shape = shapes[detectorName]
-            if len(shape) > 2:
-                shape = shape[-2:]
-
-            if self.saveFormat == SaveFormat.HDF5:
-                # Initial number of frames must not be 0; otherwise, too much disk space may get
-                # allocated. We remove this default frame later on if no frames are captured.
-                datasets[detectorName] = files[detectorName].create_dataset(
-                    datasetName, (1, *reversed(shape)),
-                    maxshape=(None, *reversed(shape)),
-                    dtype='i2'
-                )
-
-                for key, value in self.attrs[detectorName].items():
-                    datasets[detectorName].attrs[key] = value
-
-                datasets[detectorName].attrs['detector_name'] = detectorName
-
-                # For ImageJ compatibility
-                datasets[detectorName].attrs['element_size_um'] \
-                    = self.__recordingManager.detectorsManager[detectorName].pixelSizeUm
-                datasets[detectorName].attrs['writing'] = True
-
-            elif self.saveFormat == SaveFormat.TIFF:
-                fileExtension = str(self.saveFormat.name).lower()
-                filenames[detectorName] = self.__recordingManager.getSaveFilePath(
-                    f'{self.savename}_{detectorName}.{fileExtension}', False, False)
-
-            elif self.saveFormat == SaveFormat.ZARR:
-                datasets[detectorName] = files[detectorName].create_dataset(datasetName, shape=(1, *reversed(shape)),
-                                                                            dtype='i2', chunks=(1, 512, 512)
-                                                                            )
-                datasets[detectorName].attrs['detector_name'] = detectorName
-                # For ImageJ compatibility
-                datasets[detectorName].attrs['element_size_um'] \
-                    = self.__recordingManager.detectorsManager[detectorName].pixelSizeUm
-                datasets[detectorName].attrs['writing'] = True
-                info: List[dict] = [{"path": datasetName, "transformation": None}]
-                write_multiscales_metadata(files[detectorName], info, format_from_version("0.2"), shape, **self.attrs[detectorName])
+        detectorsManager = self.__recordingManager.detectorsManager
+        self._storer = self.storerType(self.savename, detectorsManager, **self.storerOptions)
+        fileDests, filePaths = self._getFiles()
+        currentFrame = self._openStreams(fileDests)
 
+        self._startWriters()
         self.__recordingManager.sigRecordingStarted.emit()
         try:
             if len(self.detectorNames) < 1:
                 raise ValueError('No detectors to record specified')
 
             if self.recMode in [RecMode.SpecFrames, RecMode.ScanOnce, RecMode.ScanLapse]:
-                recFrames = self.recFrames
-                if recFrames is None:
-                    raise ValueError('recFrames must be specified in SpecFrames, ScanOnce or'
-                                     ' ScanLapse mode')
-
-                while (self.__recordingManager.record and
-                       any([currentFrame[detectorName] < recFrames
-                            for detectorName in self.detectorNames])):
-                    for detectorName in self.detectorNames:
-                        if currentFrame[detectorName] >= recFrames:
-                            continue  # Reached requested number of frames with this detector, skip
-
-                        newFrames = self._getNewFrames(detectorName)
-                        n = len(newFrames)
-
-                        if n > 0:
-                            it = currentFrame[detectorName]
-                            if self.saveFormat == SaveFormat.TIFF:
-                                try:
-                                    filePath = filenames[detectorName]
-                                    tiff.imwrite(filePath, newFrames, append=True)
-                                except ValueError:
-                                    self.__logger.error("TIFF File exceeded 4GB.")
-                                    if self.saveFormat == SaveFormat.TIFF:
-                                        filePath = self.__recordingManager.getSaveFilePath(
-                                            f'{self.savename}_{detectorName}.{fileExtension}', False, False)
-                                        continue
-                            elif self.saveFormat == SaveFormat.HDF5:
-                                dataset = datasets[detectorName]
-                                if (it + n) <= recFrames:
-                                    dataset.resize(n + it, axis=0)
-                                    dataset[it:it + n, :, :] = newFrames
-                                    currentFrame[detectorName] += n
-                                else:
-                                    dataset.resize(recFrames, axis=0)
-                                    dataset[it:recFrames, :, :] = newFrames[0:recFrames - it]
-                                    currentFrame[detectorName] = recFrames
-                            elif self.saveFormat == SaveFormat.ZARR:
-                                dataset = datasets[detectorName]
-                                if it == 0:
-                                    dataset[0, :, :] = newFrames[0, :, :]
-                                    if n > 0:
-                                        dataset.append(newFrames[1:n, :, :])
-                                else:
-                                    dataset.append(newFrames)
-                                currentFrame[detectorName] += n
-
-                            # Things get a bit weird if we have multiple detectors when we report
-                            # the current frame number, since the detectors may not be synchronized.
-                            # For now, we will report the lowest number.
-                            self.__recordingManager.sigRecordingFrameNumUpdated.emit(
-                                min(list(currentFrame.values()))
-                            )
-                    time.sleep(0.0001)  # Prevents freezing for some reason
-
-                self.__recordingManager.sigRecordingFrameNumUpdated.emit(0)
+                self._recordSpecFrames(currentFrame)
             elif self.recMode == RecMode.SpecTime:
-                recTime = self.recTime
-                if recTime is None:
-                    raise ValueError('recTime must be specified in SpecTime mode')
-
-                start = time.time()
-                currentRecTime = 0
-                shouldStop = False
-                while True:
-                    for detectorName in self.detectorNames:
-                        newFrames = self._getNewFrames(detectorName)
-                        n = len(newFrames)
-                        if n > 0:
-                            if self.saveFormat == SaveFormat.TIFF:
-                                try:
-                                    filePath = filenames[detectorName]
-                                    tiff.imwrite(filePath, newFrames, append=True)
-                                except ValueError:
-                                    self.__logger.error("TIFF File exceeded 4GB.")
-                                    if self.saveFormat == SaveFormat.TIFF:
-                                        filePath = self.__recordingManager.getSaveFilePath(
-                                            f'{self.savename}_{detectorName}.{fileExtension}', False, False)
-                                        continue
-                            elif self.saveFormat == SaveFormat.HDF5 or self.saveFormat == SaveFormat.ZARR:
-                                it = currentFrame[detectorName]
-                                dataset = datasets[detectorName]
-                                dataset.resize(n + it, axis=0)
-                                dataset[it:it + n, :, :] = newFrames
-                            currentFrame[detectorName] += n
-                            self.__recordingManager.sigRecordingTimeUpdated.emit(
-                                np.around(currentRecTime, decimals=2)
-                            )
-                            currentRecTime = time.time() - start
-
-                    if shouldStop:
-                        break  # Enter loop one final time, then stop
-
-                    if not self.__recordingManager.record or currentRecTime >= recTime:
-                        shouldStop = True
-
-                    time.sleep(0.0001)  # Prevents freezing for some reason
-
-                self.__recordingManager.sigRecordingTimeUpdated.emit(0)
+                self._recordSpecTime(currentFrame)
             elif self.recMode == RecMode.UntilStop:
-                shouldStop = False
-                while True:
-                    for detectorName in self.detectorNames:
-                        newFrames = self._getNewFrames(detectorName)
-                        n = len(newFrames)
-                        if n > 0:
-                            if self.saveFormat == SaveFormat.TIFF:
-                                try:
-                                    filePath = filenames[detectorName]
-                                    tiff.imwrite(filePath, newFrames, append=True)
-                                except ValueError:
-                                    self.__logger.error("TIFF File exceeded 4GB.")
-                                    if self.saveFormat == SaveFormat.TIFF:
-                                        filePath = self.__recordingManager.getSaveFilePath(
-                                            f'{self.savename}_{detectorName}.{fileExtension}', False, False)
-                                        continue
-
-                            elif self.saveFormat == SaveFormat.HDF5:
-                                it = currentFrame[detectorName]
-                                dataset = datasets[detectorName]
-                                dataset.resize(n + it, axis=0)
-                                dataset[it:it + n, :, :] = newFrames
-
-                            elif self.saveFormat == SaveFormat.ZARR:
-                                it = currentFrame[detectorName]
-                                dataset = datasets[detectorName]
-                                if it == 0:
-                                    dataset[0, :, :] = newFrames[0, :, :]
-                                    if n > 0:
-                                        dataset.append(newFrames[1:n, :, :])
-                                else:
-                                    dataset.append(newFrames)
-
-                            currentFrame[detectorName] += n
-
-                    if shouldStop:
-                        break
-
-                    if not self.__recordingManager.record:
-                        shouldStop = True  # Enter loop one final time, then stop
-
-                    time.sleep(0.0001)  # Prevents freezing for some reason
+                self._recordUntilStop(currentFrame)
             else:
                 raise ValueError('Unsupported recording mode specified')
         finally:
+            # Let the writers drain their queues before the files are closed
+            self._stopWriters()
+            self._emitWriteStats(force=True)
+            self._closeStreams(fileDests, filePaths)
 
-            if self.saveFormat == SaveFormat.HDF5 or self.saveFormat == SaveFormat.ZARR:
-                for detectorName, file in files.items():
-                    # Remove default frame if no frames have been captured
-                    if currentFrame[detectorName] < 1:
-                        if self.saveFormat == SaveFormat.HDF5:
-                            datasets[detectorName].resize(0, axis=0)
-
-                    # Handle memory recordings
-                    if self.saveMode == SaveMode.RAM or self.saveMode == SaveMode.DiskAndRAM:
-                        filePath = filePaths[detectorName]
-                        name = os.path.basename(filePath)
-                        if self.saveMode == SaveMode.RAM:
-                            file.close()
-                            self.__recordingManager.sigMemoryRecordingAvailable.emit(
-                                name, fileDests[detectorName], filePath, False
-                            )
-                        else:
-                            file.flush()
-                            self.__recordingManager.sigMemoryRecordingAvailable.emit(
-                                name, file, filePath, True
-                            )
-                    else:
-                        datasets[detectorName].attrs['writing'] = False
-                        if self.saveFormat == SaveFormat.HDF5:
-                            file.close()
-                        else:
-                            self.store.close()
             emitSignal = True
             if self.recMode in [RecMode.SpecFrames, RecMode.ScanOnce, RecMode.ScanLapse]:
                 emitSignal = False
             self.__recordingManager.endRecording(emitSignal=emitSignal, wait=False)
 
+    def _openStreams(self, fileDests):
+        """ Opens a storer stream for every detector being recorded. Returns a
+        dict with the number of frames recorded per detector so far. """
+        numFramesHint = None
+        if self.recMode in [RecMode.SpecFrames, RecMode.ScanOnce, RecMode.ScanLapse]:
+            numFramesHint = self.recFrames
+
+        currentFrame = {}
+        for detectorName in self.detectorNames:
+            currentFrame[detectorName] = 0
+            self._storer.openStream(
+                detectorName, fileDests[detectorName], self.attrs[detectorName],
+                numFrames=numFramesHint,
+                appendScan=self.recMode == RecMode.ScanLapse and self.singleLapseFile
+            )
+        return currentFrame
+
+    def _recordSpecFrames(self, currentFrame):
+        recFrames = self.recFrames
+        if recFrames is None:
+            raise ValueError('recFrames must be specified in SpecFrames, ScanOnce or'
+                             ' ScanLapse mode')
+
+        while (self.__recordingManager.record and
+               any([currentFrame[detectorName] < recFrames
+                    for detectorName in self.detectorNames])):
+            for detectorName in self.detectorNames:
+                if currentFrame[detectorName] >= recFrames:
+                    continue  # Reached requested number of frames with this detector, skip
+
+                n = self._queueNewFrames(detectorName,
+                                         maxFrames=recFrames - currentFrame[detectorName])
+                if n > 0:
+                    currentFrame[detectorName] += n
+
+                    # Things get a bit weird if we have multiple detectors when we report
+                    # the current frame number, since the detectors may not be synchronized.
+                    # For now, we will report the lowest number.
+                    self.__recordingManager.sigRecordingFrameNumUpdated.emit(
+                        min(list(currentFrame.values()))
+                    )
+            self._emitWriteStats()
+            self._checkWriters()
+            time.sleep(0.0001)  # Prevents freezing for some reason
+
+        self.__recordingManager.sigRecordingFrameNumUpdated.emit(0)
+
+    def _recordSpecTime(self, currentFrame):
+        recTime = self.recTime
+        if recTime is None:
+            raise ValueError('recTime must be specified in SpecTime mode')
+
+        start = time.time()
+        currentRecTime = 0
+        shouldStop = False
+        while True:
+            for detectorName in self.detectorNames:
+                n = self._queueNewFrames(detectorName)
+                if n > 0:
+                    currentFrame[detectorName] += n
+                    self.__recordingManager.sigRecordingTimeUpdated.emit(
+                        np.around(currentRecTime, decimals=2)
+                    )
+                    currentRecTime = time.time() - start
+            self._emitWriteStats()
+            self._checkWriters()
+
+            if shouldStop:
+                break  # Enter loop one final time, then stop
+
+            if not self.__recordingManager.record or currentRecTime >= recTime:
+                shouldStop = True
+
+            time.sleep(0.0001)  # Prevents freezing for some reason
+
+        self.__recordingManager.sigRecordingTimeUpdated.emit(0)
+
+    def _recordUntilStop(self, currentFrame):
+        shouldStop = False
+        while True:
+            for detectorName in self.detectorNames:
+                currentFrame[detectorName] += self._queueNewFrames(detectorName)
+            self._emitWriteStats()
+            self._checkWriters()
+
+            if shouldStop:
+                break
+
+            if not self.__recordingManager.record:
+                shouldStop = True  # Enter loop one final time, then stop
+
+            time.sleep(0.0001)  # Prevents freezing for some reason
+
+    def _closeStreams(self, fileDests, filePaths):
+        """ Closes the storer streams, and passes on the recordings made to
+        memory. """
+        for detectorName in self.detectorNames:
+            # Handle memory recordings
+            if (self._storer.canStreamToMemory and
+                    self.saveMode in [SaveMode.RAM, SaveMode.DiskAndRAM, SaveMode.RAMArray]):
+                filePath = filePaths[detectorName]
+                name = os.path.basename(filePath)
+                if self.saveMode in [SaveMode.RAM, SaveMode.RAMArray]:
+                    self._storer.closeStream(detectorName)
+                    self.__recordingManager.sigMemoryRecordingAvailable.emit(
+                        name, fileDests[detectorName], filePath, False
+                    )
+                else:
+                    file = self._storer.closeStream(detectorName, closeFile=False)
+                    self.__recordingManager.sigMemoryRecordingAvailable.emit(
+                        name, file, filePath, True
+                    )
+            else:
+                self._storer.closeStream(detectorName)
+
+    def _startWriters(self):
+        """ Creates a write queue and a writer thread for every detector being
+        recorded. """
+        self._queues = {}
+        self._writers = {}
+        self._writerThreads = {}
+        self._lastWriteStatsTime = 0
+
+        for detectorName in self.detectorNames:
+            queue = FrameWriteQueue(self.writeQueueMaxBytes, self.writeQueuePolicy)
+            writer = RecordingWriterWorker(
+                queue, lambda frames, metadata, detectorName=detectorName: self._storer.stream(
+                    {detectorName: frames}, metadata={detectorName: metadata}
+                ),
+                name=detectorName
+            )
+            thread = Thread()
+            writer.moveToThread(thread)
+            thread.started.connect(writer.run)
+            thread.start()
+
+            self._queues[detectorName] = queue
+            self._writers[detectorName] = writer
+            self._writerThreads[detectorName] = thread
+
+    def _stopWriters(self):
+        """ Closes the write queues and waits until all queued frames have been
+        written. """
+        for queue in self._queues.values():
+            queue.close()
+
+        for thread in self._writerThreads.values():
+            thread.quit()
+            thread.wait()
+
+        for detectorName, stats in self._getWriteStats().items():
+            if stats.droppedFrames > 0:
+                self.__logger.warning(f'Dropped {stats.droppedFrames} frames from'
+                                      f' {detectorName} because its write queue was full')
+            if stats.failedFrames > 0:
+                self.__logger.error(f'Failed to write {stats.failedFrames} frames from'
+                                    f' {detectorName}')
+
+    def _checkWriters(self):
+        """ Raises the error of the first writer that has failed, which ends
+        the recording. """
+        for queue in self._queues.values():
+            queue.raiseIfFailed()
+
+    def _getWriteStats(self):
+        return {detectorName: queue.getStats() for detectorName, queue in self._queues.items()}
+
+    def _emitWriteStats(self, force=False):
+        now = time.time()
+        if not force and now - self._lastWriteStatsTime < _writeStatsUpdatePeriod:
+            return
+
+        self._lastWriteStatsTime = now
+        for detectorName, stats in self._getWriteStats().items():
+            self.__recordingManager.sigRecordingWriteStatsUpdated.emit(detectorName, stats)
+
+    def _queueNewFrames(self, detectorName, maxFrames=None):
+        """ Fetches new frames from the detector and puts them in its write
+        queue. Returns the number of frames queued. """
+        newFrames, metadata = self._getNewFrames(detectorName)
+        if maxFrames is not None:
+            newFrames, metadata = newFrames[:maxFrames], metadata[:maxFrames]
+
+        n = len(newFrames)
+        if n > 0:
+            self._queues[detectorName].put(newFrames, metadata)
+            if Instrumentation.isEnabled():
+                stats = self._queues[detectorName].getStats()
+                Instrumentation.setGauge('writeQueueFrames', stats.queuedFrames,
+                                         detector=detectorName)
+                Instrumentation.setGauge('writeQueueBytes', stats.queuedBytes,
+                                         detector=detectorName)
+        return n
+
     def _getFiles(self):
-        singleMultiDetectorFile = self.singleMultiDetectorFile
+        # TIFF files hold a single series, so they can't be shared by detectors
+        singleMultiDetectorFile = (self.singleMultiDetectorFile and
+                                   self._storer.canShareStreamFiles)
         singleLapseFile = self.recMode == RecMode.ScanLapse and self.singleLapseFile
+        toMemory = (self.saveMode in [SaveMode.RAM, SaveMode.RAMArray] and
+                    self._storer.canStreamToMemory)
 
-        files = {}
         fileDests = {}
         filePaths = {}
-        extension = 'hdf5' if self.saveFormat == SaveFormat.HDF5 else 'zarr'
+        extension = self._storer.streamExtension
 
         for detectorName in self.detectorNames:
             if singleMultiDetectorFile:
@@ -583,38 +1320,70 @@ class RecordingWorker(Worker):
             else:
                 baseFilePath = f'{self.savename}_{detectorName}.{extension}'
 
-            filePaths[detectorName] = self.__recordingManager.getSaveFilePath(
-                baseFilePath,
-                allowOverwriteDisk=singleLapseFile and self.saveMode != SaveMode.RAM,
-                allowOverwriteMem=singleLapseFile and self.saveMode == SaveMode.RAM
-            )
+            if singleMultiDetectorFile and len(filePaths) > 0:
+                filePaths[detectorName] = list(filePaths.values())[0]
+            else:
+                filePaths[detectorName] = self.__recordingManager.getSaveFilePath(
+                    baseFilePath,
+                    allowOverwriteDisk=singleLapseFile and not toMemory,
+                    allowOverwriteMem=singleLapseFile and toMemory
+                )
 
         for detectorName in self.detectorNames:
-            if self.saveMode == SaveMode.RAM:
+            if toMemory:
                 memRecordings = self.__recordingManager._memRecordings
                 if (filePaths[detectorName] not in memRecordings or
                         memRecordings[filePaths[detectorName]].closed):
-                    memRecordings[filePaths[detectorName]] = BytesIO()
+                    memRecordings[filePaths[detectorName]] = (
+                        VArrayFile(filePaths[detectorName]) if self.saveMode == SaveMode.RAMArray
+                        else BytesIO()
+                    )
                 fileDests[detectorName] = memRecordings[filePaths[detectorName]]
             else:
                 fileDests[detectorName] = filePaths[detectorName]
 
-            if singleMultiDetectorFile and len(files) > 0:
-                files[detectorName] = list(files.values())[0]
-            else:
-                if self.saveFormat == SaveFormat.HDF5:
-                    files[detectorName] = h5py.File(fileDests[detectorName],
-                                                    'a' if singleLapseFile else 'w-')
-                elif self.saveFormat == SaveFormat.ZARR:
-                    self.store = zarr.storage.DirectoryStore(fileDests[detectorName])
-                    files[detectorName] = zarr.group(store=self.store, overwrite=True)
-
-        return files, fileDests, filePaths
+        return fileDests, filePaths
 
     def _getNewFrames(self, detectorName):
-        newFrames = self.__recordingManager.detectorsManager[detectorName].getChunk()
-        newFrames = np.array(newFrames)
-        return newFrames
+        with Instrumentation.measure('getChunk', detector=detectorName):
+            newFrames, metadata = \
+                self.__recordingManager.detectorsManager[detectorName].getChunkWithMetadata()
+        # The detector hands over frames that it won't write into again (see getChunk), so they
+        # can wait in the write queue without being copied
+        return np.asarray(newFrames), metadata
+
+
+class RecordingWriterWorker(Worker):
+    """ Takes chunks of frames out of a write queue and writes them using the
+    given write function, which is passed the frames and their metadata,
+    until the queue is closed and empty. If a write fails, the queue is
+    closed with the error, which stops the recording. """
+
+    def __init__(self, queue, writeFunc, name=None):
+        super().__init__()
+        self.__logger = initLogger(self)
+        self._queue = queue
+        self._writeFunc = writeFunc
+        self._name = name
+
+    def run(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                break
+
+            frames, metadata = chunk
+            start = time.perf_counter()
+            try:
+                self._writeFunc(frames, metadata)
+            except Exception as e:
+                self.__logger.error(traceback.format_exc())
+                self._queue.chunkFailed(len(frames), e)
+                continue
+            elapsed = time.perf_counter() - start
+            self._queue.chunkWritten(len(frames), elapsed)
+            Instrumentation.record('storerWrite', elapsed, detector=self._name)
+            Instrumentation.count('framesWritten', len(frames), detector=self._name)
 
 
 class RecMode(enum.Enum):
@@ -625,6 +1394,12 @@ class RecMode(enum.Enum):
     UntilStop = 5
 
 
+_streamGrowthFrames = 64
+_sharedMemoryDir = '/dev/shm'
+_frameMetadataGroup = 'frame_metadata'
+_writeStatsUpdatePeriod = 0.5  # seconds
+
+
 # Copyright (C) 2020-2021 ImSwitch developers
 # This file is part of ImSwitch.
 #
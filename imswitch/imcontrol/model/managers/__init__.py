@@ -4,7 +4,9 @@ from .MultiManager import MultiManager
 from .NidaqManager import NidaqManager
 from .PositionersManager import PositionersManager
 from .RS232sManager import RS232sManager
-from .RecordingManager import RecordingManager, RecMode, SaveMode, SaveFormat
+from .RecordingManager import (
+    RecordingManager, RecMode, SaveMode, SaveFormat, WriteQueuePolicy, WriteQueueStats
+)
 from .SLMManager import SLMManager
 from .ScanManagerPointScan import ScanManagerPointScan
 from .ScanManagerBase import ScanManagerBase
@@ -3,6 +3,7 @@ import numpy as np
 from imswitch.imcommon.framework import Signal, Thread, Worker
 from imswitch.imcommon.model import initLogger
 from .DetectorManager import DetectorManager
+from ...signaldesigners.compactsignals import asCompactSignal
 
 
 class APDManager(DetectorManager):
@@ -53,6 +54,7 @@ class APDManager(DetectorManager):
             lambda scanInfoDict, signalDict, _: self.initiateScan(scanInfoDict, signalDict)
         )
         self._nidaqManager.sigScanStarted.connect(self.startScan)
+        self._nidaqManager.sigScanStopping.connect(self.stopScan)
         self.__shape = fullShape
         super().__init__(detectorInfo, name, fullShape=fullShape, supportedBinnings=[1],
                          model=model, parameters=parameters, croppable=False)
@@ -81,6 +83,11 @@ class APDManager(DetectorManager):
         if self.acquisition:
             self._scanThread.start()
 
+    def stopScan(self):
+        # The counter input task is about to be stopped, so reading from it will fail
+        if self._scanWorker is not None:
+            self._scanWorker.scanning = False
+
     def startAcquisition(self):
         self.acquisition = True
         self.__newFrameReady = False
@@ -237,13 +244,12 @@ class ScanWorker(Worker):
         # ratio between detection sample rate and scanning sample rate
         self._frac_scan_det_rate = round(self._manager._detection_samplerate * scanInfoDict['scan_time_step'])
 
-        # extract APD signals from signalDict
+        # extract APD signals from signalDict, the samples for each line are taken from it when
+        # the line is read
         if self._manager._ttlmultiplying:
             for target in signalDict['TTLCycleSignalsDict'].keys():
                 if self._name == target:
-                    self._seq_signal = np.repeat(signalDict['TTLCycleSignalsDict'][target].copy(), self._frac_scan_det_rate)
-                    self._seq_signal = self._seq_signal.astype('float')
-                    self._seq_signal[self._seq_signal == 0] = np.nan
+                    self._seq_signal = asCompactSignal(signalDict['TTLCycleSignalsDict'][target])
                     break
 
         # number of steps on each axis in image
@@ -267,16 +273,24 @@ class ScanWorker(Worker):
         # scan samples for zero padding at end of scanning curve dimensions
         self._samples_padlens = [round(scanInfoDict['padlens'][i] * self._frac_scan_det_rate) for i in range(len(scanInfoDict['padlens']))]
 
+        # number of times the scan is repeated, None if it's repeated until stopped
+        self._repetitions = scanInfoDict.get('repetitions', 1)
+
         self._phase_delay = int(scanInfoDict['phase_delay'])
         self._samples_throw_init = self._throw_startzero
         
         # samples to throw due to smooth between d>2 step transitioning
         self._throw_init_d2_step = (self._throw_initpos + self._throw_settling + self._throw_startacc + self._phase_delay)
 
-        self._manager._nidaqManager.startInputTask(self._name, 'ci', self._channel, 'finite',
+        if self._repetitions is None:
+            acquisitionType, sampsInScan = 'continuous', self._samples_total
+        else:
+            acquisitionType, sampsInScan = 'finite', self._samples_total * self._repetitions
+        self._manager._nidaqManager.startInputTask(self._name, 'ci', self._channel,
+                                                   acquisitionType,
                                                    self._manager._nidaq_clock_source,
                                                    self._manager._detection_samplerate,
-                                                   self._samples_total, True, 'ao/StartTrigger',
+                                                   sampsInScan, True, 'ao/StartTrigger',
                                                    self._manager._terminal)
         self._manager.initiateImage(self._img_dims)
         self._manager.setPixelSize(scanInfoDict['pixel_sizes'])  # 'pixel_sizes' order: low dim to high dim
@@ -299,6 +313,16 @@ class ScanWorker(Worker):
         self._samples_read += datalen
         return data
 
+    def get_seq_signal(self, start, stop):
+        """ Get the TTL sequence signal for the detection samples from start to stop, with
+        the scanning samples repeated to the detection sample rate, and NaN where it is off.
+        """
+        indices = np.arange(max(start, 0), stop) // self._frac_scan_det_rate
+        indices = indices[indices < len(self._seq_signal)]
+        ttl_seq = self._seq_signal.take(indices).astype('float')
+        ttl_seq[ttl_seq == 0] = np.nan
+        return ttl_seq
+
     def samples_to_pixels(self, line_samples):
         """ Reshape read datastream over the line to a line with pixel counts.
         Do this by summing elements, with the rate ratio calculated previously.
@@ -323,6 +347,22 @@ class ScanWorker(Worker):
         """ Main run for acquisition.
         """
         self._ploty = 1
+        repetition = 0
+        try:
+            while self.scanning and (self._repetitions is None or repetition < self._repetitions):
+                self.run_repetition()
+                repetition += 1
+        except Exception:
+            if self.scanning:
+                raise
+            self.__logger.debug('Close data reading: scan stopped')
+        self.acqDoneSignal.emit()
+
+    def run_repetition(self):
+        """ Record one repetition of the scan. Positions in the stream are
+        counted from the start of the repetition.
+        """
+        self._samples_read = 0
         # create empty current position counter
         self._pos = np.zeros(len(self._img_dims), dtype='uint16')
         # throw away initial recording samples
@@ -333,9 +373,9 @@ class ScanWorker(Worker):
         # start looping through all dimensions to record data, starting with the outermost dimension
         self.run_loop_dx(dim=len(self._img_dims))
 
-        # throw acquisition-final positioning datae
-        self.throwdata(self._throw_startzero + self._throw_finalpos)
-        self.acqDoneSignal.emit()
+        # throw acquisition-final positioning data, and any padding after it, so that the next
+        # repetition starts at the right sample
+        self.throwdata(self._samples_total - self._samples_read)
 
     def run_loop_dx(self, dim):
         """ Recursive looping through all scanning dimensions, actually read samples at dim = 2,
@@ -376,7 +416,7 @@ class ScanWorker(Worker):
                 data = self.readdata(self._samples_line)
                 if self._manager._ttlmultiplying:
                     seq_signal_xend = self._samples_read-self._phase_delay
-                    ttl_seq = self._seq_signal[seq_signal_xstart:seq_signal_xend]
+                    ttl_seq = self.get_seq_signal(seq_signal_xstart, seq_signal_xend)
             else:
                 # read a whole period, starting with the line and then the data during the flyback
                 if self._manager._ttlmultiplying:
@@ -386,7 +426,7 @@ class ScanWorker(Worker):
                 #self.__logger.debug(self._samples_d2_period)
                 if self._manager._ttlmultiplying:
                     seq_signal_xend = self._samples_read-self._phase_delay
-                    ttl_seq = self._seq_signal[seq_signal_xstart:seq_signal_xend]
+                    ttl_seq = self.get_seq_signal(seq_signal_xstart, seq_signal_xend)
             # get photon counts from data array (which is cumsummed)
             data_cnts = np.concatenate(([data[0]-self._last_value], np.diff(data)))
             self._last_value = data[-1]
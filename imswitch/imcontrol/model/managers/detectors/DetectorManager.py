@@ -1,3 +1,4 @@
+import time
 import traceback
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
@@ -5,7 +6,7 @@ from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 
-from imswitch.imcommon.framework import Signal, SignalInterface
+from imswitch.imcommon.framework import Instrumentation, Signal, SignalInterface
 from imswitch.imcommon.model import initLogger
 
 
@@ -59,12 +60,38 @@ class DetectorListParameter(DetectorParameter):
     """ The available values to pick from. """
 
 
+FRAME_METADATA_DTYPE = np.dtype([
+    ('frameNumber', np.int64),  # Frame counter of the camera, or of the manager if unavailable
+    ('hostTimestamp', np.float64),  # Time (time.time()) at which the host received the frame
+    ('deviceTimestamp', np.float64),  # Camera timestamp in seconds; NaN if unavailable
+    ('exposure', np.float64),  # Exposure time in seconds; NaN if unknown
+    ('droppedBefore', np.int64)  # Number of frames the camera skipped right before this one
+])
+""" Data type of the per-frame metadata records returned by
+DetectorManager.getChunkWithMetadata. """
+
+
+def createFrameMetadata(numFrames: int, *, frameNumbers=None, hostTimestamps=None,
+                        deviceTimestamps=None, exposure=None, droppedBefore=None) -> np.ndarray:
+    """ Creates an array of numFrames frame metadata records. Fields that are
+    not specified are filled in with consecutive frame numbers, the current
+    time, NaN and 0 respectively. """
+    metadata = np.empty(numFrames, dtype=FRAME_METADATA_DTYPE)
+    metadata['frameNumber'] = frameNumbers if frameNumbers is not None else np.arange(numFrames)
+    metadata['hostTimestamp'] = hostTimestamps if hostTimestamps is not None else time.time()
+    metadata['deviceTimestamp'] = deviceTimestamps if deviceTimestamps is not None else np.nan
+    metadata['exposure'] = exposure if exposure is not None else np.nan
+    metadata['droppedBefore'] = droppedBefore if droppedBefore is not None else 0
+    return metadata
+
+
 class DetectorManager(SignalInterface):
     """ Abstract base class for managers that control detectors. Each type of
     detector corresponds to a manager derived from this class. """
 
     sigImageUpdated = Signal(np.ndarray, bool, list)
     sigNewFrame = Signal()
+    sigFramesAvailable = Signal(str)  # (detectorName)
 
     @abstractmethod
     def __init__(self, detectorInfo, name: str, fullShape: Tuple[int, int],
@@ -102,6 +129,8 @@ class DetectorManager(SignalInterface):
         self.__fullShape = fullShape
         self.__supportedBinnings = supportedBinnings
         self.__image = np.array([])
+        self.__numChunkFrames = 0
+        self.__framesPending = False
 
         self.__forAcquisition = detectorInfo.forAcquisition
         self.__forFocusLock = detectorInfo.forFocusLock
@@ -113,12 +142,19 @@ class DetectorManager(SignalInterface):
 
     def updateLatestFrame(self, init):
         """ :meta private: """
-        try:
-            self.__image = self.getLatestFrame()
-        except Exception:
-            self.__logger.error(traceback.format_exc())
-        else:
-            self.sigImageUpdated.emit(self.__image, init, self.scale)
+        # Cleared before reading, so that frames arriving meanwhile are notified again
+        self.__framesPending = False
+        with Instrumentation.measure('updateLatestFrame', detector=self.__name):
+            try:
+                self.__image = self.getLatestFrame()
+            except Exception:
+                self.__logger.error(traceback.format_exc())
+            else:
+                self.sigImageUpdated.emit(self.__image, init, self.scale)
+
+    def clearFrameNotification(self):
+        """ :meta private: """
+        self.__framesPending = False
 
     def setParameter(self, name: str, value: Any) -> Dict[str, DetectorParameter]:
         """ Sets a parameter value and returns the updated list of parameters.
@@ -206,6 +242,14 @@ class DetectorManager(SignalInterface):
         """ Whether the detector is used for focus lock. """
         return self.__forFocusLock
 
+    @property
+    def notifiesNewFrames(self) -> bool:
+        """ Whether the manager emits sigFramesAvailable when new frames
+        arrive, so that the live view can be updated as soon as they do
+        instead of on a timer. Managers that do so should override this and
+        call _notifyFramesAvailable. """
+        return False
+
     @property
     def scale(self) -> List[int]:
         """ The pixel sizes in micrometers, all axes, in the format high dim
@@ -237,9 +281,28 @@ class DetectorManager(SignalInterface):
         """ Returns the frames captured by the detector since getChunk was last
         called, or since the buffers were last flushed (whichever happened
         last). The returned object is a numpy array of shape
-        (numFrames, height, width). """
+        (numFrames, height, width). The caller may keep the frames for as long
+        as it likes, e.g. in a recording's write queue, so they must not be
+        views of buffers that the detector writes later frames into. """
         pass
 
+    def getChunkWithMetadata(self) -> Tuple[np.ndarray, np.ndarray]:
+        """ Like getChunk, but also returns a metadata record (see
+        FRAME_METADATA_DTYPE) for each frame. Detectors that know more about
+        their frames than when they were received should override this, and
+        implement getChunk by calling it. """
+        frames = self.getChunk()
+        frames = np.asarray(frames) if frames is not None else np.empty((0, 0, 0))
+        if frames.ndim == 2:
+            frames = frames[np.newaxis]
+
+        metadata = createFrameMetadata(
+            len(frames),
+            frameNumbers=np.arange(self.__numChunkFrames, self.__numChunkFrames + len(frames))
+        )
+        self.__numChunkFrames += len(frames)
+        return frames, metadata
+
     @abstractmethod
     def flushBuffers(self) -> None:
         """ Flushes the detector buffers so that getChunk starts at the last
@@ -260,6 +323,16 @@ class DetectorManager(SignalInterface):
         """ Close/cleanup detector. """
         pass
 
+    def _notifyFramesAvailable(self) -> None:
+        """ Emits sigFramesAvailable, unless the live view has not yet picked
+        up the frames of the previous notification. May be called from any
+        thread, e.g. for every frame received. """
+        if not self.__framesPending:
+            self.__framesPending = True
+            self.sigFramesAvailable.emit(self.__name)
+        else:
+            Instrumentation.count('framesAvailableCoalesced', detector=self.__name)
+
 
 # Copyright (C) 2020-2021 ImSwitch developers
 # This file is part of ImSwitch.
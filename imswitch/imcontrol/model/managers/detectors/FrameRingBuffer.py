@@ -0,0 +1,285 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from imswitch.imcommon.framework import Thread, Worker
+from .DetectorManager import FRAME_METADATA_DTYPE
+
+
+@dataclass(frozen=True)
+class FrameRingBufferStats:
+    """ Frame counters of a FrameRingBuffer. """
+
+    pushedFrames: int
+    """ Number of frames pushed since the buffer was last reset. """
+
+    overwrittenFrames: int
+    """ Number of frames that were overwritten before they were read. """
+
+    droppedFrames: int
+    """ Number of frames that never reached the buffer, as detected from gaps
+    in the frame IDs reported by the camera. """
+
+
+class FrameRingBuffer:
+    """ A preallocated ring buffer of frames, with a metadata record (see
+    FRAME_METADATA_DTYPE) per frame. Detector managers push the frames they receive from the camera
+    into it, and read them back with getChunk and getLatest without any
+    per-frame allocations.
+
+    The buffer has no locking, so it must only be filled by one thread at a
+    time, and read by one thread at a time; detector managers that push and
+    read from different threads serialize the calls with a lock of their own.
+    The views returned by readChunk stay valid until the producer pushes into
+    their slots again, so a reader that hands frames on to another thread
+    (like getChunkWithMetadata for the recording) should ask readChunk for
+    copies, which are made while the frames are known to be intact. The
+    slots are allocated when the first frame arrives, and reallocated
+    (discarding their contents) if the frame shape or dtype changes, e.g.
+    after cropping. If numSlots is not specified, as many slots as fit in
+    maxBytes are used.
+    """
+
+    def __init__(self, numSlots: Optional[int] = None, maxBytes: int = 256 * 1024 ** 2):
+        self._requestedNumSlots = numSlots
+        self._maxBytes = maxBytes
+        self._frames = None
+        self._metadata = None
+        self._numSlots = 0
+        self._writeCount = 0
+        self._readCount = 0
+        self._lastFrameId = None
+        self._overwrittenFrames = 0
+        self._droppedFrames = 0
+
+    @property
+    def numSlots(self) -> int:
+        """ Number of frames the buffer can hold; 0 until the first frame has
+        been pushed. """
+        return self._numSlots
+
+    @property
+    def numAvailable(self) -> int:
+        """ Number of frames pushed but not read yet that are still in the
+        buffer. """
+        return min(self._writeCount - self._readCount, self._numSlots)
+
+    def push(self, frame: np.ndarray, frameId: Optional[int] = None,
+             timestamp: Optional[float] = None, deviceTimestamp: Optional[float] = None,
+             exposure: Optional[float] = None) -> None:
+        """ Copies a frame into the next slot, overwriting the oldest frame if
+        the buffer is full. If frameId is not specified, frames are numbered
+        consecutively; if timestamp (the host time at which the frame was
+        received) is not specified, the current time is used. """
+        if self._frames is None or self._frames.shape[1:] != frame.shape \
+                or self._frames.dtype != frame.dtype:
+            self._allocate(frame.shape, frame.dtype)
+
+        droppedBefore = 0
+        if frameId is None:
+            frameId = self._lastFrameId + 1 if self._lastFrameId is not None else 0
+        elif self._lastFrameId is not None and frameId > self._lastFrameId + 1:
+            droppedBefore = frameId - self._lastFrameId - 1
+            self._droppedFrames += droppedBefore
+        self._lastFrameId = frameId
+
+        slot = self._writeCount % self._numSlots
+        self._frames[slot] = frame
+        self._metadata[slot] = (frameId,
+                                timestamp if timestamp is not None else time.time(),
+                                deviceTimestamp if deviceTimestamp is not None else np.nan,
+                                exposure if exposure is not None else np.nan,
+                                droppedBefore)
+        # Publish the frame only once it has been fully written
+        self._writeCount += 1
+
+    def pushChunk(self, frames, frameIds=None, timestamps=None, deviceTimestamps=None,
+                  exposure=None) -> None:
+        """ Pushes each frame of a chunk (an array or a sequence of frames),
+        optionally with their frame IDs and timestamps, and the exposure time
+        they were taken with. """
+        for i, frame in enumerate(frames):
+            self.push(frame,
+                      frameIds[i] if frameIds is not None else None,
+                      timestamps[i] if timestamps is not None else None,
+                      deviceTimestamps[i] if deviceTimestamps is not None else None,
+                      exposure)
+
+    def readChunk(self, copy: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """ Returns the frames pushed since the last read, along with their
+        metadata records. If the frames lie contiguously in the
+        buffer and copy is False, views of it are returned; they remain valid
+        until the slots are overwritten by new frames. Otherwise, new arrays
+        owned by the caller are returned. Frames that were overwritten before
+        being read are skipped and counted. """
+        writeCount = self._writeCount
+        if self._frames is None or writeCount <= self._readCount:
+            return self._getEmptyChunk()
+
+        start = self._readCount
+        if writeCount - start > self._numSlots:
+            self._overwrittenFrames += writeCount - start - self._numSlots
+            start = writeCount - self._numSlots
+        self._readCount = writeCount
+
+        startSlot = start % self._numSlots
+        endSlot = startSlot + writeCount - start
+        if endSlot <= self._numSlots:
+            frames, metadata = self._frames[startSlot:endSlot], self._metadata[startSlot:endSlot]
+            return (frames.copy(), metadata.copy()) if copy else (frames, metadata)
+
+        endSlot -= self._numSlots
+        return tuple(np.concatenate((array[startSlot:], array[:endSlot]))
+                     for array in (self._frames, self._metadata))
+
+    def getChunk(self) -> np.ndarray:
+        """ Returns the frames pushed since the last read, as an array of
+        shape (numFrames, height, width). See readChunk. """
+        return self.readChunk()[0]
+
+    def getLatest(self) -> Optional[np.ndarray]:
+        """ Returns a copy of the most recently pushed frame, or None if no
+        frames have been pushed. Does not count as reading the frame. """
+        writeCount = self._writeCount
+        if writeCount < 1 or self._frames is None:
+            return None
+        return self._frames[(writeCount - 1) % self._numSlots].copy()
+
+    def flush(self) -> None:
+        """ Discards the frames that have not been read yet. Frames that the
+        camera skips until the next push are not counted as dropped. """
+        self._readCount = self._writeCount
+        self._lastFrameId = None
+
+    def reset(self) -> None:
+        """ Discards all frames and resets the counters. """
+        self._writeCount = 0
+        self._readCount = 0
+        self._lastFrameId = None
+        self._overwrittenFrames = 0
+        self._droppedFrames = 0
+
+    def getStats(self) -> FrameRingBufferStats:
+        return FrameRingBufferStats(pushedFrames=self._writeCount,
+                                    overwrittenFrames=self._overwrittenFrames,
+                                    droppedFrames=self._droppedFrames)
+
+    def _allocate(self, frameShape, dtype):
+        numSlots = self._requestedNumSlots
+        if numSlots is None:
+            frameBytes = max(int(np.prod(frameShape)) * np.dtype(dtype).itemsize, 1)
+            numSlots = max(self._maxBytes // frameBytes, _minNumSlots)
+
+        self._frames = np.empty((numSlots, *frameShape), dtype=dtype)
+        self._metadata = np.empty(numSlots, dtype=FRAME_METADATA_DTYPE)
+        self._numSlots = numSlots
+        self._writeCount = 0
+        self._readCount = 0
+
+    def _getEmptyChunk(self):
+        frameShape = self._frames.shape[1:] if self._frames is not None else (0, 0)
+        dtype = self._frames.dtype if self._frames is not None else np.uint16
+        return (np.empty((0, *frameShape), dtype=dtype),
+                np.empty(0, dtype=FRAME_METADATA_DTYPE))
+
+
+class FrameBufferProducer:
+    """ Pulls the frames that a camera acquires into a FrameRingBuffer on a
+    background thread while the acquisition runs, so that a detector manager
+    can notify the live view about new frames as they arrive. pullFrames
+    pushes the frames received since the last call into the buffer and
+    returns how many it pushed; it is called with lock held, the lock that
+    the manager also holds when it reads from the buffer. notify is called
+    (without the lock) whenever frames were pushed, and interval returns how
+    many seconds to wait between calls to pullFrames, e.g. 0 if it waits for
+    new frames itself. """
+
+    def __init__(self, pullFrames: Callable[[], int], lock, notify: Callable[[], None],
+                 interval: Callable[[], float]):
+        self._pullFrames = pullFrames
+        self._lock = lock
+        self._notify = notify
+        self._interval = interval
+        self._worker = None
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        """ Whether the producer thread is running. """
+        return self._thread is not None
+
+    def start(self) -> None:
+        """ Starts the producer thread, unless it is already running. """
+        if self._thread is not None:
+            return
+
+        self._worker = FrameBufferProducerWorker(self._pullFrames, self._lock, self._notify,
+                                                 self._interval)
+        self._thread = Thread()
+        self._worker.moveToThread(self._thread)
+        self._thread.started.connect(self._worker.run)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """ Stops the producer thread and waits for it to finish. """
+        if self._thread is None:
+            return
+
+        self._worker.producing = False
+        self._thread.quit()
+        self._thread.wait()
+        self._worker = None
+        self._thread = None
+
+
+class FrameBufferProducerWorker(Worker):
+    """ Runs the loop of a FrameBufferProducer until producing is set to
+    False. """
+
+    def __init__(self, pullFrames, lock, notify, interval):
+        super().__init__()
+        self._pullFrames = pullFrames
+        self._lock = lock
+        self._notify = notify
+        self._interval = interval
+        self.producing = True
+
+    def run(self):
+        while self.producing:
+            with self._lock:
+                numFrames = self._pullFrames()
+            if numFrames > 0:
+                self._notify()
+            self._wait(self._interval())
+
+    def _wait(self, seconds):
+        # Sleeps in short steps, so that stopping the producer doesn't take long
+        deadline = time.perf_counter() + seconds
+        while self.producing:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, _producerMaxSleep))
+
+
+_minNumSlots = 2
+_producerMaxSleep = 0.1  # seconds
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -1,7 +1,12 @@
+import threading
+
+import numpy as np
+
 from imswitch.imcommon.model import initLogger
 from .DetectorManager import (
     DetectorManager, DetectorNumberParameter, DetectorListParameter
 )
+from .FrameRingBuffer import FrameBufferProducer, FrameRingBuffer
 
 
 class HamamatsuManager(DetectorManager):
@@ -21,6 +26,11 @@ class HamamatsuManager(DetectorManager):
 
         self._camera = self._getCameraObj(detectorInfo.managerProperties['cameraListIndex'])
         self._binning = 1
+        self._lock = threading.Lock()
+        self._frameBuffer = FrameRingBuffer()
+        self._producer = FrameBufferProducer(self._pullFrames, self._lock,
+                                             self._notifyFramesAvailable,
+                                             lambda: _framePollInterval)
 
         for propertyName, propertyValue in detectorInfo.managerProperties['hamamatsu'].items():
             self._camera.setPropertyValue(propertyName, propertyValue)
@@ -62,14 +72,31 @@ class HamamatsuManager(DetectorManager):
         umxpx = self.parameters['Camera pixel size'].value
         return [1, umxpx, umxpx]
 
+    @property
+    def notifiesNewFrames(self):
+        return True
+
     def getLatestFrame(self, is_save=True):
-        return self._camera.getLast()
+        with self._lock:
+            if not self._producer.running:
+                self._pullFrames()
+            latestFrame = self._frameBuffer.getLatest()
+        # Until the first frame arrives, show what the camera has in its buffer
+        return latestFrame if latestFrame is not None else self._camera.getLast()
 
     def getChunk(self):
-        return self._camera.getFrames()[0]
+        return self.getChunkWithMetadata()[0]
+
+    def getChunkWithMetadata(self):
+        with self._lock:
+            if not self._producer.running:
+                self._pullFrames()
+            return self._frameBuffer.readChunk(copy=True)
 
     def flushBuffers(self):
-        self._camera.updateIndices()
+        with self._lock:
+            self._camera.updateIndices()
+            self._frameBuffer.flush()
 
     def crop(self, hpos, vpos, hsize, vsize):
         """Method to crop the frame read out by the camera. """
@@ -116,10 +143,31 @@ class HamamatsuManager(DetectorManager):
 
     def startAcquisition(self):
         self._camera.startAcquisition()
+        self._producer.start()
 
     def stopAcquisition(self):
+        self._producer.stop()
         self._camera.stopAcquisition()
 
+    def finalize(self):
+        self._producer.stop()
+        super().finalize()
+
+    def _pullFrames(self):
+        """ Pushes the frames that the camera has acquired since the last call
+        into the frame buffer, and returns how many there were. Must be called
+        with the lock held. """
+        frames = self._camera.getFrames()[0]
+        if len(frames) > 0:
+            # The camera counts the frames it has acquired; use that to detect dropped frames
+            lastFrameNumber = self._camera.last_frame_number
+            self._frameBuffer.pushChunk(
+                frames, frameIds=np.arange(lastFrameNumber - len(frames), lastFrameNumber),
+                deviceTimestamps=self._camera.last_frame_timestamps,
+                exposure=self.parameters['Real exposure time'].value
+            )
+        return len(frames)
+
     def _setExposure(self, time):
         self._camera.setPropertyValue('exposure_time', time)
 
@@ -191,6 +239,9 @@ class HamamatsuManager(DetectorManager):
         return camera
 
 
+_framePollInterval = 0.005  # seconds
+
+
 # Copyright (C) 2020-2021 ImSwitch developers
 # This file is part of ImSwitch.
 #
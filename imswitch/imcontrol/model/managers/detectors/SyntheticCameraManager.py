@@ -0,0 +1,378 @@
+import threading
+import time
+from typing import Tuple
+
+import numpy as np
+
+from imswitch.imcommon.framework import Thread, Worker
+from imswitch.imcommon.model import initLogger
+from .DetectorManager import (
+    DetectorManager, DetectorNumberParameter, FRAME_METADATA_DTYPE
+)
+from .FrameRingBuffer import FrameRingBufferStats
+
+
+class SyntheticCameraManager(DetectorManager):
+    """ DetectorManager that generates synthetic frames, for testing and
+    benchmarking acquisition, live view and recording without any hardware. A
+    bank of frames is computed when the manager is created and then played
+    back at the configured frame rate, so that producing a frame costs next to
+    nothing and throughput measurements reflect ImSwitch rather than the
+    camera.
+
+    Manager properties:
+
+    - ``width`` -- frame width in pixels (default 512)
+    - ``height`` -- frame height in pixels (default 512)
+    - ``fps`` -- frame rate in frames per second (default 100)
+    - ``pattern`` -- ``'noise'`` for background noise only, ``'beads'``
+      (default) for beads drifting over the background, or ``'scan'`` for a
+      spot raster-scanning the field of view
+    - ``numBankFrames`` -- number of distinct frames to precompute
+      (default 32)
+    - ``bufferFrames`` -- number of frames the simulated camera buffer holds;
+      frames that are not read before the buffer wraps around are counted as
+      overwritten (default 256)
+    - ``useProducerThread`` -- whether frames are produced by a background
+      thread running at the frame rate (default), in which case frames are
+      dropped if the thread falls behind; otherwise, the frames due since the
+      last read are produced when frames are requested
+    - ``pixelSizeUm`` -- pixel size in micrometers (default 1)
+    - ``seed`` -- seed for generating the frame bank (default 0)
+    - ``stampFrames`` -- whether the number of each frame and its camera
+      timestamp (the time at which it was due according to the frame rate,
+      comparable to time.time()) are written into its first pixels, so that
+      the latency of a frame can be measured wherever it ends up (see
+      readFrameStamp); this costs a copy of every frame (default False)
+    """
+
+    def __init__(self, detectorInfo, name, **_lowLevelManagers):
+        self.__logger = initLogger(self, instanceName=name)
+
+        properties = detectorInfo.managerProperties
+        fullShape = (int(properties.get('width', 512)), int(properties.get('height', 512)))
+        self._pixelSizeUm = properties.get('pixelSizeUm', 1)
+        self._bufferFrames = int(properties.get('bufferFrames', 256))
+        self._useProducerThread = properties.get('useProducerThread', True)
+        self._stampFrames = properties.get('stampFrames', False)
+
+        start = time.perf_counter()
+        self._bank = makeFrameBank(
+            properties.get('pattern', 'beads'), (fullShape[1], fullShape[0]),
+            int(properties.get('numBankFrames', 32)), seed=properties.get('seed', 0)
+        )
+        self.__logger.debug(f'Generated {len(self._bank)} frames in'
+                            f' {time.perf_counter() - start:.2f} s')
+        self._frames = self._bank
+
+        self._lock = threading.Lock()
+        self._metadata = np.zeros(self._bufferFrames, dtype=FRAME_METADATA_DTYPE)
+        self._fps = float(properties.get('fps', 100))
+        self._running = False
+        self._resetCounters()
+
+        self._producer = None
+        self._producerThread = None
+
+        parameters = {
+            'Frame rate': DetectorNumberParameter(group='Timings', value=self._fps,
+                                                  valueUnits='fps', editable=True),
+        }
+
+        super().__init__(detectorInfo, name, fullShape=fullShape, supportedBinnings=[1],
+                         model='Synthetic camera', parameters=parameters, croppable=True)
+
+    @property
+    def pixelSizeUm(self):
+        return [1, self._pixelSizeUm, self._pixelSizeUm]
+
+    @property
+    def notifiesNewFrames(self):
+        return self._useProducerThread
+
+    def getLatestFrame(self, is_save=False):
+        with self._lock:
+            if not self._useProducerThread:
+                self._produce()
+            latestFrameNumber = self._lastFrameNumber
+            latestMetadata = self._metadata[(self._writeCount - 1) % self._bufferFrames]
+
+        frame = self._frames[max(latestFrameNumber, 0) % len(self._frames)]
+        if self._stampFrames and latestFrameNumber >= 0:
+            frame = frame.copy()
+            stampFrames(frame[np.newaxis], [latestFrameNumber],
+                        [latestMetadata['deviceTimestamp']])
+        return frame
+
+    def getChunk(self):
+        return self.getChunkWithMetadata()[0]
+
+    def getChunkWithMetadata(self):
+        with self._lock:
+            if not self._useProducerThread:
+                self._produce()
+
+            writeCount = self._writeCount
+            start = self._readCount
+            if writeCount - start > self._bufferFrames:
+                self._overwrittenFrames += writeCount - start - self._bufferFrames
+                start = writeCount - self._bufferFrames
+            self._readCount = writeCount
+            metadata = self._metadata[np.arange(start, writeCount) % self._bufferFrames]
+
+        bankIndices = metadata['frameNumber'] % len(self._frames)
+        if self._stampFrames:
+            frames = self._frames[bankIndices]
+            stampFrames(frames, metadata['frameNumber'], metadata['deviceTimestamp'])
+            return frames, metadata
+        if len(bankIndices) > 0 and np.all(np.diff(bankIndices) == 1):
+            # Consecutive frames of the bank can be returned as a view
+            return self._frames[bankIndices[0]:bankIndices[-1] + 1], metadata
+        return self._frames[bankIndices], metadata
+
+    def flushBuffers(self):
+        with self._lock:
+            if not self._useProducerThread:
+                self._produce()
+            self._readCount = self._writeCount
+
+    def getFrameStats(self) -> FrameRingBufferStats:
+        """ Returns the number of frames produced since the acquisition was
+        started, the number that were overwritten before being read, and the
+        number that were dropped because the producer fell behind. """
+        with self._lock:
+            return FrameRingBufferStats(pushedFrames=self._writeCount,
+                                        overwrittenFrames=self._overwrittenFrames,
+                                        droppedFrames=self._droppedFrames)
+
+    def setParameter(self, name, value):
+        super().setParameter(name, value)
+        if name == 'Frame rate':
+            with self._lock:
+                if self._running and not self._useProducerThread:
+                    self._produce()
+                self._fps = float(value)
+                self._restartClock()
+        return self.parameters
+
+    def crop(self, hpos, vpos, hsize, vsize):
+        self._frames = self._bank[:, vpos:vpos + vsize, hpos:hpos + hsize]
+        self._frameStart = (hpos, vpos)
+        self._shape = (hsize, vsize)
+
+    def startAcquisition(self):
+        if self._running:
+            return
+
+        with self._lock:
+            self._resetCounters()
+            self._restartClock()
+        self._running = True
+
+        if self._useProducerThread:
+            self._producer = SyntheticCameraProducer(self)
+            self._producerThread = Thread()
+            self._producer.moveToThread(self._producerThread)
+            self._producerThread.started.connect(self._producer.run)
+            self._producerThread.start()
+
+    def stopAcquisition(self):
+        if not self._running:
+            return
+
+        self._running = False
+        if self._producerThread is not None:
+            self._producer.producing = False
+            self._producerThread.quit()
+            self._producerThread.wait()
+            self._producer = None
+            self._producerThread = None
+
+        stats = self.getFrameStats()
+        if stats.droppedFrames > 0 or stats.overwrittenFrames > 0:
+            self.__logger.warning(f'{stats.droppedFrames} frames dropped and'
+                                  f' {stats.overwrittenFrames} frames overwritten out of'
+                                  f' {stats.pushedFrames}')
+
+    def finalize(self):
+        self.stopAcquisition()
+        super().finalize()
+
+    def _produce(self, maxLag=None):
+        """ Publishes the frames that are due according to the frame rate.
+        Must be called with the lock held. If maxLag (in seconds) is
+        specified, frames that are overdue by more than that are dropped
+        instead of published. Returns the number of frames published. """
+        if not self._running:
+            return 0
+
+        now = time.perf_counter()
+        dueFrameNumber = self._clockStartFrame + int((now - self._clockStart) * self._fps)
+        firstFrameNumber = self._lastFrameNumber + 1
+        if dueFrameNumber < firstFrameNumber:
+            return 0
+
+        numDropped = 0
+        if maxLag is not None:
+            firstAllowedFrameNumber = dueFrameNumber - max(int(maxLag * self._fps), 1) + 1
+            if firstAllowedFrameNumber > firstFrameNumber:
+                numDropped = firstAllowedFrameNumber - firstFrameNumber
+                self._droppedFrames += numDropped
+                firstFrameNumber = firstAllowedFrameNumber
+
+        numFrames = dueFrameNumber - firstFrameNumber + 1
+        # Only the last bufferFrames frames can still be read, so only those are written
+        numWritten = min(numFrames, self._bufferFrames)
+        frameNumbers = np.arange(dueFrameNumber - numWritten + 1, dueFrameNumber + 1)
+        slots = (self._writeCount + numFrames - numWritten + np.arange(numWritten)) \
+            % self._bufferFrames
+
+        metadata = self._metadata
+        metadata['frameNumber'][slots] = frameNumbers
+        metadata['hostTimestamp'][slots] = time.time()
+        metadata['deviceTimestamp'][slots] = (
+            self._clockStartTimestamp + (frameNumbers - self._clockStartFrame) / self._fps
+        )
+        metadata['exposure'][slots] = 1 / self._fps
+        metadata['droppedBefore'][slots] = 0
+        if numWritten == numFrames:
+            metadata['droppedBefore'][slots[0]] = numDropped
+
+        self._lastFrameNumber = dueFrameNumber
+        self._writeCount += numFrames
+        return numFrames
+
+    def _restartClock(self):
+        self._clockStart = time.perf_counter()
+        self._clockStartTimestamp = time.time()
+        self._clockStartFrame = self._lastFrameNumber + 1
+
+    def _resetCounters(self):
+        self._writeCount = 0
+        self._readCount = 0
+        self._lastFrameNumber = -1
+        self._droppedFrames = 0
+        self._overwrittenFrames = 0
+
+
+class SyntheticCameraProducer(Worker):
+    """ Produces the frames of a SyntheticCameraManager at its frame rate
+    until producing is set to False. """
+
+    def __init__(self, manager):
+        super().__init__()
+        self._manager = manager
+        self.producing = True
+
+    def run(self):
+        while self.producing:
+            with self._manager._lock:
+                numFrames = self._manager._produce(maxLag=_producerMaxLag)
+                sleepTime = 1 / self._manager._fps
+            if numFrames > 0:
+                self._manager._notifyFramesAvailable()
+            time.sleep(min(sleepTime, _producerMaxSleep))
+
+
+def makeFrameBank(pattern, shape, numFrames, *, seed=0, dtype=np.uint16):
+    """ Generates numFrames frames of the specified (height, width) shape
+    showing the specified pattern (see SyntheticCameraManager) on top of
+    Poisson background noise. """
+    rng = np.random.default_rng(seed)
+    height, width = shape
+    # Drawing noise for every pixel of every frame takes several seconds for large frames, so
+    # the frames are instead cut from a wider noise field at different offsets
+    noise = rng.poisson(_backgroundLevel,
+                        size=(height, width + numFrames * _noiseOffsetStep)).astype(dtype)
+    bank = np.empty((numFrames, height, width), dtype=dtype)
+    for i in range(numFrames):
+        offset = i * _noiseOffsetStep
+        bank[i] = noise[:, offset:offset + width]
+
+    if pattern == 'noise':
+        pass
+    elif pattern == 'beads':
+        numBeads = max(height * width // 4096, 1)
+        positions = rng.uniform((0, 0), (height, width), size=(numBeads, 2))
+        drift = rng.normal(0, 0.5, size=(numBeads, 2))
+        amplitudes = rng.uniform(0.5, 1, size=numBeads) * _signalLevel
+        for i in range(numFrames):
+            framePositions = (positions + drift * i) % (height, width)
+            for (y, x), amplitude in zip(framePositions, amplitudes):
+                _addSpot(bank[i], y, x, amplitude, _beadSigma)
+    elif pattern == 'scan':
+        # The spot visits a grid of positions, one per frame
+        gridSize = int(np.ceil(np.sqrt(numFrames)))
+        for i in range(numFrames):
+            y = (i // gridSize + 0.5) * height / gridSize
+            x = (i % gridSize + 0.5) * width / gridSize
+            _addSpot(bank[i], y, x, _signalLevel, max(height, width) / gridSize / 4)
+    else:
+        raise ValueError(f'Unsupported synthetic camera pattern "{pattern}"')
+
+    return bank
+
+
+def stampFrames(frames, frameNumbers, timestamps):
+    """ Writes the given frame numbers and timestamps (e.g. from time.time())
+    into the first pixels of the first row of each of frames, in place.
+    Frames that are too narrow to hold the stamp are left as they are. """
+    frames = np.asarray(frames)
+    numPixels = _stampDtype.itemsize // frames.dtype.itemsize
+    if frames.ndim != 3 or frames.shape[2] < numPixels:
+        return
+
+    stamps = np.empty(len(frames), dtype=_stampDtype)
+    stamps['frameNumber'] = frameNumbers
+    stamps['timestamp'] = timestamps
+    frames[:, 0, :numPixels] = stamps.view(frames.dtype).reshape(len(frames), numPixels)
+
+
+def readFrameStamp(frame) -> Tuple[int, float]:
+    """ Returns the frame number and timestamp that stampFrames has written
+    into a frame. """
+    numPixels = _stampDtype.itemsize // frame.dtype.itemsize
+    stamp = np.ascontiguousarray(frame[0, :numPixels]).view(_stampDtype)[0]
+    return int(stamp['frameNumber']), float(stamp['timestamp'])
+
+
+def _addSpot(frame, y, x, amplitude, sigma):
+    """ Adds a Gaussian spot to a frame, only computing it where it is
+    significant. """
+    radius = int(np.ceil(3 * sigma))
+    y0, y1 = max(int(y) - radius, 0), min(int(y) + radius + 1, frame.shape[0])
+    x0, x1 = max(int(x) - radius, 0), min(int(x) + radius + 1, frame.shape[1])
+    if y0 >= y1 or x0 >= x1:
+        return
+
+    gy = np.exp(-0.5 * ((np.arange(y0, y1) - y) / sigma) ** 2)
+    gx = np.exp(-0.5 * ((np.arange(x0, x1) - x) / sigma) ** 2)
+    spot = amplitude * np.outer(gy, gx)
+    maxValue = np.iinfo(frame.dtype).max
+    frame[y0:y1, x0:x1] = np.minimum(frame[y0:y1, x0:x1] + spot, maxValue).astype(frame.dtype)
+
+
+_backgroundLevel = 100
+_signalLevel = 2000
+_beadSigma = 2
+_noiseOffsetStep = 7
+_producerMaxLag = 0.1  # seconds
+_producerMaxSleep = 0.01  # seconds
+_stampDtype = np.dtype([('frameNumber', '<i8'), ('timestamp', '<f8')])
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
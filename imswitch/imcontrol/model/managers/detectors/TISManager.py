@@ -1,7 +1,8 @@
-import numpy as np
+import threading
 
 from imswitch.imcommon.model import initLogger
 from .DetectorManager import DetectorManager, DetectorAction, DetectorNumberParameter
+from .FrameRingBuffer import FrameBufferProducer, FrameRingBuffer
 
 
 class TISManager(DetectorManager):
@@ -23,6 +24,11 @@ class TISManager(DetectorManager):
         
         self._running = False
         self._adjustingParameters = False
+        self._lock = threading.Lock()
+        self._frameBuffer = FrameRingBuffer()
+        # The camera is read out once per exposure
+        self._producer = FrameBufferProducer(self._pullFrame, self._lock,
+                                             self._notifyFramesAvailable, self._getExposure)
 
         for propertyName, propertyValue in detectorInfo.managerProperties['tis'].items():
             self._camera.setPropertyValue(propertyName, propertyValue)
@@ -55,10 +61,15 @@ class TISManager(DetectorManager):
     def scale(self):
         return [1,1]
 
+    @property
+    def notifiesNewFrames(self):
+        return True
+
     def getLatestFrame(self):
-        if not self._adjustingParameters:
-            self.__image = self._camera.grabFrame()
-        return self.__image
+        with self._lock:
+            if not self._producer.running:
+                self._pullFrame()
+            return self._frameBuffer.getLatest()
 
     def setParameter(self, name, value):
         """Sets a parameter value and returns the value.
@@ -90,17 +101,26 @@ class TISManager(DetectorManager):
         super().setBinning(binning)
 
     def getChunk(self):
-        return self._camera.grabFrame()[np.newaxis, :, :]
+        return self.getChunkWithMetadata()[0]
+
+    def getChunkWithMetadata(self):
+        with self._lock:
+            if not self._producer.running:
+                self._pullFrame()
+            return self._frameBuffer.readChunk(copy=True)
 
     def flushBuffers(self):
-        pass
+        with self._lock:
+            self._frameBuffer.flush()
 
     def startAcquisition(self):
         if not self._running:
             self._camera.start_live()
             self._running = True
+        self._producer.start()
 
     def stopAcquisition(self):
+        self._producer.stop()
         if self._running:
             self._running = False
             self._camera.suspend_live()
@@ -124,6 +144,18 @@ class TISManager(DetectorManager):
         # Only place self.shapes is changed
         self._shape = (hsize, vsize)
 
+    def _pullFrame(self):
+        """ Pushes the frame that the camera is currently capturing into the
+        frame buffer, unless the camera is being reconfigured, and returns the
+        number of frames pushed. Must be called with the lock held. """
+        if self._adjustingParameters:
+            return 0
+        self._frameBuffer.push(self._camera.grabFrame(), exposure=self._getExposure())
+        return 1
+
+    def _getExposure(self):
+        return self.parameters['exposure'].value / 1000  # ms to s
+
     def _performSafeCameraAction(self, function):
         """ This method is used to change those camera properties that need
         the camera to be idle to be able to be adjusted.
@@ -151,6 +183,10 @@ class TISManager(DetectorManager):
         self.__logger.info(f'Initialized camera, model: {camera.model}')
         return camera
     
+    def finalize(self):
+        self._producer.stop()
+        super().finalize()
+
     def close(self):
         self.__logger.info(f'Shutting down camera, model: {self._camera.model}')
         pass
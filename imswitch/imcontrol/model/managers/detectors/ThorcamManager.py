@@ -1,7 +1,10 @@
+import threading
+
 import numpy as np
 
 from imswitch.imcommon.model import initLogger
 from .DetectorManager import DetectorManager, DetectorAction, DetectorNumberParameter, DetectorListParameter
+from .FrameRingBuffer import FrameBufferProducer, FrameRingBuffer
 
 
 class ThorcamManager(DetectorManager):
@@ -31,6 +34,11 @@ class ThorcamManager(DetectorManager):
         model = self._camera.model
         self._running = False
         self._adjustingParameters = False
+        self._lock = threading.Lock()
+        self._frameBuffer = FrameRingBuffer()
+        # getLastChunk waits for the next frame, so the producer needn't wait in between
+        self._producer = FrameBufferProducer(self._pullChunk, self._lock,
+                                             self._notifyFramesAvailable, lambda: 0)
 
         # Prepare parameters
         parameters = {
@@ -50,13 +58,26 @@ class ThorcamManager(DetectorManager):
 
         super().__init__(detectorInfo, name, fullShape=fullShape, supportedBinnings=[1],
                          model=model, parameters=parameters, actions=actions, croppable=False)
-        
+
+    @property
+    def notifiesNewFrames(self):
+        return True
 
     def getLatestFrame(self, is_save=False):
-        if is_save:
-            return self._camera.getLastChunk()
-        else:
-            return self._camera.getLast()
+        with self._lock:
+            if is_save:
+                # Snaps wait for a new frame, like getChunk does
+                self._pullChunk()
+            elif not self._producer.running:
+                frame = self._camera.getLast()
+                if frame is not None:
+                    self._frameBuffer.push(frame, exposure=self._getExposure())
+            latestFrame = self._frameBuffer.getLatest()
+
+        if is_save and latestFrame is not None:
+            # Snaps are returned as a chunk of one frame, like getLastChunk returns them
+            return latestFrame[np.newaxis]
+        return latestFrame
 
     def setParameter(self, name, value):
         """Sets a parameter value and returns the value.
@@ -87,24 +108,29 @@ class ThorcamManager(DetectorManager):
 
         
     def getChunk(self):
-        try:
-            return self._camera.getLastChunk()
-        except:
-            return None
+        return self.getChunkWithMetadata()[0]
+
+    def getChunkWithMetadata(self):
+        with self._lock:
+            if not self._producer.running:
+                self._pullChunk()
+            return self._frameBuffer.readChunk(copy=True)
 
     def flushBuffers(self):
-        pass
+        with self._lock:
+            self._frameBuffer.flush()
 
     def startAcquisition(self):
-        pass
-    
+        self._producer.start()
+
     def stopAcquisition(self):
-        pass
+        self._producer.stop()
 
     def stopAcquisitionForROIChange(self):
         pass
     
     def finalize(self) -> None:
+        self._producer.stop()
         super().finalize()
         self.__logger.debug('Safely disconnecting the camera...')
         self._camera.close()
@@ -116,6 +142,20 @@ class ThorcamManager(DetectorManager):
     def crop(self, hpos, vpos, hsize, vsize):
         pass 
 
+    def _pullChunk(self):
+        """ Waits for a new frame from the camera, pushes it into the frame
+        buffer and returns the number of frames pushed. Must be called with
+        the lock held. """
+        try:
+            chunk = self._camera.getLastChunk()
+        except Exception:
+            return 0
+        self._frameBuffer.pushChunk(chunk, exposure=self._getExposure())
+        return len(chunk)
+
+    def _getExposure(self):
+        return self.parameters['exposure'].value / 1000  # ms to s
+
     def _performSafeCameraAction(self, function):
         """ This method is used to change those camera properties that need
         the camera to be idle to be able to be adjusted.
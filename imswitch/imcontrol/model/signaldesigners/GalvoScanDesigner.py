@@ -1,7 +1,10 @@
+import functools
+
 import numpy as np
 from scipy.interpolate import BPoly
 
 from .basesignaldesigners import ScanDesigner
+from .compactsignals import ConcatenatedSignal, RepeatedSignal, StepSignal, zeroSignal
 
 from imswitch.imcommon.model import initLogger
 
@@ -37,12 +40,9 @@ class GalvoScanDesigner(ScanDesigner):
         return True
 
     def checkSignalLength(self, scanParameters, setupInfo):
-        """ Check that the signal would not be too large (to be stored in
-        the RAM and to be generated and run inside a reasonable time). """
-        #TODO: change limits below later, to be more representative of what we want. Also think about changing the
-        # way >d3 steps are generated and sent to the nidaq - probably should run those scans as simple d2 scans and
-        # repeat them, with steps on the axes that needs steps between. Keep track of that in ScanController for
-        # example, alternatively directly in NidaqController.runScan?
+        """ Check that the scan would not be too large. The scanning curves are generated as
+        repeated line periods and steps, so their length is not limited by the RAM, but the
+        scanned image is still stored in the RAM. """
         device_count = len([positioner for positioner in setupInfo.positioners.values() if positioner.forScanning])
         # retrieve axis lengths in um of active axes
         axis_length = [scanParameters['axis_length'][i] for i in range(device_count)
@@ -53,12 +53,9 @@ class GalvoScanDesigner(ScanDesigner):
                             if np.ceil(scanParameters['axis_length'][i]/scanParameters['axis_step_size'][i]) > 1]
         # get list of number of axis steps
         n_steps_dx = [int(axis_length[i] / axis_step_size[i]) for i in range(axis_count_scan)]
-        # get list of number of axis scan samples, for first two axes initially
+        # get number of pixels in the scanned image
         scan_steps = np.prod(n_steps_dx)
-        scan_time = scan_steps * scanParameters['sequence_time']
-        if scan_time > 60*10:  # 10 minutes
-            return False
-        elif scan_steps > 1e7:
+        if scan_steps > 1e9:
             return False
         return True
 
@@ -133,39 +130,72 @@ class GalvoScanDesigner(ScanDesigner):
         self.__settlingtime = self.__calc_settling_time(self.axis_length, self.axis_centerpos,
                                                         self.axis_vel_max, self.axis_acc_max)
 
-        # generate axis signals for all d axes
-        pos = []  # list with all axis positions lists
-        # d1 axis signal
-        axis = 0
-        pos_temp, samples_d2_period = self.__generate_smooth_scan(parameterDict, self.axis_vel_max[0], self.axis_acc_max[0], n_steps_dx[1])
-        pos.append(pos_temp)
+        # generate the base signal of each axis, i.e. its curve before it is padded and
+        # repeated for the steps of the higher axes. All signals are cached by the parameters
+        # they depend on, so that only the axes affected by a parameter change are regenerated
+        # d1 axis signal, one line period is evaluated and repeated for all d2 steps
+        d1_key = self._signalCache.makeKey('d1', self.__timestep, self.__settlingtime,
+                                           parameterDict['sequence_time'], self.axis_length[0],
+                                           self.axis_step_size[0], self.axis_centerpos[0],
+                                           self.axis_vel_max[0], self.axis_acc_max[0],
+                                           n_steps_dx[1])
+        pos_d1, samples_d2_period, samples_throw, samples_first_d2 = self._signalCache.get(
+            d1_key, lambda: self.__generate_smooth_scan(parameterDict, self.axis_vel_max[0],
+                                                        self.axis_acc_max[0], n_steps_dx[1])
+        )
+        (self._samples_initpos, self._samples_settling,
+         self._samples_startacc, self._samples_finalpos) = samples_throw
+        base_keys = [d1_key]
+        base_signals = [lambda: pos_d1]
+        lengths = [len(pos_d1)]
 
         # initiate pad length list
         pad_maxes = [0,0]
-
-        # d2 axis signal
-        if axis_count_scan > 1:
-            axis = 1
-            axis_reps = self.__get_axis_reps(pos[0], samples_d2_period, n_steps_dx[1])
-            smooth = False if 'mock' in self.axis_devs_order[axis].lower() else True
-            pos_temp = self.__generate_step_scan(axis, n_scan_samples_dx[axis], n_steps_dx[axis], self.axis_devs_order[axis], smooth, v_max=self.axis_vel_max[axis], a_max=self.axis_acc_max[axis], axis_reps=axis_reps)
-            pos.append(pos_temp)
-            n_scan_samples_dx.append(len(pos[0]))
-
-        # d>2 axes signals - all generated as pure step signals
-        if axis_count_scan > 2:
-            for axis in range(2, axis_count_scan):
-                pos, pad_max = self.__zero_padding(pos, padlen_base=0)
-                pad_maxes.append(pad_max)
-                pos = self.__repeat_dlower(pos, n_steps_dx[axis])
-                smooth = False if 'mock' in self.axis_devs_order[axis].lower() else True
-                pos_temp = self.__generate_step_scan(axis, n_scan_samples_dx[axis], n_steps_dx[axis], self.axis_devs_order[axis], smooth, v_max=self.axis_vel_max[axis], a_max=self.axis_acc_max[axis])
-                pos.append(pos_temp)
-                n_scan_samples_dx.append(len(pos[0]))
+        # padding length and repeats of the lower axes signals for each d>2 axis
+        level_ops = []
+
+        # d2 axis signal, and d>2 axes signals - all generated as pure step signals
+        for axis in range(1, axis_count_scan):
+            if axis > 1:
+                level_len = max(lengths)
+                pad_maxes.append(level_len - lengths[0])
+                level_ops.append((axis, level_len, n_steps_dx[axis]))
+                lengths = [level_len * n_steps_dx[axis]] * len(lengths)
+            axis_name = self.axis_devs_order[axis]
+            smooth = False if 'mock' in axis_name.lower() else True
+            step_params = (self.axis_length[axis], self.axis_centerpos[axis], n_steps_dx[axis],
+                           axis_name, smooth, self.axis_vel_max[axis], self.axis_acc_max[axis])
+            positions, pos_init, pos_final = self.__get_step_scan_parts(step_params)
+            if axis == 1:
+                axis_reps = self.__get_axis_reps(samples_first_d2, samples_d2_period, n_steps_dx[1])
+                if smooth:
+                    axis_reps[0] = axis_reps[0] - len(pos_init)
+            else:
+                axis_reps = np.repeat(n_scan_samples_dx[axis], n_steps_dx[axis])
+            base_keys.append(self._signalCache.makeKey('step', self.__timestep, *step_params,
+                                                       axis_reps))
+            base_signals.append(functools.partial(self.__generate_step_scan,
+                                                  positions, pos_init, pos_final, axis_reps))
+            lengths.append(len(pos_init) + int(np.sum(axis_reps)) + len(pos_final))
+            n_scan_samples_dx.append(lengths[0])
 
         # pad all signals with zeros, for initial and final settling of galvos and safety start and end
-        axis_signals, pad_max = self.__zero_padding(pos, padlen_base=int(round(self.__paddingtime / self.__timestep)))
-        pad_maxes.append(pad_max)
+        padlen_base = int(round(self.__paddingtime / self.__timestep))
+        scan_len = max(lengths)
+        pad_maxes.append(padlen_base + scan_len - lengths[0])
+        axis_signals = []
+        minmaxes = []
+        for axis in range(axis_count_scan):
+            axis_ops = [(level_len, n_steps) for level, level_len, n_steps in level_ops
+                        if level > axis]
+            key = self._signalCache.makeKey('axis', base_keys[axis], axis_ops,
+                                            scan_len, padlen_base)
+            signal, minmax = self._signalCache.get(
+                key, functools.partial(self.__generate_axis_signal, base_signals[axis],
+                                       axis_ops, scan_len, padlen_base)
+            )
+            axis_signals.append(signal)
+            minmaxes.append(list(minmax))
 
         # add all signals to a signal dictionary
         sig_dict = {parameterDict['target_device'][i]: axis_signals[i] for i in range(axis_count_scan)}
@@ -178,9 +208,9 @@ class GalvoScanDesigner(ScanDesigner):
             'img_dims': n_steps_dx,
             'scan_samples': n_scan_samples_dx,
             'pixel_sizes': pixel_sizes,
-            'minmaxes': [[min(axis_signals[i]), max(axis_signals[i])] for i in range(axis_count_scan)],
+            'minmaxes': minmaxes,
             'scan_samples_total': len(axis_signals[0]),
-            'scan_throw_startzero': int(round(self.__paddingtime / self.__timestep)),
+            'scan_throw_startzero': padlen_base,
             'scan_throw_initpos': self._samples_initpos,
             'scan_throw_settling': self._samples_settling,
             'scan_throw_startacc': self._samples_startacc,
@@ -217,16 +247,23 @@ class GalvoScanDesigner(ScanDesigner):
         curve_poly, time_fix, pos_fix = self.__d2scan_poly(parameterDict, v_max, a_max)
         # calculate number of evaluation points for a d2 step for decided timestep
         n_eval = int(time_fix[-1] / self.__timestep)
-        # generate multi-d2-step curve for the whole d3 step
-        pos = self.__generate_smooth_multid2(curve_poly, time_fix, pos_fix, n_eval, n_d2)
+        # generate one d2 step period of the curve, which is repeated for the whole d3 step
+        pos_period = self.__generate_smooth_d2period(curve_poly, time_fix, n_eval)
         # add missing start and end piece
-        pos_ret = self.__add_start_end(pos, pos_fix, v_max, a_max)
-        return pos_ret, n_eval
-
-    def __generate_step_scan(self, dim, len_axis, n_axis, axis_name, smooth, v_max=0, a_max=0, axis_reps=[0,0]):
-        """ Generate a step-function scanning curve, with smooth initial positioning or not. """
-        l_scan = self.axis_length[dim]
-        c_scan = self.axis_centerpos[dim]
+        pos_ret, samples_first_d2 = self.__add_start_end(pos_period, n_d2, pos_fix, v_max, a_max)
+        samples_throw = (self._samples_initpos, self._samples_settling,
+                         self._samples_startacc, self._samples_finalpos)
+        return pos_ret, n_eval, samples_throw, samples_first_d2
+
+    def __get_step_scan_parts(self, step_params):
+        """ Get the positions of a step-function scanning curve, with its smooth initial and
+        final positioning curves (empty if not smooth). """
+        key = self._signalCache.makeKey('step_parts', self.__timestep, *step_params)
+        return self._signalCache.get(key, lambda: self.__generate_step_scan_parts(*step_params))
+
+    def __generate_step_scan_parts(self, l_scan, c_scan, n_axis, axis_name, smooth, v_max, a_max):
+        """ Generate the positions of a step-function scanning curve, with smooth initial and
+        final positioning or not. """
         # create linspace for axis positions
         positions = (np.linspace(l_scan / n_axis, l_scan, n_axis) -
                      l_scan / (n_axis * 2) - l_scan / 2 + c_scan)
@@ -237,29 +274,31 @@ class GalvoScanDesigner(ScanDesigner):
             pos_init = self.__init_positioning(positions[0], v_max, a_max)
             # generate the final smooth positioning curve
             pos_final = self.__final_positioning(positions[-1], v_max, a_max)
-        if dim==1: # and 'mock' not in axis_name.lower():
-            if 'mock' not in axis_name.lower():
-                axis_reps[0] = axis_reps[0] - len(pos_init)
-            pos_ret = np.repeat(positions, axis_reps)
         else:
-            pos_ret = np.repeat(positions, len_axis)
-        if smooth:
-            pos_ret = np.concatenate((pos_init, pos_ret, pos_final))
-        return pos_ret
-
-    def __repeat_dlower(self, pos, n_steps_axis):
-        """ Repeat the current positions, for all dimensions,
-        for the number of steps on the new axis. """
-        pos_ret = [np.tile(pos_dim, n_steps_axis) for pos_dim in pos]
-        return pos_ret
-
-    def __get_axis_reps(self, pos, samples_period, n_d2):
-        """ Get reps for each step on d2 axis, by looking at the maximum and
+            pos_init = pos_final = np.zeros(0)
+        return positions, pos_init, pos_final
+
+    def __generate_step_scan(self, positions, pos_init, pos_final, axis_reps):
+        """ Generate a step-function scanning curve, holding each position for the number of
+        samples of that step. """
+        return ConcatenatedSignal([pos_init, StepSignal(positions, axis_reps), pos_final])
+
+    def __generate_axis_signal(self, generate_base, level_ops, scan_len, padlen_base):
+        """ Generate the full signal of an axis, by padding and repeating its base signal for the
+        steps of each higher axis, and padding it with zeros to the full scan length. Returns the
+        signal and its min and max. """
+        signal = generate_base()
+        for level_len, n_steps in level_ops:
+            signal = RepeatedSignal(signal, n_steps, period=level_len)
+        signal = ConcatenatedSignal([zeroSignal(padlen_base), signal,
+                                     zeroSignal(padlen_base + scan_len - len(signal))])
+        return signal, (signal.min(), signal.max())
+
+    def __get_axis_reps(self, samples_first_d2, samples_period, n_d2):
+        """ Get reps for each step on d2 axis, from the first maximum and the
         periods of the d1 axis """
-        start_skip = self._samples_initpos + self._samples_settling + self._samples_startacc
-        end_skip = self._samples_finalpos
         # get length of first d2 step
-        first_d2 = [np.argmax(pos[start_skip:-end_skip]) + start_skip]
+        first_d2 = [samples_first_d2]
         # get length of all other d2 steps
         rest_d2s = np.repeat(samples_period - 1, n_d2 - 1)
         # concatenate all repetition lengths
@@ -319,8 +358,9 @@ class GalvoScanDesigner(ScanDesigner):
         acc = [a1, a2, a2p, a3, a3p, a4, a4p, a5, a5p, a6]
         # if p3 is already past the center of the scan it means that the max_velocity was never
         # reached in this case, remove two fixed points, and change the values to the curr. vel and
-        # time in the middle of the flyback
-        if p3 <= c_scan:
+        # time in the middle of the flyback. the same is done if the flyback at max_velocity is
+        # shorter than dt_fix, as the fixed points around it would then not be in time order
+        if p3 <= c_scan or t4 <= t3p:
             t_mid = np.roots([-a_max / 2, v_scan, p2 - c_scan])[0]
             v_mid = -a_max * t_mid + v_scan
             del pos[5:7]
@@ -344,17 +384,15 @@ class GalvoScanDesigner(ScanDesigner):
         # return fixed points position and time
         return bpoly, time, pos
 
-    def __generate_smooth_multid2(self, pos_bpoly, time_fix, pos_fix, n_eval, n_d2):
-        """ Generate a smooth multi-d2-step curve by evaluating the polynomial with
-        the clock frequency used and copying it """
+    def __generate_smooth_d2period(self, pos_bpoly, time_fix, n_eval):
+        """ Generate one period of a smooth multi-d2-step curve by evaluating the
+        polynomial with the clock frequency used """
         # get evaluation times for one d2 step
         x_eval = np.linspace(0, time_fix[-1], n_eval)
         # evaluate polynomial
         x_bpoly = pos_bpoly(x_eval)
-        pos_ret = []
-        # concatenate for number of d2 steps in scan
-        pos_ret = np.tile(x_bpoly[:-1], n_d2 - 1)
-        return pos_ret
+        # the last point is the first point of the next period
+        return x_bpoly[:-1]
 
     def __init_positioning(self, initpos, v_max, a_max):
         v_max = np.sign(initpos) * v_max
@@ -498,53 +536,37 @@ class GalvoScanDesigner(ScanDesigner):
         # return evaluated polynomial at the timestep I want
         return poly_eval
 
-    def __add_start_end(self, pos, pos_fix, v_max, a_max):
-        """ Add start and end half-d2-steps to smooth scanning curve """
-        # generate five pieces, three before and two after, to be concatenated to the given positions array
+    def __add_start_end(self, pos_period, n_d2, pos_fix, v_max, a_max):
+        """ Add start and end half-d2-steps to smooth scanning curve, made of the given
+        period repeated for all but one d2 steps. Also returns the sample index of the first
+        maximum, where the first d2 step ends. """
+        # generate five pieces, three before and two after, to be concatenated to the repeated
+        # periods
+        pos_min = np.min(pos_period)
         # initial smooth acceleration piece from 0
-        pos_pre1 = self.__init_positioning(initpos=np.min(pos), v_max=v_max, a_max=a_max)
+        pos_pre1 = self.__init_positioning(initpos=pos_min, v_max=v_max, a_max=a_max)
         self._samples_initpos = len(pos_pre1)
         # initial settling time before first d2 step
         settlinglen = int(round(self.__settlingtime / self.__timestep))
-        pos_pre2 = np.repeat(np.min(pos), settlinglen)  # settling positions
+        pos_pre2 = StepSignal([pos_min], [settlinglen])  # settling positions
         self._samples_settling = len(pos_pre2)
-        pos_pre3 = pos[np.where(pos == np.min(pos))[0][-1]:]  # first half scan curve
+        pos_pre3 = pos_period[np.where(pos_period == pos_min)[0][-1]:]  # first half scan curve
         # alt: last half scan curve to last peak after last d2 step
-        pos_post1 = pos[:np.where(pos == np.max(pos))[0][0]]
+        pos_post1 = pos_period[:np.where(pos_period == np.max(pos_period))[0][0]]
         # final smooth acceleration piece from max to 0
         pos_post2 = self.__final_positioning(initpos=pos_post1[-1], v_max=v_max, a_max=a_max)
-        pos_ret = np.concatenate((pos_pre1, pos_pre2, pos_pre3, pos, pos_post1, pos_post2))
+        pos_ret = ConcatenatedSignal([pos_pre1, pos_pre2, pos_pre3,
+                                      RepeatedSignal(pos_period, n_d2 - 1),
+                                      pos_post1, pos_post2])
         # half scan d2 step
-        pos_halfscand2step =\
-            pos[:np.argmin(abs(pos[:np.where(pos == np.max(pos))[0][0]] - pos_fix[2]))]
+        pos_halfscand2step = pos_period[:np.argmin(abs(pos_post1 - pos_fix[2]))]
         self._samples_startacc = len(pos_pre3) - len(pos_halfscand2step)
         self._samples_finalpos = len(pos_post2)
-        return pos_ret
-
-    def __zero_padding(self, pos, padlen_base):
-        """ Pad zeros to the beginning and end of all scanning curves. """
-        pos_ret = []  # return array of padded axis signals
-        n_axes = len(pos)  # number of axes
-        padlens = [np.array([padlen_base, padlen_base]) for i in range(n_axes)]  # basic padding length added to arrays for all axes
-        # calculate padding lengths for all axes
-        # get longest axis index
-        pos_lens = [len(pos_i) for pos_i in pos]
-        pos_max_len = np.argmax(pos_lens)
-        # get difference in length between longest and all other axes
-        pos_len_diffs = [pos_lens[pos_max_len] - pos_len for pos_len in pos_lens]
-        # add length differences to padlens for each axis, if differences sum != 0
-        if np.sum(pos_len_diffs) != 0:
-            padlens = [padlen_i + np.array([0, pos_len_diffs[i]]) for i, padlen_i in enumerate(padlens)]
-        # pad arrays
-        for axis, pos_axis in enumerate(pos):
-            pos_temp = np.pad(pos_axis, padlens[axis], 'constant', constant_values=0)
-            pos_ret.append(pos_temp)
-        ## get maximum pad length
-        #pad_max = 0
-        #for padlen in padlens:
-        #    if padlen[1] > pad_max:
-        #        pad_max = padlen[1]
-        return pos_ret, padlens[0][1]
+        # the first maximum is in the first repeated period, as the first half scan curve
+        # only goes up to the center
+        samples_first_d2 = (self._samples_initpos + self._samples_settling + len(pos_pre3) +
+                            int(np.argmax(pos_period)))
+        return pos_ret, samples_first_d2
 
     def __plot_curves(self, plot, signals):
         """ Plot all scan curves, for debugging. """
@@ -553,7 +575,7 @@ class GalvoScanDesigner(ScanDesigner):
             plt.figure(1)
             plt.clf()
             for i, signal in enumerate(signals):
-                plt.plot(signal - 0.01 * i)
+                plt.plot(np.asarray(signal) - 0.01 * i)
                 target = self.axis_devs_order[i]
                 self._logger.debug(f'Signal length {target}: {len(signal)}')
             plt.show()
@@ -1,8 +1,54 @@
+import functools
+from dataclasses import dataclass
+from typing import List
+
 import numpy as np
 
 from .basesignaldesigners import TTLCycleDesigner
+from .compactsignals import ConcatenatedSignal, RepeatedSignal, SampledSignal, zeroSignal
 from imswitch.imcommon.model import initLogger
 
+_scanLayoutKeys = ['img_dims', 'scan_samples', 'scan_samples_total', 'scan_samples_d2_period',
+                   'scan_throw_startzero', 'scan_throw_initpos', 'scan_throw_settling',
+                   'scan_throw_startacc', 'padlens']
+
+
+@dataclass(frozen=True)
+class _ScanLayout:
+    """ The values of the scan info dictionary that the TTL signals are laid
+    out by, in samples unless noted otherwise. """
+
+    n_steps_dx: List[int]
+    """ Number of steps along each scan axis. """
+
+    n_scan_samples_dx: List[int]
+    """ Number of samples of a step along each scan axis. """
+
+    samples_total: int
+    """ Number of samples of the whole scan. """
+
+    zeropad_start: int
+    """ Zeros at the start of the scan. """
+
+    zeropad_d3_step: int
+    """ Zeros at the start of each d3 step: first step acceleration, start
+    settling and initial positioning of the smooth d2 curve. """
+
+    zeropad_d2flyback: int
+    """ Zeros at the end of each d2 step, during the flyback. """
+
+    zeropad_extrapad: List[int]
+    """ Zeros at the end of each step along each scan axis. """
+
+    onepad_extraon: int
+    """ Extra ON at the end of each d2 step, to not turn off before the line
+    is finished. """
+
+    @property
+    def axis_count(self):
+        return len(self.n_steps_dx)
+
+
 class PointScanTTLCycleDesigner(TTLCycleDesigner):
     """ Line-based TTL cycle designer, for point-scanning applications. Treats
     input ms as lines.
@@ -32,28 +78,12 @@ class PointScanTTLCycleDesigner(TTLCycleDesigner):
             return self.__make_signal_stationary(parameterDict, setupInfo.scan.sampleRate)
         else:
             signal_dict = {}
-            frame_line_clocks = {}
 
             targets = parameterDict['target_device']
-            n_steps_dx = scanInfoDict['img_dims']
-            axis_count = len(n_steps_dx)
-            n_scan_samples_dx = scanInfoDict['scan_samples']
-            samples_total = scanInfoDict['scan_samples_total']
             scan_axes_order = scanInfoDict['axis_names']
-            # extra ON at the end of d2 step, to not turn off before line is finished
-            onepad_extraon = 10 #int(np.round(scanInfoDict['extra_laser_on']))
-
-            clock_len = 10  # length of line/frame clock pulses at the start of line/frame, in samples
-  
-            #zeropad_phasedelay = int(np.round(scanInfoDict['phase_delay']))
-            zeropad_d2flyback = np.max([0,(scanInfoDict['scan_samples_d2_period'] -
-                                   n_scan_samples_dx[1] -
-                                   onepad_extraon)])
-            zeropad_initpos = scanInfoDict['scan_throw_initpos']
-            zeropad_settling = scanInfoDict['scan_throw_settling']
-            zeropad_start = scanInfoDict['scan_throw_startzero']
-            zeropad_startacc = scanInfoDict['scan_throw_startacc']
-            self.zeropad_extrapad = scanInfoDict['padlens']
+            layout = self.__get_scan_layout(scanInfoDict)
+            # the scan parameters that the TTL signals depend on, signals are cached by these
+            scan_layout = {key: scanInfoDict[key] for key in _scanLayoutKeys}
             # Tile and pad TTL signals according to d=1 axis scan parameters
             for i, target in enumerate(targets):
                 # get sequence
@@ -66,212 +96,199 @@ class PointScanTTLCycleDesigner(TTLCycleDesigner):
                     except:
                         seq_axis = 'None'
                 seq_txt = parameterDict['TTL_sequence'][i]
-                seq = self.__decode_sequence(seq_txt)
-                if seq_axis == 'None':
-                    # no ttl sequences along axes
-                    # repeat start of sequence to d1 axis length
-                    signal_d2_step = np.ones(n_scan_samples_dx[1] + onepad_extraon, dtype='bool') if seq[0] else np.zeros(n_scan_samples_dx[1] + onepad_extraon, dtype='bool')
-                    signal_d2_period = np.append(signal_d2_step, np.zeros(zeropad_d2flyback, dtype='bool'))
-                    # all d2 steps except last
-                    signal_d2 = np.tile(signal_d2_period, n_steps_dx[1] - 1)
-                    # add last d2 step (without flyback)
-                    signal_d2 = np.append(signal_d2, signal_d2_step)
-                    # pad extra bits of smooth d2 curve: first step acc, start settling, and initial positioning
-                    signal_d2 = np.append(np.zeros(zeropad_startacc+zeropad_settling+zeropad_initpos, dtype='bool'), signal_d2)
-                    # adjust to frame len 
-                    zeropad_toframelen = n_scan_samples_dx[2] - len(signal_d2)
-                    if zeropad_toframelen > 0:
-                        signal_d2 = np.append(signal_d2, np.zeros(zeropad_toframelen, dtype='bool'))
-                    elif zeropad_toframelen < 0:
-                        signal_d2 = signal_d2[-zeropad_toframelen:]  # TODO: looks strange? not right length? never enters here probably
-                    # repeat signal for all additional scan axes, if applicable
-                    signal = self.__repeat_remaining_axes(signal=signal_d2, n_steps_dx=n_steps_dx, axis_start=2, axis_end=axis_count)
-                elif seq_axis == 0:
-                    # ttl sequence along first (pixel) axis
-                    # repeat sequence to d1 axis length
-                    signal_d2_step = np.resize(seq, n_steps_dx[0])
-                    if n_scan_samples_dx[1] > n_steps_dx[0]:
-                        signal_d2_step = np.repeat(signal_d2_step, (n_scan_samples_dx[1])/n_steps_dx[0]).astype(bool)
-                    elif n_scan_samples_dx[1] < n_steps_dx[0]:
-                        signal_d2_step = signal_d2_step[::int(n_steps_dx[0]/n_scan_samples_dx[1])].astype(bool)
-                    append_start = np.ones(onepad_extraon, dtype='bool') if signal_d2_step[0] == 1 else np.zeros(onepad_extraon, dtype='bool')
-                    signal_d2_step = np.append(append_start, signal_d2_step)
-                    signal_d2_period = np.append(signal_d2_step, np.zeros(zeropad_d2flyback, dtype='bool'))
-                    # all d2 steps except last
-                    signal_d2 = np.tile(signal_d2_period, n_steps_dx[1] - 1)
-                    # add last d2 step (without flyback)
-                    signal_d2 = np.append(signal_d2, signal_d2_step)
-                    # pad extra bits of smooth d2 curve: first step acc, start settling, and initial positioning
-                    signal_d2 = np.append(np.zeros(zeropad_startacc+zeropad_settling+zeropad_initpos, dtype='bool'), signal_d2)
-                    # adjust to d3 step len 
-                    zeropad_toframelen = n_scan_samples_dx[2] - len(signal_d2)
-                    if zeropad_toframelen > 0:
-                        signal_d2 = np.append(signal_d2, np.zeros(zeropad_toframelen, dtype='bool'))
-                    elif zeropad_toframelen < 0:
-                        signal_d2 = signal_d2[-zeropad_toframelen:]
-                    # repeat signal for all additional scan axes, if applicable
-                    signal = self.__repeat_remaining_axes(signal=signal_d2, n_steps_dx=n_steps_dx, axis_start=2, axis_end=axis_count)
-                elif seq_axis == 1:
-                    # ttl sequence along second (line) axis
-                    # repeat sequence to d2 axis length
-                    seq = np.resize(seq, n_steps_dx[1])
-                    # create ON and OFF d2 periods and steps to use when building d2 sequence
-                    on_d2_period, on_d2_step = self.__create_d2_period(state=1, n_samples_d1=n_scan_samples_dx[1], samples_extra=onepad_extraon, samples_flyback=zeropad_d2flyback)
-                    off_d2_period, off_d2_step = self.__create_d2_period(state=0, n_samples_d1=n_scan_samples_dx[1], samples_extra=onepad_extraon, samples_flyback=zeropad_d2flyback)
-                    # build frame from seq
-                    signal_d3 = np.array([])
-                    for step in seq[:-1]:
-                        signal_d3 = np.append(signal_d3, on_d2_period) if step else np.append(signal_d3, off_d2_period)
-                    # add last d2 step (without flyback)
-                    signal_d3 = np.append(signal_d3, on_d2_step) if seq[-1] else np.append(signal_d3, off_d2_step)
-                    # pad extra bits of smooth d2 curve: first step acc, start settling, and initial positioning
-                    signal_d3 = np.append(np.zeros(zeropad_startacc+zeropad_settling+zeropad_initpos, dtype='bool'), signal_d3)
-                    # adjust to d3 step len 
-                    zeropad_toframelen = n_scan_samples_dx[2] - len(signal_d3)
-                    if zeropad_toframelen > 0:
-                        signal_d3 = np.append(signal_d3, np.zeros(zeropad_toframelen, dtype='bool'))
-                    elif zeropad_toframelen < 0:
-                        signal_d3 = signal_d3[-zeropad_toframelen:]
-                    # repeat signal for all additional scan axes, if applicable
-                    signal = self.__repeat_remaining_axes(signal=signal_d3, n_steps_dx=n_steps_dx, axis_start=2, axis_end=axis_count)
-                elif seq_axis == 2:
-                    # ttl sequence along third (frame) axis
-                    # repeat sequence to d3 axis length
-                    seq = np.resize(seq, n_steps_dx[2])
-                    # create ON and OFF d2 periods and steps
-                    on_d2_period, on_d2_step = self.__create_d2_period(state=1, n_samples_d1=n_scan_samples_dx[1], samples_extra=onepad_extraon, samples_flyback=zeropad_d2flyback)
-                    off_d2_period, off_d2_step = self.__create_d2_period(state=0, n_samples_d1=n_scan_samples_dx[1], samples_extra=onepad_extraon, samples_flyback=zeropad_d2flyback)
-                    # create ON and OFF d3 steps, to use when building d3 sequence
-                    on_d3_step = self.__create_d3_step(d2_period=on_d2_period, d2_step=on_d2_step, n_steps_d2=n_steps_dx[1], n_samples_d3=n_scan_samples_dx[2], samples_zeropad_step=zeropad_startacc+zeropad_settling+zeropad_initpos)
-                    off_d3_step = self.__create_d3_step(d2_period=off_d2_period, d2_step=off_d2_step, n_steps_d2=n_steps_dx[1], n_samples_d3=n_scan_samples_dx[2], samples_zeropad_step=zeropad_startacc+zeropad_settling+zeropad_initpos)
-                    # build d4 step from seq
-                    signal_d4 = np.array([])
-                    for step in seq:
-                        signal_d4 = np.append(signal_d4, on_d3_step) if step else np.append(signal_d4, off_d3_step)
-                    # adjust to d4 step len 
-                    zeropad_toframelen = n_scan_samples_dx[3] - len(signal_d4)
-                    if zeropad_toframelen > 0:
-                        signal_d4 = np.append(signal_d4, np.zeros(zeropad_toframelen, dtype='bool'))
-                    elif zeropad_toframelen < 0:
-                        signal_d4 = signal_d4[-zeropad_toframelen:]
-                    # repeat signal for all additional scan axes, if applicable
-                    signal = self.__repeat_remaining_axes(signal=signal_d4, n_steps_dx=n_steps_dx, axis_start=3, axis_end=axis_count)
-                elif seq_axis == 3:
-                    # ttl sequence along fourth (timelapse) axis
-                    # repeat sequence to d4 axis length
-                    seq = np.resize(seq, n_steps_dx[3])
-                    # create ON and OFF d2 periods and steps
-                    on_d2_period, on_d2_step = self.__create_d2_period(state=1, n_samples_d1=n_scan_samples_dx[1], samples_extra=onepad_extraon, samples_flyback=zeropad_d2flyback)
-                    off_d2_period, off_d2_step = self.__create_d2_period(state=0, n_samples_d1=n_scan_samples_dx[1], samples_extra=onepad_extraon, samples_flyback=zeropad_d2flyback)
-                    # create ON and OFF d3 steps
-                    on_d3_step = self.__create_d3_step(d2_period=on_d2_period, d2_step=on_d2_step, n_steps_d2=n_steps_dx[1], n_samples_d3=n_scan_samples_dx[2], samples_zeropad_step=zeropad_startacc+zeropad_settling+zeropad_initpos)
-                    off_d3_step = self.__create_d3_step(d2_period=off_d2_period, d2_step=off_d2_step, n_steps_d2=n_steps_dx[1], n_samples_d3=n_scan_samples_dx[2], samples_zeropad_step=zeropad_startacc+zeropad_settling+zeropad_initpos)
-                    # create ON and OFF d4 steps, to use when building d4 sequence
-                    on_d4_step = self.__create_d4_step(d3_step=on_d3_step, n_steps_d3=n_steps_dx[2])
-                    off_d4_step = self.__create_d4_step(d3_step=off_d3_step, n_steps_d3=n_steps_dx[2])
-                    # build d5 step from seq
-                    signal_d5 = np.array([])
-                    for step in seq:
-                        signal_d5 = np.append(signal_d5, on_d4_step) if step else np.append(signal_d5, off_d4_step)
-                    # adjust to d5 step len 
-                    zeropad_toframelen = n_scan_samples_dx[4] - len(signal_d5)
-                    if zeropad_toframelen > 0:
-                        signal_d5 = np.append(signal_d5, np.zeros(zeropad_toframelen, dtype='bool'))
-                    elif zeropad_toframelen < 0:
-                        signal_d5 = signal_d5[-zeropad_toframelen:]
-                    # repeat signal for all additional scan axes, if applicable
-                    signal = self.__repeat_remaining_axes(signal=signal_d5, n_steps_dx=n_steps_dx, axis_start=4, axis_end=axis_count)
-                
-                # pad start zeros
-                signal = np.append(np.zeros(zeropad_start, dtype='bool'), signal)
-                # pad scanner phase delay to beginning to sync actual position with TTL
-                #signal = np.append(np.zeros(zeropad_phasedelay, dtype='bool'), signal)
-
-                # adjust to same length as analog scanning
-                zeropad_end = samples_total - len(signal)
-                if zeropad_end > 0:
-                    signal = np.append(signal, np.zeros(zeropad_end, dtype='bool'))
-                elif zeropad_end < 0:
-                    signal = signal[:zeropad_end]  # TODO: looks strange? not right length? never enters here probably
-
-                signal_dict[target] = signal.astype(bool)
+                key = self._signalCache.makeKey('ttl', seq_txt, seq_axis, scan_layout)
+                signal_dict[target] = self._signalCache.get(
+                    key, functools.partial(self.__make_target_signal, seq_txt, seq_axis, layout)
+                )
 
             # Generate frame and line clocks
-            # line clock
-            line_clock = self.__generate_frame_line_clock(n_scan_samples_dx, n_steps_dx, samples_total, axis_count, zeropad_startacc, zeropad_settling, zeropad_initpos, zeropad_start, zeropad_d2flyback, onepad_extraon, frame=False, line=True)
-            signal_dict['line_clock'] = line_clock.astype(bool)
-            # frame clock
-            frame_clock = self.__generate_frame_line_clock(n_scan_samples_dx, n_steps_dx, samples_total, axis_count, zeropad_startacc, zeropad_settling, zeropad_initpos, zeropad_start, zeropad_d2flyback, onepad_extraon, frame=True, line=False)
-            signal_dict['frame_clock'] = frame_clock.astype(bool)
+            for clock, frame, line in [('line_clock', False, True), ('frame_clock', True, False)]:
+                key = self._signalCache.makeKey(clock, scan_layout)
+                signal_dict[clock] = self._signalCache.get(
+                    key, functools.partial(self.__generate_frame_line_clock, layout,
+                                           frame=frame, line=line)
+                )
 
-            self.__plot_curves(plot=False, signals=signal_dict, targets=targets+['frame_clock','line_clock'])  # for debugging
+            # for debugging
+            self.__plot_curves(plot=False, signals=signal_dict,
+                               targets=targets + ['frame_clock', 'line_clock'])
 
             # return signal_dict, which contains bool arrays for each target
             return signal_dict
 
-    def __generate_frame_line_clock(self, n_scan_samples_dx, n_steps_dx, samples_total, axis_count, zeropad_startacc, zeropad_settling, zeropad_initpos, zeropad_start, zeropad_d2flyback, onepad_extraon, frame=True, line=False, clock_len=10):
-        """ Generate frame and line clock signals, to be returned in signal_dict and used if user wants frame/line clock at a digital output. """
+    def __get_scan_layout(self, scanInfoDict):
+        """ Pick the values that the TTL signals are laid out by from the scan
+        info dictionary. """
+        n_scan_samples_dx = scanInfoDict['scan_samples']
+        # extra ON at the end of d2 step, to not turn off before line is finished
+        onepad_extraon = 10  # int(np.round(scanInfoDict['extra_laser_on']))
+        # zeropad_phasedelay = int(np.round(scanInfoDict['phase_delay']))
+        zeropad_d2flyback = np.max([0, (scanInfoDict['scan_samples_d2_period'] -
+                                        n_scan_samples_dx[1] -
+                                        onepad_extraon)])
+        return _ScanLayout(
+            n_steps_dx=scanInfoDict['img_dims'],
+            n_scan_samples_dx=n_scan_samples_dx,
+            samples_total=scanInfoDict['scan_samples_total'],
+            zeropad_start=scanInfoDict['scan_throw_startzero'],
+            zeropad_d3_step=(scanInfoDict['scan_throw_startacc'] +
+                             scanInfoDict['scan_throw_settling'] +
+                             scanInfoDict['scan_throw_initpos']),
+            zeropad_d2flyback=zeropad_d2flyback,
+            zeropad_extrapad=scanInfoDict['padlens'],
+            onepad_extraon=onepad_extraon
+        )
+
+    def __make_target_signal(self, seq_txt, seq_axis, layout):
+        """ Generate the TTL signal of a target, from its sequence and the axis the sequence is
+        along. Each axis only differs in the step pattern that the sequence is laid out as;
+        the pattern is then repeated for the remaining axes and padded to the scan. """
+        seq = self.__decode_sequence(seq_txt)
+        if seq_axis == 'None':
+            # no ttl sequences along axes, the start of the sequence holds for the whole scan
+            signal = self.__create_uniform_d3_step(self.__create_d2_step(seq[0], layout), layout)
+            axis_start = 2
+        elif seq_axis == 0:
+            # ttl sequence along first (pixel) axis
+            signal = self.__create_uniform_d3_step(self.__create_seq_d2_step(seq, layout), layout)
+            axis_start = 2
+        elif seq_axis == 1:
+            # ttl sequence along second (line) axis
+            signal = self.__create_seq_d3_step(seq, layout)
+            axis_start = 2
+        else:
+            # ttl sequence along third (frame) axis or beyond
+            signal = self.__create_seq_step(seq, seq_axis, layout)
+            axis_start = seq_axis + 1
+
+        # repeat signal for all additional scan axes, if applicable
+        signal = self.__repeat_remaining_axes(signal, layout, axis_start=axis_start)
+        # pad start zeros, and adjust to same length as analog scanning
+        # pad scanner phase delay to beginning to sync actual position with TTL
+        # signal = np.append(np.zeros(zeropad_phasedelay, dtype='bool'), signal)
+        return self.__pad_to_scan(signal, layout)
+
+    def __create_seq_d2_step(self, seq, layout):
+        """ Create a d2 step (without flyback) from a sequence along the first (pixel) axis. """
+        n_steps_d1 = layout.n_steps_dx[0]
+        n_samples_d1 = layout.n_scan_samples_dx[1]
+        # repeat sequence to d1 axis length
+        d2_step = np.resize(seq, n_steps_d1)
+        if n_samples_d1 > n_steps_d1:
+            d2_step = np.repeat(d2_step, n_samples_d1 / n_steps_d1).astype(bool)
+        elif n_samples_d1 < n_steps_d1:
+            d2_step = d2_step[::int(n_steps_d1 / n_samples_d1)].astype(bool)
+        append_start = np.full(layout.onepad_extraon, d2_step[0] == 1, dtype='bool')
+        return np.append(append_start, d2_step).astype(bool)
+
+    def __create_seq_d3_step(self, seq, layout):
+        """ Create a d3 step from a sequence along the second (line) axis. """
+        # repeat sequence to d2 axis length
+        seq = np.resize(seq, layout.n_steps_dx[1])
+        # create ON and OFF d2 periods and steps to use when building d2 sequence
+        d2_steps = [self.__create_d2_step(state, layout) for state in (0, 1)]
+        d2_periods = [self.__create_d2_period(d2_step, layout) for d2_step in d2_steps]
+        # build frame from seq, with the last d2 step (without flyback), adjusted to d3 step len
+        return self.__create_d3_step([d2_periods[step] for step in seq[:-1]], d2_steps[seq[-1]],
+                                     layout)
+
+    def __create_seq_step(self, seq, seq_axis, layout):
+        """ Create a step along the axis after seq_axis, from a sequence along the third (frame)
+        axis or beyond. """
+        # repeat sequence to the axis length
+        seq = np.resize(seq, layout.n_steps_dx[seq_axis])
+        # create ON and OFF steps along seq_axis, to use when building the sequence
+        steps = [self.__create_uniform_d3_step(self.__create_d2_step(state, layout), layout)
+                 for state in (0, 1)]
+        for axis in range(2, seq_axis):
+            steps = [RepeatedSignal(step, layout.n_steps_dx[axis]) for step in steps]
+        # build the step from seq, adjusted to the step len
+        signal = ConcatenatedSignal([steps[step] for step in seq])
+        return self.__pad_to_length(signal, layout.n_scan_samples_dx[seq_axis + 1])
+
+    def __generate_frame_line_clock(self, layout, frame=True, line=False, clock_len=10):
+        """ Generate frame and line clock signals, to be returned in signal_dict and used if user
+        wants frame/line clock at a digital output. """
+        n_steps_dx = layout.n_steps_dx
         # zeros to d1 axis length
-        signal_d2_step = np.zeros(n_scan_samples_dx[1] + onepad_extraon, dtype='bool')
+        signal_d2_step = np.zeros(layout.n_scan_samples_dx[1] + layout.onepad_extraon,
+                                  dtype='bool')
         if line:
             # replace first part with a line clock pulse
             signal_d2_step[:clock_len] = 1
-        signal_d2_period = np.append(signal_d2_step, np.zeros(zeropad_d2flyback, dtype='bool'))
+        signal_d2_period = self.__create_d2_period(signal_d2_step, layout)
         # all d2 steps except last
-        signal_d2 = np.tile(signal_d2_period, n_steps_dx[1] - 1)
-        # add last d2 step (without flyback)
-        signal_d2 = np.append(signal_d2, signal_d2_step)
+        d2_periods = [RepeatedSignal(signal_d2_period, n_steps_dx[1] - 1)]
         if frame:
             # replace first part with a frame clock pulse
-            signal_d2[:clock_len] = 1
-        # pad extra bits of smooth d2 curve: first step acc, start settling, and initial positioning
-        signal_d2 = np.append(np.zeros(zeropad_startacc+zeropad_settling+zeropad_initpos, dtype='bool'), signal_d2)
-        # adjust to frame len 
-        zeropad_toframelen = n_scan_samples_dx[2] - len(signal_d2)
-        if zeropad_toframelen > 0:
-            signal_d2 = np.append(signal_d2, np.zeros(zeropad_toframelen, dtype='bool'))
-        elif zeropad_toframelen < 0:
-            signal_d2 = signal_d2[-zeropad_toframelen:]  # TODO: looks strange? not right length? never enters here probably
+            if n_steps_dx[1] > 1:
+                first_d2_period = signal_d2_period.copy()
+                first_d2_period[:clock_len] = 1
+                d2_periods = [first_d2_period,
+                              RepeatedSignal(signal_d2_period, n_steps_dx[1] - 2)]
+            else:
+                signal_d2_step = signal_d2_step.copy()
+                signal_d2_step[:clock_len] = 1
+        # add last d2 step (without flyback), and adjust to frame len
+        signal_d3 = self.__create_d3_step(d2_periods, signal_d2_step, layout)
         # repeat signal for all additional scan axes, if applicable
-        signal = self.__repeat_remaining_axes(signal=signal_d2, n_steps_dx=n_steps_dx, axis_start=2, axis_end=axis_count)
-        # pad start zeros
-        signal = np.append(np.zeros(zeropad_start, dtype='bool'), signal)
-        # adjust to same length as analog scanning
-        zeropad_end = samples_total - len(signal)
-        if zeropad_end > 0:
-            signal = np.append(signal, np.zeros(zeropad_end, dtype='bool'))
-        elif zeropad_end < 0:
-            signal = signal[:zeropad_end]  # TODO: looks strange? not right length? never enters here probably
+        signal = self.__repeat_remaining_axes(signal_d3, layout, axis_start=2)
+        # pad start zeros, and adjust to same length as analog scanning
+        return self.__pad_to_scan(signal, layout)
+
+    def __create_d2_step(self, state, layout):
+        """ Create a d2 step (without flyback) of boolean state (on or off during the whole
+        step). """
+        return np.full(layout.n_scan_samples_dx[1] + layout.onepad_extraon, bool(state),
+                       dtype='bool')
+
+    def __create_d2_period(self, d2_step, layout):
+        """ Create a full d2 step period, from the d2 step followed by the flyback. """
+        return np.append(d2_step, np.zeros(layout.zeropad_d2flyback, dtype='bool'))
+
+    def __create_uniform_d3_step(self, d2_step, layout):
+        """ Create a full d3 step signal, in which all d2 steps are the same. """
+        d2_period = self.__create_d2_period(d2_step, layout)
+        # all d2 steps except last, and last d2 step (without flyback)
+        return self.__create_d3_step([RepeatedSignal(d2_period, layout.n_steps_dx[1] - 1)],
+                                     d2_step, layout)
+
+    def __create_d3_step(self, d2_periods, d2_step, layout):
+        """ Create a full d3 step signal, from the periods of all d2 steps except the last one, and
+        the last d2 step (without flyback). """
+        d3_step = ConcatenatedSignal([zeroSignal(layout.zeropad_d3_step, dtype=bool),
+                                      *d2_periods, d2_step], dtype=bool)
+        return self.__pad_to_length(d3_step, layout.n_scan_samples_dx[2])
+
+    def __repeat_remaining_axes(self, signal, layout, axis_start):
+        """ Repeat a created signal for the remaining axes, from axis_start on. """
+        for axis in range(axis_start, layout.axis_count):
+            signal = RepeatedSignal(signal, layout.n_steps_dx[axis],
+                                    period=len(signal) + layout.zeropad_extrapad[axis])
         return signal
 
-    def __create_d2_period(self, state, n_samples_d1, samples_extra, samples_flyback):
-        """ Create a full d2 step period of boolean state (on or off during d2 step, without flyback). """
-        d2_step = np.ones(n_samples_d1 + samples_extra, dtype='bool') if state else np.zeros(n_samples_d1 + samples_extra, dtype='bool')
-        return np.append(d2_step, np.zeros(samples_flyback, dtype='bool')), d2_step
-    
-    def __create_d3_step(self, d2_period, d2_step, n_steps_d2, n_samples_d3, samples_zeropad_step):
-        """ Create a full d3 step signal. """
-        d3_step = np.tile(d2_period, n_steps_d2 - 1)
-        d3_step = np.append(d3_step, d2_step)
-        d3_step = np.append(np.zeros(samples_zeropad_step, dtype='bool'), d3_step)
-        zeropad_toframelen = n_samples_d3 - len(d3_step)
-        if zeropad_toframelen > 0:
-            d3_step = np.append(d3_step, np.zeros(zeropad_toframelen, dtype='bool'))
-        elif zeropad_toframelen < 0:
-            d3_step = d3_step[-zeropad_toframelen:]
-        return d3_step
-
-    def __create_d4_step(self, d3_step, n_steps_d3):
-        """ Create a full d4 step signal. """
-        return np.tile(d3_step, n_steps_d3)
-
-    def __repeat_remaining_axes(self, signal, n_steps_dx, axis_start, axis_end):
-        """ Repeat a created signal for the remaining axes, from axis_start to axis_end. """
-        for axis in range(axis_start, axis_end):
-            signal = np.append(signal, np.zeros(self.zeropad_extrapad[axis]))
-            signal = np.tile(signal, n_steps_dx[axis])
+    def __pad_to_length(self, signal, length):
+        """ Pad zeros to the end of a signal, or throw samples at the start of it, to adjust it
+        to the given length. """
+        zeropad_tolen = length - len(signal)
+        if zeropad_tolen > 0:
+            signal = ConcatenatedSignal([signal, zeroSignal(zeropad_tolen, dtype=bool)])
+        elif zeropad_tolen < 0:
+            # TODO: looks strange? not right length? never enters here probably
+            signal = SampledSignal(signal[-zeropad_tolen:])
         return signal
 
+    def __pad_to_scan(self, signal, layout):
+        """ Pad start zeros to a signal, and pad zeros to the end of it or throw samples at the end
+        of it, to adjust it to the same length as analog scanning. """
+        zeropad_end = layout.samples_total - layout.zeropad_start - len(signal)
+        if zeropad_end < 0:
+            # TODO: looks strange? not right length? never enters here probably
+            signal = signal[:zeropad_end]
+            zeropad_end = 0
+        return ConcatenatedSignal([zeroSignal(layout.zeropad_start, dtype=bool), signal,
+                                   zeroSignal(zeropad_end, dtype=bool)], dtype=bool)
+
     def __make_signal_stationary(self, parameterDict, sample_rate):
         """ Make a signal for displaying in the signal graph, without scan parameters. """
         targets = parameterDict['target_device']
@@ -283,13 +300,13 @@ class PointScanTTLCycleDesigner(TTLCycleDesigner):
         return signalDict
 
     def __decode_sequence(self, sequence_txt):
-        """ Decode user-inputted string of TTL sequence into boolean list. 
+        """ Decode user-inputted string of TTL sequence into boolean list.
         Input string should consist of comma-separated commands on the form
         "h#" or "l#", where h means high=on, l means low=off, and # is the
         number of axis steps. Example:
         "h1,l2,h3,l1"
         means on for 1 step, off for 2 steps, on for 3 steps, and off for 1 step.
-        This will be repeated until reaching the axis length over the axis the 
+        This will be repeated until reaching the axis length over the axis the
         sequence is valid for."""
         seq_list = []  # list of inputted sequence - minimal length
         seq = sequence_txt.split(',')
@@ -312,7 +329,7 @@ class PointScanTTLCycleDesigner(TTLCycleDesigner):
             import matplotlib.pyplot as plt
             plt.figure(1)
             for i, target in enumerate(targets):
-                plt.plot(signals[target] - 0.01 * i)
+                plt.plot(np.asarray(signals[target]) - 0.01 * i)
                 #self._logger.debug(f'Signal length {target}: {len(signals[target])}')
             plt.show()
 
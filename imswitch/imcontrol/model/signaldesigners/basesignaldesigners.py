@@ -1,7 +1,13 @@
+import hashlib
 import importlib
+import threading
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import numpy as np
 
 from imswitch.imcommon.model import pythontools, initLogger
+from .compactsignals import CompactSignal
 from ..errors import InvalidChildClassError
 
 
@@ -15,6 +21,7 @@ class SignalDesigner(ABC):
         self.lastSignal = None
         self.lastParameterDict = None
         self._expectedParameters = None
+        self._signalCache = SignalCache()
 
     @property
     def expectedParameters(self):
@@ -77,6 +84,109 @@ class TTLCycleDesigner(SignalDesigner, ABC):
         pass
 
 
+class SignalCache:
+    """ Content-addressed cache for generated signals. Each entry is keyed
+    by a hash of the normalized parameters it was generated from, so that
+    generating a signal again with unchanged parameters is a lookup. The least
+    recently used entries are dropped when the cached arrays take up more than
+    maxBytes. Cached arrays are made read-only, as the same arrays are returned
+    to everyone asking for the same parameters. """
+
+    def __init__(self, maxBytes=256 * 1024 ** 2):
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._entryBytes = {}
+        self._totalBytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def makeKey(*parameters):
+        """ Returns the key for the given parameters. Dicts, sequences, numpy
+        arrays and numpy scalars are normalized first, so that neither the
+        order of dict keys nor the container or number types change the key. """
+        digest = hashlib.sha1()
+        _hashNormalized(digest, parameters)
+        return digest.hexdigest()
+
+    def get(self, key, generate):
+        """ Returns the entry with the given key, calling generate() to
+        create it if it isn't cached. """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = generate()
+        nbytes = _freezeArrays(value)
+        with self._lock:
+            if key not in self._entries and nbytes <= self.maxBytes:
+                self._entries[key] = value
+                self._entryBytes[key] = nbytes
+                self._totalBytes += nbytes
+                while self._totalBytes > self.maxBytes:
+                    oldKey, _ = self._entries.popitem(last=False)
+                    self._totalBytes -= self._entryBytes.pop(oldKey)
+        return value
+
+    def clear(self):
+        """ Removes all entries. """
+        with self._lock:
+            self._entries.clear()
+            self._entryBytes.clear()
+            self._totalBytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+def _hashNormalized(digest, value):
+    if isinstance(value, dict):
+        digest.update(b'd%d' % len(value))
+        for key in sorted(value, key=repr):
+            _hashNormalized(digest, key)
+            _hashNormalized(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(b'l%d' % len(value))
+        for item in value:
+            _hashNormalized(digest, item)
+    elif isinstance(value, np.ndarray):
+        digest.update(f'a{value.dtype.str}{value.shape}'.encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, np.generic):
+        _hashNormalized(digest, value.item())
+    elif isinstance(value, bool) or value is None:
+        digest.update(f'b{value}'.encode())
+    elif isinstance(value, (int, float)):
+        digest.update(f'f{float(value)!r}'.encode())
+    else:
+        digest.update(f's{value!r}'.encode())
+
+
+def _freezeArrays(value):
+    """ Makes all numpy arrays in value, also those that compact signals are
+    made of, read-only and returns their total size in bytes. """
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+        return value.nbytes
+    elif isinstance(value, CompactSignal):
+        for array in value.arrays():
+            array.setflags(write=False)
+        return value.nbytes
+    elif isinstance(value, dict):
+        return sum(_freezeArrays(item) for item in value.values())
+    elif isinstance(value, (list, tuple)):
+        return sum(_freezeArrays(item) for item in value)
+    return 0
+
+
 class SignalDesignerFactory:
     """Factory class for creating a SignalDesigner object. Factory checks
     that the new object is compatible with the parameters that will we
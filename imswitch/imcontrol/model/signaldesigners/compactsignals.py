@@ -0,0 +1,255 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class CompactSignal(ABC):
+    """ A signal described by a few primitives (sampled curves and steps) and
+    repeat counts instead of by all its samples. The length of the signal and
+    its value at any sample index are worked out from the primitives, and its
+    samples are generated block by block when they are needed, so memory use
+    doesn't depend on the length of the signal. np.asarray(signal) generates
+    all samples. """
+
+    @property
+    @abstractmethod
+    def dtype(self):
+        pass
+
+    @abstractmethod
+    def __len__(self):
+        pass
+
+    @abstractmethod
+    def take(self, indices):
+        """ Returns the samples at the given indices, which must be in range.
+        """
+        pass
+
+    @abstractmethod
+    def min(self):
+        pass
+
+    @abstractmethod
+    def max(self):
+        pass
+
+    @abstractmethod
+    def _iterArrays(self):
+        pass
+
+    def arrays(self):
+        """ Returns the arrays that the signal is made of, each of them once.
+        """
+        return list({id(array): array for array in self._iterArrays()}.values())
+
+    @property
+    def nbytes(self):
+        """ Memory used by the arrays that the signal is made of. """
+        return sum(array.nbytes for array in self.arrays())
+
+    def getBlock(self, start, stop):
+        """ Returns the samples from index start up to stop. """
+        return self.take(np.arange(start, stop))
+
+    def blocks(self, blockSamples):
+        """ Yields all samples in blocks of blockSamples samples. The last
+        block may be shorter. """
+        length = len(self)
+        for start in range(0, length, blockSamples):
+            yield self.getBlock(start, min(start + blockSamples, length))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.take(np.arange(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('signal index out of range')
+        return self.take(np.array([index]))[0]
+
+    def __array__(self, dtype=None, copy=None):
+        samples = self.getBlock(0, len(self))
+        return samples if dtype is None else samples.astype(dtype)
+
+
+class SampledSignal(CompactSignal):
+    """ A signal given by its samples, e.g. one period of an evaluated
+    scanning curve. """
+
+    def __init__(self, samples):
+        self._samples = np.asarray(samples)
+
+    @property
+    def dtype(self):
+        return self._samples.dtype
+
+    def __len__(self):
+        return len(self._samples)
+
+    def take(self, indices):
+        return self._samples[indices]
+
+    def min(self):
+        return self._samples.min()
+
+    def max(self):
+        return self._samples.max()
+
+    def _iterArrays(self):
+        yield self._samples
+
+
+class StepSignal(CompactSignal):
+    """ A step function, each value is held for the corresponding number of
+    samples. """
+
+    def __init__(self, values, counts, dtype=None):
+        values = np.asarray(values, dtype=dtype)
+        counts = np.asarray(counts, dtype=np.int64)
+        if values.shape != counts.shape:
+            raise ValueError('There must be one sample count per value')
+        if np.any(counts < 0):
+            raise ValueError('Sample counts must not be negative')
+        keep = counts > 0
+        self._values = values[keep]
+        self._ends = np.cumsum(counts[keep])
+
+    @property
+    def dtype(self):
+        return self._values.dtype
+
+    def __len__(self):
+        return int(self._ends[-1]) if len(self._ends) > 0 else 0
+
+    def take(self, indices):
+        return self._values[np.searchsorted(self._ends, indices, side='right')]
+
+    def min(self):
+        return self._values.min()
+
+    def max(self):
+        return self._values.max()
+
+    def _iterArrays(self):
+        yield self._values
+        yield self._ends
+
+
+class ConcatenatedSignal(CompactSignal):
+    """ Signals (compact signals or arrays) joined one after the other. """
+
+    def __init__(self, parts, dtype=None):
+        parts = [asCompactSignal(part) for part in parts]
+        if dtype is not None:
+            self._dtype = np.dtype(dtype)
+        else:
+            self._dtype = np.result_type(*[part.dtype for part in parts])
+        self._parts = [part for part in parts if len(part) > 0]
+        lengths = [len(part) for part in self._parts]
+        self._starts = np.cumsum([0] + lengths[:-1])
+        self._length = sum(lengths)
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    def __len__(self):
+        return self._length
+
+    def take(self, indices):
+        indices = np.asarray(indices)
+        samples = np.empty(indices.shape, dtype=self._dtype)
+        if indices.size < 1:
+            return samples
+        # group the indices by the part they are in
+        partIndices = np.searchsorted(self._starts, indices, side='right') - 1
+        order = np.argsort(partIndices, kind='stable')
+        groups = np.split(order, np.flatnonzero(np.diff(partIndices[order])) + 1)
+        for group in groups:
+            part = partIndices[group[0]]
+            samples[group] = self._parts[part].take(indices[group] - self._starts[part])
+        return samples
+
+    def min(self):
+        return min(part.min() for part in self._parts)
+
+    def max(self):
+        return max(part.max() for part in self._parts)
+
+    def _iterArrays(self):
+        for part in self._parts:
+            yield from part._iterArrays()
+
+
+class RepeatedSignal(CompactSignal):
+    """ A signal (compact signal or array) repeated a number of times, with
+    each repetition padded with zeros to period samples. """
+
+    def __init__(self, signal, repeats, period=None):
+        self._signal = asCompactSignal(signal)
+        self._repeats = int(repeats)
+        self._period = len(self._signal) if period is None else int(period)
+        if self._period < len(self._signal):
+            raise ValueError('The period must not be shorter than the repeated signal')
+
+    @property
+    def dtype(self):
+        return self._signal.dtype
+
+    def __len__(self):
+        return self._period * self._repeats
+
+    def take(self, indices):
+        periodIndices = np.asarray(indices) % self._period
+        samples = np.zeros(periodIndices.shape, dtype=self.dtype)
+        inSignal = periodIndices < len(self._signal)
+        samples[inSignal] = self._signal.take(periodIndices[inSignal])
+        return samples
+
+    def min(self):
+        if len(self._signal) < 1:
+            return self.dtype.type(0)
+        if self._period > len(self._signal):
+            return min(self._signal.min(), self.dtype.type(0))
+        return self._signal.min()
+
+    def max(self):
+        if len(self._signal) < 1:
+            return self.dtype.type(0)
+        if self._period > len(self._signal):
+            return max(self._signal.max(), self.dtype.type(0))
+        return self._signal.max()
+
+    def _iterArrays(self):
+        yield from self._signal._iterArrays()
+
+
+def asCompactSignal(signal):
+    """ Returns the signal as a compact signal, wrapping it if it's an array.
+    """
+    if isinstance(signal, CompactSignal):
+        return signal
+    return SampledSignal(signal)
+
+
+def zeroSignal(length, dtype=float):
+    """ Returns a compact signal of zeros. """
+    return StepSignal([0], [length], dtype=dtype)
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
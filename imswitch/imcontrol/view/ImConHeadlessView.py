@@ -0,0 +1,63 @@
+from imswitch.imcommon.framework import Signal, SignalInterface
+from imswitch.imcommon.model import initLogger
+from . import headless
+
+
+class ImConHeadlessView(SignalInterface):
+    """ Used in place of ImConMainView when ImSwitch runs headless. Instead of
+    a window, it creates the headless counterparts of the widgets in the
+    setup, so that their controllers and the API functions they provide work
+    without a GUI. Widgets that have no headless counterpart, such as the
+    image display, are left out. """
+
+    sigLoadParamsFromHDF5 = Signal()
+    sigPickSetup = Signal()
+    sigClosing = Signal()
+
+    pickSetupDialog = None
+    pickDatasetsDialog = None
+
+    def __init__(self, options, viewSetupInfo):
+        super().__init__()
+        self.__logger = initLogger(self)
+        self.__logger.debug('Initializing')
+
+        self.viewSetupInfo = viewSetupInfo
+        self.widgets = {}
+
+        enabledWidgetKeys = self.viewSetupInfo.availableWidgets
+        if enabledWidgetKeys is False:
+            enabledWidgetKeys = []
+        elif enabledWidgetKeys is True:
+            enabledWidgetKeys = _headlessWidgetKeys
+
+        for widgetKey in enabledWidgetKeys:
+            if widgetKey not in _headlessWidgetKeys:
+                self.__logger.warning(f'Skipping widget {widgetKey}, which is not available when'
+                                      f' running headless')
+                continue
+
+            self.widgets[widgetKey] = getattr(headless, f'{widgetKey}Widget')(options)
+
+    def addShortcuts(self, shortcuts):
+        pass
+
+
+_headlessWidgetKeys = ['Settings', 'View', 'Recording', 'Laser', 'Positioner', 'Tiling']
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -1,4 +1,32 @@
-from .ImConMainView import ImConMainView
-from .PickSetupDialog import PickSetupDialog
-from .SLMDisplay import SLMDisplay
+import importlib
+import sys
+
 from .guitools import ViewSetupInfo
+
+
+# The main view imports all widgets and napari, so it is only imported when it is first used. This
+# allows the controllers to be imported without it in headless mode.
+_lazyViewModules = {
+    'ImConHeadlessView': 'ImConHeadlessView',
+    'ImConMainView': 'ImConMainView',
+    'PickSetupDialog': 'PickSetupDialog',
+    'SLMDisplay': 'SLMDisplay'
+}
+
+
+def __getattr__(name):
+    if name not in _lazyViewModules:
+        raise AttributeError(f'Module "{__name__}" has no attribute "{name}"')
+    importlib.import_module(f'{__name__}.{_lazyViewModules[name]}')
+
+    # Importing a submodule binds its name in this package to the submodule, also when it is
+    # imported by another submodule, so bind the names to the classes instead
+    for lazyName, moduleName in _lazyViewModules.items():
+        module = sys.modules.get(f'{__name__}.{moduleName}')
+        if module is not None:
+            globals()[lazyName] = getattr(module, lazyName)
+    return globals()[name]
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(_lazyViewModules.keys()))
@@ -25,6 +25,26 @@ class LaserPresetInfo:
     """ Laser value. """
 
 
+@dataclass(frozen=True)
+class AutoLevelsInfo:
+    mode: str = 'minmax'
+    """ How the display levels of the live view are set: ``minmax`` to span
+    from 0 to the brightest pixel, or ``percentile`` to span from the
+    ``lowPercentile`` to the ``highPercentile`` percentile of the pixel
+    values. """
+
+    lowPercentile: float = 0.1
+    """ Percentile that the lower level is set to in ``percentile`` mode. """
+
+    highPercentile: float = 99.9
+    """ Percentile that the upper level is set to in ``percentile`` mode. """
+
+    continuous: bool = False
+    """ Whether the levels follow the frames as they come in. If false, they
+    are only set when the live view starts and when updating the levels
+    manually. """
+
+
 @dataclass
 class ViewSetupInfo(SetupInfo):
     """ This is the object represented by the hardware configuration JSON file.
@@ -42,6 +62,9 @@ class ViewSetupInfo(SetupInfo):
     defaultLaserPresetForScan: Optional[str] = field(default_factory=lambda: None)
     """ Default laser preset for scanning. """
 
+    autoLevels: 'AutoLevelsInfo' = field(default_factory=AutoLevelsInfo)
+    """ How the display levels of the live view are set automatically. """
+
     availableWidgets: Union[List[str], bool] = field(default_factory=list)
     """ Which widgets to load. The following values are possible to include
     (case sensitive):
@@ -1,2 +1,3 @@
 from imswitch.imcommon.view.guitools import *  # noqa
-from .ViewSetupInfo import ROIInfo, LaserPresetInfo, ViewSetupInfo
+from .ViewSetupInfo import AutoLevelsInfo, ROIInfo, LaserPresetInfo, ViewSetupInfo
+from .detectortools import createDetectorParameters
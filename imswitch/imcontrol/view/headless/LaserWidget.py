@@ -0,0 +1,133 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from imswitch.imcommon.framework import Signal
+from .basewidgets import HeadlessWidget
+
+
+class LaserWidget(HeadlessWidget):
+    """ Holds the laser values and presets. """
+
+    sigEnableChanged = Signal(str, bool)  # (laserName, enabled)
+    sigValueChanged = Signal(str, float)  # (laserName, value)
+
+    sigModEnabledChanged = Signal(str, bool)  # (laserName, modulationEnabled)
+    sigFreqChanged = Signal(str, int)  # (laserName, frequency)
+    sigDutyCycleChanged = Signal(str, int)  # (laserName, dutyCycle)
+
+    sigPresetSelected = Signal(str)  # (presetName)
+    sigLoadPresetClicked = Signal()
+    sigSavePresetClicked = Signal()
+    sigSavePresetAsClicked = Signal()
+    sigDeletePresetClicked = Signal()
+    sigPresetScanDefaultToggled = Signal()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lasers = {}
+        self._presets = []
+        self._currentPreset = None
+
+    def addLaser(self, laserName, valueUnits, valueDecimals, wavelength, valueRange=None,
+                 valueRangeStep=1, frequencyRange=(0, 0, 0)):
+        """ Adds a laser. valueRange is either a tuple (min, max), or None (if
+        the laser can only be turned on/off). """
+        self._lasers[laserName] = _LaserState(
+            valueRange=valueRange, value=float(valueRange[0] if valueRange is not None else 0)
+        )
+
+    def isLaserActive(self, laserName):
+        """ Returns whether the specified laser is powered on. """
+        return self._lasers[laserName].active
+
+    def getValue(self, laserName):
+        """ Returns the value of the specified laser, in the units that the
+        laser uses. """
+        return self._lasers[laserName].value
+
+    def setLaserActive(self, laserName, active):
+        """ Sets whether the specified laser is powered on. """
+        laser = self._lasers[laserName]
+        if active == laser.active:
+            return
+
+        laser.active = active
+        self.sigEnableChanged.emit(laserName, active)
+
+    def setValue(self, laserName, value):
+        """ Sets the value of the specified laser, in the units that the laser
+        uses. The value is limited to the value range of the laser. """
+        laser = self._lasers[laserName]
+        value = float(value)
+        if laser.valueRange is not None:
+            value = min(max(value, laser.valueRange[0]), laser.valueRange[1])
+        if value == laser.value:
+            return
+
+        laser.value = value
+        self.sigValueChanged.emit(laserName, value)
+
+    def getCurrentPreset(self):
+        """ Returns the name of the currently selected preset. """
+        return self._currentPreset
+
+    def setCurrentPreset(self, name):
+        """ Sets the selected preset. Pass None to unselect all presets. """
+        if not name:
+            self._currentPreset = None
+        elif name in self._presets:
+            self._currentPreset = name
+
+    def addPreset(self, name):
+        """ Adds a preset to the preset list. """
+        self._presets.append(name)
+        self._presets.sort()
+
+    def removePreset(self, name):
+        """ Removes a preset from the preset list. """
+        if name in self._presets:
+            self._presets.remove(name)
+        if name == self._currentPreset:
+            self._currentPreset = None
+
+    # The modulation settings and the default scan preset are kept by the laser managers and the
+    # setup info, so these only exist for compatibility with the regular widget
+
+    def setLaserEditable(self, laserName, editable):
+        pass
+
+    def setModulationFrequency(self, laserName, value):
+        pass
+
+    def setModulationDutyCycle(self, laserName, value):
+        pass
+
+    def setScanDefaultPreset(self, name):
+        pass
+
+    def setScanDefaultPresetActive(self, active):
+        pass
+
+
+@dataclass
+class _LaserState:
+    valueRange: Optional[Tuple[float, float]]
+    value: float
+    active: bool = False
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,55 @@
+from imswitch.imcommon.framework import Signal
+from .basewidgets import HeadlessWidget
+
+
+class PositionerWidget(HeadlessWidget):
+    """ Holds the step sizes and speed of the positioners. """
+
+    sigStepUpClicked = Signal(str, str)  # (positionerName, axis)
+    sigStepDownClicked = Signal(str, str)  # (positionerName, axis)
+    sigsetSpeedClicked = Signal()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stepSizes = {}
+        self._speed = 1000.0
+
+    def addPositioner(self, positionerName, axes, speed):
+        for axis in axes:
+            self._stepSizes[(positionerName, axis)] = 0.05
+
+    def getStepSize(self, positionerName, axis):
+        """ Returns the step size of the specified positioner axis in
+        micrometers. """
+        return self._stepSizes[(positionerName, axis)]
+
+    def setStepSize(self, positionerName, axis, stepSize):
+        """ Sets the step size of the specified positioner axis to the
+        specified number of micrometers. """
+        self._stepSizes[(positionerName, axis)] = float(stepSize)
+
+    def getSpeed(self):
+        return self._speed
+
+    def setSpeedSize(self, positionerName, axis, speedSize):
+        self._speed = float(speedSize)
+
+    def updatePosition(self, positionerName, axis, position):
+        pass  # The positions are kept by the positioner managers
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,251 @@
+import os
+import time
+
+from imswitch.imcommon.framework import Signal
+from .basewidgets import HeadlessWidget
+
+
+class RecordingWidget(HeadlessWidget):
+    """ Holds the snap and recording settings. """
+
+    sigDetectorModeChanged = Signal()
+    sigDetectorSpecificChanged = Signal()
+    sigOpenRecFolderClicked = Signal()
+    sigSpecFileToggled = Signal(bool)  # (enabled)
+
+    sigSpecFramesPicked = Signal()
+    sigSpecTimePicked = Signal()
+    sigScanOncePicked = Signal()
+    sigScanLapsePicked = Signal()
+    sigUntilStopPicked = Signal()
+
+    sigsaveFormatChanged = Signal()
+    sigSnapSaveModeChanged = Signal()
+    sigRecSaveModeChanged = Signal()
+
+    sigSnapRequested = Signal()
+    sigRecToggled = Signal(bool)  # (enabled)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        baseOutputFolder = self._options.recording.outputFolder
+        if self._options.recording.includeDateInOutputFolder:
+            self.initialDir = os.path.join(baseOutputFolder, time.strftime('%Y-%m-%d'))
+        else:
+            self.initialDir = baseOutputFolder
+
+        self._detectorModes = []
+        self._detectorMode = None
+        self._specificDetectors = []
+        self._selectedSpecificDetectors = []
+        self._multiDetectorSingleFile = False
+        self._recFolder = self.initialDir
+        self._customFilename = None
+        self._customFilenameEnabled = False
+        self._recButtonChecked = False
+        self._numExpositions = 100
+        self._timeToRec = 1.0
+        self._timelapseTime = 5
+        self._timelapseFreq = 0.0
+        self._timelapseSingleFile = False
+        self._saveFormat = 1
+        self._snapSaveMode = 1
+        self._recSaveMode = 1
+
+    def getDetectorMode(self):
+        """ Returns the detector capture mode. The value -1 corresponds to
+        "current detector at start", the value -2 corresponds to "all
+        acquisition detectors", and the value -3 corresponds to "specific
+        detector(s)". """
+        return self._detectorMode
+
+    def getSelectedSpecificDetectors(self):
+        """ Returns the selected items in the "select specific detectors"
+        list. """
+        return list(self._selectedSpecificDetectors)
+
+    def getMultiDetectorSingleFile(self):
+        return self._multiDetectorSingleFile
+
+    def getsaveFormat(self):
+        return self._saveFormat
+
+    def getSnapSaveMode(self):
+        return self._snapSaveMode
+
+    def getRecSaveMode(self):
+        return self._recSaveMode
+
+    def getRecFolder(self):
+        return self._recFolder
+
+    def getCustomFilename(self):
+        return self._customFilename if self._customFilenameEnabled else None
+
+    def isRecButtonChecked(self):
+        return self._recButtonChecked
+
+    def getNumExpositions(self):
+        return self._numExpositions
+
+    def getTimeToRec(self):
+        return self._timeToRec
+
+    def getTimelapseTime(self):
+        return self._timelapseTime
+
+    def getTimelapseFreq(self):
+        return self._timelapseFreq
+
+    def getTimelapseSingleFile(self):
+        return self._timelapseSingleFile
+
+    def setDetectorList(self, detectorModels):
+        self._detectorModes.append(-1)
+        if len(detectorModels) > 1:
+            self._detectorModes += [-2, -3]
+        self._specificDetectors += list(detectorModels.keys())
+        self.setDetectorMode(self._detectorModes[0])
+
+    def setDetectorMode(self, detectorMode):
+        """ Sets the detector capture mode. Modes that are not available for
+        the current detectors are ignored. """
+        if detectorMode not in self._detectorModes or detectorMode == self._detectorMode:
+            return
+
+        self._detectorMode = detectorMode
+        self.sigDetectorModeChanged.emit()
+
+    def setSelectedSpecificDetectors(self, detectors):
+        """ Sets the selected items in the "select specific detectors" list.
+        """
+        selectedDetectors = [detector for detector in self._specificDetectors
+                             if detector in detectors]
+        if selectedDetectors == self._selectedSpecificDetectors:
+            return
+
+        self._selectedSpecificDetectors = selectedDetectors
+        self.sigDetectorSpecificChanged.emit()
+
+    def setMultiDetectorSingleFile(self, singleFile):
+        self._multiDetectorSingleFile = singleFile
+
+    def setsaveFormat(self, saveFormat):
+        if saveFormat == self._saveFormat:
+            return
+
+        self._saveFormat = saveFormat
+        self.sigsaveFormatChanged.emit()
+
+    def setSnapSaveMode(self, saveMode):
+        if saveMode == self._snapSaveMode:
+            return
+
+        self._snapSaveMode = saveMode
+        self.sigSnapSaveModeChanged.emit()
+
+    def setRecSaveMode(self, saveMode):
+        if saveMode == self._recSaveMode:
+            return
+
+        self._recSaveMode = saveMode
+        self.sigRecSaveModeChanged.emit()
+
+    def setCustomFilenameEnabled(self, enabled):
+        """ Sets whether the custom filename is used for the data to save. """
+        self._customFilenameEnabled = enabled
+
+    def setCustomFilename(self, filename):
+        self.setCustomFilenameEnabled(True)
+        self._customFilename = filename
+
+    def setRecFolder(self, folderPath):
+        self._recFolder = folderPath
+
+    def setRecButtonChecked(self, checked):
+        if checked == self._recButtonChecked:
+            return
+
+        self._recButtonChecked = checked
+        self.sigRecToggled.emit(checked)
+
+    def setNumExpositions(self, numExpositions):
+        self._numExpositions = int(float(numExpositions))
+
+    def setTimeToRec(self, secondsToRec):
+        self._timeToRec = float(secondsToRec)
+
+    def setTimelapseTime(self, lapsesToRec):
+        self._timelapseTime = int(float(lapsesToRec))
+
+    def setTimelapseFreq(self, freqSeconds):
+        self._timelapseFreq = float(freqSeconds)
+
+    def setTimelapseSingleFile(self, singleFile):
+        self._timelapseSingleFile = singleFile
+
+    # The recording mode is kept by the controller, and there is nothing to display the field
+    # states or progress on, so these only exist for compatibility with the regular widget
+
+    def setSpecificDetectorListVisible(self, visible):
+        pass
+
+    def setMultiDetectorSingleFileVisible(self, visible):
+        pass
+
+    def setsaveFormatEnabled(self, value):
+        pass
+
+    def setSnapSaveModeVisible(self, value):
+        pass
+
+    def setRecSaveModeVisible(self, value):
+        pass
+
+    def checkSpecFrames(self):
+        pass
+
+    def checkSpecTime(self):
+        pass
+
+    def checkScanOnce(self):
+        pass
+
+    def checkScanLapse(self):
+        pass
+
+    def checkUntilStop(self):
+        pass
+
+    def setFieldsEnabled(self, enabled):
+        pass
+
+    def setEnabledParams(self, specFrames=False, specTime=False, scanLapse=False):
+        pass
+
+    def updateRecFrameNum(self, recFrameNum):
+        pass
+
+    def updateRecTime(self, recTime):
+        pass
+
+    def updateRecLapseNum(self, lapseNum):
+        pass
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
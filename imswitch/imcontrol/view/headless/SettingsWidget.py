@@ -0,0 +1,97 @@
+from imswitch.imcommon.framework import Signal
+from imswitch.imcontrol.view import guitools
+from .basewidgets import HeadlessWidget
+
+
+class DetectorParameterTree:
+    """ Holds the configuration parameters of a detector, like CamParamTree
+    but without displaying them. """
+
+    def __init__(self, detectorParameters, detectorActions, supportedBinnings, roiInfos):
+        self.p = guitools.createDetectorParameters(detectorParameters, detectorActions,
+                                                   supportedBinnings, roiInfos)
+
+    def setImageFrameVisible(self, visible):
+        self.p.param('Image frame').setOpts(visible=visible)
+
+
+class ROI:
+    """ The region of interest used to pick a custom detector frame. Its
+    position is relative to the current frame. """
+
+    def __init__(self):
+        self.position = (0, 0)
+        self.size = (64, 64)
+        self.visible = False
+
+
+class SettingsWidget(HeadlessWidget):
+    """ Holds the detector settings and the ROI. """
+
+    sigROIChanged = Signal()
+    sigDetectorChanged = Signal(str)  # (detectorName)
+    sigNextDetectorClicked = Signal()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ROI = ROI()
+        self.trees = {}
+        self._detectorNames = []
+        self._selectedDetectorIndex = -1
+        self._displayedDetector = None
+
+    def addDetector(self, detectorName, detectorModel, detectorParameters, detectorActions,
+                    supportedBinnings, roiInfos):
+        self.trees[detectorName] = DetectorParameterTree(detectorParameters, detectorActions,
+                                                         supportedBinnings, roiInfos)
+        self._detectorNames.append(detectorName)
+        if self._selectedDetectorIndex < 0:
+            self._selectedDetectorIndex = 0
+
+    def getDisplayedDetector(self):
+        return self._displayedDetector
+
+    def setDisplayedDetector(self, detectorName):
+        self._displayedDetector = detectorName
+
+    def selectNextDetector(self):
+        nextDetectorIndex = (self._selectedDetectorIndex + 1) % len(self._detectorNames)
+        if nextDetectorIndex == self._selectedDetectorIndex:
+            return
+
+        self._selectedDetectorIndex = nextDetectorIndex
+        self.sigDetectorChanged.emit(self._detectorNames[nextDetectorIndex])
+
+    def setImageFrameVisible(self, visible):
+        """ Sets whether the image frame settings are visible. """
+        self.trees[self._displayedDetector].setImageFrameVisible(visible)
+
+    def getROIGraphicsItem(self):
+        return self.ROI
+
+    def showROI(self, position=None, size=None):
+        if position is not None:
+            self.ROI.position = position
+        if size is not None:
+            self.ROI.size = size
+        self.ROI.visible = True
+
+    def hideROI(self):
+        self.ROI.visible = False
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
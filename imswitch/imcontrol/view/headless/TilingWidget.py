@@ -0,0 +1,35 @@
+from imswitch.imcommon.framework import Signal
+from .basewidgets import HeadlessWidget
+
+
+class TilingWidget(HeadlessWidget):
+    """ Holds the label of the current tile. """
+
+    sigSaveFocus = Signal(bool)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._label = ''
+
+    def getLabel(self):
+        return self._label
+
+    def setLabel(self, label):
+        self._label = label
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -0,0 +1,63 @@
+from imswitch.imcommon.framework import Signal
+from .basewidgets import HeadlessWidget
+
+
+class ViewWidget(HeadlessWidget):
+    """ Holds whether the live view is active. """
+
+    sigGridToggled = Signal(bool)  # (enabled)
+    sigCrosshairToggled = Signal(bool)  # (enabled)
+    sigLiveviewToggled = Signal(bool)  # (enabled)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._liveViewActive = False
+        self._gridVisible = False
+        self._crosshairVisible = False
+
+    def setViewToolsEnabled(self, enabled):
+        pass  # There are no buttons to enable
+
+    def getLiveViewActive(self):
+        return self._liveViewActive
+
+    def setLiveViewActive(self, active):
+        """ Sets whether the LiveView is active. """
+        if active == self._liveViewActive:
+            return
+
+        self._liveViewActive = active
+        self.sigLiveviewToggled.emit(active)
+
+    def setLiveViewGridVisible(self, visible):
+        """ Sets whether the LiveView grid is visible. """
+        if visible == self._gridVisible:
+            return
+
+        self._gridVisible = visible
+        self.sigGridToggled.emit(visible)
+
+    def setLiveViewCrosshairVisible(self, visible):
+        """ Sets whether the LiveView crosshair is visible. """
+        if visible == self._crosshairVisible:
+            return
+
+        self._crosshairVisible = visible
+        self.sigCrosshairToggled.emit(visible)
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
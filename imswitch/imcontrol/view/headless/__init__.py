@@ -0,0 +1,7 @@
+from .basewidgets import HeadlessWidget
+from .LaserWidget import LaserWidget
+from .PositionerWidget import PositionerWidget
+from .RecordingWidget import RecordingWidget
+from .SettingsWidget import SettingsWidget
+from .TilingWidget import TilingWidget
+from .ViewWidget import ViewWidget
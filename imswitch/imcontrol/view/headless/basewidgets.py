@@ -0,0 +1,31 @@
+from imswitch.imcommon.framework import SignalInterface
+
+
+class HeadlessWidget(SignalInterface):
+    """ Superclass for the widgets that are used in place of the regular ones
+    when ImSwitch runs headless. They hold the values that the controllers
+    read from and write to their widgets, and emit the same signals as the
+    regular widgets when these values change, without creating any Qt
+    widgets. Methods that only affect how a widget is displayed, such as
+    setting whether a field is visible, are implemented as no-ops. """
+
+    def __init__(self, options, *_args, **_kwargs):
+        super().__init__()
+        self._options = options
+
+
+# Copyright (C) 2020-2021 ImSwitch developers
+# This file is part of ImSwitch.
+#
+# ImSwitch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# ImSwitch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
@@ -1,5 +1,5 @@
 import numpy as np
-from qtpy import QtWidgets
+from qtpy import QtCore, QtWidgets
 
 from imswitch.imcommon.model import shortcut
 from imswitch.imcommon.view.guitools import naparitools
@@ -8,6 +8,8 @@ from imswitch.imcommon.view.guitools import naparitools
 class ImageWidget(QtWidgets.QWidget):
     """ Widget containing viewbox that displays the new detector frames. """
 
+    sigViewChanged = QtCore.Signal()
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -19,6 +21,8 @@ class ImageWidget(QtWidgets.QWidget):
         self.NapariResetViewWidget = naparitools.NapariResetViewWidget.addToViewer(self.napariViewer, 'right')
         self.NapariShiftWidget = naparitools.NapariShiftWidget.addToViewer(self.napariViewer)
         self.imgLayers = {}
+        self.napariViewer.camera.events.zoom.connect(lambda _: self.sigViewChanged.emit())
+        self.napariViewer.camera.events.center.connect(lambda _: self.sigViewChanged.emit())
 
         self.viewCtrlLayout = QtWidgets.QVBoxLayout()
         self.viewCtrlLayout.addWidget(self.napariViewer.get_widget())
@@ -59,12 +63,14 @@ class ImageWidget(QtWidgets.QWidget):
     def getImage(self, name):
         return self.imgLayers[name].data
 
-    def setImage(self, name, im, scale):
+    def setImage(self, name, im, scale, translate=None):
         self.imgLayers[name].data = im
         self.imgLayers[name].scale = tuple(scale)
+        self.imgLayers[name].translate = (tuple(translate) if translate is not None
+                                          else (0,) * len(scale))
 
     def clearImage(self, name):
-        self.setImage(name, np.zeros((1, 1)))
+        self.setImage(name, np.zeros((1, 1)), (1, 1))
 
     def getImageDisplayLevels(self, name):
         return self.imgLayers[name].contrast_limits
@@ -79,6 +85,18 @@ class ImageWidget(QtWidgets.QWidget):
             self.napariViewer.window.qt_viewer.camera.center[1]
         )
 
+    def getViewport(self):
+        """ Returns the camera zoom (in screen pixels per world unit), the
+        center of the view as a (y, x) tuple in world units, and the canvas
+        size as a (height, width) tuple in screen pixels. """
+        canvas = self.napariViewer.window.qt_viewer.canvas.native
+        camera = self.napariViewer.camera
+        return (
+            camera.zoom,
+            (camera.center[-2], camera.center[-1]),
+            (canvas.height(), canvas.width())
+        )
+
     def updateGrid(self, imShape):
         self.grid.update(imShape)
 
@@ -106,9 +106,10 @@ class RecordingWidget(Widget):
 
         self.recSaveModeLabel = QtWidgets.QLabel('<strong>Rec save mode:</strong>')
         self.recSaveModeList = QtWidgets.QComboBox()
-        self.recSaveModeList.addItems(['Save on disk',
-                                       'Save in memory for reconstruction',
-                                       'Save on disk and keep in memory'])
+        self.recSaveModeList.addItem('Save on disk', 1)
+        self.recSaveModeList.addItem('Save in memory for reconstruction', 2)
+        self.recSaveModeList.addItem('Save on disk and keep in memory', 3)
+        self.recSaveModeList.addItem('Save in memory as arrays (save to disk later)', 5)
 
         # Add items to GridLayout
         buttonWidget = QtWidgets.QWidget()
@@ -235,7 +236,7 @@ class RecordingWidget(Widget):
         return self.snapSaveModeList.currentIndex() + 1
 
     def getRecSaveMode(self):
-        return self.recSaveModeList.currentIndex() + 1
+        return self.recSaveModeList.currentData()
 
     def getRecFolder(self):
         return self.folderEdit.text()
@@ -310,7 +311,7 @@ class RecordingWidget(Widget):
         self.snapSaveModeList.setVisible(value)
 
     def setRecSaveMode(self, saveMode):
-        self.recSaveModeList.setCurrentIndex(saveMode - 1)
+        self.recSaveModeList.setCurrentIndex(self.recSaveModeList.findData(saveMode))
 
     def setRecSaveModeVisible(self, value):
         self.recSaveModeLabel.setVisible(value)
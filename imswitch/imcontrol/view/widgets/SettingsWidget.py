@@ -1,4 +1,4 @@
-from pyqtgraph.parametertree import ParameterTree, Parameter
+from pyqtgraph.parametertree import ParameterTree
 from qtpy import QtCore, QtWidgets
 
 from imswitch.imcommon.model import shortcut
@@ -15,77 +15,8 @@ class CamParamTree(ParameterTree):
                  *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        BinTip = ("Sets binning mode. Binning mode specifies if and how \n"
-                  "many pixels are to be read out and interpreted as a \n"
-                  "single pixel value.")
-
-        # Parameter tree for the detector configuration
-        params = [{'name': 'Model', 'type': 'str', 'readonly': True},
-                  {'name': 'Image frame', 'type': 'group', 'children': [
-                      {'name': 'Binning', 'type': 'list', 'value': 1,
-                       'values': supportedBinnings, 'tip': BinTip},
-                      {'name': 'Mode', 'type': 'list', 'value': 'Full chip',
-                       'values': ['Full chip'] + list(roiInfos.keys()) + ['Custom']},
-                      {'name': 'X0', 'type': 'int', 'value': 0, 'limits': (0, 65535)},
-                      {'name': 'Y0', 'type': 'int', 'value': 0, 'limits': (0, 65535)},
-                      {'name': 'Width', 'type': 'int', 'value': 1, 'limits': (1, 65535)},
-                      {'name': 'Height', 'type': 'int', 'value': 1, 'limits': (1, 65535)},
-                      {'name': 'Apply', 'type': 'action', 'title': 'Apply'},
-                      {'name': 'New ROI', 'type': 'action', 'title': 'New ROI'},
-                      {'name': 'Abort ROI', 'type': 'action', 'title': 'Abort ROI'},
-                      {'name': 'Save mode', 'type': 'action',
-                       'title': 'Save current parameters as mode'},
-                      {'name': 'Delete mode', 'type': 'action',
-                       'title': 'Remove current mode from list'},
-                      {'name': 'Update all detectors', 'type': 'bool', 'value': False}
-                  ]}]
-
-        detectorParamGroups = {}
-        for detectorParameterName, detectorParameter in detectorParameters.items():
-            if detectorParameter.group not in detectorParamGroups:
-                # Create group
-                detectorParamGroups[detectorParameter.group] = {
-                    'name': detectorParameter.group, 'type': 'group', 'children': []
-                }
-
-            detectorParameterType = type(detectorParameter).__name__
-            if detectorParameterType == 'DetectorNumberParameter':
-                pyqtParam = {
-                    'name': detectorParameterName,
-                    'type': 'float',
-                    'value': detectorParameter.value,
-                    'readonly': not detectorParameter.editable,
-                    'siPrefix': detectorParameter.valueUnits in ['s'],
-                    'suffix': detectorParameter.valueUnits,
-                    'decimals': 5
-                }
-            elif detectorParameterType == 'DetectorListParameter':
-                pyqtParam = {
-                    'name': detectorParameterName,
-                    'type': 'list',
-                    'value': detectorParameter.value,
-                    'readonly': not detectorParameter.editable,
-                    'values': detectorParameter.options
-                }
-            else:
-                raise TypeError(f'Unsupported detector parameter type "{detectorParameterType}"')
-
-            detectorParamGroups[detectorParameter.group]['children'].append(pyqtParam)
-
-        for detectorActionName, detectorAction in detectorActions.items():
-            if detectorAction.group not in detectorParamGroups:
-                # Create group
-                detectorParamGroups[detectorAction.group] = {
-                    'name': detectorAction.group, 'type': 'group', 'children': []
-                }
-
-            detectorParamGroups[detectorAction.group]['children'].append(
-                {'name': detectorActionName, 'type': 'action', 'title': detectorActionName}
-            )
-
-        params += list(detectorParamGroups.values())
-
-        self.p = Parameter.create(name='params', type='group', children=params)
+        self.p = guitools.createDetectorParameters(detectorParameters, detectorActions,
+                                                   supportedBinnings, roiInfos)
         self.setParameters(self.p, showTop=False)
         self._writable = True
 
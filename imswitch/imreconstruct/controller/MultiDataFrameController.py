@@ -2,6 +2,7 @@ import os
 
 import h5py
 
+from imswitch.imcommon.model import VArrayFile
 from imswitch.imreconstruct.model import DataObj
 from .basecontrollers import ImRecWidgetController
 
@@ -50,10 +51,10 @@ class MultiDataFrameController(ImRecWidgetController):
 
     def memoryDataSet(self, name, vFileItem):
         data = vFileItem.data
-        if not isinstance(data, h5py.File):
+        if not isinstance(data, (h5py.File, VArrayFile)):
             data = h5py.File(data)
 
-        for datasetName in data.keys():
+        for datasetName in DataObj.getImageDatasetNames(data):
             self.makeAndAddDataObj(
                 name, datasetName, path=vFileItem.filePath if vFileItem.savedToDisk else None,
                 file=data
@@ -5,7 +5,7 @@ import numpy as np
 import tifffile as tiff
 import zarr
 
-from imswitch.imcommon.model import initLogger
+from imswitch.imcommon.model import VArrayFile, initLogger
 
 
 class DataObj:
@@ -33,6 +33,8 @@ class DataObj:
             self._data = self._file.asarray()
         elif isinstance(self._file, zarr.hierarchy.Group):
             self._data = np.array(self._file[self._datasetName])
+        elif isinstance(self._file, VArrayFile):
+            self._data = self._file[self._datasetName]  # Shared, not copied
         return self._data
 
     @property
@@ -48,6 +50,10 @@ class DataObj:
             attrs = dict(self._file.attrs)
             attrs.update(dict(self._file[self.datasetName].attrs))
             self._attrs = attrs
+        if isinstance(self._file, VArrayFile):
+            attrs = dict(self._file.attrs)
+            attrs.update(self._file.datasetAttrs.get(self.datasetName, {}))
+            self._attrs = attrs
         return self._attrs
 
     @property
@@ -97,7 +103,7 @@ class DataObj:
         file, _ = DataObj._open(path, allowMultipleDatasets=True)
         try:
             if isinstance(file, h5py.File) or isinstance(file, zarr.hierarchy.Group):
-                return list(file.keys())
+                return DataObj.getImageDatasetNames(file)
             elif isinstance(file, tiff.TiffFile):
                 return ['default']
             else:
@@ -106,31 +112,40 @@ class DataObj:
             if isinstance(file, h5py.File):
                 file.close()
 
+    @staticmethod
+    def getImageDatasetNames(file):
+        """ Returns the names of the datasets in an opened file, leaving out
+        groups such as the per-frame metadata tables of recordings. """
+        return [name for name in file.keys()
+                if isinstance(file[name], (h5py.Dataset, zarr.core.Array, np.ndarray))]
+
     @staticmethod
     def _open(path, datasetName=None, allowMultipleDatasets=False):
         ext = os.path.splitext(path)[1]
         if ext in ['.hdf5', '.hdf']:
             file = h5py.File(path, 'r')
-            if len(file) < 1:
+            datasetNames = DataObj.getImageDatasetNames(file)
+            if len(datasetNames) < 1:
                 raise RuntimeError('File does not contain any datasets')
-            elif len(file) > 1 and datasetName is None and not allowMultipleDatasets:
+            elif len(datasetNames) > 1 and datasetName is None and not allowMultipleDatasets:
                 raise RuntimeError('File contains multiple datasets')
 
             if datasetName is None and not allowMultipleDatasets:
-                datasetName = list(file.keys())[0]
+                datasetName = datasetNames[0]
 
             return file, datasetName
         elif ext in ['.tiff', '.tif']:
             return tiff.TiffFile(path), None
         elif ext in ['.zarr']:
             file = zarr.open(path, mode='r')
-            if len(file) < 1:
+            datasetNames = DataObj.getImageDatasetNames(file)
+            if len(datasetNames) < 1:
                 raise RuntimeError('File does not contain any datasets')
-            elif len(file) > 1 and datasetName is None and not allowMultipleDatasets:
+            elif len(datasetNames) > 1 and datasetName is None and not allowMultipleDatasets:
                 raise RuntimeError('File contains multiple datasets')
 
             if datasetName is None and not allowMultipleDatasets:
-                datasetName = list(file.keys())[0]
+                datasetName = datasetNames[0]
 
             return file, datasetName
         else: